@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+ARTEFATO DO MODELO TREINADO (VERSIONADO, SEM PICKLE)
+=============================================================================
+Tudo o que sai de um treino fica em um único modelo_<m>.modelo.npz:
+   árvores  nós de cada árvore (feature, limiar, filhos, valores)
+   SVM      coeficientes, bias, média/desvio do StandardScaler e a decisão
+            (binario, ovo, ovr)
+   meta     formato + versão, features, nomes das classes, hash dos dados
+            de treino, métricas da validação, parâmetros e os formatos do C
+            da última exportação
+
+A partir dele, sem recarregar CSVs nem treinar de novo (milissegundos):
+   python treinar_scanner.py --artefato modelo_rf.modelo.npz --arvore-c tabela16
+   python inferencia.py modelo_rf.modelo.npz ../data/*.csv --comparar
+   python artefato.py modelo_rf.modelo.npz        (resumo + tamanho no Pico)
+
+carregar_artefato() devolve objetos com a mesma interface que os geradores
+de C usam (tree_, estimators_, coef_, mean_/scale_...) e com predict()
+igual ao do scikit-learn, para servir de referência.
+VERSAO_ARTEFATO muda quando o layout muda; versões mais novas que a do
+código são recusadas.
+=============================================================================
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+
+from arvores_c import bytes_tabela, quantizar_tabela, tabela_arvores
+from svm_c import tipo_decisao
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+FORMATO_ARTEFATO = 'bme688-modelo'
+VERSAO_ARTEFATO = 1
+EXTENSAO_ARTEFATO = '.modelo.npz'
+
+# =============================================================================
+# MODELOS RECONSTRUÍDOS
+# =============================================================================
+
+class ArvoreSalva:
+    """Árvore lida do artefato: tree_ como o do scikit-learn."""
+
+    def __init__(self, feature, limiar, esquerda, direita, valor, classes):
+        self.tree_ = SimpleNamespace(
+            feature=feature, threshold=limiar, children_left=esquerda,
+            children_right=direita, value=valor[:, None, :], node_count=len(feature))
+        self.classes_ = classes
+        self.n_features_in_ = int(feature.max()) + 1 if len(feature) else 0
+
+    def apply(self, X):
+        """Folha de cada linha (entrada em float32, como o scikit-learn)."""
+        t = self.tree_
+        X = np.asarray(X, dtype=np.float32)
+        no = np.zeros(len(X), dtype=np.int64)
+        ativo = t.children_left[no] != -1
+        while ativo.any():
+            i = np.flatnonzero(ativo)
+            esquerda = X[i, t.feature[no[i]]] <= t.threshold[no[i]]
+            no[i] = np.where(esquerda, t.children_left[no[i]], t.children_right[no[i]])
+            ativo = t.children_left[no] != -1
+        return no
+
+    def predict_proba(self, X):
+        valor = self.tree_.value[self.apply(X), 0]
+        return valor / np.maximum(valor.sum(axis=1, keepdims=True), 1e-300)
+
+    def predict(self, X):
+        return self.classes_[self.tree_.value[self.apply(X), 0].argmax(axis=1)]
+
+
+class FlorestaSalva:
+    """Floresta lida do artefato (voto por probabilidade ou por maioria)."""
+
+    def __init__(self, estimators, classes, votacao):
+        self.estimators_ = estimators
+        self.classes_ = classes
+        self.votacao = votacao
+
+    def predict(self, X):
+        votos = np.zeros((len(X), len(self.classes_)))
+        for arvore in self.estimators_:
+            if self.votacao == 'probabilidade':
+                votos += arvore.predict_proba(X)
+            else:
+                votos[np.arange(len(X)), arvore.tree_.value[arvore.apply(X), 0].argmax(axis=1)] += 1
+        return self.classes_[votos.argmax(axis=1)]
+
+
+class LinearSalvo:
+    """SVM/modelo linear lido do artefato."""
+
+    def __init__(self, coef, intercept, classes, decisao):
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.classes_ = classes
+        self.decisao = decisao
+
+    def decision_function(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef_.T + self.intercept_
+
+    def predict(self, X):
+        d = self.decision_function(X)
+        if self.decisao == 'binario':
+            return self.classes_[(d[:, 0] > 0).astype(int)]
+        if self.decisao == 'ovr':
+            return self.classes_[d.argmax(axis=1)]
+        k = len(self.classes_)
+        votos = np.zeros((len(d), k), dtype=np.int64)
+        h = 0
+        for i in range(k):
+            for j in range(i + 1, k):
+                votos[:, i] += d[:, h] > 0
+                votos[:, j] += d[:, h] <= 0
+                h += 1
+        return self.classes_[votos.argmax(axis=1)]
+
+
+class EscalonadorSalvo:
+    """StandardScaler lido do artefato."""
+
+    def __init__(self, media, desvio):
+        self.mean_ = media
+        self.scale_ = desvio
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+# =============================================================================
+# HASH DOS DADOS
+# =============================================================================
+
+def hash_arrays(X, y):
+    """sha256 de X e y (forma, tipo e bytes): muda se qualquer leitura mudar."""
+    h = hashlib.sha256()
+    for a in (X, y):
+        a = np.ascontiguousarray(a)
+        h.update(f"{a.shape}{a.dtype}".encode())
+        h.update(a.tobytes())
+    return h.hexdigest()
+
+
+def hash_arquivos(caminhos):
+    """sha256 de caminho + tamanho + mtime (treino em fluxo, sem a base na memória)."""
+    h = hashlib.sha256()
+    for caminho in sorted(caminhos):
+        info = os.stat(caminho)
+        h.update(f"{os.path.abspath(caminho)}|{info.st_size}|{info.st_mtime_ns}\n".encode())
+    return h.hexdigest()
+
+# =============================================================================
+# SALVAR / CARREGAR
+# =============================================================================
+
+def _arrays_arvores(arvores):
+    t = [a.tree_ for a in arvores]
+    n_classes = max(x.value.shape[2] for x in t)
+    valor = np.zeros((sum(x.node_count for x in t), n_classes))
+    inicio = 0
+    for x in t:
+        valor[inicio:inicio + x.node_count, :x.value.shape[2]] = x.value[:, 0, :]
+        inicio += x.node_count
+    return {
+        'nos': np.array([x.node_count for x in t], dtype=np.int64),
+        'feature': np.concatenate([x.feature for x in t]).astype(np.int64),
+        'limiar': np.concatenate([x.threshold for x in t]).astype(np.float64),
+        'esquerda': np.concatenate([x.children_left for x in t]).astype(np.int64),
+        'direita': np.concatenate([x.children_right for x in t]).astype(np.int64),
+        'valor': valor,
+    }
+
+
+def salvar_artefato(caminho, modelo, clf, scaler, meta):
+    """
+    Grava o modelo treinado. `meta` leva features, classes (id -> nome),
+    dados, métricas, parâmetros e exportação; formato/versão/data entram aqui.
+    """
+    meta = dict(meta, formato=FORMATO_ARTEFATO, versao=VERSAO_ARTEFATO, modelo=modelo,
+                criado_em=meta.get('criado_em') or datetime.now().isoformat(timespec='seconds'))
+    meta['classes'] = {str(k): v for k, v in meta.get('classes', {}).items()}
+    arrays = {'classes_modelo': np.asarray(clf.classes_)}
+    if modelo == 'svm':
+        meta['decisao'] = tipo_decisao(clf)
+        arrays.update(coef=np.atleast_2d(clf.coef_), intercept=np.asarray(clf.intercept_),
+                      media=np.asarray(scaler.mean_), desvio=np.asarray(scaler.scale_))
+    else:
+        arvores = [clf] if modelo == 'dt' else clf.estimators_
+        # RandomForestClassifier soma probabilidades; a floresta do fluxo vota
+        meta['votacao'] = 'probabilidade' if hasattr(clf, 'predict_proba') else 'maioria'
+        arrays.update(_arrays_arvores(arvores))
+
+    temporario = caminho + '.tmp.npz'
+    np.savez_compressed(temporario, meta=json.dumps(meta, ensure_ascii=False), **arrays)
+    os.replace(temporario, caminho)
+    return meta
+
+
+def eh_artefato(caminho):
+    return caminho.endswith(EXTENSAO_ARTEFATO)
+
+
+def carregar_artefato(caminho):
+    """(meta, clf, scaler) com objetos prontos para os geradores de C."""
+    with np.load(caminho) as dados:
+        meta = json.loads(str(dados['meta']))
+        a = {c: dados[c] for c in dados.files if c != 'meta'}
+
+    if meta.get('formato') != FORMATO_ARTEFATO:
+        raise ValueError(f"{caminho}: não é um artefato de modelo")
+    if meta.get('versao', 0) > VERSAO_ARTEFATO:
+        raise ValueError(f"{caminho}: versão {meta['versao']} do artefato é mais nova que a "
+                         f"suportada ({VERSAO_ARTEFATO}); atualize o código")
+    meta['classes'] = {int(k): v for k, v in meta.get('classes', {}).items()}
+    classes = a['classes_modelo']
+
+    if meta['modelo'] == 'svm':
+        clf = LinearSalvo(a['coef'], a['intercept'], classes, meta['decisao'])
+        return meta, clf, EscalonadorSalvo(a['media'], a['desvio'])
+
+    arvores, inicio = [], 0
+    for n in a['nos']:
+        fatia = slice(inicio, inicio + n)
+        arvores.append(ArvoreSalva(a['feature'][fatia], a['limiar'][fatia], a['esquerda'][fatia],
+                                   a['direita'][fatia], a['valor'][fatia], classes))
+        inicio += n
+    if meta['modelo'] == 'dt':
+        return meta, arvores[0], None
+    return meta, FlorestaSalva(arvores, classes, meta.get('votacao', 'probabilidade')), None
+
+# =============================================================================
+# RESUMO
+# =============================================================================
+
+def resumo(caminho):
+    """Linhas de texto com os metadados e o tamanho no Pico de cada formato."""
+    meta, clf, _ = carregar_artefato(caminho)
+    linhas = [
+        f"🧠 {meta['modelo']} | artefato v{meta['versao']} | criado em {meta['criado_em']}",
+        f"   classes: {', '.join(f'{k}={v}' for k, v in sorted(meta['classes'].items()))}",
+        f"   features: {', '.join(meta.get('features', []))}",
+    ]
+    dados = meta.get('dados', {})
+    if dados:
+        linhas.append(f"   dados: {dados.get('n_amostras', '?'):,} amostras | "
+                      f"sha256 {dados.get('hash', '?')[:16]}…")
+    for nome, valor in meta.get('metricas', {}).items():
+        linhas.append(f"   {nome}: {valor:.2%}" if isinstance(valor, float) else f"   {nome}: {valor}")
+    if meta.get('parametros'):
+        linhas.append(f"   parâmetros: {meta['parametros']}")
+
+    if meta['modelo'] == 'svm':
+        h, n = clf.coef_.shape
+        linhas.append(f"   {meta['decisao']}: {h} hiperplano(s) | float {4 * h * (n + 1):,} B | "
+                      f"int16 {2 * h * n + 4 * h:,} B | int8 {h * n + 4 * h:,} B")
+    else:
+        arvores = [clf] if meta['modelo'] == 'dt' else clf.estimators_
+        tabela = tabela_arvores(arvores)
+        float_ = bytes_tabela(tabela)
+        int16 = bytes_tabela(quantizar_tabela(tabela, len(meta.get('features', [])) or 9))
+        linhas.append(f"   {len(arvores)} árvore(s), {len(tabela['feature'])} nós internos | "
+                      f"tabela {float_:,} B | tabela16 {int16:,} B")
+    exportacao = meta.get('exportacao')
+    if exportacao:
+        linhas.append(f"   última exportação: {exportacao}")
+    return linhas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mostra o conteúdo de um artefato de modelo')
+    parser.add_argument('artefatos', nargs='+')
+    args = parser.parse_args()
+    for caminho in args.artefatos:
+        try:
+            print("\n".join(resumo(caminho)))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"❌ {caminho}: {e}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
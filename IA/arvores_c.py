@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+EXPORTAÇÃO DE ÁRVORES / FLORESTAS COMO TABELAS DE NÓS
+=============================================================================
+Alternativa ao if/else aninhado: os nós internos de todas as árvores vão
+para vetores constantes (flash) e um único laço em C percorre qualquer
+árvore. O código não cresce com o número de árvores, só as tabelas:
+   arv_feature[n]  uint8    índice do ratio comparado
+   arv_limiar[n]   float    (ou int16 no modo quantizado)
+   arv_esq[n]      uint16   filho se ratio <= limiar
+   arv_dir[n]      uint16   filho se ratio >  limiar
+   arv_raiz[t]     uint16   primeiro nó de cada árvore
+Um filho com o bit 15 ligado (FOLHA) é uma folha: os bits 0..14 são a
+classe. São 9 bytes por nó interno (7 quantizado), contra ~16 do if/else
+mais 4 por folha; o tempo é proporcional à profundidade.
+
+Limiar float: o scikit-learn compara o float32 da entrada com um limiar
+double; o limiar é arredondado para baixo em float32, o que dá a mesma
+decisão para qualquer entrada float32 (paridade exata).
+
+Modo quantizado (int16): cada ratio é convertido uma vez por leitura
+(q = ratio * escala[f], saturado) e as comparações viram inteiras, bem
+mais baratas no Cortex-M0+ sem FPU. Como q é o piso, ratio <= limiar
+implica q <= limiar_q; só entradas a menos de um passo do limiar podem
+mudar de lado.
+
+avaliar_tabela() é o avaliador de referência em Python sobre as mesmas
+tabelas exportadas: conferir_paridade() o compara com o scikit-learn.
+=============================================================================
+"""
+
+import numpy as np
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+FOLHA = 0x8000
+MAX_NOS = FOLHA - 1
+
+# Maior valor int16 usado para o maior limiar de cada feature (folga de 1
+# para a saturação da entrada ficar sempre acima de todos os limiares)
+Q_MAX = 32766
+
+BYTES_NO_FLOAT = 1 + 4 + 2 + 2
+BYTES_NO_QUANTIZADO = 1 + 2 + 2 + 2
+
+# =============================================================================
+# TABELAS
+# =============================================================================
+
+def limiar_float32(t):
+    """Maior float32 <= t: x <= limiar (float32) equivale a x <= t (double)."""
+    f = np.float32(t)
+    if float(f) > t:
+        f = np.nextafter(f, np.float32(-np.inf))
+    return f
+
+
+def tabela_arvores(arvores, casas=None):
+    """
+    Tabelas (dict de arrays) com os nós internos de todas as `arvores`
+    (objetos com tree_, como DecisionTreeClassifier). Com `casas`, o limiar
+    é o que o C lê de f"{t:.<casas>f}f" (o formato do if/else).
+    """
+    feature, limiar, esq, dir_, raizes = [], [], [], [], []
+
+    for arvore in arvores:
+        t = arvore.tree_
+
+        def referencia(no):
+            if t.children_left[no] == -1:
+                return FOLHA | int(np.argmax(t.value[no][0]))
+            return indice[no]
+
+        # Numera os nós internos em pré-ordem (filho esquerdo logo depois
+        # do pai: percorre a flash em sequência no caminho mais comum)
+        indice = {}
+        pilha = [0]
+        while pilha:
+            no = pilha.pop()
+            if t.children_left[no] == -1:
+                continue
+            indice[no] = len(feature) + len(indice)
+            pilha += [t.children_right[no], t.children_left[no]]
+
+        for no in sorted(indice, key=indice.get):
+            feature.append(int(t.feature[no]))
+            if casas is None:
+                limiar.append(limiar_float32(t.threshold[no]))
+            else:
+                limiar.append(np.float32(f"{t.threshold[no]:.{casas}f}"))
+            esq.append(referencia(t.children_left[no]))
+            dir_.append(referencia(t.children_right[no]))
+        raizes.append(referencia(0))
+
+    if len(feature) > MAX_NOS:
+        raise ValueError(f"{len(feature)} nós internos: o máximo da tabela é {MAX_NOS}")
+    return {
+        'feature': np.array(feature, dtype=np.uint8),
+        'limiar': np.array(limiar, dtype=np.float32),
+        'esq': np.array(esq, dtype=np.uint16),
+        'dir': np.array(dir_, dtype=np.uint16),
+        'raiz': np.array(raizes, dtype=np.uint16),
+    }
+
+
+def quantizar_tabela(tabela, n_features):
+    """Acrescenta escala[f] (float32) e limiar_q (int16) à tabela."""
+    escala = np.ones(n_features, dtype=np.float32)
+    for f in range(n_features):
+        limiares = tabela['limiar'][tabela['feature'] == f]
+        if len(limiares) and np.abs(limiares).max() > 0:
+            escala[f] = np.float32(Q_MAX / np.abs(limiares).max())
+    tabela['escala'] = escala
+    tabela['limiar_q'] = quantizar_entrada(tabela['limiar'], escala[tabela['feature']])
+    return tabela
+
+
+def quantizar_entrada(X, escala):
+    """Mesma conta do C: piso de ratio * escala em float32, saturado em int16."""
+    q = np.floor(np.asarray(X, dtype=np.float32) * escala)
+    return np.clip(q, -32768, 32767).astype(np.int16)
+
+
+def bytes_tabela(tabela):
+    """Bytes de flash ocupados pelas tabelas."""
+    por_no = BYTES_NO_QUANTIZADO if 'limiar_q' in tabela else BYTES_NO_FLOAT
+    extra = 4 * len(tabela['escala']) if 'escala' in tabela else 0
+    return len(tabela['feature']) * por_no + 2 * len(tabela['raiz']) + extra
+
+# =============================================================================
+# AVALIADOR DE REFERÊNCIA
+# =============================================================================
+
+def profundidade_tabela(tabela):
+    """Maior número de comparações até uma folha, em qualquer árvore."""
+    # Pré-ordem: o filho sempre tem índice maior que o pai
+    nivel = np.ones(len(tabela['feature']), dtype=np.int64)
+    for no in range(len(nivel)):
+        for filho in (tabela['esq'][no], tabela['dir'][no]):
+            if not filho & FOLHA:
+                nivel[filho] = nivel[no] + 1
+    return int(nivel.max()) if len(nivel) else 0
+
+
+def avaliar_tabela(tabela, X):
+    """Classe dada por cada árvore a cada linha: array (n_arvores, n)."""
+    quantizada = 'limiar_q' in tabela
+    if quantizada:
+        entrada, limiares = quantizar_entrada(X, tabela['escala']), tabela['limiar_q']
+        sempre = np.iinfo(np.int16).max
+    else:
+        entrada, limiares = np.asarray(X, dtype=np.float32), tabela['limiar']
+        sempre = np.inf
+
+    # Cada folha vira um nó extra (n_nos + classe) que aponta para si mesmo
+    # e sempre "vai para a esquerda": todas as linhas andam o mesmo número
+    # de passos, sem máscaras nem compactação a cada nível
+    n_nos = len(tabela['feature'])
+    refs = np.concatenate([tabela['esq'], tabela['dir'], tabela['raiz']]).astype(np.int64)
+    n_classes = int((refs[(refs & FOLHA) != 0] & (FOLHA - 1)).max(initial=0)) + 1
+
+    def destino(ref):
+        ref = ref.astype(np.int64)
+        return np.where(ref & FOLHA, n_nos + (ref & (FOLHA - 1)), ref)
+
+    folhas = n_nos + np.arange(n_classes)
+    feature = np.concatenate([tabela['feature'], np.zeros(n_classes, np.uint8)]).astype(np.intp)
+    limiar = np.concatenate([limiares, np.full(n_classes, sempre, dtype=limiares.dtype)])
+    # filhos[2*no + 1] = esquerdo, filhos[2*no] = direito: um só gather por passo
+    filhos = np.stack([np.concatenate([destino(tabela['dir']), folhas]),
+                       np.concatenate([destino(tabela['esq']), folhas])], axis=1).ravel()
+
+    entrada = np.ascontiguousarray(entrada)
+    plana = entrada.ravel()
+    base = np.arange(len(entrada), dtype=np.intp) * entrada.shape[1]
+    passos = profundidade_tabela(tabela)
+    saida = np.empty((len(tabela['raiz']), len(entrada)), dtype=np.int64)
+    for k, raiz in enumerate(destino(tabela['raiz'])):
+        no = np.full(len(entrada), raiz, dtype=np.intp)
+        for _ in range(passos):
+            esquerda = plana.take(base + feature.take(no)) <= limiar.take(no)
+            no = filhos.take(2 * no + esquerda)
+        saida[k] = no - n_nos
+    return saida
+
+
+def votar(previsoes, n_classes):
+    """Classe mais votada (empate: a de menor índice, como o laço em C)."""
+    votos = np.stack([np.count_nonzero(previsoes == c, axis=0) for c in range(n_classes)])
+    return votos.argmax(axis=0)
+
+
+def conferir_paridade(arvores, tabela, X):
+    """
+    Compara, árvore a árvore, o avaliador das tabelas com o predict do
+    scikit-learn. Retorna (decisões iguais, total de decisões).
+    """
+    X32 = np.asarray(X, dtype=np.float32)
+    referencia = avaliar_tabela(tabela, X32)
+    iguais = 0
+    for k, arvore in enumerate(arvores):
+        esperado = arvore.tree_.value[arvore.apply(X32), 0].argmax(axis=1)
+        iguais += int(np.count_nonzero(referencia[k] == esperado))
+    return iguais, referencia.size
+
+# =============================================================================
+# CÓDIGO C
+# =============================================================================
+
+def _vetor_c(tipo, nome, valores, formato, por_linha=12):
+    itens = [formato(v) for v in valores] or ['0']
+    linhas = [', '.join(itens[i:i + por_linha]) for i in range(0, len(itens), por_linha)]
+    return f"static const {tipo} {nome}[{len(itens)}] = {{\n    " + ",\n    ".join(linhas) + "\n};\n"
+
+
+def gerar_tabela_c(tabela, n_classes, nome_funcao, n_features):
+    """Tabelas + avaliador iterativo; nome_funcao(ratios) devolve a classe."""
+    quantizada = 'limiar_q' in tabela
+    n_arvores = len(tabela['raiz'])
+    code = f"""
+#include <stdint.h>
+
+// {len(tabela['feature'])} nós internos em {n_arvores} árvore(s), {bytes_tabela(tabela)} bytes de tabela
+#define ARV_FOLHA 0x8000u
+#define ARV_N_ARVORES {n_arvores}
+
+"""
+    code += _vetor_c('uint8_t', 'arv_feature', tabela['feature'], str)
+    if quantizada:
+        code += _vetor_c('int16_t', 'arv_limiar', tabela['limiar_q'], str)
+        code += _vetor_c('float', 'arv_escala', tabela['escala'], lambda v: f"{v:.9g}f")
+    else:
+        code += _vetor_c('float', 'arv_limiar', tabela['limiar'], lambda v: f"{v:.9g}f", 6)
+    code += _vetor_c('uint16_t', 'arv_esq', tabela['esq'], lambda v: f"0x{v:04X}", 8)
+    code += _vetor_c('uint16_t', 'arv_dir', tabela['dir'], lambda v: f"0x{v:04X}", 8)
+    code += _vetor_c('uint16_t', 'arv_raiz', tabela['raiz'], lambda v: f"0x{v:04X}", 8)
+
+    if quantizada:
+        code += f"""
+static int arv_avaliar(const int16_t q[], uint16_t no) {{
+    while (!(no & ARV_FOLHA)) {{
+        no = (q[arv_feature[no]] <= arv_limiar[no]) ? arv_esq[no] : arv_dir[no];
+    }}
+    return no & ~ARV_FOLHA;
+}}
+
+int {nome_funcao}(float ratios[]) {{
+    int16_t q[{n_features}];
+    for (int i = 0; i < {n_features}; i++) {{
+        float v = floorf(ratios[i] * arv_escala[i]);
+        q[i] = (v >= 32767.0f) ? 32767 : (v <= -32768.0f) ? -32768 : (int16_t)v;
+    }}
+"""
+        code = code.replace("#include <stdint.h>", "#include <math.h>\n#include <stdint.h>", 1)
+        entrada = 'q'
+    else:
+        code += f"""
+static int arv_avaliar(const float ratios[], uint16_t no) {{
+    while (!(no & ARV_FOLHA)) {{
+        no = (ratios[arv_feature[no]] <= arv_limiar[no]) ? arv_esq[no] : arv_dir[no];
+    }}
+    return no & ~ARV_FOLHA;
+}}
+
+int {nome_funcao}(float ratios[]) {{
+"""
+        entrada = 'ratios'
+
+    if n_arvores == 1:
+        code += f"    return arv_avaliar({entrada}, arv_raiz[0]);\n}}\n"
+        return code
+
+    code += f"""    int votos[{n_classes}] = {{0}};
+    for (int t = 0; t < ARV_N_ARVORES; t++) {{
+        votos[arv_avaliar({entrada}, arv_raiz[t])]++;
+    }}
+
+    int classe_vencedora = 0;
+    for (int i = 1; i < {n_classes}; i++) {{
+        if (votos[i] > votos[classe_vencedora]) {{
+            classe_vencedora = i;
+        }}
+    }}
+    return classe_vencedora;
+}}
+"""
+    return code
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+BUSCA DE HIPERPARÂMETROS EM PARALELO (ACURÁCIA x CUSTO NO PICO)
+=============================================================================
+Explora grades de profundidade / número de árvores / C para os três
+modelos exportáveis, em um pool de processos com todos os núcleos:
+- As dobras (as da validação escolhida no treinador, ou StratifiedKFold)
+  são calculadas uma vez e compartilhadas por todos os candidatos; cada
+  tarefa é um par (candidato, dobra)
+- O StandardScaler do SVM é ajustado uma vez por dobra e os dados já
+  escalados ficam prontos nos processos (não se repete por valor de C)
+- Modo halving: todos os candidatos começam com poucas amostras; a cada
+  rodada sobram os melhores (e os da fronteira de Pareto) com FATOR vezes
+  mais amostras; a última rodada usa o treino inteiro de cada dobra
+
+Para cada candidato mede a acurácia e estima o custo no RP2040 (nós,
+bytes de flash e ciclos por inferência do código C gerado). O resultado
+é a fronteira de Pareto: candidatos que nenhum outro supera em acurácia
+sem custar mais.
+=============================================================================
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import StratifiedKFold
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+from sklearn.tree import DecisionTreeClassifier
+
+from validacao import media_dobras
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+GRADES = {
+    'dt': {'max_depth': [2, 3, 4, 5, 6, 8, 10]},
+    'rf': {'n_estimators': [3, 5, 10, 20], 'max_depth': [3, 4, 6]},
+    'svm': {'C': [0.01, 0.1, 1.0, 10.0]},
+}
+
+N_DOBRAS = 5
+SEMENTE = 42
+
+# Halving: amostras de treino na primeira rodada e fator de corte/aumento
+AMOSTRAS_INICIAIS = 1000
+FATOR_HALVING = 3
+
+# Custo estimado do código gerado no RP2040 (Cortex-M0+ sem FPU: float é
+# emulado em software). Valores aproximados, servem para comparar os
+# candidatos entre si, não para prever o tempo exato.
+CUSTO_PICO = {
+    'ciclos_comparacao': 35,    # __aeabi_fcmple + desvio
+    'ciclos_soma': 70,          # __aeabi_fadd / fsub
+    'ciclos_multiplicacao': 60,
+    'ciclos_divisao': 150,
+    'ciclos_chamada': 12,       # chamada de função + retorno
+    'bytes_no_interno': 16,     # carrega ratio, constante, compara, desvia
+    'bytes_folha': 4,           # return <classe>
+    'bytes_funcao': 16,         # prólogo/epílogo
+    'bytes_voto': 64,           # laço de votação da floresta
+}
+
+# =============================================================================
+# CUSTO NO DISPOSITIVO
+# =============================================================================
+
+def _custo_arvore(arvore, X):
+    """(nós, bytes, ciclos médios) de uma árvore exportada como if/else."""
+    t = arvore.tree_
+    folhas = int(np.count_nonzero(t.children_left == -1))
+    internos = t.node_count - folhas
+    flash = (internos * CUSTO_PICO['bytes_no_interno'] + folhas * CUSTO_PICO['bytes_folha']
+             + CUSTO_PICO['bytes_funcao'])
+    # Comparações por leitura = nós no caminho até a folha - 1
+    comparacoes = np.asarray(arvore.decision_path(X).sum(axis=1)).mean() - 1
+    ciclos = comparacoes * CUSTO_PICO['ciclos_comparacao'] + CUSTO_PICO['ciclos_chamada']
+    return t.node_count, flash, ciclos
+
+
+def custo_modelo(modelo, clf, X):
+    """Estimativa de (nós, bytes de flash, ciclos por inferência)."""
+    if modelo == 'dt':
+        return _custo_arvore(clf, X)
+    if modelo == 'rf':
+        custos = np.array([_custo_arvore(a, X) for a in clf.estimators_])
+        n_classes = len(clf.classes_)
+        return (int(custos[:, 0].sum()),
+                custos[:, 1].sum() + CUSTO_PICO['bytes_voto'],
+                custos[:, 2].sum() + n_classes * CUSTO_PICO['ciclos_comparacao'])
+    # SVM linear: por feature (x - média) / desvio * peso + soma, por hiperplano
+    hiperplanos, n_features = clf.coef_.shape
+    por_feature = (2 * CUSTO_PICO['ciclos_soma'] + CUSTO_PICO['ciclos_divisao']
+                   + CUSTO_PICO['ciclos_multiplicacao'])
+    flash = 4 * (hiperplanos + 1) * n_features + 4 * hiperplanos + 3 * CUSTO_PICO['bytes_funcao']
+    ciclos = hiperplanos * (n_features * por_feature + CUSTO_PICO['ciclos_comparacao'])
+    return 0, flash, ciclos + CUSTO_PICO['ciclos_chamada']
+
+# =============================================================================
+# TAREFAS DO POOL
+# =============================================================================
+
+# Preenchido em cada processo pelo initializer (herdado no fork, enviado
+# uma única vez por processo no spawn)
+_DADOS = {}
+
+
+def _iniciar_processo(X, y, dobras, escalados):
+    _DADOS.update(X=X, y=y, dobras=dobras, escalados=escalados)
+
+
+def criar_classificador(modelo, params):
+    if modelo == 'dt':
+        return DecisionTreeClassifier(random_state=SEMENTE, **params)
+    if modelo == 'rf':
+        # n_jobs=1: o paralelismo já está no pool
+        return RandomForestClassifier(random_state=SEMENTE, n_jobs=1, **params)
+    return SVC(kernel='linear', random_state=SEMENTE, **params)
+
+
+def _avaliar(tarefa):
+    """Treina um candidato em uma dobra; retorna acurácia e custo."""
+    indice, modelo, params, dobra, n_amostras = tarefa
+    treino, teste = _DADOS['dobras'][dobra]
+    if modelo == 'svm':
+        X_treino, X_teste = _DADOS['escalados'][dobra]
+        X_treino = X_treino[:n_amostras]
+    else:
+        X_treino, X_teste = _DADOS['X'][treino[:n_amostras]], _DADOS['X'][teste]
+    y_treino, y_teste = _DADOS['y'][treino[:n_amostras]], _DADOS['y'][teste]
+
+    clf = criar_classificador(modelo, params)
+    clf.fit(X_treino, y_treino)
+    acuracia = float(np.mean(clf.predict(X_teste) == y_teste))
+    return (indice, acuracia) + tuple(float(c) for c in custo_modelo(modelo, clf, X_teste))
+
+# =============================================================================
+# BUSCA
+# =============================================================================
+
+def candidatos(grades=GRADES, modelos=None):
+    """Lista de (modelo, params) com todas as combinações das grades."""
+    lista = []
+    for modelo, grade in grades.items():
+        if modelos and modelo not in modelos:
+            continue
+        nomes = list(grade)
+        for valores in itertools.product(*(grade[n] for n in nomes)):
+            lista.append((modelo, dict(zip(nomes, valores))))
+    return lista
+
+
+def preparar_dobras(X, y, divisoes=None, n_dobras=N_DOBRAS, semente=SEMENTE):
+    """
+    Dobras de `divisoes` (ex: por sessão, de validacao.py) ou estratificadas
+    por linha. Os índices de treino vêm embaralhados: treino[:n] é uma
+    subamostra aleatória (halving). Devolve também os dados escalados do
+    SVM por dobra.
+    """
+    if divisoes is None:
+        divisoes = StratifiedKFold(n_dobras).split(X, y)
+    rng = np.random.default_rng(semente)
+    dobras, escalados = [], []
+    for treino, teste in divisoes:
+        treino = rng.permutation(treino)
+        dobras.append((treino, teste))
+        scaler = StandardScaler().fit(X[treino])
+        escalados.append((scaler.transform(X[treino]), scaler.transform(X[teste])))
+    return dobras, escalados
+
+
+def fronteira_pareto(resultados):
+    """Resultados não dominados (acurácia maior, flash e ciclos menores)."""
+    fronteira = []
+    for r in resultados:
+        dominado = any(
+            o['acuracia'] >= r['acuracia'] and o['flash'] <= r['flash'] and o['ciclos'] <= r['ciclos']
+            and (o['acuracia'], o['flash'], o['ciclos']) != (r['acuracia'], r['flash'], r['ciclos'])
+            for o in resultados)
+        if not dominado:
+            fronteira.append(r)
+    return sorted(fronteira, key=lambda r: (r['flash'], -r['acuracia']))
+
+
+def _rodada(executor, lista, dobras, n_amostras):
+    """Uma rodada; n_amostras=None treina com o treino inteiro de cada dobra."""
+    tarefas = [(i, modelo, params, d, n_amostras)
+               for i, (modelo, params) in enumerate(lista) for d in range(len(dobras))]
+    tamanhos = [len(treino[:n_amostras]) for treino, _ in dobras]
+    metricas = [[] for _ in lista]
+    for indice, *valores in executor.map(_avaliar, tarefas,
+                                         chunksize=max(1, len(tarefas) // 64)):
+        metricas[indice].append(valores)
+    resultados = []
+    for (modelo, params), m in zip(lista, metricas):
+        m = np.array(m)
+        acuracia, desvio = media_dobras(m[:, 0], dobras)
+        resultados.append({
+            'modelo': modelo, 'params': params, 'amostras': (min(tamanhos), max(tamanhos)),
+            'acuracia': acuracia, 'desvio': desvio,
+            'nos': int(round(m[:, 1].mean())), 'flash': int(round(m[:, 2].mean())),
+            'ciclos': int(round(m[:, 3].mean())),
+        })
+    return resultados
+
+
+class _ExecutorLocal:
+    """Mesmo map() do pool, no próprio processo (1 núcleo ou depuração)."""
+
+    def map(self, funcao, itens, chunksize=1):
+        return map(funcao, itens)
+
+
+def buscar(X, y, lista=None, processos=None, halving=False, divisoes=None,
+           amostras_iniciais=AMOSTRAS_INICIAIS, fator=FATOR_HALVING, ao_terminar_rodada=None):
+    """
+    Avalia os candidatos (todos os da grade por padrão) e retorna
+    (resultados com o treino inteiro de cada dobra, fronteira de Pareto).
+    ao_terminar_rodada(n_amostras, resultados) recebe n_amostras=None na
+    rodada final; 'amostras' de cada resultado é (menor, maior) treino.
+    """
+    lista = lista or candidatos()
+    processos = processos or os.cpu_count() or 1
+    dobras, escalados = preparar_dobras(X, y, divisoes)
+    n_treino = min(len(treino) for treino, _ in dobras)
+
+    if processos > 1:
+        executor = ProcessPoolExecutor(processos, initializer=_iniciar_processo,
+                                       initargs=(X, y, dobras, escalados))
+    else:
+        _iniciar_processo(X, y, dobras, escalados)
+        executor = _ExecutorLocal()
+
+    try:
+        # Halving em número de amostras até a menor dobra; a última rodada
+        # (None) usa o treino inteiro de cada dobra, sem cortar as maiores
+        n_amostras = amostras_iniciais if halving and amostras_iniciais < n_treino else None
+        while True:
+            resultados = _rodada(executor, lista, dobras, n_amostras)
+            if ao_terminar_rodada:
+                ao_terminar_rodada(n_amostras, resultados)
+            if n_amostras is None:
+                break
+            # Ficam os melhores 1/fator e a fronteira de Pareto da rodada
+            # (modelos baratos não são descartados só por perderem acurácia)
+            melhores = sorted(resultados, key=lambda r: -r['acuracia'])
+            manter = melhores[:max(1, -(-len(melhores) // fator))] + fronteira_pareto(resultados)
+            chaves = {(r['modelo'], str(r['params'])) for r in manter}
+            lista = [(m, p) for m, p in lista if (m, str(p)) in chaves]
+            n_amostras = n_amostras * fator
+            if n_amostras >= n_treino:
+                n_amostras = None
+    finally:
+        if processos > 1:
+            executor.shutdown()
+
+    return resultados, fronteira_pareto(resultados)
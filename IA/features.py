@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+FEATURES DO NARIZ ELETRÔNICO (VETORIZADAS E COM CACHE)
+=============================================================================
+Todas as features saem da matriz (n, 10) de resistências G320...G100 em
+poucas operações NumPy sobre a matriz inteira (sem laço por coluna):
+   ratio      R_Gxxx = Gxxx / G100 (9 colunas, as usadas no firmware)
+   log        L_Gxxx = ln(Gxxx) (10 colunas)
+   inclinacao S_Gxxx = ln(G[passo+1]) - ln(G[passo]) (9 colunas)
+   forma      F_Gxxx = ln(Gxxx) - média dos ln da leitura (10 colunas)
+
+Cada arquivo processado (features + sessao_id/amostra_id de cada leitura)
+vai para um cache em disco (.npz) cuja chave é o hash de caminho + mtime +
+tamanho + grupos de features. Rodar de novo o treinador com os mesmos
+arquivos pula o parse e o cálculo.
+=============================================================================
+"""
+
+import hashlib
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+from armazenamento import EXTENSOES_REGISTROS, carregar_registros  # noqa: E402
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+FEATURES_RAW = ['G320', 'G295', 'G270', 'G245', 'G220', 'G195', 'G170', 'G145', 'G120', 'G100']
+
+GRUPOS = {
+    'ratio': ('R_', FEATURES_RAW[:-1]),
+    'log': ('L_', FEATURES_RAW),
+    'inclinacao': ('S_', FEATURES_RAW[:-1]),
+    'forma': ('F_', FEATURES_RAW),
+}
+GRUPOS_PADRAO = ('ratio', 'log', 'inclinacao', 'forma')
+
+# Identificação da sessão de cada leitura (para validação por grupos)
+COLUNAS_META = ['sessao_id', 'amostra_id']
+
+DIRETORIO_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache_features')
+
+# Mude ao alterar qualquer fórmula: invalida todo o cache antigo
+VERSAO_FEATURES = 2
+
+# Resistência mínima usada no log (evita -inf em leituras com canal zerado)
+RESISTENCIA_MINIMA = 1.0
+
+# =============================================================================
+# CÁLCULO
+# =============================================================================
+
+def nomes_features(grupos=GRUPOS_PADRAO):
+    """Nomes das colunas na ordem em que calcular_features as devolve."""
+    return [prefixo + canal for g in grupos for prefixo, canais in [GRUPOS[g]]
+            for canal in canais]
+
+
+def filtrar_leituras(gases):
+    """Máscara das leituras válidas: tudo finito e G100 > 0."""
+    return np.isfinite(gases).all(axis=1) & (gases[:, -1] > 0)
+
+
+def calcular_features(gases, grupos=GRUPOS_PADRAO):
+    """Matriz (n, 10) de resistências -> matriz float64 (n, k) de features."""
+    gases = np.asarray(gases, dtype=np.float64)
+    blocos = []
+    ln = None
+    for grupo in grupos:
+        if grupo == 'ratio':
+            blocos.append(gases[:, :-1] / gases[:, -1:])
+            continue
+        if ln is None:
+            ln = np.log(np.maximum(gases, RESISTENCIA_MINIMA))
+        if grupo == 'log':
+            blocos.append(ln)
+        elif grupo == 'inclinacao':
+            blocos.append(np.diff(ln, axis=1))
+        elif grupo == 'forma':
+            blocos.append(ln - ln.mean(axis=1, keepdims=True))
+        else:
+            raise ValueError(f"Grupo de features desconhecido: {grupo}")
+    if not blocos:
+        return np.empty((len(gases), 0))
+    return np.hstack(blocos)
+
+
+def adicionar_features(df, grupos=GRUPOS_PADRAO):
+    """Acrescenta ao DataFrame as colunas de features que ainda não existem."""
+    nomes = nomes_features(grupos)
+    faltando = [n for n in nomes if n not in df.columns]
+    if faltando:
+        valores = calcular_features(df[FEATURES_RAW].to_numpy(dtype=np.float64), grupos)
+        novas = pd.DataFrame(valores, columns=nomes, index=df.index)[faltando]
+        df = pd.concat([df, novas], axis=1)
+    return df
+
+# =============================================================================
+# LEITURA COM CACHE
+# =============================================================================
+
+def _ler_arquivo(caminho):
+    """
+    (gases (n, 10), metadados) de um CSV ou .bme; None se faltar coluna de
+    gás. Metadados: sessao_id e amostra_id por linha ('' quando o arquivo
+    não tem, ex: CSV direto do firmware).
+    """
+    if caminho.endswith(EXTENSOES_REGISTROS):
+        registros, dicionario = carregar_registros(caminho)
+        gases = np.column_stack([registros[c] for c in FEATURES_RAW]).astype(np.float64)
+        sessoes = dicionario['sessoes'] or [{}]
+        codigos = np.asarray(registros['sessao'])
+        meta = {campo: np.asarray([s.get(campo, '') for s in sessoes], dtype=str)[codigos]
+                for campo in COLUNAS_META}
+        return gases, meta
+
+    cabecalho = pd.read_csv(caminho, nrows=0).columns
+    if any(c not in cabecalho for c in FEATURES_RAW):
+        return None
+    presentes = [c for c in COLUNAS_META if c in cabecalho]
+    # Só gás e ids: o parse das demais (timestamp, notas) é o mais caro
+    df = pd.read_csv(caminho, usecols=FEATURES_RAW + presentes,
+                     dtype={c: str for c in presentes})
+    meta = {c: (df[c].fillna('').to_numpy(dtype=str) if c in presentes
+                else np.full(len(df), '', dtype=str))
+            for c in COLUNAS_META}
+    return df[FEATURES_RAW].to_numpy(dtype=np.float64), meta
+
+
+def chave_cache(caminho, grupos=GRUPOS_PADRAO):
+    info = os.stat(caminho)
+    assinatura = json.dumps([os.path.abspath(caminho), info.st_mtime_ns, info.st_size,
+                             list(grupos), VERSAO_FEATURES])
+    return hashlib.sha1(assinatura.encode('utf-8')).hexdigest()
+
+
+def carregar_features(caminho, grupos=GRUPOS_PADRAO, usar_cache=True,
+                      diretorio=DIRETORIO_CACHE):
+    """
+    DataFrame com G320...G100, as features e os metadados (COLUNAS_META)
+    das leituras válidas de um arquivo, vindo do cache quando o arquivo
+    não mudou. None se o arquivo não tem as colunas de gás.
+    """
+    nomes = FEATURES_RAW + nomes_features(grupos)
+    arquivo_cache = os.path.join(diretorio, chave_cache(caminho, grupos) + '.npz')
+
+    if usar_cache and os.path.exists(arquivo_cache):
+        try:
+            with np.load(arquivo_cache) as cache:
+                df = pd.DataFrame(cache['valores'], columns=nomes)
+                for c in COLUNAS_META:
+                    df[c] = cache[c]
+                return df
+        except (OSError, ValueError, KeyError):
+            pass  # cache corrompido: recalcula
+
+    lido = _ler_arquivo(caminho)
+    if lido is None:
+        return None
+    gases, meta = lido
+    validas = filtrar_leituras(gases)
+    gases = gases[validas]
+    meta = {c: v[validas] for c, v in meta.items()}
+    valores = np.hstack([gases, calcular_features(gases, grupos)])
+
+    if usar_cache:
+        os.makedirs(diretorio, exist_ok=True)
+        temporario = arquivo_cache + '.tmp.npz'
+        np.savez(temporario, valores=valores, **meta)
+        os.replace(temporario, arquivo_cache)
+    df = pd.DataFrame(valores, columns=nomes)
+    for c in COLUNAS_META:
+        df[c] = meta[c]
+    return df
+
+
+def limpar_cache(diretorio=DIRETORIO_CACHE):
+    """Apaga os arquivos de cache; retorna quantos foram removidos."""
+    if not os.path.isdir(diretorio):
+        return 0
+    removidos = 0
+    for nome in os.listdir(diretorio):
+        if nome.endswith('.npz'):
+            os.remove(os.path.join(diretorio, nome))
+            removidos += 1
+    return removidos
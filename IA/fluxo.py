@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+TREINO EM FLUXO (BASES MAIORES QUE A MEMÓRIA)
+=============================================================================
+Os arquivos nunca são carregados inteiros: passam em blocos de tamanho
+fixo pelo cálculo de features, e os modelos aprendem bloco a bloco.
+- FonteBlocos: lê alguns arquivos ao mesmo tempo (classes intercaladas),
+  mistura os pedaços em um bloco embaralhado e marca para teste as linhas
+  dos arquivos separados por separar_fontes_teste (arquivos inteiros: uma
+  leitura de teste não tem vizinha quase igual no treino). Cada passada
+  gera exatamente os mesmos blocos
+- Linear (SVM): StandardScaler.partial_fit + SGDClassifier(hinge).partial_fit
+  por algumas épocas; exporta com o mesmo gerar_svm_c
+- Árvores: features discretizadas em faixas (quantis de uma amostra) e
+  árvore construída nível a nível, uma passada por nível, somando
+  histogramas (nó, feature, faixa, classe). A floresta treina todas as
+  árvores na mesma passada, com bootstrap por pesos de Poisson. O
+  resultado tem o mesmo tree_ das árvores do scikit-learn, então os
+  geradores de C continuam iguais
+- Avaliação: reservatório estratificado (amostragem uniforme por classe)
+  das linhas de teste
+
+O pico de memória depende do orçamento (ORCAMENTO_MB), não do total de
+linhas: ele define o tamanho do bloco e dos reservatórios.
+=============================================================================
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+from features import FEATURES_RAW, calcular_features, filtrar_leituras
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+from armazenamento import EXTENSAO_BINARIO, EXTENSAO_COMPACTADO, carregar_binario  # noqa: E402
+from compactacao import LeitorCompactado  # noqa: E402
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+ORCAMENTO_MB = 256
+
+# Memória por linha em um bloco: parse do CSV pelo pandas, gases, features,
+# faixas e índices dos histogramas (estimativa conservadora)
+BYTES_POR_LINHA = 1024
+
+# Divisão do orçamento: blocos de leitura / reservatório de teste / amostra
+# usada para calcular as faixas das árvores
+FRACAO_BLOCO = 0.5
+FRACAO_TESTE = 0.25
+FRACAO_AMOSTRA_FAIXAS = 0.1
+
+# Arquivos lidos ao mesmo tempo para misturar as classes em cada bloco
+ARQUIVOS_ABERTOS = 8
+
+# Fração das linhas separada para avaliação: alvo dos arquivos de teste
+# por classe, ou sorteio fixo por bloco quando uma classe tem um só arquivo
+PROPORCAO_TESTE = 0.2
+
+N_FAIXAS = 64
+EPOCAS_SGD = 5
+SEMENTE = 42
+
+GRUPOS_FLUXO = ('ratio',)
+
+# =============================================================================
+# LEITURA EM BLOCOS
+# =============================================================================
+
+def tamanhos_por_orcamento(orcamento_mb=ORCAMENTO_MB, n_classes=2, n_features=9):
+    """(linhas por bloco, amostras de teste e para as faixas por classe)."""
+    orcamento = orcamento_mb * 1024 * 1024
+    bytes_amostra = (8 * n_features + 8) * n_classes
+    return (max(1000, int(orcamento * FRACAO_BLOCO / BYTES_POR_LINHA)),
+            max(100, int(orcamento * FRACAO_TESTE / bytes_amostra)),
+            max(100, int(orcamento * FRACAO_AMOSTRA_FAIXAS / bytes_amostra)))
+
+
+def ler_gases_em_blocos(caminho, linhas):
+    """Gera matrizes (n <= linhas, 10) de resistências de um CSV, .bme ou .bmz."""
+    if caminho.endswith(EXTENSAO_COMPACTADO):
+        # Só os blocos de cada pedaço são descomprimidos, e só os gases
+        for fatia in LeitorCompactado(caminho).iterar(linhas, colunas=FEATURES_RAW):
+            yield np.column_stack([fatia[c] for c in FEATURES_RAW]).astype(np.float64)
+        return
+    if caminho.endswith(EXTENSAO_BINARIO):
+        registros, _ = carregar_binario(caminho)
+        for inicio in range(0, len(registros), linhas):
+            fatia = registros[inicio:inicio + linhas]
+            yield np.column_stack([fatia[c] for c in FEATURES_RAW]).astype(np.float64)
+        return
+    cabecalho = pd.read_csv(caminho, nrows=0).columns
+    faltando = [c for c in FEATURES_RAW if c not in cabecalho]
+    if faltando:
+        print(f"   ⚠️  {os.path.basename(caminho)}: colunas faltando {faltando}")
+        return
+    with pd.read_csv(caminho, usecols=FEATURES_RAW, chunksize=linhas) as leitor:
+        for pedaco in leitor:
+            yield pedaco[FEATURES_RAW].to_numpy(dtype=np.float64)
+
+
+def intercalar_classes(fontes):
+    """Ordena [(caminho, classe)] alternando as classes (round-robin)."""
+    por_classe = {}
+    for caminho, classe in fontes:
+        por_classe.setdefault(classe, []).append((caminho, classe))
+    filas = list(por_classe.values())
+    ordem = []
+    while any(filas):
+        for fila in filas:
+            if fila:
+                ordem.append(fila.pop(0))
+    return ordem
+
+
+def separar_fontes_teste(fontes, proporcao=PROPORCAO_TESTE, semente=SEMENTE):
+    """
+    Caminhos dos arquivos de teste: por classe, em ordem sorteada, entra
+    cada arquivo que aproxima o total (tamanho em disco, como estimativa
+    de linhas) de `proporcao` da classe; ao menos um e nunca todos.
+    Vazio se alguma classe tem um só arquivo (não há como separar).
+    """
+    por_classe = {}
+    for caminho, classe in fontes:
+        por_classe.setdefault(classe, []).append(caminho)
+    if any(len(caminhos) < 2 for caminhos in por_classe.values()):
+        return set()
+
+    rng = np.random.default_rng(semente)
+    teste = set()
+    for classe in sorted(por_classe):
+        caminhos = por_classe[classe]
+        tamanhos = {c: os.path.getsize(c) for c in caminhos}
+        alvo = proporcao * sum(tamanhos.values())
+        escolhidos, total = [], 0
+        for i in rng.permutation(len(caminhos)):
+            caminho = caminhos[i]
+            if len(escolhidos) < len(caminhos) - 1 and \
+                    abs(total + tamanhos[caminho] - alvo) < abs(total - alvo):
+                escolhidos.append(caminho)
+                total += tamanhos[caminho]
+        teste.update(escolhidos or [min(caminhos, key=tamanhos.get)])
+    return teste
+
+
+class FonteBlocos:
+    """
+    Iterável de blocos (n_bloco, X, y, teste) com as features das leituras
+    válidas (teste = máscara das linhas separadas para avaliação: as dos
+    arquivos em `fontes_teste`, ou um sorteio de `proporcao_teste` das
+    linhas se `fontes_teste` é vazio).
+    Reiterável: cada passada devolve os mesmos blocos na mesma ordem
+    (sorteios semeados pelo número do bloco).
+    """
+
+    def __init__(self, fontes, linhas_bloco, grupos=GRUPOS_FLUXO, fontes_teste=(),
+                 proporcao_teste=PROPORCAO_TESTE, semente=SEMENTE):
+        self.fontes = intercalar_classes(fontes)
+        self.linhas_bloco = linhas_bloco
+        self.grupos = grupos
+        self.fontes_teste = set(fontes_teste)
+        self.proporcao_teste = proporcao_teste
+        self.semente = semente
+
+    def __iter__(self):
+        pendentes = list(self.fontes)
+        abertos = []
+        por_arquivo = max(1, self.linhas_bloco // ARQUIVOS_ABERTOS)
+        n_bloco = 0
+        while pendentes or abertos:
+            while pendentes and len(abertos) < ARQUIVOS_ABERTOS:
+                caminho, classe = pendentes.pop(0)
+                abertos.append((ler_gases_em_blocos(caminho, por_arquivo), classe,
+                                caminho in self.fontes_teste))
+
+            gases, classes, de_teste = [], [], []
+            for leitor in list(abertos):
+                pedaco = next(leitor[0], None)
+                if pedaco is None:
+                    abertos.remove(leitor)
+                    continue
+                pedaco = pedaco[filtrar_leituras(pedaco)]
+                gases.append(pedaco)
+                classes.append(np.full(len(pedaco), leitor[1], dtype=np.int64))
+                de_teste.append(np.full(len(pedaco), leitor[2]))
+            if not gases or not sum(len(g) for g in gases):
+                continue
+
+            rng = np.random.default_rng((self.semente, n_bloco))
+            ordem = rng.permutation(sum(len(g) for g in gases))
+            X = calcular_features(np.concatenate(gases), self.grupos)[ordem]
+            y = np.concatenate(classes)[ordem]
+            if self.fontes_teste:
+                teste = np.concatenate(de_teste)[ordem]
+            else:
+                teste = rng.random(len(y)) < self.proporcao_teste
+            yield n_bloco, X, y, teste
+            n_bloco += 1
+
+# =============================================================================
+# AMOSTRAGEM
+# =============================================================================
+
+class ReservatorioEstratificado:
+    """Amostra uniforme de até `capacidade` linhas por classe, em uma passada."""
+
+    def __init__(self, capacidade, semente=SEMENTE):
+        self.capacidade = capacidade
+        self.rng = np.random.default_rng(semente)
+        self.amostras = {}
+        self.vistos = {}
+
+    def adicionar(self, X, y):
+        for classe in np.unique(y):
+            linhas = X[y == classe]
+            vistos = self.vistos.get(classe, 0)
+            if classe not in self.amostras:
+                self.amostras[classe] = np.empty((self.capacidade, X.shape[1]))
+            amostra = self.amostras[classe]
+
+            # Enchendo: copia direto
+            livres = max(0, min(self.capacidade - vistos, len(linhas)))
+            amostra[vistos:vistos + livres] = linhas[:livres]
+
+            # Cheio (algoritmo R): a linha i fica com probabilidade cap/(i+1);
+            # índices repetidos mantêm a última, como no laço sequencial
+            resto = linhas[livres:]
+            if len(resto):
+                posicoes = np.arange(vistos + livres, vistos + len(linhas))
+                sorteio = (self.rng.random(len(resto)) * (posicoes + 1)).astype(np.int64)
+                entra = sorteio < self.capacidade
+                amostra[sorteio[entra]] = resto[entra]
+            self.vistos[classe] = vistos + len(linhas)
+
+    def dados(self):
+        """(X, y) da amostra atual."""
+        classes = sorted(self.amostras)
+        partes = [self.amostras[c][:min(self.vistos[c], self.capacidade)] for c in classes]
+        if not partes:
+            return np.empty((0, 0)), np.empty(0, dtype=np.int64)
+        y = np.concatenate([np.full(len(p), c, dtype=np.int64) for c, p in zip(classes, partes)])
+        return np.concatenate(partes), y
+
+
+def explorar(fonte, capacidade_teste, capacidade_faixas):
+    """
+    Primeira passada: contagem por classe, scaler, reservatório de teste e
+    amostra de treino para as faixas das árvores.
+    """
+    contagem = {}
+    scaler = StandardScaler()
+    teste = ReservatorioEstratificado(capacidade_teste, SEMENTE)
+    amostra = ReservatorioEstratificado(capacidade_faixas, SEMENTE + 1)
+    for _, X, y, eh_teste in fonte:
+        teste.adicionar(X[eh_teste], y[eh_teste])
+        X_treino, y_treino = X[~eh_teste], y[~eh_teste]
+        if len(y_treino):
+            scaler.partial_fit(X_treino)
+            amostra.adicionar(X_treino, y_treino)
+        for classe, n in zip(*np.unique(y_treino, return_counts=True)):
+            contagem[int(classe)] = contagem.get(int(classe), 0) + int(n)
+    return SimpleNamespace(contagem=contagem, scaler=scaler, teste=teste, amostra=amostra)
+
+# =============================================================================
+# MODELO LINEAR (SGD)
+# =============================================================================
+
+def treinar_linear(fonte, scaler, classes, C, n_amostras, epocas=EPOCAS_SGD):
+    """
+    SVM linear por SGD, bloco a bloco, com o scaler da exploração. O mesmo
+    C do SVC equivale a alpha = 1 / (C * n) na regularização do SGD.
+    """
+    clf = SGDClassifier(loss='hinge', alpha=1.0 / (C * n_amostras), random_state=SEMENTE)
+    for _ in range(epocas):
+        for _, X, y, teste in fonte:
+            if (~teste).any():
+                clf.partial_fit(scaler.transform(X[~teste]), y[~teste], classes=classes)
+    return clf
+
+# =============================================================================
+# ÁRVORES POR HISTOGRAMA
+# =============================================================================
+
+def calcular_faixas(amostra, n_faixas=N_FAIXAS):
+    """Limites (n_features, n_faixas - 1) pelos quantis da amostra."""
+    quantis = np.linspace(0, 1, n_faixas + 1)[1:-1]
+    return np.quantile(amostra, quantis, axis=0).T.copy()
+
+
+def discretizar(X, faixas):
+    """Faixa de cada valor: x <= faixas[f, b] equivale a faixa <= b."""
+    saida = np.empty(X.shape, dtype=np.int64)
+    for f in range(X.shape[1]):
+        saida[:, f] = np.searchsorted(faixas[f], X[:, f], side='left')
+    return saida
+
+
+class ArvoreHistograma:
+    """Árvore de decisão construída por histogramas, com a interface usada
+    pelos geradores de C (tree_) e predict()."""
+
+    def __init__(self, max_depth=5, min_samples_leaf=1, max_features=None,
+                 random_state=SEMENTE):
+        self.max_depth = max_depth
+        self.min_samples_leaf = min_samples_leaf
+        self.max_features = max_features
+        self.rng = np.random.default_rng(random_state)
+
+    def _iniciar(self, classes):
+        self.classes_ = np.asarray(classes)
+        self._feature, self._limiar = [-2], [-2.0]
+        self._esquerda, self._direita = [-1], [-1]
+        self._valor = [np.zeros(len(classes))]
+        self.fronteira = [0]
+        self.nivel = 0
+        self._compilar()
+
+    def _novo_no(self, valor):
+        for lista, v in ((self._feature, -2), (self._limiar, -2.0),
+                         (self._esquerda, -1), (self._direita, -1), (self._valor, valor)):
+            lista.append(v)
+        return len(self._feature) - 1
+
+    def _compilar(self):
+        self.tree_ = SimpleNamespace(
+            feature=np.array(self._feature, dtype=np.int64),
+            threshold=np.array(self._limiar, dtype=np.float64),
+            children_left=np.array(self._esquerda, dtype=np.int64),
+            children_right=np.array(self._direita, dtype=np.int64),
+            value=np.array(self._valor)[:, None, :],
+            node_count=len(self._feature))
+
+    def aplicar(self, X):
+        """Nó final (folha ou fronteira) de cada linha."""
+        t = self.tree_
+        no = np.zeros(len(X), dtype=np.int64)
+        for _ in range(self.nivel):
+            interno = t.feature[no] >= 0
+            if not interno.any():
+                break
+            i = np.flatnonzero(interno)
+            vai_esquerda = X[i, t.feature[no[i]]] <= t.threshold[no[i]]
+            no[i] = np.where(vai_esquerda, t.children_left[no[i]], t.children_right[no[i]])
+        return no
+
+    # Mesmo nome do scikit-learn (usado por arvores_c.conferir_paridade)
+    apply = aplicar
+
+    def predict(self, X):
+        return self.classes_[self.tree_.value[self.aplicar(X), 0].argmax(axis=1)]
+
+    def _dividir(self, hist, faixas):
+        """Escolhe a melhor divisão de cada nó da fronteira (Gini)."""
+        nova_fronteira = []
+        n_features = hist.shape[1]
+        for j, no in enumerate(self.fronteira):
+            acumulado = hist[j].cumsum(axis=1)          # (F, B, C)
+            total = acumulado[0, -1]
+            self._valor[no] = total
+            n = total.sum()
+            if n < 2 * self.min_samples_leaf or np.count_nonzero(total) <= 1:
+                continue
+
+            esquerda = acumulado[:, :-1]                # (F, B-1, C)
+            direita = total - esquerda
+            n_esq, n_dir = esquerda.sum(-1), direita.sum(-1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                impureza = (n_esq - (esquerda ** 2).sum(-1) / n_esq
+                            + n_dir - (direita ** 2).sum(-1) / n_dir)
+            impureza[(n_esq < self.min_samples_leaf) | (n_dir < self.min_samples_leaf)] = np.inf
+            impureza[~np.isfinite(impureza)] = np.inf
+            if self.max_features:
+                fora = self.rng.permutation(n_features)[self.max_features:]
+                impureza[fora] = np.inf
+
+            f, b = np.unravel_index(np.argmin(impureza), impureza.shape)
+            if impureza[f, b] >= n - (total ** 2).sum() / n - 1e-12:
+                continue  # nenhuma divisão melhora o nó
+            self._feature[no], self._limiar[no] = int(f), float(faixas[f, b])
+            self._esquerda[no] = self._novo_no(esquerda[f, b])
+            self._direita[no] = self._novo_no(direita[f, b])
+            nova_fronteira += [self._esquerda[no], self._direita[no]]
+        self.fronteira = nova_fronteira
+        self.nivel += 1
+        self._compilar()
+
+
+class FlorestaHistograma:
+    """Floresta de ArvoreHistograma (bootstrap por pesos de Poisson)."""
+
+    def __init__(self, n_estimators=5, max_depth=4, random_state=SEMENTE):
+        self.n_estimators = n_estimators
+        self.max_depth = max_depth
+        self.random_state = random_state
+        self.estimators_ = []
+
+    def predict(self, X):
+        votos = np.zeros((len(X), len(self.classes_)))
+        linhas = np.arange(len(X))
+        for arvore in self.estimators_:
+            indice = arvore.tree_.value[arvore.aplicar(X), 0].argmax(axis=1)
+            votos[linhas, indice] += 1
+        return self.classes_[votos.argmax(axis=1)]
+
+
+def treinar_arvores(fonte, arvores, faixas, classes, bootstrap=False, semente=SEMENTE):
+    """Constrói as árvores juntas: uma passada pelos blocos por nível."""
+    n_features, n_faixas, n_classes = faixas.shape[0], faixas.shape[1] + 1, len(classes)
+    for arvore in arvores:
+        arvore._iniciar(classes)
+
+    while True:
+        ativas = [a for a in arvores if a.fronteira and a.nivel < a.max_depth]
+        if not ativas:
+            break
+        hist = [np.zeros(len(a.fronteira) * n_features * n_faixas * n_classes) for a in ativas]
+        posicao = []
+        for a in ativas:
+            p = np.full(a.tree_.node_count, -1, dtype=np.int64)
+            p[a.fronteira] = np.arange(len(a.fronteira))
+            posicao.append(p)
+        deslocamento = np.arange(n_features) * n_faixas
+
+        for n_bloco, X, y, teste in fonte:
+            X, y = X[~teste], np.searchsorted(classes, y[~teste])
+            faixa = discretizar(X, faixas)
+            for k, a in enumerate(ativas):
+                pesos = None
+                if bootstrap:
+                    rng = np.random.default_rng((semente, arvores.index(a), n_bloco))
+                    pesos = rng.poisson(1.0, len(y)).astype(np.float64)
+                pos = posicao[k][a.aplicar(X)]
+                dentro = pos >= 0
+                if pesos is not None:
+                    dentro &= pesos > 0
+                # índice plano (nó, feature, faixa, classe)
+                indice = (((pos[dentro, None] * n_features * n_faixas + deslocamento
+                            + faixa[dentro]) * n_classes) + y[dentro, None])
+                w = None if pesos is None else np.repeat(pesos[dentro], n_features)
+                hist[k] += np.bincount(indice.ravel(), weights=w, minlength=len(hist[k]))
+
+        for a, h in zip(ativas, hist):
+            a._dividir(h.reshape(len(a.fronteira), n_features, n_faixas, n_classes), faixas)
+    return arvores
+
+
+def treinar_decision_tree_fluxo(fonte, faixas, classes, max_depth, random_state=SEMENTE):
+    arvore = ArvoreHistograma(max_depth=max_depth, random_state=random_state)
+    return treinar_arvores(fonte, [arvore], faixas, classes)[0]
+
+
+def treinar_random_forest_fluxo(fonte, faixas, classes, n_estimators, max_depth,
+                                random_state=SEMENTE):
+    floresta = FlorestaHistograma(n_estimators, max_depth, random_state)
+    max_features = max(1, int(np.sqrt(faixas.shape[0])))
+    floresta.estimators_ = [ArvoreHistograma(max_depth=max_depth, max_features=max_features,
+                                             random_state=random_state + i)
+                            for i in range(n_estimators)]
+    floresta.classes_ = np.asarray(classes)
+    treinar_arvores(fonte, floresta.estimators_, faixas, classes, bootstrap=True,
+                    semente=random_state)
+    return floresta
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+INFERÊNCIA EM LOTE NO PC (ESPELHO DO CÓDIGO C EXPORTADO)
+=============================================================================
+Roda a mesma lógica de identificar() do firmware sobre gravações inteiras
+(CSV ou .bme), em NumPy vetorizado, para testar o comportamento do Pico em
+meses de arquivos sem gravar nada na placa.
+
+Lê o artefato modelo_<m>.modelo.npz salvo pelo treinador (artefato.py) e
+monta exatamente o que foi para o C no formato pedido (por padrão, o da
+última exportação):
+   árvores  tabelas de nós de arvores_c.py (o if/else vira a mesma tabela,
+            com os limiares de 6 casas que ele escreve)
+   SVM      matriz de pesos (svm_c.py) ou pesos inteiros (ponto_fixo.py)
+--comparar usa o predict do próprio artefato (igual ao do scikit-learn).
+
+As contas seguem o firmware: ratios G/G100 em float32, G100 <= 0 devolve
+-1, árvores percorridas sobre vetores de índices de nó, SVM como produto
+matriz-vetor. Uso:
+
+   python inferencia.py modelo_rf.modelo.npz ../data/planta.csv --classe 0
+   python inferencia.py modelo_svm.modelo.npz ../data/*.bme --comparar --svm-c int8
+=============================================================================
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from artefato import carregar_artefato
+from arvores_c import avaliar_tabela, quantizar_tabela, tabela_arvores, votar
+from fluxo import ler_gases_em_blocos
+from ponto_fixo import BITS_SVM, pontuar_svm, quantizar_svm
+from svm_c import decidir, layout_svm, somas_float
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+LINHAS_BLOCO = 1_000_000
+
+# Casas decimais com que o exportador if/else escreve os limiares
+CASAS_IF = 6
+
+# =============================================================================
+# DESCRIÇÃO DO MODELO EXPORTADO
+# =============================================================================
+
+def descrever_arvores(modelo, arvores, n_classes, n_features, formato):
+    """Descrição de dt/rf exportados como if/else, tabela ou tabela16."""
+    tabela = tabela_arvores(arvores, casas=CASAS_IF if formato == 'if' else None)
+    if formato == 'tabela16':
+        quantizar_tabela(tabela, n_features)
+    return dict(tabela, modelo=modelo, formato=formato, n_classes=n_classes)
+
+
+def descrever_svm(svm, scaler, formato):
+    """Descrição do SVM exportado em float ou ponto fixo (int16/int8)."""
+    if formato == 'float':
+        descricao = layout_svm(svm, scaler)
+    else:
+        descricao = quantizar_svm(svm, scaler, BITS_SVM[formato])
+    descricao = dict(descricao, modelo='svm', formato=formato)
+    descricao['n_classes'] = len(descricao['classes'])
+    return descricao
+
+
+def descrever_artefato(meta, clf, scaler, arvore_c=None, svm_c=None):
+    """Descrição do C gerado a partir do artefato (None = formato da última exportação)."""
+    exportacao = meta.get('exportacao', {})
+    if meta['modelo'] == 'svm':
+        return descrever_svm(clf, scaler, svm_c or exportacao.get('svm_c', 'float'))
+    arvores = [clf] if meta['modelo'] == 'dt' else clf.estimators_
+    return descrever_arvores(meta['modelo'], arvores, len(meta['classes']),
+                             len(meta['features']), arvore_c or exportacao.get('arvore_c', 'if'))
+
+# =============================================================================
+# CLASSIFICAÇÃO
+# =============================================================================
+
+def ratios_firmware(gases):
+    """(ratios float32 (n, 9), máscara G100 > 0), como em integracao.c."""
+    g = np.asarray(gases, dtype=np.float32)
+    validas = g[:, -1] > 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = g[:, :-1] / g[:, -1:]
+    return ratios, validas
+
+
+def classificar(descricao, gases):
+    """Retorno de identificar(gases) do firmware para cada linha (-1 = G100 <= 0)."""
+    ratios, validas = ratios_firmware(gases)
+    saida = np.full(len(ratios), -1, dtype=np.int64)
+    if not validas.any():
+        return saida
+    ratios = ratios[validas]
+
+    if descricao['modelo'] == 'svm':
+        if descricao['formato'] == 'float':
+            indices = decidir(somas_float(descricao, ratios), descricao)
+        else:
+            indices = decidir(pontuar_svm(descricao, np.asarray(gases)[validas]), descricao)
+    else:
+        previsoes = avaliar_tabela(descricao, ratios)
+        indices = previsoes[0] if len(previsoes) == 1 else votar(previsoes, descricao['n_classes'])
+    saida[validas] = indices
+    return saida
+
+
+def classificar_arquivo(descricao, caminho, linhas=LINHAS_BLOCO):
+    """Classes de todas as leituras do arquivo, lido em blocos."""
+    blocos = [classificar(descricao, gases) for gases in ler_gases_em_blocos(caminho, linhas)]
+    return np.concatenate(blocos) if blocos else np.empty(0, dtype=np.int64)
+
+
+def prever_referencia(clf, scaler, gases):
+    """Previsões do modelo do artefato (como o scikit-learn) nos ratios em float64."""
+    g = np.asarray(gases, dtype=np.float64)
+    validas = g[:, -1] > 0
+    saida = np.full(len(g), -1, dtype=np.int64)
+    if validas.any():
+        X = g[validas, :-1] / g[validas, -1:]
+        saida[validas] = clf.predict(scaler.transform(X) if scaler is not None else X)
+    return saida
+
+# =============================================================================
+# LINHA DE COMANDO
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Roda o modelo exportado sobre gravações')
+    parser.add_argument('modelo', help='Artefato salvo pelo treinador (modelo_<m>.modelo.npz)')
+    parser.add_argument('arquivos', nargs='+', help='CSVs ou .bme (aceita padrões glob)')
+    parser.add_argument('--classe', type=int, default=None,
+                        help='Classe verdadeira das leituras (mostra a acurácia)')
+    parser.add_argument('--comparar', action='store_true',
+                        help='Compara com o predict do modelo treinado (scikit-learn)')
+    parser.add_argument('--arvore-c', choices=['if', 'tabela', 'tabela16'], default=None,
+                        help='Formato das árvores (padrão: o da última exportação)')
+    parser.add_argument('--svm-c', choices=['float', 'int16', 'int8'], default=None,
+                        help='Formato do SVM (padrão: o da última exportação)')
+    parser.add_argument('--saida', default=None,
+                        help='Salva a classe de cada leitura em um CSV')
+    args = parser.parse_args()
+
+    try:
+        meta, clf, scaler = carregar_artefato(args.modelo)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ {args.modelo}: {e}")
+        sys.exit(1)
+    descricao = descrever_artefato(meta, clf, scaler, args.arvore_c, args.svm_c)
+    nomes = meta['classes']
+
+    arquivos = sorted({a for padrao in args.arquivos for a in (glob.glob(padrao) or [padrao])})
+    print(f"🧠 {descricao['modelo']} ({descricao['formato']}) | {len(arquivos)} arquivo(s)")
+
+    saidas = []
+    total, tempo_modelo, inicio = 0, 0.0, time.perf_counter()
+    for caminho in arquivos:
+        if not os.path.exists(caminho):
+            print(f"   ⚠️  {caminho}: não encontrado")
+            continue
+        classes, iguais = [], 0
+        for gases in ler_gases_em_blocos(caminho, LINHAS_BLOCO):
+            t = time.perf_counter()
+            bloco = classificar(descricao, gases)
+            tempo_modelo += time.perf_counter() - t
+            classes.append(bloco)
+            if args.comparar:
+                iguais += int(np.count_nonzero(prever_referencia(clf, scaler, gases) == bloco))
+        if not classes:
+            continue
+        classes = np.concatenate(classes)
+        total += len(classes)
+
+        contagem = ', '.join(f"{nomes.get(c, c)}: {n:,}"
+                             for c, n in zip(*np.unique(classes, return_counts=True)))
+        linha = f"   {os.path.basename(caminho)}: {len(classes):,} leituras ({contagem})"
+        if args.classe is not None:
+            linha += f" | acurácia {np.mean(classes == args.classe):.2%}"
+        if args.comparar:
+            linha += f" | igual ao scikit-learn {iguais / len(classes):.2%}"
+        print(linha)
+        if args.saida:
+            saidas.append((caminho, classes))
+
+    if args.saida and saidas:
+        pd.concat([pd.DataFrame({'arquivo': caminho, 'linha': np.arange(len(classes)),
+                                 'classe': classes})
+                   for caminho, classes in saidas]).to_csv(args.saida, index=False)
+        print(f"💾 Classes salvas em {args.saida}")
+
+    decorrido = time.perf_counter() - inicio
+    if total:
+        print(f"\n⚡ {total:,} leituras em {decorrido:.2f} s (modelo: "
+              f"{total / max(tempo_modelo, 1e-9):,.0f} leituras/s)")
+    else:
+        print("\n❌ Nenhuma leitura classificada")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+SVM EM PONTO FIXO PARA O PICO (SEM FPU)
+=============================================================================
+O SVM exportado em float faz, por feature, uma subtração, uma divisão, uma
+multiplicação e uma soma em float emulado (~350 ciclos no Cortex-M0+),
+além das 9 divisões G/G100 dos ratios. Aqui tudo vira inteiro:
+
+1. O StandardScaler é dobrado nos pesos:
+      soma = sum(w[i] * (r[i] - media[i]) / desvio[i]) + b
+           = sum(v[i] * r[i]) + b'     com v = w / desvio, b' = b - sum(v * media)
+2. Como r[i] = G[i] / G100 e G100 > 0, o sinal não muda ao multiplicar por
+   G100, e os ratios somem:
+      sinal(soma) = sinal(sum(v[i] * G[i]) + b' * G100)
+3. v e b' são multiplicados por uma escala comum E e arredondados para
+   int16 (ou int8); as resistências entram como inteiros de 32 bits e a
+   soma é feita em int64 (sem divisão nenhuma e sem risco de estouro).
+   Os pesos de features diferentes chegam a variar ~300x, então cada
+   feature tem ainda um deslocamento d[i] (potência de 2):
+      v[i] * E ~ peso_q[i] << d[i]
+   E é escolhida para a feature de menor peso usar a faixa inteira do
+   tipo; as maiores perdem bits à direita em vez de as menores virarem 0
+   (sem isso, int8 arredondava metade dos pesos para zero).
+
+A entrada não é quantizada (resistências já são inteiras): o único erro é
+o arredondamento dos pesos. simular_svm() faz a mesma conta do C, bit a
+bit, para medir a perda de acurácia antes de gravar no Pico.
+
+Com mais de duas classes vale o mesmo para cada hiperplano (o fator G100
+e a escala são comuns a todos, então sinais e argmax não mudam); a
+matriz de pesos e a decisão (um-contra-um ou argmax) são as de svm_c.py.
+=============================================================================
+"""
+
+import numpy as np
+
+from svm_c import decidir, decisao_c, layout_svm, matriz_c, pares_c
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+# Formatos do --svm-c do treinador -> bits dos pesos
+BITS_SVM = {'int16': 16, 'int8': 8}
+
+PESO_MAX = {8: 127, 16: 32767}
+TIPO_PESO = {8: 'int8_t', 16: 'int16_t'}
+
+# Resistência máxima representável (uint32); acima disso satura
+GAS_MAX = 2**32 - 1
+
+# Limite de |v * E| e |b' * E| (pesos já deslocados e bias): x G < 2^32,
+# 11 termos < 2^63; também garante o bias em int32
+PRODUTO_MAX = 2**26
+
+# =============================================================================
+# QUANTIZAÇÃO
+# =============================================================================
+
+def quantizar_svm(svm, scaler, bits=16):
+    """
+    Layout de svm_c.py mais peso_q (hiperplanos, features), desloc por
+    feature, bias_q (int64, cabe em int32) e a escala comum
+    (peso_q << desloc ~ peso * escala).
+    """
+    if bits not in PESO_MAX:
+        raise ValueError(f"bits deve ser um de {sorted(PESO_MAX)}")
+    layout = layout_svm(svm, scaler)
+    v, b = layout['peso'], layout['bias']
+    maximos = np.abs(v).max(axis=0)
+    usados = maximos[maximos > 0]
+
+    # Menor feature (não nula) usa a faixa inteira do tipo; pesos e bias
+    # escalados ficam em PRODUTO_MAX (soma exata em int64, bias em int32)
+    escala = PESO_MAX[bits] / usados.min() if len(usados) else 1.0
+    escala = min(escala, PRODUTO_MAX / max(maximos.max(), np.abs(b).max(), 1e-30))
+
+    # Menor deslocamento que põe a feature dentro do tipo
+    razao = np.maximum(maximos * escala / PESO_MAX[bits], 1.0)
+    desloc = np.ceil(np.log2(razao)).astype(np.int64)
+    peso_q = np.round(v * escala / 2.0**desloc).astype(np.int64)
+    # Arredondamento para cima no limite (ex: 127.6 -> 128): mais um bit
+    estourou = np.abs(peso_q).max(axis=0) > PESO_MAX[bits]
+    desloc[estourou] += 1
+    peso_q = np.round(v * escala / 2.0**desloc).astype(np.int64)
+    return dict(layout,
+                peso_q=peso_q,
+                desloc=desloc,
+                bias_q=np.round(b * escala).astype(np.int64),
+                escala=float(escala),
+                bits=bits)
+
+# =============================================================================
+# SIMULADOR (MESMA ARITMÉTICA DO C)
+# =============================================================================
+
+def gases_inteiros(gases):
+    """Conversão do C: float -> uint32 truncando, saturada em [0, GAS_MAX]."""
+    g = np.asarray(gases, dtype=np.float32).astype(np.float64)
+    return np.trunc(np.clip(g, 0, GAS_MAX)).astype(np.int64)
+
+
+def pontuar_svm(modelo_q, gases):
+    """Somas inteiras (n, hiperplanos): sum((peso_q * G) << desloc) + bias_q * G100."""
+    g = gases_inteiros(gases)
+    n_features = modelo_q['peso_q'].shape[1]
+    # |peso << desloc| <= PRODUTO_MAX = 2^26, G < 2^32, 10 termos: exato em int64
+    pesos = modelo_q['peso_q'] << modelo_q.get('desloc', 0)
+    return (g[:, :n_features] @ pesos.T
+            + g[:, n_features:n_features + 1] * modelo_q['bias_q'])
+
+
+def simular_svm(modelo_q, gases):
+    """Classe prevista pelo código C em ponto fixo para cada leitura."""
+    return modelo_q['classes'][decidir(pontuar_svm(modelo_q, gases), modelo_q)]
+
+
+def comparar(y, y_float, y_fixo):
+    """Acurácias do modelo float e do ponto fixo e quanto eles concordam."""
+    y, y_float, y_fixo = np.asarray(y), np.asarray(y_float), np.asarray(y_fixo)
+    acuracia_float = float(np.mean(y_float == y))
+    acuracia_fixo = float(np.mean(y_fixo == y))
+    return {
+        'acuracia_float': acuracia_float,
+        'acuracia_fixo': acuracia_fixo,
+        'delta': acuracia_fixo - acuracia_float,
+        'concordancia': float(np.mean(y_fixo == y_float)),
+    }
+
+# =============================================================================
+# CÓDIGO C
+# =============================================================================
+
+def gerar_svm_fixo_c(modelo_q):
+    """identificar_svm_gases(gases) em inteiros (+ svm_confianca_gases no binário)."""
+    n_hiperplanos, n_features = modelo_q['peso_q'].shape
+    tipo = TIPO_PESO[modelo_q['bits']]
+
+    code = f"""
+#include <stdint.h>
+
+// {modelo_q['tipo']}: {n_hiperplanos} hiperplano(s), StandardScaler dobrado,
+// (peso << desloc) = peso x {modelo_q['escala']:.9g}
+#define SVM_PONTO_FIXO
+#define SVM_N_FEATURES {n_features}
+#define SVM_N_HIPERPLANOS {n_hiperplanos}
+#define SVM_N_CLASSES {len(modelo_q['classes'])}
+
+"""
+    code += matriz_c(tipo, 'svm_peso_q', modelo_q['peso_q'], lambda v: str(int(v)))
+    code += (f"static const uint8_t svm_desloc[{n_features}] = {{"
+             f"{', '.join(str(int(d)) for d in modelo_q['desloc'])}}};\n")
+    code += (f"static const int32_t svm_bias_q[{n_hiperplanos}] = {{"
+             f"{', '.join(str(int(b)) for b in modelo_q['bias_q'])}}};\n")
+    code += pares_c(modelo_q)
+    code += f"""
+static inline uint32_t svm_gas_inteiro(float g) {{
+    if (g <= 0.0f) return 0;
+    if (g >= 4294967295.0f) return 4294967295u;
+    return (uint32_t)g;
+}}
+
+// Todos os hiperplanos em um laço sobre a matriz contígua
+static void svm_somas_q(const float gases[], int64_t somas[]) {{
+    uint32_t g[SVM_N_FEATURES + 1];
+    for (int i = 0; i <= SVM_N_FEATURES; i++) {{
+        g[i] = svm_gas_inteiro(gases[i]);
+    }}
+    for (int h = 0; h < SVM_N_HIPERPLANOS; h++) {{
+        const {tipo} *w = svm_peso_q[h];
+        int64_t soma = (int64_t)svm_bias_q[h] * g[SVM_N_FEATURES];
+        for (int i = 0; i < SVM_N_FEATURES; i++) {{
+            // Deslocamento em uint64: << de negativo é indefinido em C
+            soma += (int64_t)((uint64_t)((int64_t)w[i] * g[i]) << svm_desloc[i]);
+        }}
+        somas[h] = soma;
+    }}
+}}
+"""
+    code += "\n// gases = G320...G100 (resistências); dispensa o cálculo dos ratios"
+    code += decisao_c(modelo_q, 'identificar_svm_gases', 'const float gases[]', 'int64_t',
+                      'svm_somas_q(gases, somas)')
+
+    if modelo_q['tipo'] == 'binario':
+        code += f"""
+static const float svm_escala = {modelo_q['escala']:.9g}f;
+"""
+        code += """
+// Mesma escala do svm_confianca em float (só para diagnóstico)
+float svm_confianca_gases(const float gases[]) {
+    int64_t somas[1];
+    svm_somas_q(gases, somas);
+    return (float)somas[0] / (svm_escala * gases[SVM_N_FEATURES]);
+}
+"""
+    return code
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+EXPORTAÇÃO DO SVM LINEAR (BINÁRIO E MULTICLASSE)
+=============================================================================
+Todos os hiperplanos ficam em uma única matriz contígua svm_pesos[H][n],
+com o StandardScaler já dobrado (sem subtração/divisão por feature), e são
+avaliados em um só laço. A decisão depende de como o modelo foi treinado:
+   binario  1 hiperplano:  soma > 0 -> classe 1
+   ovo      SVC (libsvm), um hiperplano por par (i, j) de classes:
+            soma > 0 vota em i, senão em j; vence o mais votado
+            (empate: menor índice, como o predict do scikit-learn)
+   ovr      um hiperplano por classe (ex: SGD do treino em fluxo): argmax
+
+somas_float() é o espelho exato do C em float32 (mesma ordem das contas)
+e decidir() a mesma decisão: conferir_paridade_svm() compara os dois com o
+predict do scikit-learn. ponto_fixo.py reaproveita a decisão com as somas
+inteiras.
+=============================================================================
+"""
+
+import numpy as np
+
+# =============================================================================
+# LAYOUT
+# =============================================================================
+
+def dobrar_scaler(coef, intercept, media, desvio):
+    """Pesos e bias sobre os ratios crus (sem StandardScaler): (v, b')."""
+    coef = np.atleast_2d(np.asarray(coef, dtype=np.float64))
+    v = coef / np.asarray(desvio, dtype=np.float64)
+    b = np.asarray(intercept, dtype=np.float64) - v @ np.asarray(media, dtype=np.float64)
+    return v, b
+
+
+def tipo_decisao(svm):
+    """'binario', 'ovo' (SVC) ou 'ovr' (um hiperplano por classe)."""
+    # Modelos recarregados de um artefato (artefato.py) trazem a decisão gravada
+    if getattr(svm, 'decisao', None):
+        return svm.decisao
+    if len(svm.coef_) == 1:
+        return 'binario'
+    # SVC (libsvm) é sempre um-contra-um; os lineares (SGD, LinearSVC) não
+    return 'ovo' if hasattr(svm, 'dual_coef_') else 'ovr'
+
+
+def pares_ovo(n_classes):
+    return [(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)]
+
+
+def layout_svm(svm, scaler):
+    """dict com peso (H, n), bias (H,), tipo, pares (ovo) e classes."""
+    peso, bias = dobrar_scaler(svm.coef_, svm.intercept_, scaler.mean_, scaler.scale_)
+    classes = np.asarray(svm.classes_)
+    tipo = tipo_decisao(svm)
+    return {
+        'peso': peso,
+        'bias': bias,
+        'tipo': tipo,
+        'pares': pares_ovo(len(classes)) if tipo == 'ovo' else [],
+        'classes': classes,
+    }
+
+# =============================================================================
+# ESPELHO EM PYTHON
+# =============================================================================
+
+def somas_float(layout, X):
+    """Somas (n, H) em float32, na mesma ordem do laço em C."""
+    X32 = np.asarray(X, dtype=np.float32)
+    peso = layout['peso'].astype(np.float32)
+    soma = np.tile(layout['bias'].astype(np.float32), (len(X32), 1))
+    for i in range(peso.shape[1]):
+        soma += X32[:, i:i + 1] * peso[:, i]
+    return soma
+
+
+def decidir(somas, layout):
+    """Índice da classe escolhida pelo C para cada linha de somas."""
+    if layout['tipo'] == 'binario':
+        return (somas[:, 0] > 0).astype(np.int64)
+    if layout['tipo'] == 'ovr':
+        return somas.argmax(axis=1)
+    votos = np.zeros((len(somas), len(layout['classes'])), dtype=np.int64)
+    for h, (i, j) in enumerate(layout['pares']):
+        positivo = somas[:, h] > 0
+        votos[:, i] += positivo
+        votos[:, j] += ~positivo
+    return votos.argmax(axis=1)
+
+
+def conferir_paridade_svm(svm, scaler, layout, X):
+    """(previsões iguais ao predict do scikit-learn, total)."""
+    esperado = svm.predict(scaler.transform(X))
+    obtido = layout['classes'][decidir(somas_float(layout, X), layout)]
+    return int(np.count_nonzero(obtido == esperado)), len(esperado)
+
+# =============================================================================
+# CÓDIGO C
+# =============================================================================
+
+def _float_c(v):
+    return f"{float(np.float32(v)):.9g}f"
+
+
+def matriz_c(tipo, nome, matriz, formato):
+    """Matriz constante [H][n] em C, uma linha por hiperplano."""
+    linhas = [', '.join(formato(v) for v in linha) for linha in matriz]
+    return (f"static const {tipo} {nome}[{len(matriz)}][{len(matriz[0])}] = {{\n    {{"
+            + "},\n    {".join(linhas) + "}\n};\n")
+
+
+def pares_c(layout):
+    """Tabelas svm_par_i/svm_par_j (só no um-contra-um)."""
+    if layout['tipo'] != 'ovo':
+        return ""
+    i, j = zip(*layout['pares'])
+    return (f"static const uint8_t svm_par_i[{len(i)}] = {{{', '.join(map(str, i))}}};\n"
+            f"static const uint8_t svm_par_j[{len(j)}] = {{{', '.join(map(str, j))}}};\n")
+
+
+def decisao_c(layout, nome_funcao, parametro, tipo_soma, funcao_somas):
+    """int nome_funcao(parametro): calcula as somas e aplica a decisão."""
+    code = f"""
+int {nome_funcao}({parametro}) {{
+    {tipo_soma} somas[SVM_N_HIPERPLANOS];
+    {funcao_somas};
+"""
+    if layout['tipo'] == 'binario':
+        return code + "    return (somas[0] > 0) ? 1 : 0;\n}\n"
+    if layout['tipo'] == 'ovr':
+        return code + """
+    int classe_vencedora = 0;
+    for (int c = 1; c < SVM_N_CLASSES; c++) {
+        if (somas[c] > somas[classe_vencedora]) {
+            classe_vencedora = c;
+        }
+    }
+    return classe_vencedora;
+}
+"""
+    return code + """
+    int votos[SVM_N_CLASSES] = {0};
+    for (int h = 0; h < SVM_N_HIPERPLANOS; h++) {
+        votos[(somas[h] > 0) ? svm_par_i[h] : svm_par_j[h]]++;
+    }
+
+    int classe_vencedora = 0;
+    for (int c = 1; c < SVM_N_CLASSES; c++) {
+        if (votos[c] > votos[classe_vencedora]) {
+            classe_vencedora = c;
+        }
+    }
+    return classe_vencedora;
+}
+"""
+
+
+def gerar_hiperplanos_c(layout):
+    """svm_somas + identificar_svm(ratios) + svm_pontuacoes(ratios, pontos)."""
+    n_hiperplanos, n_features = layout['peso'].shape
+    code = f"""
+#include <math.h>
+#include <stdint.h>
+
+// {layout['tipo']}: {n_hiperplanos} hiperplano(s), StandardScaler já dobrado nos pesos
+#define SVM_N_FEATURES {n_features}
+#define SVM_N_HIPERPLANOS {n_hiperplanos}
+#define SVM_N_CLASSES {len(layout['classes'])}
+
+"""
+    code += matriz_c('float', 'svm_pesos', layout['peso'], _float_c)
+    code += (f"static const float svm_bias[{n_hiperplanos}] = {{"
+             f"{', '.join(_float_c(b) for b in layout['bias'])}}};\n")
+    code += pares_c(layout)
+    code += """
+// Todos os hiperplanos em um laço sobre a matriz contígua
+static void svm_somas(const float ratios[], float somas[]) {
+    for (int h = 0; h < SVM_N_HIPERPLANOS; h++) {
+        const float *w = svm_pesos[h];
+        float soma = svm_bias[h];
+        for (int i = 0; i < SVM_N_FEATURES; i++) {
+            soma += w[i] * ratios[i];
+        }
+        somas[h] = soma;
+    }
+}
+"""
+    code += decisao_c(layout, 'identificar_svm', 'float ratios[]', 'float',
+                      'svm_somas(ratios, somas)')
+
+    # Pontuação por classe, na escala do decision_function do scikit-learn
+    code += """
+void svm_pontuacoes(float ratios[], float pontos[SVM_N_CLASSES]) {
+    float somas[SVM_N_HIPERPLANOS];
+    svm_somas(ratios, somas);
+"""
+    if layout['tipo'] == 'binario':
+        code += "    pontos[0] = -somas[0];\n    pontos[1] = somas[0];\n}\n"
+    elif layout['tipo'] == 'ovr':
+        code += "    for (int c = 0; c < SVM_N_CLASSES; c++) pontos[c] = somas[c];\n}\n"
+    else:
+        # Votos + confiança normalizada em (-1/3, 1/3): mesma fórmula do
+        # decision_function_shape='ovr' do SVC
+        code += """    float confianca[SVM_N_CLASSES] = {0};
+    for (int c = 0; c < SVM_N_CLASSES; c++) pontos[c] = 0.0f;
+    for (int h = 0; h < SVM_N_HIPERPLANOS; h++) {
+        pontos[(somas[h] > 0) ? svm_par_i[h] : svm_par_j[h]] += 1.0f;
+        confianca[svm_par_i[h]] += somas[h];
+        confianca[svm_par_j[h]] -= somas[h];
+    }
+    for (int c = 0; c < SVM_N_CLASSES; c++) {
+        pontos[c] += confianca[c] / (3.0f * (fabsf(confianca[c]) + 1.0f));
+    }
+}
+"""
+
+    if layout['tipo'] == 'binario':
+        code += """
+float svm_confianca(float ratios[]) {
+    float somas[1];
+    svm_somas(ratios, somas);
+    return somas[0];
+}
+"""
+    return code
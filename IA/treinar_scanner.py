@@ -18,6 +18,43 @@ Estrutura de dados suportada:
 3. Arquivo único com coluna 'classe' (NOVO):
    ARQUIVO_UNICO = 'todos_dados.csv'  # Deve ter coluna 'classe'
 
+4. Conjunto Parquet particionado (data/conjunto_parquet.py, requer pyarrow):
+   DIRETORIO_PARQUET = '../data/parquet'   # ou --parquet ../data/parquet
+   Só as partições das classes/datas pedidas (--classes, --desde, --ate) e
+   só as colunas de gás e ids são lidas.
+
+Em qualquer opção, arquivos binários '.bme' do coletor podem ser usados no
+lugar dos CSVs (carregados por memory-map, sem parse de texto).
+
+As features (ratios, log, inclinações, forma) vêm de features.py, com cache
+em disco por arquivo: rodar de novo sem mudar os dados pula o parse e o
+cálculo (--sem-cache ignora o cache, --limpar-cache apaga).
+
+--buscar explora grades de hiperparâmetros em paralelo (busca.py) e mostra
+a fronteira de Pareto acurácia x custo no Pico (flash, ciclos).
+
+--fluxo treina sem carregar a base na memória (fluxo.py): os arquivos passam
+em blocos e o pico de memória fica dentro de --orcamento-mb.
+
+A validação cruzada separa sessões/arquivos entre treino e teste
+(validacao.py, --cv grupos|sessao|tempo|linhas): leituras vizinhas não
+vazam para o teste e a acurácia fica perto da que se vê no campo.
+
+--arvore-c tabela|tabela16 exporta DT/RF como tabelas de nós com um único
+avaliador iterativo em C (arvores_c.py): 50-100 árvores cabem na flash que
+o if/else gasta com poucas dezenas, com tempo previsível por inferência.
+
+--svm-c int16|int8 exporta o SVM em ponto fixo (ponto_fixo.py): scaler
+dobrado nos pesos, só somas e multiplicações inteiras sobre as resistências.
+Com ele ou com --arvore-c tabela16, o treinador simula a aritmética do C
+em dados de teste e mostra a perda de acurácia em relação ao float.
+
+Com --exportar arquivo/todos, cada modelo_<m>.c vem com o artefato
+modelo_<m>.modelo.npz (artefato.py: pesos/nós, scaler, classes, hash dos
+dados, métricas). --artefato gera o C de novo a partir dele, em outro
+formato, sem carregar dados nem treinar; inferencia.py roda a mesma lógica
+do C sobre gravações inteiras no PC.
+
 =============================================================================
 """
 
@@ -27,6 +64,7 @@ import os
 import sys
 import argparse
 import glob
+import time
 from datetime import datetime
 
 # Scikit-learn
@@ -35,8 +73,27 @@ from sklearn.ensemble import RandomForestClassifier
 from sklearn.svm import SVC
 from sklearn.preprocessing import StandardScaler, LabelEncoder
 from sklearn.model_selection import cross_val_score, train_test_split
+from sklearn.pipeline import make_pipeline
 from sklearn.metrics import classification_report, confusion_matrix
 
+# Módulos compartilhados com o coletor (pasta data/)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+from armazenamento import EXTENSOES_REGISTROS, binario_para_dataframe
+from arvores_c import (avaliar_tabela, bytes_tabela, conferir_paridade, gerar_tabela_c,
+                       quantizar_tabela, tabela_arvores, votar)
+from busca import CUSTO_PICO, buscar
+from fluxo import (ORCAMENTO_MB, FonteBlocos, calcular_faixas, explorar,
+                   separar_fontes_teste, tamanhos_por_orcamento, treinar_decision_tree_fluxo, treinar_linear,
+                   treinar_random_forest_fluxo)
+from validacao import (CHAVES_GRUPO, ESTRATEGIAS, descrever_divisoes, dobras_uma_classe,
+                       gerar_divisoes, grupos_do_dataframe, media_dobras)
+from artefato import EXTENSAO_ARTEFATO, carregar_artefato, hash_arquivos, hash_arrays, salvar_artefato
+from svm_c import conferir_paridade_svm, gerar_hiperplanos_c, layout_svm
+from ponto_fixo import BITS_SVM, comparar, gerar_svm_fixo_c, quantizar_svm, simular_svm
+from features import (FEATURES_RAW, GRUPOS_PADRAO, adicionar_features, carregar_features,
+                      filtrar_leituras, limpar_cache, nomes_features)
+from conjunto_parquet import carregar as carregar_conjunto_parquet
+
 # =============================================================================
 # CONFIGURAÇÃO - EDITE AQUI
 # =============================================================================
@@ -66,15 +123,22 @@ ARQUIVOS = {
 #     1: '../data/ar_*.csv',
 # }
 
+# OPÇÃO 4: Conjunto Parquet (python ../data/conjunto_parquet.py exportar ...)
+# DIRETORIO_PARQUET = '../data/parquet'
+# FILTRO_PARQUET = {'classes': ['planta', 'ar_neutro'], 'inicio': '2026-01-01', 'fim': None}
+
 NOMES_CLASSES = {
     0: "PLANTA",
     1: "AR_NEUTRO",
     # 2: "DOENTE",
 }
 
-# Features do sensor
-FEATURES_RAW = ['G320', 'G295', 'G270', 'G245', 'G220', 'G195', 'G170', 'G145', 'G120', 'G100']
-FEATURES_RATIO = ['R_G320', 'R_G295', 'R_G270', 'R_G245', 'R_G220', 'R_G195', 'R_G170', 'R_G145', 'R_G120']
+# Features do sensor: G320...G100 (FEATURES_RAW) e as derivadas calculadas
+# por features.py. Os modelos exportados usam só os ratios (o firmware
+# calcula os 9 ratios em integracao.c); os demais grupos ficam no DataFrame
+# para análise. Tire grupos daqui para carregar mais rápido.
+GRUPOS_FEATURES = GRUPOS_PADRAO
+FEATURES_RATIO = nomes_features(('ratio',))
 
 # Configurações dos modelos
 CONFIG_MODELOS = {
@@ -97,6 +161,10 @@ CONFIG_MODELOS = {
     }
 }
 
+# Perda de acurácia do ponto fixo (em relação ao float) acima da qual o
+# código exportado recebe um aviso
+LIMITE_PERDA_PONTO_FIXO = 0.02
+
 # =============================================================================
 # FUNÇÕES DE CARREGAMENTO
 # =============================================================================
@@ -111,12 +179,16 @@ def normalizar_lista_arquivos(entrada):
         return []
 
 def carregar_arquivo_csv(caminho, id_classe=None):
-    """Carrega um único arquivo CSV."""
+    """Carrega um único arquivo CSV (ou binário .bme do coletor)."""
     if not os.path.exists(caminho):
         return None
     
     try:
-        df = pd.read_csv(caminho)
+        if caminho.endswith(EXTENSOES_REGISTROS):
+            # Memory-map dos registros tipados, sem parse de texto
+            df = binario_para_dataframe(caminho)
+        else:
+            df = pd.read_csv(caminho)
         
         # Verificar se tem coluna 'classe' (arquivo com múltiplas classes)
         if 'classe' in df.columns and id_classe is None:
@@ -130,7 +202,7 @@ def carregar_arquivo_csv(caminho, id_classe=None):
             return None
         
         # Filtrar colunas
-        colunas_manter = [c for c in df.columns if c in FEATURES_RAW or c in ['temp', 'umid', 'timestamp', 'amostra_id', 'sessao_id', 'notas', 'classe']]
+        colunas_manter = [c for c in df.columns if c in FEATURES_RAW or c in ['temp', 'umid', 'timestamp', 'timestamp_ns', 'amostra_id', 'sessao_id', 'notas', 'classe']]
         df = df[colunas_manter].copy()
         
         # Definir classe se fornecida
@@ -143,21 +215,82 @@ def carregar_arquivo_csv(caminho, id_classe=None):
         print(f"   ❌ Erro: {e}")
         return None
 
-def carregar_dados():
-    """Carrega todos os dados de todas as fontes configuradas."""
+def carregar_arquivo_features(caminho, id_classe, usar_cache=True):
+    """Leituras válidas de um arquivo com as features (do cache se possível)."""
+    if not os.path.exists(caminho):
+        return None
+
+    try:
+        df = carregar_features(caminho, GRUPOS_FEATURES, usar_cache=usar_cache)
+    except Exception as e:
+        print(f"   ❌ Erro: {e}")
+        return None
+
+    if df is None:
+        print(f"   ⚠️  Colunas faltando: precisa de {FEATURES_RAW[0]}...{FEATURES_RAW[-1]}")
+        return None
+
+    df['target'] = id_classe
+    df['arquivo'] = caminho
+    return df
+
+def carregar_parquet(diretorio, classes=None, inicio=None, fim=None):
+    """
+    Leituras válidas do conjunto Parquet: o filtro por classe/data pula
+    partições inteiras e só gás + ids são lidos. Atualiza NOMES_CLASSES.
+    """
+    global NOMES_CLASSES
+    print(f"\n📄 Modo: Conjunto Parquet ({diretorio})")
+    try:
+        df, lidos, total = carregar_conjunto_parquet(
+            diretorio, colunas=FEATURES_RAW + ['classe', 'sessao_id', 'amostra_id', 'origem'],
+            classes=classes, inicio=inicio, fim=fim)
+    except (ImportError, OSError) as e:
+        print(f"   ❌ {e}")
+        return None
+    print(f"   📦 {lidos} de {total} arquivo(s) Parquet passam no filtro")
+    if df.empty:
+        return None
+    
+    df = df[filtrar_leituras(df[FEATURES_RAW].to_numpy(dtype=np.float64))]
+    df = df.rename(columns={'origem': 'arquivo'}).reset_index(drop=True)
+    for c in FEATURES_RAW:
+        df[c] = df[c].astype(np.float64)
+    le = LabelEncoder()
+    df['target'] = le.fit_transform(df['classe'].astype(str))
+    NOMES_CLASSES = {i: nome.upper() for i, nome in enumerate(le.classes_)}
+    for i, nome in NOMES_CLASSES.items():
+        print(f"   🏷️  {nome}: {int((df['target'] == i).sum()):,} amostras")
+    return df
+
+def carregar_dados(usar_cache=True, parquet=None):
+    """
+    Carrega todos os dados de todas as fontes configuradas. `parquet`
+    (dict com diretorio/classes/inicio/fim) tem prioridade sobre elas.
+    """
     df_list = []
     base_dir = os.path.dirname(__file__)
     
     print("\n📂 CARREGANDO DADOS")
     print("=" * 60)
     
+    if parquet is None and 'DIRETORIO_PARQUET' in globals() and DIRETORIO_PARQUET:
+        parquet = {'diretorio': os.path.join(base_dir, DIRETORIO_PARQUET),
+                   **globals().get('FILTRO_PARQUET', {})}
+    
+    if parquet:
+        df = carregar_parquet(**parquet)
+        if df is not None:
+            df_list.append(df)
+    
     # Verificar se está usando arquivo único
-    if 'ARQUIVO_UNICO' in globals() and ARQUIVO_UNICO:
+    elif 'ARQUIVO_UNICO' in globals() and ARQUIVO_UNICO:
         print("\n📄 Modo: Arquivo único com coluna 'classe'")
         full_path = os.path.join(base_dir, ARQUIVO_UNICO)
         df = carregar_arquivo_csv(full_path)
         
         if df is not None and 'classe' in df.columns:
+            df['arquivo'] = ARQUIVO_UNICO
             # Converter classe string para numérico
             le = LabelEncoder()
             df['target'] = le.fit_transform(df['classe'])
@@ -180,7 +313,7 @@ def carregar_dados():
             print(f"\n🏷️  {nome} (padrão: {padrao})")
             
             for arq in arquivos:
-                df = carregar_arquivo_csv(arq, id_classe)
+                df = carregar_arquivo_features(arq, id_classe, usar_cache)
                 if df is not None:
                     df_list.append(df)
                     print(f"   ✅ {os.path.basename(arq)}: {len(df)} amostras")
@@ -199,19 +332,9 @@ def carregar_dados():
             
             for caminho in arquivos_lista:
                 full_path = os.path.join(base_dir, caminho)
-                df = carregar_arquivo_csv(full_path, id_classe)
+                df = carregar_arquivo_features(full_path, id_classe, usar_cache)
                 
                 if df is not None:
-                    # Processar dados
-                    df = df[FEATURES_RAW].copy()
-                    df = df.replace([np.inf, -np.inf], np.nan).dropna()
-                    df = df[df['G100'] > 0]
-                    
-                    # Criar ratios
-                    for col in FEATURES_RAW[:-1]:
-                        df[f'R_{col}'] = df[col] / df['G100']
-                    
-                    df['target'] = id_classe
                     df_list.append(df)
                     
                     total_classe += len(df)
@@ -232,10 +355,8 @@ def carregar_dados():
     # Concatenar todos os dados
     df_final = pd.concat(df_list, ignore_index=True)
     
-    # Garantir que temos os ratios
-    if 'R_G320' not in df_final.columns:
-        for col in FEATURES_RAW[:-1]:
-            df_final[f'R_{col}'] = df_final[col] / df_final['G100']
+    # Garantir que temos as features (arquivo único vem só com G320...G100)
+    df_final = adicionar_features(df_final, GRUPOS_FEATURES)
     
     # Estatísticas finais
     print("\n" + "=" * 60)
@@ -312,41 +433,72 @@ def treinar_svm(X, y):
     clf.fit(X_scaled, y)
     return clf, scaler
 
-def avaliar_modelos(X, y):
-    """Avalia todos os modelos com cross-validation."""
-    print("\n📈 AVALIAÇÃO DOS MODELOS (5-fold cross-validation)")
+def preparar_validacao(df, y, estrategia, chave_grupo):
+    """Divisões de treino/teste da estratégia escolhida (validacao.py)."""
+    grupos = None
+    if estrategia != 'linhas':
+        grupos = grupos_do_dataframe(df, chave_grupo)
+    
+    try:
+        divisoes = gerar_divisoes(y, grupos, estrategia)
+    except ValueError as e:
+        print(f"\n⚠️  {e}")
+        divisoes = []
+    
+    # Dobra sem todas as classes no treino não mede nada
+    classes = np.unique(y)
+    divisoes = [(tr, te) for tr, te in divisoes if len(np.unique(y[tr])) == len(classes)]
+    if not divisoes and estrategia != 'tempo':
+        print(f"\n⚠️  Poucos grupos por classe para --cv {estrategia}: usando --cv tempo")
+        print("   Colete mais sessões por classe para medir a generalização entre sessões")
+        return preparar_validacao(df, y, 'tempo', chave_grupo)
+    
+    n_grupos = len(np.unique(grupos)) if grupos is not None else 0
+    print(f"\n🧪 Validação: {estrategia} ({len(divisoes)} dobras"
+          f"{f', {n_grupos} grupos' if n_grupos else ''})")
+    for linha in descrever_divisoes(divisoes, y):
+        print(f"   {linha}")
+    uma_classe = dobras_uma_classe(divisoes, y)
+    if uma_classe:
+        print(f"⚠️  Dobra(s) {', '.join(map(str, uma_classe))} com uma só classe no teste: "
+              "a acurácia delas só mede essa classe")
+        print("   Colete mais sessões por classe para que cada dobra teste todas as classes")
+    return estrategia, divisoes
+
+def estimadores_avaliacao():
+    """Modelos comparados na cross-validation, com os parâmetros de CONFIG_MODELOS."""
+    return {
+        'dt': DecisionTreeClassifier(
+            max_depth=CONFIG_MODELOS['dt']['max_depth'],
+            random_state=CONFIG_MODELOS['dt']['random_state']
+        ),
+        'rf': RandomForestClassifier(
+            n_estimators=CONFIG_MODELOS['rf']['n_estimators'],
+            max_depth=CONFIG_MODELOS['rf']['max_depth'],
+            random_state=CONFIG_MODELOS['rf']['random_state']
+        ),
+        'svm': make_pipeline(
+            StandardScaler(),
+            SVC(kernel='linear', C=1.0, random_state=42)
+        ),
+    }
+
+def avaliar_modelos(X, y, divisoes=None, descricao="5-fold cross-validation"):
+    """
+    Avalia todos os modelos com cross-validation (dobras em paralelo).
+    Média ponderada pelo tamanho do teste de cada dobra (media_dobras).
+    """
+    print(f"\n📈 AVALIAÇÃO DOS MODELOS ({descricao})")
     print("=" * 60)
+    cv = divisoes if divisoes is not None else 5
+    rotulos = {'dt': "\n🌳 Decision Tree: ", 'rf': "🌲 Random Forest: ", 'svm': "📐 SVM Linear:    "}
     
     resultados = {}
-    
-    # Decision Tree
-    dt = DecisionTreeClassifier(
-        max_depth=CONFIG_MODELOS['dt']['max_depth'],
-        random_state=CONFIG_MODELOS['dt']['random_state']
-    )
-    scores_dt = cross_val_score(dt, X, y, cv=5, scoring='accuracy')
-    resultados['dt'] = {'media': scores_dt.mean(), 'std': scores_dt.std()}
-    print(f"\n🌳 Decision Tree:  {scores_dt.mean():.2%} ± {scores_dt.std():.2%}")
-    
-    # Random Forest
-    rf = RandomForestClassifier(
-        n_estimators=CONFIG_MODELOS['rf']['n_estimators'],
-        max_depth=CONFIG_MODELOS['rf']['max_depth'],
-        random_state=CONFIG_MODELOS['rf']['random_state']
-    )
-    scores_rf = cross_val_score(rf, X, y, cv=5, scoring='accuracy')
-    resultados['rf'] = {'media': scores_rf.mean(), 'std': scores_rf.std()}
-    print(f"🌲 Random Forest:  {scores_rf.mean():.2%} ± {scores_rf.std():.2%}")
-    
-    # SVM Linear
-    from sklearn.pipeline import make_pipeline
-    svm_pipe = make_pipeline(
-        StandardScaler(),
-        SVC(kernel='linear', C=1.0, random_state=42)
-    )
-    scores_svm = cross_val_score(svm_pipe, X, y, cv=5, scoring='accuracy')
-    resultados['svm'] = {'media': scores_svm.mean(), 'std': scores_svm.std()}
-    print(f"📐 SVM Linear:     {scores_svm.mean():.2%} ± {scores_svm.std():.2%}")
+    for modelo, estimador in estimadores_avaliacao().items():
+        scores = cross_val_score(estimador, X, y, cv=cv, scoring='accuracy', n_jobs=-1)
+        media, desvio = media_dobras(scores, divisoes)
+        resultados[modelo] = {'media': media, 'std': desvio}
+        print(f"{rotulos[modelo]} {media:.2%} ± {desvio:.2%}")
     
     # Melhor modelo
     melhor = max(resultados.items(), key=lambda x: x[1]['media'])
@@ -354,6 +506,216 @@ def avaliar_modelos(X, y):
     
     return resultados
 
+def dobras_de_teste(estrategia, divisoes, y):
+    """Dobras dos relatórios: as da validação, ou um split 80/20 em 'linhas'."""
+    if estrategia == 'linhas':
+        treino, teste = train_test_split(
+            np.arange(len(y)), test_size=0.2, random_state=42, stratify=y
+        )
+        return [(treino, teste)]
+    return divisoes
+
+def relatorio_ponto_fixo(df, X, y, dobras, args):
+    """
+    Perda de acurácia do código em ponto fixo: treina em cada dobra e
+    compara, nos dados de teste, o modelo float com a simulação do C.
+    Retorna {modelo: comparar(...)}.
+    """
+    modelos = []
+    if args.arvore_c == 'tabela16':
+        modelos += ['dt', 'rf']
+    if args.svm_c != 'float':
+        modelos.append('svm')
+    if not modelos:
+        return {}
+    
+    print(f"\n{'='*60}")
+    print("🔢 PONTO FIXO x FLOAT (dados de teste)")
+    print("="*60)
+    gases = df[FEATURES_RAW].to_numpy(dtype=np.float64)
+    
+    perdas = {}
+    for modelo in modelos:
+        y_teste, y_float, y_fixo = [], [], []
+        for treino, teste in dobras:
+            if modelo == 'svm':
+                clf, scaler = treinar_svm(X[treino], y[treino])
+                y_float.append(clf.predict(scaler.transform(X[teste])))
+                modelo_q = quantizar_svm(clf, scaler, BITS_SVM[args.svm_c])
+                y_fixo.append(simular_svm(modelo_q, gases[teste]))
+            else:
+                if modelo == 'dt':
+                    clf = treinar_decision_tree(X[treino], y[treino])
+                    arvores = [clf]
+                else:
+                    clf = treinar_random_forest(X[treino], y[treino])
+                    arvores = clf.estimators_
+                # Float de referência = tabela float (mesmas decisões e
+                # votação por maioria do C)
+                tabela = tabela_arvores(arvores)
+                n_classes = len(clf.classes_)
+                y_float.append(clf.classes_[votar(avaliar_tabela(tabela, X[teste]), n_classes)])
+                quantizar_tabela(tabela, X.shape[1])
+                y_fixo.append(clf.classes_[votar(avaliar_tabela(tabela, X[teste]), n_classes)])
+            y_teste.append(y[teste])
+        
+        r = comparar(np.concatenate(y_teste), np.concatenate(y_float), np.concatenate(y_fixo))
+        formato = args.svm_c if modelo == 'svm' else 'int16'
+        print(f"   {CONFIG_MODELOS[modelo]['nome']:<15} float {r['acuracia_float']:.2%} | "
+              f"{formato} {r['acuracia_fixo']:.2%} | Δ {100 * r['delta']:+.2f} pp | "
+              f"concordância {r['concordancia']:.2%}")
+        perdas[modelo] = r
+    return perdas
+
+def mostrar_rodada(n_amostras, resultados):
+    menor, maior = resultados[0]['amostras']
+    if n_amostras is None:
+        faixa = f"{menor:,}" if menor == maior else f"{menor:,}–{maior:,}"
+        print(f"   🔄 {len(resultados)} candidato(s) com o treino inteiro de cada dobra "
+              f"({faixa} amostras)")
+    else:
+        print(f"   🔄 {len(resultados)} candidato(s) com {n_amostras:,} amostras de treino")
+
+def buscar_hiperparametros(X, y, processos=None, halving=False, divisoes=None):
+    """Busca em paralelo e mostra a fronteira acurácia x custo no Pico."""
+    print(f"\n🔎 BUSCA DE HIPERPARÂMETROS ({processos or os.cpu_count()} processo(s)"
+          f"{', halving' if halving else ''})")
+    print("=" * 60)
+    
+    resultados, fronteira = buscar(X, y, processos=processos, halving=halving,
+                                   divisoes=divisoes, ao_terminar_rodada=mostrar_rodada)
+    
+    print(f"\n📐 Fronteira de Pareto ({len(fronteira)} de {len(resultados)} candidatos)")
+    print(f"{'Modelo':<8} {'Parâmetros':<32} {'Acurácia':>16} {'Nós':>6} {'Flash':>8} {'Ciclos':>8}")
+    print("-" * 82)
+    for r in fronteira:
+        params = ', '.join(f'{k}={v}' for k, v in r['params'].items())
+        print(f"{r['modelo']:<8} {params:<32} {r['acuracia']:>8.2%} ± {r['desvio']:>5.2%} "
+              f"{r['nos']:>6} {r['flash']:>7}B {r['ciclos']:>8}")
+    print(f"\n   Custos estimados para o RP2040 sem FPU "
+          f"(comparação de float ~{CUSTO_PICO['ciclos_comparacao']} ciclos)")
+    print("   Para exportar um candidato, copie os parâmetros para CONFIG_MODELOS")
+    
+    return fronteira
+
+# =============================================================================
+# TREINO EM FLUXO (BASES MAIORES QUE A MEMÓRIA)
+# =============================================================================
+
+def listar_fontes():
+    """[(caminho, classe)] dos modos por classe e glob, sem carregar nada."""
+    base_dir = os.path.dirname(__file__)
+    fontes = []
+    
+    if 'USA_GLOB' in globals() and USA_GLOB and 'PADROES_GLOB' in globals():
+        for id_classe, padrao in PADROES_GLOB.items():
+            for arq in sorted(glob.glob(os.path.join(base_dir, padrao))):
+                fontes.append((arq, id_classe))
+        return fontes
+    
+    for id_classe, arquivos in ARQUIVOS.items():
+        for caminho in normalizar_lista_arquivos(arquivos):
+            full_path = os.path.join(base_dir, caminho)
+            if os.path.exists(full_path):
+                fontes.append((full_path, id_classe))
+            else:
+                print(f"   ❌ {os.path.basename(caminho)}: não encontrado")
+    return fontes
+
+def treinar_em_fluxo(args):
+    """Treina e exporta lendo os arquivos em blocos (memória limitada)."""
+    if (('ARQUIVO_UNICO' in globals() and ARQUIVO_UNICO) or args.parquet or
+            ('DIRETORIO_PARQUET' in globals() and DIRETORIO_PARQUET)):
+        print("\n❌ O treino em fluxo usa ARQUIVOS ou PADROES_GLOB (uma classe por arquivo)")
+        sys.exit(1)
+    
+    print(f"\n🌊 TREINO EM FLUXO (orçamento de {args.orcamento_mb} MB)")
+    print("=" * 60)
+    
+    fontes = listar_fontes()
+    if not fontes:
+        print("\n❌ Nenhum arquivo encontrado!")
+        sys.exit(1)
+    
+    n_classes = len({id_classe for _, id_classe in fontes})
+    linhas_bloco, n_teste, n_amostra = tamanhos_por_orcamento(args.orcamento_mb, n_classes)
+    fontes_teste = separar_fontes_teste(fontes)
+    fonte = FonteBlocos(fontes, linhas_bloco, fontes_teste=fontes_teste)
+    print(f"   {len(fontes)} arquivo(s) | blocos de {linhas_bloco:,} linhas | "
+          f"teste: até {n_teste:,} amostras por classe")
+    if fontes_teste:
+        validacao = 'arquivos separados para teste no treino em fluxo'
+        print(f"   🧪 Arquivos de teste: "
+              f"{', '.join(sorted(os.path.basename(c) for c in fontes_teste))}")
+    else:
+        validacao = 'linhas sorteadas dos mesmos arquivos do treino (otimista)'
+        print("\n⚠️  Alguma classe tem um só arquivo: o teste sorteia linhas dos arquivos do treino")
+        print("   Leituras vizinhas vazam para o teste e a acurácia sai otimista;")
+        print("   colete mais de um arquivo/sessão por classe")
+    
+    info = explorar(fonte, n_teste, n_amostra)
+    classes = np.array(sorted(info.contagem))
+    X_teste, y_teste = info.teste.dados()
+    for id_classe in classes:
+        nome = NOMES_CLASSES.get(id_classe, f'Classe {id_classe}')
+        print(f"   {nome:<15} treino {info.contagem[id_classe]:>12,} | "
+              f"teste (amostra) {np.count_nonzero(y_teste == id_classe):>10,}")
+    
+    faixas = calcular_faixas(info.amostra.dados()[0])
+    dados = {'hash': hash_arquivos([caminho for caminho, _ in fontes]),
+             'n_amostras': int(sum(info.contagem.values())),
+             'arquivos': [caminho for caminho, _ in fontes]}
+    
+    if args.modelo == 'auto' or args.exportar == 'todos':
+        modelos = ['dt', 'rf', 'svm']
+    else:
+        modelos = [args.modelo]
+    
+    treinados = {}
+    for modelo in modelos:
+        cfg = CONFIG_MODELOS[modelo]
+        print(f"\n🔧 {cfg['nome']}...")
+        if modelo == 'dt':
+            clf = treinar_decision_tree_fluxo(fonte, faixas, classes, cfg['max_depth'],
+                                              cfg['random_state'])
+            y_pred = clf.predict(X_teste)
+        elif modelo == 'rf':
+            clf = treinar_random_forest_fluxo(fonte, faixas, classes, cfg['n_estimators'],
+                                              cfg['max_depth'], cfg['random_state'])
+            y_pred = clf.predict(X_teste)
+        elif modelo == 'svm':
+            clf = treinar_linear(fonte, info.scaler, classes, cfg['C'],
+                                 sum(info.contagem.values()))
+            y_pred = clf.predict(info.scaler.transform(X_teste))
+        
+        acuracia = np.mean(y_pred == y_teste)
+        treinados[modelo] = (clf, acuracia)
+        print(f"   Acurácia (teste): {acuracia:.2%}")
+        
+        if args.avaliar:
+            print(classification_report(y_teste, y_pred,
+                  target_names=[NOMES_CLASSES.get(c, f'Classe {c}') for c in classes]))
+    
+    if args.modelo == 'auto':
+        modelo_escolhido = max(treinados.items(), key=lambda x: x[1][1])[0]
+        print(f"\n🎯 Modelo selecionado: {CONFIG_MODELOS[modelo_escolhido]['nome']}")
+    else:
+        modelo_escolhido = args.modelo
+    
+    for modelo in (modelos if args.exportar == 'todos' else [modelo_escolhido]):
+        clf = treinados[modelo][0]
+        if modelo in ('dt', 'rf'):
+            codigo = gerar_arvore_c(modelo, clf, args.arvore_c, X_teste)
+        elif args.svm_c != 'float':
+            codigo = gerar_svm_fixo_exportado(clf, info.scaler, args.svm_c)
+        else:
+            codigo = gerar_svm_c(clf, info.scaler, X_teste)
+        exportar_codigo(modelo, codigo, args.exportar)
+        exportar_artefato(modelo, clf, info.scaler if modelo == 'svm' else None, args, dados,
+                          {'acuracia': float(treinados[modelo][1]),
+                           'validacao': validacao})
+    exportar_integracao(args.exportar)
+
 # =============================================================================
 # GERADORES DE CÓDIGO C (mantidos do original)
 # =============================================================================
@@ -482,53 +844,77 @@ int identificar_rf(float ratios[]) {{
 """
     return code
 
-def gerar_svm_c(svm, scaler, feature_names):
-    w = svm.coef_[0]
-    b = svm.intercept_[0]
-    mean = scaler.mean_
-    std = scaler.scale_
-    n_features = len(w)
+def gerar_arvores_tabela_c(arvores, nome_funcao, X=None, quantizar=False):
+    """
+    Árvores como tabelas de nós + avaliador iterativo (arvores_c.py).
+    Com X, confere o avaliador de referência contra o modelo treinado.
+    """
+    tabela = tabela_arvores(arvores)
+    n_features = len(FEATURES_RATIO)
+    if quantizar:
+        quantizar_tabela(tabela, n_features)
+    
+    if X is not None:
+        iguais, total = conferir_paridade(arvores, tabela, X)
+        print(f"   Tabela {'int16' if quantizar else 'float'}: {len(tabela['feature'])} nós, "
+              f"{bytes_tabela(tabela):,} bytes | paridade {iguais:,}/{total:,}")
+        if iguais != total and not quantizar:
+            raise RuntimeError(f"Tabela diverge do modelo em {total - iguais} decisões")
     
     code = gerar_header_c()
     code += f"""
 // ============================================================================
-// SVM LINEAR
+// {'DECISION TREE' if len(arvores) == 1 else f'RANDOM FOREST ({len(arvores)} árvores)'} - TABELA DE NÓS{' (INT16)' if quantizar else ''}
 // ============================================================================
+"""
+    code += gerar_tabela_c(tabela, len(NOMES_CLASSES), nome_funcao, n_features)
+    return code
 
-static const float svm_weights[{n_features}] = {{
-    {', '.join(f'{x:.8f}f' for x in w)}
-}};
-
-static const float svm_bias = {b:.8f}f;
-
-static const float scaler_mean[{n_features}] = {{
-    {', '.join(f'{x:.8f}f' for x in mean)}
-}};
+def gerar_arvore_c(modelo, clf, formato, X=None):
+    """Código C de dt/rf no formato escolhido (--arvore-c)."""
+    if formato == 'if':
+        if modelo == 'dt':
+            return gerar_decision_tree_c(clf, FEATURES_RATIO)
+        return gerar_random_forest_c(clf, FEATURES_RATIO)
+    arvores = [clf] if modelo == 'dt' else clf.estimators_
+    return gerar_arvores_tabela_c(arvores, f'identificar_{modelo}', X,
+                                  quantizar=(formato == 'tabela16'))
 
-static const float scaler_std[{n_features}] = {{
-    {', '.join(f'{x:.8f}f' for x in std)}
-}};
+def gerar_svm_fixo_exportado(svm, scaler, formato):
+    """SVM em ponto fixo (--svm-c int16/int8), com cabeçalho."""
+    modelo_q = quantizar_svm(svm, scaler, BITS_SVM[formato])
+    code = gerar_header_c()
+    code += f"""
+// ============================================================================
+// SVM LINEAR - PONTO FIXO ({formato.upper()})
+// ============================================================================
+"""
+    code += gerar_svm_fixo_c(modelo_q)
+    return code
 
-int identificar_svm(float ratios[]) {{
-    float soma = svm_bias;
+def gerar_svm_c(svm, scaler, X=None):
+    """
+    SVM linear em float, binário ou multiclasse (svm_c.py). Com X, confere
+    o espelho do C contra o predict do scikit-learn.
+    """
+    layout = layout_svm(svm, scaler)
+    n_hiperplanos = len(layout['peso'])
     
-    for (int i = 0; i < {n_features}; i++) {{
-        float x_norm = (ratios[i] - scaler_mean[i]) / scaler_std[i];
-        soma += svm_weights[i] * x_norm;
-    }}
+    if X is not None:
+        iguais, total = conferir_paridade_svm(svm, scaler, layout, X)
+        print(f"   SVM {layout['tipo']} ({n_hiperplanos} hiperplano(s)): "
+              f"paridade {iguais:,}/{total:,}")
+        if iguais != total:
+            print("   ⚠️  Diferenças só de arredondamento (float32 no C, float64 no "
+                  "scikit-learn) em leituras quase sobre a fronteira")
     
-    return (soma > 0.0f) ? 1 : 0;
-}}
-
-float svm_confianca(float ratios[]) {{
-    float soma = svm_bias;
-    for (int i = 0; i < {n_features}; i++) {{
-        float x_norm = (ratios[i] - scaler_mean[i]) / scaler_std[i];
-        soma += svm_weights[i] * x_norm;
-    }}
-    return soma;
-}}
+    code = gerar_header_c()
+    code += f"""
+// ============================================================================
+// SVM LINEAR ({len(layout['classes'])} classes, {layout['tipo']})
+// ============================================================================
 """
+    code += gerar_hiperplanos_c(layout)
     return code
 
 def gerar_codigo_integracao():
@@ -550,6 +936,10 @@ int identificar(float gases[]) {
         return -1;
     }
     
+#if defined(USAR_SVM_LINEAR) && defined(SVM_PONTO_FIXO)
+    // SVM em ponto fixo: usa as resistências direto, sem as divisões
+    return identificar_svm_gases(gases);
+#else
     for (int i = 0; i < 9; i++) {
         ratios[i] = gases[i] / g100;
     }
@@ -563,6 +953,7 @@ int identificar(float gases[]) {
 #else
     #error "Nenhum modelo selecionado!"
 #endif
+#endif
 }
 
 const char* NOMES_CLASSES[] = {
@@ -572,6 +963,70 @@ const char* NOMES_CLASSES[] = {
     code += "};\n"
     return code
 
+def exportar_codigo(modelo, codigo, exportar):
+    """Salva modelo_<modelo>.c ou mostra o código no console."""
+    print(f"\n{'='*60}")
+    print(f"📝 {CONFIG_MODELOS[modelo]['nome'].upper()}")
+    print("="*60)
+    
+    if exportar in ['arquivo', 'todos']:
+        filename = f"modelo_{modelo}.c"
+        with open(filename, 'w') as f:
+            f.write(codigo)
+        print(f"✅ Salvo em: {filename}")
+    else:
+        print(codigo)
+
+def exportar_artefato(modelo, clf, scaler, args, dados, metricas):
+    """Salva modelo_<modelo>.modelo.npz (artefato.py) junto do código C."""
+    if args.exportar not in ['arquivo', 'todos']:
+        return
+    filename = f"modelo_{modelo}{EXTENSAO_ARTEFATO}"
+    salvar_artefato(filename, modelo, clf, scaler, {
+        'features': FEATURES_RATIO,
+        'classes': NOMES_CLASSES,
+        'dados': dados,
+        'metricas': metricas,
+        'parametros': {k: v for k, v in CONFIG_MODELOS[modelo].items() if k != 'nome'},
+        'exportacao': {'arvore_c': args.arvore_c, 'svm_c': args.svm_c},
+    })
+    print(f"✅ Artefato: {filename}")
+
+def exportar_de_artefato(args):
+    """Gera o C de um artefato salvo (outro formato/quantização), sem treinar."""
+    inicio = time.perf_counter()
+    try:
+        meta, clf, scaler = carregar_artefato(args.artefato)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"\n❌ {args.artefato}: {e}")
+        sys.exit(1)
+    if meta.get('features', FEATURES_RATIO) != FEATURES_RATIO:
+        print(f"\n❌ O artefato usa outras features: {meta['features']}")
+        sys.exit(1)
+    
+    # O cabeçalho e a integração usam os nomes de classe do treino
+    global NOMES_CLASSES
+    NOMES_CLASSES = dict(meta['classes'])
+    modelo = meta['modelo']
+    print(f"\n📦 {args.artefato}: {CONFIG_MODELOS[modelo]['nome']} "
+          f"(treinado em {meta['criado_em']})")
+    
+    if modelo in ('dt', 'rf'):
+        codigo = gerar_arvore_c(modelo, clf, args.arvore_c)
+    elif args.svm_c != 'float':
+        codigo = gerar_svm_fixo_exportado(clf, scaler, args.svm_c)
+    else:
+        codigo = gerar_svm_c(clf, scaler)
+    exportar_codigo(modelo, codigo, args.exportar)
+    exportar_integracao(args.exportar)
+    print(f"\n⚡ Código gerado do artefato em {1000 * (time.perf_counter() - inicio):.0f} ms")
+
+def exportar_integracao(exportar):
+    if exportar in ['arquivo', 'todos']:
+        with open("integracao.c", 'w') as f:
+            f.write(gerar_codigo_integracao())
+        print("✅ integracao.c salvo")
+
 # =============================================================================
 # FUNÇÃO PRINCIPAL
 # =============================================================================
@@ -587,6 +1042,39 @@ def main():
                         default='console', help='Onde exportar o código')
     parser.add_argument('--avaliar', action='store_true',
                         help='Mostrar avaliação detalhada')
+    parser.add_argument('--arvore-c', choices=['if', 'tabela', 'tabela16'], default='if',
+                        help='Formato das árvores no C: if/else, tabela de nós (float) '
+                             'ou tabela com limiares int16')
+    parser.add_argument('--svm-c', choices=list(BITS_SVM) + ['float'], default='float',
+                        help='Formato do SVM no C: float ou ponto fixo (int16/int8, sem FPU)')
+    parser.add_argument('--artefato', default=None,
+                        help='Gerar o C de um modelo_<m>.modelo.npz salvo (sem dados nem treino)')
+    parser.add_argument('--sem-cache', action='store_true',
+                        help='Recalcular as features sem usar o cache em disco')
+    parser.add_argument('--limpar-cache', action='store_true',
+                        help='Apagar o cache de features antes de carregar')
+    parser.add_argument('--buscar', action='store_true',
+                        help='Buscar hiperparâmetros (fronteira acurácia x custo) e sair')
+    parser.add_argument('--halving', action='store_true',
+                        help='Na busca, descartar candidatos fracos com poucas amostras')
+    parser.add_argument('--processos', type=int, default=None,
+                        help='Processos da busca (padrão: todos os núcleos)')
+    parser.add_argument('--fluxo', action='store_true',
+                        help='Treinar lendo os arquivos em blocos (bases maiores que a memória)')
+    parser.add_argument('--orcamento-mb', type=int, default=ORCAMENTO_MB,
+                        help='Memória máxima aproximada do treino em fluxo')
+    parser.add_argument('--cv', choices=ESTRATEGIAS, default='grupos',
+                        help='Validação: grupos (sessões/arquivos separados), sessao '
+                             '(deixa uma de fora), tempo (forward-chaining) ou linhas (antigo)')
+    parser.add_argument('--grupo', choices=CHAVES_GRUPO, default='auto',
+                        help='O que é um grupo: sessao_id, amostra_id ou arquivo de origem')
+    parser.add_argument('--parquet', default=None,
+                        help='Carregar de um conjunto Parquet (conjunto_parquet.py) no lugar '
+                             'de ARQUIVOS')
+    parser.add_argument('--classes', default=None,
+                        help='Com --parquet: classes separadas por vírgula (ex: planta,ar_neutro)')
+    parser.add_argument('--desde', default=None, help='Com --parquet: data inicial AAAA-MM-DD')
+    parser.add_argument('--ate', default=None, help='Com --parquet: data final AAAA-MM-DD')
     
     args = parser.parse_args()
     
@@ -594,12 +1082,35 @@ def main():
     print("🧠 TREINADOR MULTI-MODELO PARA BME688")
     print("=" * 60)
     
+    if args.limpar_cache:
+        print(f"\n🧹 Cache de features: {limpar_cache()} arquivo(s) removido(s)")
+    
+    if args.artefato:
+        exportar_de_artefato(args)
+        return
+    
+    if args.fluxo:
+        treinar_em_fluxo(args)
+        print("\n✅ Concluído!")
+        return
+    
     # Carregar dados
-    df = carregar_dados()
+    parquet = None
+    if args.parquet:
+        parquet = {'diretorio': args.parquet, 'inicio': args.desde, 'fim': args.ate,
+                   'classes': args.classes.split(',') if args.classes else None}
+    df = carregar_dados(usar_cache=not args.sem_cache, parquet=parquet)
     X, y, features = preparar_dados(df, usar_ratios=True)
+    estrategia, divisoes = preparar_validacao(df, y, args.cv, args.grupo)
+    
+    if args.buscar:
+        buscar_hiperparametros(X, y, args.processos, args.halving, divisoes)
+        print("\n✅ Concluído!")
+        return
     
     # Avaliar todos os modelos
-    resultados = avaliar_modelos(X, y)
+    resultados = avaliar_modelos(X, y, divisoes, f"validação por {estrategia}, "
+                                                 f"{len(divisoes)} dobras")
     
     # Determinar qual modelo exportar
     if args.modelo == 'auto':
@@ -608,8 +1119,12 @@ def main():
     else:
         modelo_escolhido = args.modelo
     
+    # Perda do ponto fixo antes de gravar o C (aviso junto da exportação)
+    perdas = relatorio_ponto_fixo(df, X, y, dobras_de_teste(estrategia, divisoes, y), args)
+    
     # Treinar e exportar
     print(f"\n🔧 Treinando modelo(s) final(is)...")
+    dados = {'hash': hash_arrays(X, y), 'n_amostras': int(len(y))}
     
     if args.exportar == 'todos':
         modelos_para_exportar = ['dt', 'rf', 'svm']
@@ -617,33 +1132,36 @@ def main():
         modelos_para_exportar = [modelo_escolhido]
     
     for modelo in modelos_para_exportar:
-        print(f"\n{'='*60}")
-        print(f"📝 {CONFIG_MODELOS[modelo]['nome'].upper()}")
-        print("="*60)
-        
+        scaler = None
         if modelo == 'dt':
             clf = treinar_decision_tree(X, y)
-            codigo = gerar_decision_tree_c(clf, features)
+            codigo = gerar_arvore_c(modelo, clf, args.arvore_c, X)
         elif modelo == 'rf':
             clf = treinar_random_forest(X, y)
-            codigo = gerar_random_forest_c(clf, features)
+            codigo = gerar_arvore_c(modelo, clf, args.arvore_c, X)
         elif modelo == 'svm':
             clf, scaler = treinar_svm(X, y)
-            codigo = gerar_svm_c(clf, scaler, features)
+            if args.svm_c != 'float':
+                codigo = gerar_svm_fixo_exportado(clf, scaler, args.svm_c)
+            else:
+                codigo = gerar_svm_c(clf, scaler, X)
         
-        if args.exportar in ['arquivo', 'todos']:
-            filename = f"modelo_{modelo}.c"
-            with open(filename, 'w') as f:
-                f.write(codigo)
-            print(f"✅ Salvo em: {filename}")
-        else:
-            print(codigo)
+        exportar_codigo(modelo, codigo, args.exportar)
+        perda = perdas.get(modelo)
+        if perda and perda['delta'] < -LIMITE_PERDA_PONTO_FIXO:
+            formato = args.svm_c if modelo == 'svm' else args.arvore_c
+            print(f"\n⚠️  ATENÇÃO: {CONFIG_MODELOS[modelo]['nome']} em {formato} perde "
+                  f"{-100 * perda['delta']:.2f} pp de acurácia em relação ao float "
+                  f"({perda['acuracia_fixo']:.2%} x {perda['acuracia_float']:.2%}).")
+            print(f"   Confira antes de gravar no Pico ou exporte em float / int16.")
+        exportar_artefato(modelo, clf, scaler, args, dados, {
+            'acuracia': float(resultados[modelo]['media']),
+            'desvio': float(resultados[modelo]['std']),
+            'validacao': f"{estrategia}, {len(divisoes)} dobras",
+        })
     
     # Código de integração
-    if args.exportar in ['arquivo', 'todos']:
-        with open("integracao.c", 'w') as f:
-            f.write(gerar_codigo_integracao())
-        print("✅ integracao.c salvo")
+    exportar_integracao(args.exportar)
     
     # Relatório detalhado
     if args.avaliar:
@@ -651,22 +1169,26 @@ def main():
         print("📊 RELATÓRIO DETALHADO")
         print("="*60)
         
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42, stratify=y
-        )
+        # Previsões de teste de todas as dobras da validação escolhida
+        dobras = dobras_de_teste(estrategia, divisoes, y)
         
         for modelo in ['dt', 'rf', 'svm']:
             print(f"\n--- {CONFIG_MODELOS[modelo]['nome']} ---")
             
-            if modelo == 'dt':
-                clf = treinar_decision_tree(X_train, y_train)
-                y_pred = clf.predict(X_test)
-            elif modelo == 'rf':
-                clf = treinar_random_forest(X_train, y_train)
-                y_pred = clf.predict(X_test)
-            elif modelo == 'svm':
-                clf, scaler = treinar_svm(X_train, y_train)
-                y_pred = clf.predict(scaler.transform(X_test))
+            y_test, y_pred = [], []
+            for treino, teste in dobras:
+                X_train, y_train = X[treino], y[treino]
+                if modelo == 'dt':
+                    clf = treinar_decision_tree(X_train, y_train)
+                    y_pred.append(clf.predict(X[teste]))
+                elif modelo == 'rf':
+                    clf = treinar_random_forest(X_train, y_train)
+                    y_pred.append(clf.predict(X[teste]))
+                elif modelo == 'svm':
+                    clf, scaler = treinar_svm(X_train, y_train)
+                    y_pred.append(clf.predict(scaler.transform(X[teste])))
+                y_test.append(y[teste])
+            y_test, y_pred = np.concatenate(y_test), np.concatenate(y_pred)
             
             print(classification_report(y_test, y_pred,
                   target_names=[NOMES_CLASSES[i] for i in sorted(NOMES_CLASSES.keys())]))
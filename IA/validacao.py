@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+VALIDAÇÃO CRUZADA SEM VAZAMENTO ENTRE LEITURAS VIZINHAS
+=============================================================================
+Leituras consecutivas do sensor são quase iguais. Com cv=5 por linhas, a
+leitura de teste quase sempre tem uma vizinha idêntica no treino e a
+acurácia sai otimista. As estratégias daqui separam o que o modelo vê
+no campo (uma sessão nova, um momento depois):
+   linhas  StratifiedKFold por linha (o antigo cv=5, só para comparar)
+   grupos  StratifiedGroupKFold: uma sessão/arquivo nunca cai em treino
+           e teste ao mesmo tempo
+   sessao  leave-one-group-out: cada sessão/arquivo é testada uma vez
+   tempo   forward-chaining: cada sessão é cortada em trechos na ordem de
+           coleta; a dobra k treina nos trechos 0..k de todas as sessões
+           e testa no trecho k+1, com uma lacuna entre eles
+
+Os grupos vêm dos metadados gravados pelo coletor (sessao_id, amostra_id)
+ou, para os CSVs do firmware, do arquivo de origem.
+=============================================================================
+"""
+
+import numpy as np
+from sklearn.model_selection import LeaveOneGroupOut, StratifiedGroupKFold, StratifiedKFold
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+ESTRATEGIAS = ('linhas', 'grupos', 'sessao', 'tempo')
+CHAVES_GRUPO = ('auto', 'sessao', 'amostra', 'arquivo')
+
+N_DOBRAS = 5
+
+# Leituras descartadas entre o fim do treino e o começo do teste em cada
+# sessão (modo tempo), para a vizinha do teste não estar no treino
+LACUNA_TEMPO = 30
+
+# =============================================================================
+# GRUPOS
+# =============================================================================
+
+def grupos_do_dataframe(df, chave='auto'):
+    """
+    Rótulo de grupo por linha. 'auto' usa arquivo + sessao_id quando o
+    arquivo tem sessões, senão só o arquivo.
+    """
+    arquivo = df['arquivo'].astype(str) if 'arquivo' in df.columns else None
+    sessao = df['sessao_id'].astype(str) if 'sessao_id' in df.columns else None
+    amostra = df['amostra_id'].astype(str) if 'amostra_id' in df.columns else None
+
+    if chave == 'sessao' or (chave == 'auto' and sessao is not None and (sessao != '').any()):
+        partes = [p for p in (arquivo, sessao) if p is not None]
+    elif chave == 'amostra':
+        partes = [p for p in (arquivo, amostra) if p is not None]
+    else:
+        partes = [arquivo]
+    if not partes or partes[0] is None:
+        raise ValueError("Sem metadados para agrupar (arquivo/sessao_id/amostra_id)")
+    rotulo = partes[0]
+    for p in partes[1:]:
+        rotulo = rotulo + '|' + p
+    return rotulo.to_numpy()
+
+# =============================================================================
+# DIVISÕES
+# =============================================================================
+
+def dividir_temporal(grupos, n_dobras=N_DOBRAS, lacuna=LACUNA_TEMPO):
+    """Forward-chaining dentro de cada grupo (linhas já em ordem de coleta)."""
+    posicao = np.empty(len(grupos), dtype=np.int64)
+    tamanho = np.empty(len(grupos), dtype=np.int64)
+    for g in np.unique(grupos):
+        linhas = np.flatnonzero(grupos == g)
+        posicao[linhas] = np.arange(len(linhas))
+        tamanho[linhas] = len(linhas)
+    # Trecho (0..n_dobras) de cada linha dentro da sua sessão
+    trecho = posicao * (n_dobras + 1) // tamanho
+    inicio_trecho = -(-trecho * tamanho // (n_dobras + 1))
+
+    divisoes = []
+    for k in range(n_dobras):
+        treino = np.flatnonzero(trecho <= k)
+        teste = np.flatnonzero((trecho == k + 1) & (posicao - inicio_trecho >= lacuna))
+        if len(treino) and len(teste):
+            divisoes.append((treino, teste))
+    return divisoes
+
+
+def gerar_divisoes(y, grupos=None, estrategia='grupos', n_dobras=N_DOBRAS,
+                   lacuna=LACUNA_TEMPO):
+    """Lista de (índices de treino, índices de teste) da estratégia."""
+    if estrategia == 'linhas':
+        return list(StratifiedKFold(n_dobras).split(np.zeros(len(y)), y))
+    if grupos is None:
+        raise ValueError(f"A estratégia '{estrategia}' precisa dos grupos")
+    n_grupos = len(np.unique(grupos))
+    if estrategia == 'tempo':
+        return dividir_temporal(grupos, n_dobras, lacuna)
+    if n_grupos < 2:
+        raise ValueError(f"Só há {n_grupos} grupo: use --cv tempo ou colete mais sessões")
+    if estrategia == 'sessao':
+        return list(LeaveOneGroupOut().split(np.zeros(len(y)), y, grupos))
+    if estrategia == 'grupos':
+        return list(StratifiedGroupKFold(min(n_dobras, n_grupos)).split(
+            np.zeros(len(y)), y, grupos))
+    raise ValueError(f"Estratégia desconhecida: {estrategia}")
+
+
+def descrever_divisoes(divisoes, y):
+    """Resumo por dobra: tamanhos de treino/teste e classes no teste."""
+    linhas = []
+    for i, (treino, teste) in enumerate(divisoes):
+        classes = ', '.join(f'{c}:{n}' for c, n in zip(*np.unique(y[teste], return_counts=True)))
+        linhas.append(f"dobra {i + 1}: treino {len(treino):,} | teste {len(teste):,} ({classes})")
+    return linhas
+
+
+def dobras_uma_classe(divisoes, y):
+    """Números (a partir de 1) das dobras cujo teste tem uma só classe."""
+    return [i + 1 for i, (_, teste) in enumerate(divisoes) if len(np.unique(y[teste])) < 2]
+
+
+# =============================================================================
+# MÉDIA ENTRE DOBRAS
+# =============================================================================
+
+def media_dobras(acuracias, divisoes=None):
+    """
+    Média e desvio das acurácias por dobra, ponderados pelo tamanho do
+    teste: é a acurácia de todas as leituras de teste juntas. Com grupos
+    de tamanhos muito diferentes, a média simples deixa uma dobra de
+    300 leituras pesar tanto quanto uma de 9.000.
+    """
+    acuracias = np.asarray(acuracias, dtype=float)
+    pesos = None if divisoes is None else [len(teste) for _, teste in divisoes]
+    media = np.average(acuracias, weights=pesos)
+    desvio = np.sqrt(np.average((acuracias - media) ** 2, weights=pesos))
+    return float(media), float(desvio)
@@ -0,0 +1,471 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+BENCHMARK PONTA A PONTA DAS ETAPAS (RESULTADOS EM JSON)
+=============================================================================
+Mede cada etapa do caminho sensor -> modelo com leituras sintéticas ou
+reproduzidas (replay.py), sem Pico, sem navegador e sem teclado:
+   parse       linhas/s do parser de texto e quadros/s do binário
+   escrita     linhas/s gravadas em CSV, .bme e .bmz: em lote, com flush
+               por linha e com flush + fsync por linha
+   coleta      ColetorBME688.coletar() inteiro, lendo de um replay na
+               velocidade máxima (com o print por linha indo para /dev/null)
+   dashboard   quadros/s do ServicoAquisicao e custo de um redesenho
+               (desde() + DataFrames dos gráficos e da tabela)
+   carga       data/*.csv multiplicados por --escala (100x): read_csv,
+               só colunas de gás, carregar_features sem/com cache, .bme
+               (conversão + memory-map), .bmz (compressão, bytes por
+               leitura, leitura dos gases) e carregar_dados() do treinador
+   features    calcular_features em linhas/s
+   validacao   tempo da cross-validation de cada modelo (5 dobras) e de
+               avaliar_modelos() inteiro, nos dados reais
+
+Cada métrica vira {"valor", "unidade"} em um JSON com o commit, as versões
+e a máquina; unidades terminadas em "/s" são vazão (maior é melhor), as
+demais são tempo (menor é melhor). --comparar mostra a variação contra um
+JSON anterior e sai com código 1 se alguma métrica piorou mais que --limiar.
+
+Uso:
+   python bench_etapas.py                              (tudo, ~1-2 min)
+   python bench_etapas.py --rapido --etapas parse escrita
+   python bench_etapas.py --saida antes.json
+   python bench_etapas.py --saida depois.json --comparar antes.json
+=============================================================================
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(RAIZ, 'data'))
+sys.path.insert(0, os.path.join(RAIZ, 'IA'))
+from armazenamento import (  # noqa: E402
+    CANAIS_GAS, LOTE_PADRAO, abrir_armazenamento, carregar_binario, converter_csv_para_binario
+)
+from barramento import carregar_quadros_arquivo  # noqa: E402
+from compactacao import LeitorCompactado, converter  # noqa: E402
+from bench_parser import fatiar, gerar_linhas  # noqa: E402
+from features import FEATURES_RAW, calcular_features, carregar_features  # noqa: E402
+from protocolo import (  # noqa: E402
+    DecodificadorBinario, ParserQuadros, codificar_quadros, matriz
+)
+from replay import PortaReplay  # noqa: E402
+from servico_aquisicao import ServicoAquisicao  # noqa: E402
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+DIRETORIO_DADOS = os.path.join(RAIZ, 'data')
+DIRETORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados')
+
+# Gravações usadas em todas as etapas (classe 0 e classe 1)
+ARQUIVOS_BASE = {0: 'planta.csv', 1: 'ar_neutro.csv'}
+
+ETAPAS = ['parse', 'escrita', 'coleta', 'dashboard', 'carga', 'features', 'validacao']
+
+# Tamanhos: (normal, --rapido)
+LINHAS_PARSE = (200_000, 20_000)
+LINHAS_ESCRITA = (100_000, 10_000)
+LINHAS_COLETA = (100_000, 10_000)
+ESCALA_CARGA = (100, 10)
+
+LEITURAS_POR_BLOCO = 64     # escrita: leituras por chamada de escrever_lote
+BLOCO_SERIAL = 4096         # parse: bytes por leitura da serial
+LOTE_PARSER = 64            # parse: blocos por chamada do parser
+PONTOS_GRAFICO = 1000       # dashboard: leituras novas por redesenho
+LIMIAR_PADRAO = 0.10        # --comparar: piora tolerada (10%)
+
+# =============================================================================
+# MEDIÇÃO
+# =============================================================================
+
+class Resultados:
+    """Métricas da rodada: nome 'etapa.metrica' -> valor e unidade."""
+
+    def __init__(self):
+        self.metricas = {}
+
+    def registrar(self, nome, valor, unidade):
+        self.metricas[nome] = {'valor': float(valor), 'unidade': unidade}
+        formato = f"{valor:>14,.2f}" if unidade in ('ms', 'bytes/linha') else f"{valor:>14,.0f}"
+        print(f"  {nome:<34} {formato} {unidade}")
+
+    def vazao(self, nome, itens, segundos, unidade='linhas/s'):
+        self.registrar(nome, itens / max(segundos, 1e-9), unidade)
+
+    def tempo(self, nome, segundos):
+        self.registrar(nome, segundos * 1e3, 'ms')
+
+
+def melhor_de(funcao, repeticoes):
+    """Menor tempo (s) de `repeticoes` chamadas de `funcao`."""
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - t0)
+    return melhor
+
+
+@contextlib.contextmanager
+def silencioso():
+    """Descarta os prints (emojis de progresso) da etapa medida."""
+    with open(os.devnull, 'w', encoding='utf-8') as nulo, contextlib.redirect_stdout(nulo):
+        yield
+
+
+def quadros_base(n=None):
+    """Leituras das gravações de ARQUIVOS_BASE (DTYPE_QUADRO), repetidas até `n`."""
+    quadros = np.concatenate([carregar_quadros_arquivo(os.path.join(DIRETORIO_DADOS, a))
+                              for a in ARQUIVOS_BASE.values()])
+    if n is None:
+        return quadros
+    quadros = np.resize(quadros, n)
+    quadros['indice'] = np.arange(n)
+    return quadros
+
+# =============================================================================
+# ETAPAS
+# =============================================================================
+
+def etapa_parse(res, args):
+    n = args.linhas_parse
+    linhas = gerar_linhas(os.path.join(DIRETORIO_DADOS, ARQUIVOS_BASE[0]), n)
+    lotes = fatiar(b'\r\n'.join(linhas) + b'\r\n', BLOCO_SERIAL, LOTE_PARSER)
+
+    def texto():
+        p = ParserQuadros()
+        for lote in lotes:
+            p.processar(lote)
+    res.vazao('parse.texto', n, melhor_de(texto, args.repeticoes))
+
+    valores = matriz(quadros_base(n))
+    binario = codificar_quadros(valores[:, 0].astype(np.int64), valores[:, 1],
+                                valores[:, 2], valores[:, 3:])
+    lotes_binarios = fatiar(binario, BLOCO_SERIAL, LOTE_PARSER)
+
+    def decodificar():
+        d = DecodificadorBinario()
+        for lote in lotes_binarios:
+            d.processar(lote)
+    res.vazao('parse.binario', n, melhor_de(decodificar, args.repeticoes), 'quadros/s')
+
+
+def etapa_escrita(res, args):
+    n = args.linhas_escrita
+    valores = matriz(quadros_base(n))
+    ts = time.time_ns() + np.arange(n, dtype=np.int64) * 1_000_000_000
+    temps, umids, gases = valores[:, 1], valores[:, 2], valores[:, 3:]
+
+    # (nome, lote, fsync_a_cada, fração das linhas): fsync por linha é
+    # ordens de grandeza mais lento, mede só uma parte
+    modos = [('lote', LOTE_PADRAO, 0, 1), ('flush_por_linha', 1, 0, 1),
+             ('fsync_por_linha', 1, 1, 100)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for extensao in ('.csv', '.bme', '.bmz'):
+            for nome, lote, fsync, fracao in modos:
+                m = max(n // fracao, LEITURAS_POR_BLOCO)
+
+                def gravar():
+                    caminho = os.path.join(tmp, 'escrita' + extensao)
+                    if os.path.exists(caminho):
+                        os.remove(caminho)
+                    with abrir_armazenamento(caminho, lote=lote, fsync_a_cada=fsync) as arm:
+                        arm.iniciar_sessao('bench', 'a1', 'planta')
+                        for i in range(0, m, LEITURAS_POR_BLOCO):
+                            f = slice(i, min(i + LEITURAS_POR_BLOCO, m))
+                            arm.escrever_lote(ts[f], temps[f], umids[f], gases[f])
+                res.vazao(f'escrita.{extensao[1:]}.{nome}', m, melhor_de(gravar, args.repeticoes))
+
+
+def etapa_coleta(res, args):
+    with silencioso():
+        from coleta_gas import ColetorBME688  # avisa que falta o 'keyboard'
+    n = args.linhas_coleta
+    quadros = quadros_base(n)
+    for protocolo in ('texto', 'binario'):
+        with tempfile.TemporaryDirectory() as tmp:
+            coletor = ColetorBME688()
+            coletor.ser = PortaReplay(f'replay:bench?protocolo={protocolo}', quadros=quadros,
+                                      velocidade='max', protocolo=protocolo)
+            t0 = time.perf_counter()
+            with silencioso():
+                coletor.coletar(os.path.join(tmp, 'coleta.csv'), 'planta', 'bench')
+            segundos = time.perf_counter() - t0
+        res.vazao(f'coleta.{protocolo}', coletor.contador, segundos)
+
+
+def para_dataframe(dados, posicoes, colunas):
+    """Mesmo DataFrame que o dashboard monta para os gráficos (dashboard.py)."""
+    nomes = {'Temp': 'temp', 'Umid': 'umid'}
+    return pd.DataFrame({c: dados[nomes.get(c, c)] for c in colunas},
+                        index=pd.Index(posicoes, name='Leitura'))
+
+
+def etapa_dashboard(res, args):
+    n = args.linhas_coleta
+    servico = ServicoAquisicao('replay:bench')
+    porta = PortaReplay('replay:bench', timeout=0.1, quadros=quadros_base(n), velocidade='max')
+    t0 = time.perf_counter()
+    servico.iniciar(porta)
+    while servico.total < n and servico.rodando and not porta.terminou:
+        servico.aguardar(servico.total, timeout=0.1)
+    servico.aguardar(n - 1, timeout=1.0)
+    segundos = time.perf_counter() - t0
+    servico.parar()
+    res.vazao('dashboard.aquisicao', servico.total, segundos, 'quadros/s')
+
+    # Um redesenho do laço do dashboard com PONTOS_GRAFICO leituras novas
+    clima = ['Temp', 'Umid']
+    desenhado = max(servico.total - PONTOS_GRAFICO, 0)
+
+    def redesenhar():
+        novos, posicoes = servico.desde(desenhado)
+        para_dataframe(novos, posicoes, clima)
+        para_dataframe(novos, posicoes, CANAIS_GAS)
+        ultimos, posicoes = servico.desde(servico.total - 5)
+        para_dataframe(ultimos, posicoes, clima + CANAIS_GAS)
+        servico.estado()
+    repeticoes = max(args.repeticoes, 20)
+    t0 = time.perf_counter()
+    for _ in range(repeticoes):
+        redesenhar()
+    res.tempo('dashboard.redesenho', (time.perf_counter() - t0) / repeticoes)
+
+
+def escalar_csv(origem, destino, escala):
+    """Copia o CSV repetindo as linhas de dados `escala` vezes."""
+    with open(origem, 'rb') as f:
+        cabecalho = f.readline()
+        corpo = f.read()
+    if not corpo.endswith(b'\n'):
+        corpo += b'\n'
+    with open(destino, 'wb') as f:
+        f.write(cabecalho)
+        for _ in range(escala):
+            f.write(corpo)
+
+
+def etapa_carga(res, args):
+    import treinar_scanner
+
+    with tempfile.TemporaryDirectory() as tmp:
+        caminhos = {}
+        for classe, nome in ARQUIVOS_BASE.items():
+            caminhos[classe] = os.path.join(tmp, nome)
+            escalar_csv(os.path.join(DIRETORIO_DADOS, nome), caminhos[classe], args.escala)
+        arquivos = list(caminhos.values())
+        n = sum(sum(1 for _ in open(c, 'rb')) - 1 for c in arquivos)
+        mb = sum(os.path.getsize(c) for c in arquivos) / 1e6
+        print(f"  ({args.escala}x: {n:,} linhas, {mb:.0f} MB de CSV)")
+        res.registrar('carga.linhas', n, 'linhas')
+
+        res.tempo('carga.read_csv', melhor_de(
+            lambda: [pd.read_csv(c) for c in arquivos], args.repeticoes))
+        res.tempo('carga.read_csv_gases', melhor_de(
+            lambda: [pd.read_csv(c, usecols=FEATURES_RAW) for c in arquivos], args.repeticoes))
+
+        cache = os.path.join(tmp, 'cache')
+        res.tempo('carga.features_sem_cache', melhor_de(
+            lambda: [carregar_features(c, usar_cache=False) for c in arquivos], args.repeticoes))
+        for c in arquivos:
+            carregar_features(c, diretorio=cache)
+        res.tempo('carga.features_cache', melhor_de(
+            lambda: [carregar_features(c, diretorio=cache) for c in arquivos], args.repeticoes))
+
+        binarios = [os.path.splitext(c)[0] + '.bme' for c in arquivos]
+        t0 = time.perf_counter()
+        for c, b in zip(arquivos, binarios):
+            converter_csv_para_binario(c, b)
+        res.tempo('carga.conversao_bme', time.perf_counter() - t0)
+
+        def ler_binarios():
+            for b in binarios:
+                registros, _ = carregar_binario(b)
+                np.column_stack([registros[g] for g in FEATURES_RAW]).astype(np.float64)
+        res.tempo('carga.bme', melhor_de(ler_binarios, args.repeticoes))
+        res.tempo('carga.features_bme', melhor_de(
+            lambda: [carregar_features(b, usar_cache=False) for b in binarios], args.repeticoes))
+
+        compactados = [os.path.splitext(b)[0] + '.bmz' for b in binarios]
+        t0 = time.perf_counter()
+        for b, z in zip(binarios, compactados):
+            converter(b, z)
+        res.tempo('carga.conversao_bmz', time.perf_counter() - t0)
+        res.registrar('carga.bmz_bytes_por_linha',
+                      sum(os.path.getsize(z) for z in compactados) / n, 'bytes/linha')
+        res.tempo('carga.bmz', melhor_de(
+            lambda: [LeitorCompactado(z).ler(colunas=FEATURES_RAW) for z in compactados],
+            args.repeticoes))
+
+        # O carregamento do treinador inteiro (concat, resumo por classe)
+        originais = treinar_scanner.ARQUIVOS
+        treinar_scanner.ARQUIVOS = {k: [v] for k, v in caminhos.items()}
+        try:
+            with silencioso():
+                segundos = melhor_de(lambda: treinar_scanner.carregar_dados(usar_cache=False),
+                                     args.repeticoes)
+        finally:
+            treinar_scanner.ARQUIVOS = originais
+        res.tempo('carga.carregar_dados', segundos)
+
+
+def etapa_features(res, args):
+    valores = matriz(quadros_base(args.linhas_escrita * 10))
+    gases = np.ascontiguousarray(valores[:, 3:])
+    res.vazao('features.calcular', len(gases),
+              melhor_de(lambda: calcular_features(gases), args.repeticoes))
+
+
+def etapa_validacao(res, args):
+    import treinar_scanner
+    from sklearn.model_selection import cross_val_score
+
+    with silencioso():
+        df = treinar_scanner.carregar_dados(usar_cache=False)
+    X, y, _ = treinar_scanner.preparar_dados(df, usar_ratios=True)
+    print(f"  ({len(X):,} amostras, 5 dobras)")
+    for modelo, estimador in treinar_scanner.estimadores_avaliacao().items():
+        t0 = time.perf_counter()
+        cross_val_score(estimador, X, y, cv=5, scoring='accuracy', n_jobs=-1)
+        res.tempo(f'validacao.{modelo}', time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    with silencioso():
+        treinar_scanner.avaliar_modelos(X, y)
+    res.tempo('validacao.avaliar_modelos', time.perf_counter() - t0)
+
+
+FUNCOES_ETAPAS = {
+    'parse': etapa_parse,
+    'escrita': etapa_escrita,
+    'coleta': etapa_coleta,
+    'dashboard': etapa_dashboard,
+    'carga': etapa_carga,
+    'features': etapa_features,
+    'validacao': etapa_validacao,
+}
+
+# =============================================================================
+# JSON E COMPARAÇÃO
+# =============================================================================
+
+def versao_git():
+    """(commit curto, há mudanças não commitadas) ou (None, None) fora do git."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                cwd=RAIZ, capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def metadados(args):
+    import sklearn
+
+    commit, sujo = versao_git()
+    return {
+        'commit': commit,
+        'sujo': sujo,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__,
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+        'argumentos': vars(args),
+    }
+
+
+def caminho_padrao(meta):
+    nome = datetime.now().strftime('%Y%m%d_%H%M%S')
+    if meta['commit']:
+        nome += f"_{meta['commit']}{'-sujo' if meta['sujo'] else ''}"
+    return os.path.join(DIRETORIO_RESULTADOS, nome + '.json')
+
+
+def comparar(atual, anterior, limiar):
+    """Imprime a variação de cada métrica; devolve as que pioraram além do limiar."""
+    meta = anterior.get('meta', {})
+    print(f"\n🔍 Comparando com {meta.get('commit') or '?'} ({meta.get('data', '?')})")
+    pioraram = []
+    for nome, m in atual.items():
+        if nome not in anterior['resultados'] or m['unidade'] in ('linhas',):
+            continue
+        antes = anterior['resultados'][nome]['valor']
+        if antes == 0:
+            continue
+        variacao = m['valor'] / antes - 1
+        # Vazão: cair é pior; tempo: subir é pior
+        piora = -variacao if m['unidade'].endswith('/s') else variacao
+        marca = '🔴' if piora > limiar else ('🟢' if piora < -limiar else '  ')
+        casas = 2 if m['unidade'] == 'ms' else 0
+        print(f"  {marca} {nome:<34} {antes:>14,.{casas}f} -> {m['valor']:>14,.{casas}f} "
+              f"{m['unidade']:<9} {variacao:+7.1%}")
+        if piora > limiar:
+            pioraram.append(nome)
+    return pioraram
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark ponta a ponta das etapas')
+    parser.add_argument('--etapas', nargs='+', choices=ETAPAS, default=ETAPAS)
+    parser.add_argument('--rapido', action='store_true', help='tamanhos menores (smoke test)')
+    parser.add_argument('--escala', type=int, default=None,
+                        help=f'multiplicador dos CSVs na carga (padrão {ESCALA_CARGA[0]})')
+    parser.add_argument('--repeticoes', type=int, default=3, help='melhor de N')
+    parser.add_argument('--saida', default=None, help='JSON de saída (padrão: resultados/)')
+    parser.add_argument('--comparar', default=None, help='JSON de uma rodada anterior')
+    parser.add_argument('--limiar', type=float, default=LIMIAR_PADRAO,
+                        help='piora tolerada no --comparar (fração)')
+    args = parser.parse_args()
+
+    i = 1 if args.rapido else 0
+    args.linhas_parse = LINHAS_PARSE[i]
+    args.linhas_escrita = LINHAS_ESCRITA[i]
+    args.linhas_coleta = LINHAS_COLETA[i]
+    args.escala = args.escala or ESCALA_CARGA[i]
+
+    res = Resultados()
+    meta = metadados(args)
+    print(f"⏱️  Benchmark | commit {meta['commit'] or '?'}{' (sujo)' if meta['sujo'] else ''} | "
+          f"{meta['cpus']} CPU(s) | Python {meta['python']}")
+    inicio = time.perf_counter()
+    for etapa in args.etapas:
+        print(f"\n▶️  {etapa}")
+        FUNCOES_ETAPAS[etapa](res, args)
+    meta['duracao_s'] = round(time.perf_counter() - inicio, 1)
+
+    saida = args.saida or caminho_padrao(meta)
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump({'meta': meta, 'resultados': res.metricas}, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 {len(res.metricas)} métricas em {saida} ({meta['duracao_s']} s)")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            anterior = json.load(f)
+        pioraram = comparar(res.metricas, anterior, args.limiar)
+        if pioraram:
+            print(f"\n⚠️  {len(pioraram)} métrica(s) pioraram mais de {args.limiar:.0%}: "
+                  f"{', '.join(pioraram)}")
+            sys.exit(1)
+        print(f"\n✅ Nenhuma métrica piorou mais de {args.limiar:.0%}")
+
+
+if __name__ == "__main__":
+    main()
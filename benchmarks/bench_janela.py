@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+BENCHMARK DO MODELO DE DADOS DO DASHBOARD
+=============================================================================
+Custo de acrescentar uma leitura conforme o histórico cresce:
+- antigo: pd.concat do DataFrame da sessão com uma linha nova
+- novo:   JanelaQuadros.adicionar() (buffer circular NumPy)
+
+O custo do pd.concat cresce com o histórico; o da janela fica constante,
+assim como a memória (medida com tracemalloc).
+
+Uso:
+   python bench_janela.py [--historico 1000 10000 50000] [--janela 10000]
+=============================================================================
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+from janela import JanelaQuadros  # noqa: E402
+from protocolo import COLUNAS_QUADRO, DTYPE_QUADRO  # noqa: E402
+
+AMOSTRAS = 200
+
+
+def custo_concat(historico):
+    """Microssegundos por leitura com pd.concat sobre `historico` linhas."""
+    dados = pd.DataFrame(np.zeros((historico, len(COLUNAS_QUADRO))), columns=COLUNAS_QUADRO)
+    linha = dict.fromkeys(COLUNAS_QUADRO, 1.0)
+    t0 = time.perf_counter()
+    for _ in range(AMOSTRAS):
+        dados = pd.concat([dados, pd.DataFrame([linha])], ignore_index=True)
+    return (time.perf_counter() - t0) / AMOSTRAS * 1e6
+
+
+def custo_janela(historico, capacidade):
+    """Microssegundos por leitura na janela depois de `historico` leituras."""
+    janela = JanelaQuadros(capacidade)
+    bloco = np.zeros(1000, dtype=DTYPE_QUADRO)
+    tempos = np.zeros(1000, dtype=np.int64)
+    for _ in range(historico // 1000):
+        janela.adicionar(tempos, bloco)
+    quadro, tempo = bloco[:1], tempos[:1]
+    t0 = time.perf_counter()
+    for _ in range(AMOSTRAS):
+        janela.adicionar(tempo, quadro)
+    return (time.perf_counter() - t0) / AMOSTRAS * 1e6
+
+
+def memoria_janela(leituras, capacidade):
+    """Pico de memória (MB) ao passar `leituras` pela janela em lotes de 100."""
+    tracemalloc.start()
+    janela = JanelaQuadros(capacidade)
+    bloco = np.zeros(100, dtype=DTYPE_QUADRO)
+    tempos = np.zeros(100, dtype=np.int64)
+    for _ in range(leituras // 100):
+        janela.adicionar(tempos, bloco)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark da janela do dashboard')
+    parser.add_argument('--historico', type=int, nargs='+', default=[1_000, 10_000, 50_000])
+    parser.add_argument('--janela', type=int, default=10_000)
+    args = parser.parse_args()
+
+    print(f"📊 µs por leitura acrescentada (janela de {args.janela} pontos)")
+    print(f"  {'histórico':>10} {'pd.concat':>12} {'janela':>10}")
+    for h in args.historico:
+        print(f"  {h:>10} {custo_concat(h):>12.1f} {custo_janela(h, args.janela):>10.1f}")
+
+    for leituras in (10_000, 1_000_000):
+        print(f"  memória da janela após {leituras:>9} leituras: "
+              f"{memoria_janela(leituras, args.janela):.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
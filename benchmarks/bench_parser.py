@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+BENCHMARK DO PARSER SERIAL (LINHAS/S)
+=============================================================================
+Compara o parser antigo (split + float() linha a linha) com o
+protocolo.ParserQuadros (conversão em lote com np.fromstring), usando
+linhas no formato do firmware tiradas de um CSV gravado. Mede também o
+DecodificadorBinario com as mesmas leituras em quadros binários.
+
+Uso:
+   python bench_parser.py [--arquivo ../data/planta.csv] [--linhas 200000]
+                          [--bloco 4096] [--lote 64]
+
+--bloco é o tamanho de cada leitura da serial e --lote quantos blocos o
+pipeline entrega de uma vez ao parser (LOTE_PROCESSAMENTO).
+=============================================================================
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+from protocolo import (  # noqa: E402
+    DecodificadorBinario, ParserQuadros, codificar_quadros
+)
+
+ARQUIVO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              '..', 'data', 'planta.csv')
+
+# =============================================================================
+# REFERÊNCIA: PARSER LINHA A LINHA (COMO NO COLETOR ORIGINAL)
+# =============================================================================
+
+def parser_linha_a_linha(lotes, resto=b''):
+    """Reproduz o parse original: decode, split(',') e float() por campo."""
+    valores = []
+    for _, dados in (b for lote in lotes for b in lote):
+        linhas = (resto + dados).split(b'\n')
+        resto = linhas.pop()
+        for bruta in linhas:
+            bruta = bruta.strip()
+            if not bruta:
+                continue
+            try:
+                partes = bruta.decode('utf-8').split(',')
+                if len(partes) >= 13:
+                    valores.append([float(p) for p in partes[:13]])
+            except (UnicodeDecodeError, ValueError):
+                continue
+    return np.asarray(valores, dtype=np.float64)
+
+# =============================================================================
+# BENCHMARK
+# =============================================================================
+
+def gerar_linhas(arquivo, n_linhas):
+    """Linhas do firmware (bytes) repetidas até `n_linhas`."""
+    with open(arquivo, 'rb') as f:
+        linhas = [l.strip() for l in f.readlines()[1:] if l.strip()]
+    repeticoes = n_linhas // len(linhas) + 1
+    return (linhas * repeticoes)[:n_linhas]
+
+
+def fatiar(fluxo, tamanho_bloco, lote):
+    """Corta o fluxo em blocos (como a serial) e agrupa em lotes."""
+    blocos = [(0, fluxo[i:i + tamanho_bloco]) for i in range(0, len(fluxo), tamanho_bloco)]
+    return [blocos[i:i + lote] for i in range(0, len(blocos), lote)]
+
+
+def medir(nome, funcao, blocos, n_linhas, repeticoes=3):
+    melhor = float('inf')
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao(blocos)
+        melhor = min(melhor, time.perf_counter() - t0)
+    print(f"  {nome:<22} {n_linhas / melhor:>12,.0f} linhas/s  ({melhor * 1e3:.1f} ms)")
+    return n_linhas / melhor
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do parser serial')
+    parser.add_argument('--arquivo', default=ARQUIVO_PADRAO)
+    parser.add_argument('--linhas', type=int, default=200_000)
+    parser.add_argument('--bloco', type=int, default=4096, help='bytes por leitura da serial')
+    parser.add_argument('--lote', type=int, default=64, help='blocos por chamada do parser')
+    args = parser.parse_args()
+
+    linhas = gerar_linhas(args.arquivo, args.linhas)
+    lotes = fatiar(b'\r\n'.join(linhas) + b'\r\n', args.bloco, args.lote)
+    print(f"📊 {args.linhas} linhas | blocos de {args.bloco} bytes | "
+          f"{args.lote} blocos por chamada")
+
+    # Confere que os dois caminhos produzem os mesmos números
+    referencia = parser_linha_a_linha(lotes)
+    novo = ParserQuadros()
+    saidas = [novo.processar(lote)[1].copy() for lote in lotes]
+    obtido = np.concatenate(saidas).view(np.float64).reshape(-1, 13)
+    assert np.array_equal(referencia, obtido), "parsers divergem"
+
+    antigo = medir('linha a linha', parser_linha_a_linha, lotes, args.linhas)
+
+    def em_lote(lotes):
+        p = ParserQuadros()
+        for lote in lotes:
+            p.processar(lote)
+    novo = medir('ParserQuadros', em_lote, lotes, args.linhas)
+
+    # Mesmas leituras no protocolo binário
+    binario = codificar_quadros(referencia[:, 0].astype(np.int64), referencia[:, 1],
+                                referencia[:, 2], referencia[:, 3:])
+    lotes_binarios = fatiar(binario, args.bloco, args.lote)
+
+    def decodificar(lotes):
+        d = DecodificadorBinario()
+        for lote in lotes:
+            d.processar(lote)
+    quadros = medir('DecodificadorBinario', decodificar, lotes_binarios, args.linhas)
+
+    bytes_texto = sum(len(l) + 2 for l in linhas)
+    print(f"  ganho texto em lote: {novo / antigo:.1f}x | binário: {quadros / antigo:.1f}x")
+    print(f"  bytes por leitura: texto {bytes_texto / args.linhas:.1f} | "
+          f"binário {len(binario) / args.linhas:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,647 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+ARMAZENAMENTO DE LEITURAS BME688
+=============================================================================
+Backends de gravação usados pelo coletor:
+- CSV: texto, compatível com os arquivos já existentes
+- Binário (.bme): registros tipados de largura fixa, append-only, que o
+  treinador lê via memory-map direto para arrays NumPy (sem parse de texto)
+- Compactado (.bmz): os mesmos registros em blocos comprimidos, para
+  arquivo de longo prazo (compactacao.py)
+
+Formato .bme (little-endian):
+   [0:8]        magic b'BME688B\\x01'
+   [8:12]       tamanho do dicionário JSON (uint32)
+   [12:C]       dicionário JSON (colunas e sessões) + padding com zeros
+   [C:]         registros com dtype DTYPE_REGISTRO
+
+Cada registro guarda apenas o índice da sessão; sessao_id, sensor_id,
+amostra_id, classe e notas ficam no dicionário do cabeçalho.
+
+C (chave 'tamanho_cabecalho' do dicionário) começa em 16384 bytes. Quando
+as sessões não cabem mais, o cabeçalho dobra de tamanho e os registros são
+copiados para a nova posição (arquivo temporário + rename), então um
+arquivo que recebe sessões por semanas não tem limite de sessões.
+
+Uso direto (converter CSV existente):
+   python armazenamento.py planta.csv [planta.bme | planta.bmz]
+=============================================================================
+"""
+
+import csv
+import json
+import os
+import shutil
+import struct
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from metricas import LIMITES_LATENCIA_S, Histograma
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+CANAIS_GAS = ['G320', 'G295', 'G270', 'G245', 'G220',
+              'G195', 'G170', 'G145', 'G120', 'G100']
+
+# Cabeçalho do CSV: 'timestamp' é a hora local legível (resolução de 1 s);
+# 'timestamp_ns' é o horário exato da leitura (relogio.py), int64 ns UTC
+CABECALHO = [
+    'timestamp', 'timestamp_ns', 'sessao_id', 'amostra_id', 'classe',
+    'temp', 'umid',
+    *CANAIS_GAS,
+    'notas'
+]
+
+# Cabeçalho dos CSVs com vários sensores no mesmo arquivo (multi_coleta.py)
+CABECALHO_SENSOR = CABECALHO[:3] + ['sensor_id'] + CABECALHO[3:]
+
+EXTENSAO_BINARIO = '.bme'
+EXTENSAO_COMPACTADO = '.bmz'
+# Formatos com registros DTYPE_REGISTRO (carregar_registros)
+EXTENSOES_REGISTROS = (EXTENSAO_BINARIO, EXTENSAO_COMPACTADO)
+EXTENSOES_DADOS = ('.csv',) + EXTENSOES_REGISTROS
+
+MAGIC_BINARIO = b'BME688B\x01'
+VERSAO_BINARIO = 1
+TAMANHO_CABECALHO = 16384       # inicial; cresce com o dicionário de sessões
+
+DTYPE_REGISTRO = np.dtype([
+    ('timestamp_ns', '<i8'),
+    ('sessao', '<u2'),
+    ('temp', '<f4'),
+    ('umid', '<f4'),
+    *[(g, '<u4') for g in CANAIS_GAS],
+])
+
+# Gravação em lote: linhas acumuladas em memória antes de ir para o disco,
+# intervalo máximo (s) sem descarregar e linhas entre chamadas de fsync
+# (0 = nunca forçar fsync, deixa para o sistema operacional)
+LOTE_PADRAO = 32
+INTERVALO_DESCARGA = 2.0
+FSYNC_A_CADA = 256
+
+FORMATO_TIMESTAMP = '%Y-%m-%d %H:%M:%S'
+# Granularidade das mudanças de fuso (horário de verão) no fallback sem
+# nome de fuso: uma consulta à biblioteca C por quarto de hora
+QUARTO_HORA_S = 900
+
+# =============================================================================
+# RESUMO DE SESSÃO
+# =============================================================================
+
+class ResumoSessao:
+    """Estatísticas de uma sessão, atualizadas a cada leitura (ver catalogo.py)."""
+
+    def __init__(self, sessao_id, amostra_id, classe, offset, sensor_id=''):
+        self.sessao_id = sessao_id
+        self.amostra_id = amostra_id
+        self.classe = classe
+        self.sensor_id = sensor_id
+        self.offset = offset
+        self.leituras = 0
+        self.ts_inicio = None
+        self.ts_fim = None
+        self.minimo = np.full(len(CANAIS_GAS), np.inf)
+        self.maximo = np.full(len(CANAIS_GAS), -np.inf)
+
+    def adicionar(self, timestamp_ns, gases):
+        self.leituras += 1
+        if timestamp_ns is not None:
+            if self.ts_inicio is None:
+                self.ts_inicio = int(timestamp_ns)
+            self.ts_fim = int(timestamp_ns)
+        np.minimum(self.minimo, gases, out=self.minimo)
+        np.maximum(self.maximo, gases, out=self.maximo)
+
+    def adicionar_lote(self, timestamps_ns, gases):
+        if len(gases) == 0:
+            return
+        self.leituras += len(gases)
+        if timestamps_ns is not None:
+            if self.ts_inicio is None:
+                self.ts_inicio = int(timestamps_ns[0])
+            self.ts_fim = int(timestamps_ns[-1])
+        np.minimum(self.minimo, np.min(gases, axis=0), out=self.minimo)
+        np.maximum(self.maximo, np.max(gases, axis=0), out=self.maximo)
+
+    def para_dict(self):
+        vazio = self.leituras == 0
+        return {
+            'sessao_id': self.sessao_id,
+            'amostra_id': self.amostra_id,
+            'classe': self.classe,
+            'sensor_id': self.sensor_id,
+            'offset': self.offset,
+            'leituras': self.leituras,
+            'ts_inicio_ns': self.ts_inicio,
+            'ts_fim_ns': self.ts_fim,
+            'min': None if vazio else [int(v) for v in self.minimo],
+            'max': None if vazio else [int(v) for v in self.maximo],
+        }
+
+# =============================================================================
+# BACKENDS DE GRAVAÇÃO
+# =============================================================================
+
+class Armazenamento:
+    """Base dos backends: bufferiza linhas e descarrega em lote."""
+
+    def __init__(self, caminho, lote=LOTE_PADRAO, intervalo=INTERVALO_DESCARGA,
+                 fsync_a_cada=FSYNC_A_CADA):
+        self.caminho = caminho
+        self.lote = max(1, lote)
+        self.intervalo = intervalo
+        self.fsync_a_cada = fsync_a_cada
+        self.f = None
+        self.pendentes = 0
+        self.desde_fsync = 0
+        self.ultima_descarga = time.monotonic()
+        self.resumo = ResumoSessao('', '', '', 0)
+        self.resumos = {}
+        # Instrumentação: bytes que chegaram ao arquivo e latência de cada
+        # descarga (flush + fsync quando houver)
+        self.bytes_gravados = 0
+        self.descargas = Histograma(LIMITES_LATENCIA_S)
+        self._posicao = None
+
+    def contar(self):
+        """Número de leituras já gravadas no arquivo."""
+        raise NotImplementedError
+
+    def iniciar_sessao(self, sessao_id, amostra_id, classe, notas="", sensor_id=""):
+        """
+        Registra os metadados das próximas leituras.
+
+        Voltar a uma sessão já iniciada (ex: vários sensores alternando no
+        mesmo arquivo) continua o mesmo ResumoSessao.
+        """
+        self.descarregar()
+        self._registrar_sessao({
+            'sessao_id': sessao_id,
+            'sensor_id': sensor_id,
+            'amostra_id': amostra_id,
+            'classe': classe,
+            'notas': notas,
+        })
+        chave = (sessao_id, sensor_id, amostra_id, classe)
+        if chave not in self.resumos:
+            self.resumos[chave] = ResumoSessao(sessao_id, amostra_id, classe,
+                                               os.fstat(self.f.fileno()).st_size,
+                                               sensor_id)
+        self.resumo = self.resumos[chave]
+        if self._posicao is None:
+            self._posicao = os.fstat(self.f.fileno()).st_size
+
+    def escrever(self, timestamp_ns, temp, umid, gases):
+        """Adiciona uma leitura ao lote atual."""
+        self._adicionar(timestamp_ns, temp, umid, gases)
+        self.resumo.adicionar(timestamp_ns, gases)
+        self.pendentes += 1
+        if (self.pendentes >= self.lote or
+                time.monotonic() - self.ultima_descarga >= self.intervalo):
+            self.descarregar()
+
+    def escrever_lote(self, timestamps_ns, temps, umids, gases):
+        """Adiciona várias leituras (gases com shape (n, 10))."""
+        for i in range(len(timestamps_ns)):
+            self.escrever(timestamps_ns[i], temps[i], umids[i], gases[i])
+
+    def descarregar(self):
+        """Grava o lote pendente e faz fsync quando configurado."""
+        if self.pendentes:
+            self._gravar_lote()
+            self._concluir_escrita(self.pendentes)
+            self.pendentes = 0
+        self.ultima_descarga = time.monotonic()
+
+    def _concluir_escrita(self, n):
+        t0 = time.perf_counter()
+        self.f.flush()
+        self.desde_fsync += n
+        if self.fsync_a_cada and self.desde_fsync >= self.fsync_a_cada:
+            os.fsync(self.f.fileno())
+            self.desde_fsync = 0
+        self.descargas.observar(time.perf_counter() - t0)
+        # Tamanho depois do flush (tell() em arquivo de texto é caro)
+        posicao = os.fstat(self.f.fileno()).st_size
+        if self._posicao is not None:
+            self.bytes_gravados += posicao - self._posicao
+        self._posicao = posicao
+
+    def fechar(self):
+        """Descarrega o que falta e fecha o arquivo."""
+        if self.f is None:
+            return
+        self.descarregar()
+        if self.fsync_a_cada:
+            os.fsync(self.f.fileno())
+        self.f.close()
+        self.f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+    def _registrar_sessao(self, meta):
+        raise NotImplementedError
+
+    def _adicionar(self, timestamp_ns, temp, umid, gases):
+        raise NotImplementedError
+
+    def _gravar_lote(self):
+        raise NotImplementedError
+
+
+class ArmazenamentoCSV(Armazenamento):
+    """
+    Grava no CSV com o CABECALHO do coletor.
+
+    Ao continuar um arquivo existente, as linhas seguem o cabeçalho que já
+    está nele (colunas ausentes são omitidas).
+    """
+
+    def __init__(self, caminho, cabecalho=CABECALHO, **kwargs):
+        super().__init__(caminho, **kwargs)
+        if os.path.exists(caminho) and os.path.getsize(caminho) > 0:
+            with open(caminho, 'r', newline='', encoding='utf-8') as f:
+                cabecalho = next(csv.reader(f), cabecalho)
+            self.f = open(caminho, 'a', newline='', encoding='utf-8')
+        else:
+            self.f = open(caminho, 'a', newline='', encoding='utf-8')
+            csv.writer(self.f).writerow(cabecalho)
+            self.f.flush()
+        self.colunas = cabecalho
+        self.writer = csv.DictWriter(self.f, fieldnames=cabecalho, extrasaction='ignore')
+        self.buffer = []
+        self.meta = {}
+
+    def contar(self):
+        self.descarregar()
+        return contar_leituras(self.caminho)
+
+    def _registrar_sessao(self, meta):
+        self.meta = meta
+
+    def _adicionar(self, timestamp_ns, temp, umid, gases):
+        ts = datetime.fromtimestamp(timestamp_ns / 1e9).strftime(FORMATO_TIMESTAMP)
+        self.buffer.append({
+            'timestamp': ts,
+            'timestamp_ns': int(timestamp_ns),
+            **self.meta,
+            'temp': f"{temp:.1f}",
+            'umid': f"{umid:.1f}",
+            **{g: f"{v:.0f}" for g, v in zip(CANAIS_GAS, gases)},
+        })
+
+    def _gravar_lote(self):
+        self.writer.writerows(self.buffer)
+        self.buffer.clear()
+
+
+class ArmazenamentoBinario(Armazenamento):
+    """Grava registros DTYPE_REGISTRO no formato .bme."""
+
+    def __init__(self, caminho, **kwargs):
+        super().__init__(caminho, **kwargs)
+        if os.path.exists(caminho) and os.path.getsize(caminho) > 0:
+            self.dicionario = ler_cabecalho_binario(caminho)
+            self.f = open(caminho, 'r+b')
+            # Descarta registro incompleto deixado por uma queda no meio da
+            # escrita (só nesse caso: truncate muda o mtime, e o catálogo
+            # reindexaria o arquivo a cada retomada)
+            inicio = inicio_registros(self.dicionario)
+            tamanho = os.fstat(self.f.fileno()).st_size
+            if tamanho > inicio and (tamanho - inicio) % DTYPE_REGISTRO.itemsize:
+                self.f.truncate(inicio + self._registros_completos() * DTYPE_REGISTRO.itemsize)
+        else:
+            self.dicionario = {
+                'versao': VERSAO_BINARIO,
+                'colunas': list(DTYPE_REGISTRO.names),
+                'tamanho_cabecalho': TAMANHO_CABECALHO,
+                'sessoes': [],
+            }
+            self.f = open(caminho, 'w+b')
+            self._gravar_cabecalho()
+        self.f.seek(0, os.SEEK_END)
+        self.buffer = np.zeros(self.lote, dtype=DTYPE_REGISTRO)
+        self.sessao = 0
+
+    def _registros_completos(self):
+        tamanho = os.fstat(self.f.fileno()).st_size
+        inicio = inicio_registros(self.dicionario)
+        return max(tamanho - inicio, 0) // DTYPE_REGISTRO.itemsize
+
+    def _bloco_cabecalho(self, tamanho):
+        """Cabeçalho com `tamanho` bytes, ou None se o dicionário não couber."""
+        self.dicionario['tamanho_cabecalho'] = tamanho
+        dados = json.dumps(self.dicionario, ensure_ascii=False).encode('utf-8')
+        if len(MAGIC_BINARIO) + 4 + len(dados) > tamanho:
+            return None
+        bloco = MAGIC_BINARIO + struct.pack('<I', len(dados)) + dados
+        return bloco.ljust(tamanho, b'\x00')
+
+    def _gravar_cabecalho(self):
+        atual = inicio_registros(self.dicionario)
+        novo = atual
+        bloco = self._bloco_cabecalho(novo)
+        while bloco is None:
+            novo *= 2
+            bloco = self._bloco_cabecalho(novo)
+        if novo != atual:
+            self._realocar(bloco, atual)
+            return
+        self.f.seek(0)
+        self.f.write(bloco)
+        self.f.flush()
+        os.fsync(self.f.fileno())
+        self.f.seek(0, os.SEEK_END)
+
+    def _realocar(self, bloco, inicio_antigo):
+        """
+        Reescreve o arquivo com o cabeçalho maior `bloco` e os registros logo
+        depois. Vai para um temporário e só então substitui o original, então
+        uma queda no meio deixa o arquivo antigo intacto.
+        """
+        temporario = self.caminho + '.tmp'
+        with open(temporario, 'wb') as destino:
+            destino.write(bloco)
+            self.f.seek(inicio_antigo)
+            shutil.copyfileobj(self.f, destino, 1 << 20)
+            destino.flush()
+            os.fsync(destino.fileno())
+        self.f.close()
+        os.replace(temporario, self.caminho)
+        self.f = open(self.caminho, 'r+b')
+        self.f.seek(0, os.SEEK_END)
+        # Offsets já calculados andam junto com os registros
+        deslocamento = len(bloco) - inicio_antigo
+        for resumo in self.resumos.values():
+            resumo.offset += deslocamento
+        if self._posicao is not None:
+            self._posicao += deslocamento
+
+    def contar(self):
+        self.descarregar()
+        return self._registros_completos()
+
+    def _registrar_sessao(self, meta):
+        entrada = dict(meta)
+        sessoes = self.dicionario['sessoes']
+        if entrada in sessoes:
+            self.sessao = sessoes.index(entrada)
+            return
+        sessoes.append(entrada)
+        self.sessao = len(sessoes) - 1
+        self._gravar_cabecalho()
+
+    def _adicionar(self, timestamp_ns, temp, umid, gases):
+        reg = self.buffer[self.pendentes]
+        reg['timestamp_ns'] = timestamp_ns
+        reg['sessao'] = self.sessao
+        reg['temp'] = temp
+        reg['umid'] = umid
+        for g, valor in zip(CANAIS_GAS, gases):
+            reg[g] = valor
+
+    def escrever_lote(self, timestamps_ns, temps, umids, gases):
+        self.descarregar()
+        bloco = np.empty(len(timestamps_ns), dtype=DTYPE_REGISTRO)
+        bloco['timestamp_ns'] = timestamps_ns
+        bloco['sessao'] = self.sessao
+        bloco['temp'] = temps
+        bloco['umid'] = umids
+        gases = np.asarray(gases)
+        for i, g in enumerate(CANAIS_GAS):
+            bloco[g] = gases[:, i]
+        self.resumo.adicionar_lote(timestamps_ns, gases)
+        self.f.write(bloco.tobytes())
+        self._concluir_escrita(len(bloco))
+
+    def _gravar_lote(self):
+        self.f.write(self.buffer[:self.pendentes].tobytes())
+
+
+def abrir_armazenamento(caminho, **kwargs):
+    """Escolhe o backend pela extensão do arquivo."""
+    if caminho.endswith(EXTENSAO_BINARIO):
+        return ArmazenamentoBinario(caminho, **kwargs)
+    if caminho.endswith(EXTENSAO_COMPACTADO):
+        from compactacao import ArmazenamentoCompactado
+        return ArmazenamentoCompactado(caminho, **kwargs)
+    return ArmazenamentoCSV(caminho, **kwargs)
+
+# =============================================================================
+# LEITURA
+# =============================================================================
+
+def ler_cabecalho_binario(caminho):
+    """Lê o dicionário JSON de um arquivo .bme."""
+    with open(caminho, 'rb') as f:
+        inicio = f.read(len(MAGIC_BINARIO) + 4)
+        if inicio[:len(MAGIC_BINARIO)] != MAGIC_BINARIO:
+            raise ValueError(f"Arquivo não é .bme válido: {caminho}")
+        (tamanho,) = struct.unpack('<I', inicio[len(MAGIC_BINARIO):])
+        return json.loads(f.read(tamanho).decode('utf-8'))
+
+
+def inicio_registros(dicionario):
+    """Offset do primeiro registro de um .bme (tamanho do cabeçalho)."""
+    return dicionario.get('tamanho_cabecalho', TAMANHO_CABECALHO)
+
+
+def contar_leituras(caminho):
+    """Número de leituras de um arquivo de dados (CSV, .bme ou .bmz)."""
+    if caminho.endswith(EXTENSAO_BINARIO):
+        inicio = inicio_registros(ler_cabecalho_binario(caminho))
+        return max(os.path.getsize(caminho) - inicio, 0) // DTYPE_REGISTRO.itemsize
+    if caminho.endswith(EXTENSAO_COMPACTADO):
+        from compactacao import LeitorCompactado
+        return len(LeitorCompactado(caminho))
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return max(sum(1 for _ in f) - 1, 0)  # -1 para cabeçalho
+
+
+def carregar_binario(caminho):
+    """
+    Mapeia os registros de um .bme em memória (somente leitura).
+
+    Retorna (registros, dicionario); registros é um array estruturado
+    DTYPE_REGISTRO cujas colunas (ex: registros['G100']) são views sem cópia.
+    """
+    dicionario = ler_cabecalho_binario(caminho)
+    inicio = inicio_registros(dicionario)
+    n = max(os.path.getsize(caminho) - inicio, 0) // DTYPE_REGISTRO.itemsize
+    if n == 0:
+        return np.zeros(0, dtype=DTYPE_REGISTRO), dicionario
+    registros = np.memmap(caminho, dtype=DTYPE_REGISTRO, mode='r',
+                          offset=inicio, shape=(n,))
+    return registros, dicionario
+
+
+def carregar_registros(caminho):
+    """(registros, dicionario) de um .bme (memory-map) ou .bmz (descomprimido)."""
+    if caminho.endswith(EXTENSAO_COMPACTADO):
+        from compactacao import carregar_compactado
+        return carregar_compactado(caminho)
+    return carregar_binario(caminho)
+
+
+def binario_para_dataframe(caminho):
+    """Carrega um .bme ou .bmz como DataFrame com as mesmas colunas do CSV."""
+    import pandas as pd
+
+    registros, dicionario = carregar_registros(caminho)
+    sessoes = dicionario['sessoes'] or [{}]
+    codigos = np.asarray(registros['sessao'])
+
+    def coluna_sessao(campo):
+        valores = np.asarray([s.get(campo, '') for s in sessoes], dtype=str)
+        categorias, inversa = np.unique(valores, return_inverse=True)
+        return pd.Categorical.from_codes(inversa[codigos], categories=categorias)
+
+    df = pd.DataFrame({
+        'timestamp': ns_para_local(registros['timestamp_ns']),
+        'sessao_id': coluna_sessao('sessao_id'),
+        'sensor_id': coluna_sessao('sensor_id'),
+        'amostra_id': coluna_sessao('amostra_id'),
+        'classe': coluna_sessao('classe'),
+        'temp': registros['temp'],
+        'umid': registros['umid'],
+        **{g: registros[g] for g in CANAIS_GAS},
+        'notas': coluna_sessao('notas'),
+    })
+    return df
+
+def fuso_local():
+    """
+    Fuso do sistema com as regras de horário de verão (não um offset fixo):
+    o nome IANA de TZ ou de /etc/localtime. None quando não há nome (ex:
+    Windows, TZ no formato POSIX); aí vale _offsets_sistema().
+    """
+    nome = os.environ.get('TZ', '').lstrip(':')
+    if not nome and os.path.islink('/etc/localtime'):
+        nome = os.path.realpath('/etc/localtime').partition('zoneinfo/')[2]
+    if not nome:
+        return None
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+    try:
+        return ZoneInfo(nome)
+    except (ZoneInfoNotFoundError, ValueError, OSError):
+        return None
+
+
+def _offsets_sistema(segundos_utc):
+    """
+    Offset local (s) de cada instante pela biblioteca C, a mesma que grava
+    o CSV. Mudanças de fuso caem em múltiplos de 15 min, então basta uma
+    consulta por quarto de hora distinto.
+    """
+    quartos, inversa = np.unique(np.asarray(segundos_utc) // QUARTO_HORA_S,
+                                 return_inverse=True)
+    offsets = np.array([time.localtime(int(q) * QUARTO_HORA_S).tm_gmtoff for q in quartos],
+                       dtype=np.int64)
+    return offsets[inversa]
+
+
+def ns_para_local(timestamps_ns):
+    """Converte epoch ns para datas no fuso local (como o CSV grava)."""
+    import pandas as pd
+
+    timestamps_ns = np.asarray(timestamps_ns, dtype=np.int64)
+    fuso = fuso_local()
+    if fuso is None:
+        offsets = _offsets_sistema(timestamps_ns // 10**9)
+        return pd.to_datetime(timestamps_ns + offsets * 10**9, unit='ns')
+    datas = pd.to_datetime(timestamps_ns, unit='ns', utc=True)
+    return datas.tz_convert(fuso).tz_localize(None)
+
+
+def local_para_ns(textos):
+    """
+    Converte a coluna 'timestamp' do CSV (hora local) para epoch ns.
+
+    A hora repetida no fim do horário de verão é resolvida pela ordem das
+    linhas ('infer'); sem ordem ou sem nome de fuso, vale a primeira
+    ocorrência. Um horário que não existe (pulado no início do horário de
+    verão) anda para frente.
+    """
+    import pandas as pd
+
+    datas = pd.to_datetime(textos, format=FORMATO_TIMESTAMP)
+    fuso = fuso_local()
+    if fuso is None:
+        # Offsets de um dia antes e depois (mudanças de fuso ficam meses
+        # afastadas): vale o maior (a primeira ocorrência) se a hora existir
+        # com ele, senão o outro
+        locais = datas.dt.as_unit('ns').astype('int64').to_numpy()
+        segundos = locais // 10**9
+        antes = _offsets_sistema(segundos - 86400)
+        depois = _offsets_sistema(segundos + 86400)
+        maior, menor = np.maximum(antes, depois), np.minimum(antes, depois)
+        offsets = np.where(_offsets_sistema(segundos - maior) == maior, maior, menor)
+        return locais - offsets * 10**9
+    try:
+        locais = datas.dt.tz_localize(fuso, ambiguous='infer', nonexistent='shift_forward')
+    except ValueError:
+        locais = datas.dt.tz_localize(fuso, ambiguous=np.ones(len(datas), dtype=bool),
+                                      nonexistent='shift_forward')
+    return locais.dt.as_unit('ns').astype('int64').to_numpy()
+
+# =============================================================================
+# CONVERSÃO
+# =============================================================================
+
+def converter_csv_para_binario(origem, destino):
+    """Converte um CSV do coletor (ou do firmware) para .bme ou .bmz."""
+    import pandas as pd
+
+    df = pd.read_csv(origem, dtype={c: str for c in ('sessao_id', 'sensor_id',
+                                                     'amostra_id', 'classe', 'notas')})
+    if 'sessao_id' not in df.columns:
+        df['sessao_id'] = os.path.splitext(os.path.basename(origem))[0]
+    for col in ('sensor_id', 'amostra_id', 'classe', 'notas'):
+        if col not in df.columns:
+            df[col] = ''
+    df = df.fillna({'sensor_id': '', 'amostra_id': '', 'classe': '', 'notas': ''})
+    if 'timestamp_ns' in df.columns and df['timestamp_ns'].notna().all():
+        ts = df['timestamp_ns'].to_numpy(dtype=np.int64)
+    elif 'timestamp' in df.columns:
+        ts = local_para_ns(df['timestamp'])
+    else:
+        ts = np.zeros(len(df), dtype=np.int64)
+    temp = df['temp' if 'temp' in df.columns else 'Temp'].to_numpy()
+    umid = df['umid' if 'umid' in df.columns else 'Umid'].to_numpy()
+    gases = df[CANAIS_GAS].to_numpy()
+
+    # Cada trecho contínuo com os mesmos metadados vira uma sessão
+    meta = df[['sessao_id', 'amostra_id', 'classe', 'notas', 'sensor_id']].astype(str)
+    mudou = (meta != meta.shift()).any(axis=1).to_numpy()
+    inicios = np.flatnonzero(mudou)
+    fins = np.append(inicios[1:], len(df))
+
+    with abrir_armazenamento(destino, fsync_a_cada=0) as arm:
+        for ini, fim in zip(inicios, fins):
+            arm.iniciar_sessao(*meta.iloc[ini])
+            arm.escrever_lote(ts[ini:fim], temp[ini:fim], umid[ini:fim], gases[ini:fim])
+        return arm.contar()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Uso: python armazenamento.py entrada.csv [saida.bme]")
+        sys.exit(1)
+    origem = sys.argv[1]
+    destino = sys.argv[2] if len(sys.argv) > 2 else \
+        os.path.splitext(origem)[0] + EXTENSAO_BINARIO
+    n = converter_csv_para_binario(origem, destino)
+    tam_csv = os.path.getsize(origem) / 1024
+    tam_bin = os.path.getsize(destino) / 1024
+    print(f"✅ {n} leituras: {origem} ({tam_csv:.1f} KB) -> {destino} ({tam_bin:.1f} KB)")
@@ -0,0 +1,584 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+BARRAMENTO DE DADOS AO VIVO EM MEMÓRIA COMPARTILHADA
+=============================================================================
+Um publicador lê a porta serial uma única vez e coloca os quadros em um
+buffer circular em multiprocessing.shared_memory. Qualquer número de
+consumidores locais (gravador, dashboard, classificador ao vivo) se anexa
+pelo nome e lê sem passar pela porta, sem pickle e sem fila entre
+processos: cada leitura é uma cópia direta das fatias do buffer.
+
+Layout do segmento 'bme688_<nome>':
+   cabeçalho (int64): magic, versão, capacidade, escritos, pid e batida do
+                      publicador, encerrado + uma vaga por consumidor
+                      (pid, cursor, perdidos, batida)
+   registros:         capacidade x (seq, timestamp_ns, 13 campos do quadro)
+
+Cada quadro recebe um número de sequência global (seq). O consumidor guarda
+um cursor; se ficar mais de `capacidade` quadros para trás, os quadros
+sobrescritos são contados como perdidos (nunca lidos pela metade). O
+atraso (escritos - cursor) de cada consumidor aparece em `status`.
+
+Uso:
+   python barramento.py publicar --porta COM4 [--protocolo binario]
+   python barramento.py replay --arquivo planta.csv --taxa 10 [--repetir]
+   python barramento.py status
+
+Consumidores: coleta_gas.py, o dashboard e o classificador ao vivo aceitam
+a porta 'barramento' (ou 'barramento:<nome>') no lugar de uma porta
+serial e recebem os quadros como foram publicados (protocolo 'quadros'):
+Index do firmware, temp/umid em float e o horário de chegada no
+publicador. abrir_porta() também aceita 'replay:<arquivo>' (replay.py).
+=============================================================================
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from armazenamento import EXTENSOES_REGISTROS, carregar_registros, local_para_ns
+from protocolo import (
+    CANAIS_GAS, COLUNAS_QUADRO, DTYPE_QUADRO, PROTOCOLO_BINARIO, PROTOCOLO_QUADROS,
+    PROTOCOLO_TEXTO, QuadrosProntos, criar_parser, matriz
+)
+from relogio import agora_ns
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+NOME_PADRAO = 'bme688'
+PREFIXO_SEGMENTO = 'bme688_'
+PREFIXO_PORTA = 'barramento'
+
+# 65536 quadros x 120 bytes ~ 7,9 MB: ~11 min de folga a 100 leituras/s
+CAPACIDADE_PADRAO = 65536
+
+MAGIC = 0x314D4F5242454D42  # 'BMEBROM1' em little-endian
+VERSAO = 1
+MAX_CONSUMIDORES = 16
+
+# Posições no cabeçalho
+C_MAGIC, C_VERSAO, C_CAPACIDADE, C_ESCRITOS, C_PID, C_BATIDA, C_ENCERRADO = range(7)
+INICIO_VAGAS = 8
+CAMPOS_VAGA = 4  # pid, cursor, perdidos, batida
+V_PID, V_CURSOR, V_PERDIDOS, V_BATIDA = range(CAMPOS_VAGA)
+TAMANHO_CABECALHO = 1024
+
+# Colunas int64 de cada registro: seq, timestamp_ns e o quadro (13 x float64)
+COLUNAS_REGISTRO = 2 + len(COLUNAS_QUADRO)
+
+# Sem batida por mais que isso = processo morto (vaga ou segmento abandonado)
+TIMEOUT_BATIDA_S = 5.0
+
+# Espera entre verificações quando o consumidor aguarda quadros novos
+INTERVALO_ESPERA = 0.005
+
+# =============================================================================
+# SEGMENTO
+# =============================================================================
+
+def nome_segmento(nome):
+    return PREFIXO_SEGMENTO + nome
+
+
+def _anexar(nome):
+    """Abre um segmento existente sem registrá-lo no resource_tracker."""
+    try:
+        return shared_memory.SharedMemory(name=nome_segmento(nome), track=False)
+    except TypeError:
+        # Python < 3.13: o resource_tracker apagaria o segmento quando o
+        # consumidor saísse; tira o registro feito pelo construtor
+        shm = shared_memory.SharedMemory(name=nome_segmento(nome))
+        if os.name == 'posix':
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class _Segmento:
+    """Vistas NumPy do cabeçalho e dos registros de um segmento."""
+
+    def _mapear(self, shm):
+        self.shm = shm
+        self.cabecalho = np.ndarray(TAMANHO_CABECALHO // 8, dtype=np.int64, buffer=shm.buf)
+        self.capacidade = int(self.cabecalho[C_CAPACIDADE])
+        self.registros = np.ndarray((self.capacidade, COLUNAS_REGISTRO), dtype=np.int64,
+                                    buffer=shm.buf, offset=TAMANHO_CABECALHO)
+
+    def vagas(self):
+        fim = INICIO_VAGAS + MAX_CONSUMIDORES * CAMPOS_VAGA
+        return self.cabecalho[INICIO_VAGAS:fim].reshape(MAX_CONSUMIDORES, CAMPOS_VAGA)
+
+    @property
+    def escritos(self):
+        return int(self.cabecalho[C_ESCRITOS])
+
+    def publicador_vivo(self):
+        if self.cabecalho[C_ENCERRADO]:
+            return False
+        return time.time_ns() - self.cabecalho[C_BATIDA] < TIMEOUT_BATIDA_S * 1e9
+
+    def _soltar_mapeamento(self):
+        # As vistas precisam sumir antes de fechar o mmap
+        self.cabecalho = self.registros = None
+        self.shm.close()
+
+# =============================================================================
+# PUBLICADOR
+# =============================================================================
+
+class PublicadorBarramento(_Segmento):
+    """Único escritor do barramento."""
+
+    def __init__(self, nome=NOME_PADRAO, capacidade=CAPACIDADE_PADRAO):
+        self.nome = nome
+        tamanho = TAMANHO_CABECALHO + capacidade * COLUNAS_REGISTRO * 8
+        try:
+            shm = shared_memory.SharedMemory(name=nome_segmento(nome), create=True,
+                                             size=tamanho)
+        except FileExistsError:
+            shm = self._reaproveitar(nome, tamanho)
+        self._mapear_novo(shm, capacidade)
+        self.publicados = 0
+
+    def _reaproveitar(self, nome, tamanho):
+        """Segmento de um publicador que morreu sem limpar: recria."""
+        antigo = _Segmento()
+        antigo._mapear(shared_memory.SharedMemory(name=nome_segmento(nome)))
+        vivo = antigo.cabecalho[C_MAGIC] == MAGIC and antigo.publicador_vivo()
+        pid = int(antigo.cabecalho[C_PID])
+        antigo._soltar_mapeamento()
+        if vivo:
+            raise RuntimeError(f"Barramento '{nome}' já tem publicador ativo (pid {pid})")
+        antigo.shm.unlink()
+        return shared_memory.SharedMemory(name=nome_segmento(nome), create=True, size=tamanho)
+
+    def _mapear_novo(self, shm, capacidade):
+        cabecalho = np.ndarray(TAMANHO_CABECALHO // 8, dtype=np.int64, buffer=shm.buf)
+        cabecalho[:] = 0
+        cabecalho[C_VERSAO] = VERSAO
+        cabecalho[C_CAPACIDADE] = capacidade
+        cabecalho[C_PID] = os.getpid()
+        cabecalho[C_BATIDA] = time.time_ns()
+        cabecalho[C_MAGIC] = MAGIC  # por último: consumidores só anexam depois disso
+        del cabecalho
+        self._mapear(shm)
+
+    def publicar(self, timestamps_ns, quadros):
+        """Acrescenta um lote de quadros (DTYPE_QUADRO) ao buffer circular."""
+        n = len(quadros)
+        self.cabecalho[C_BATIDA] = time.time_ns()
+        if n == 0:
+            return
+        escritos = self.escritos
+        # Lote maior que o buffer: só os últimos `capacidade` quadros cabem
+        pular = max(0, n - self.capacidade)
+        m = n - pular
+        inicio = (escritos + pular) % self.capacidade
+        primeira = min(m, self.capacidade - inicio)
+        valores = matriz(quadros).view(np.int64)
+        seqs = np.arange(escritos, escritos + n, dtype=np.int64)
+        for destino, fatia in ((slice(inicio, inicio + primeira), slice(pular, pular + primeira)),
+                               (slice(0, m - primeira), slice(pular + primeira, n))):
+            # seq = -1 enquanto o registro é reescrito: o consumidor confere
+            # o seq depois de copiar e descarta o que mudou no meio da cópia
+            self.registros[destino, 0] = -1
+            self.registros[destino, 1] = timestamps_ns[fatia]
+            self.registros[destino, 2:] = valores[fatia]
+            self.registros[destino, 0] = seqs[fatia]
+        self.cabecalho[C_ESCRITOS] = escritos + n
+        self.publicados += n
+
+    def bater(self):
+        """Sinal de vida quando não há quadros para publicar."""
+        self.cabecalho[C_BATIDA] = time.time_ns()
+
+    def fechar(self):
+        if self.shm is None:
+            return
+        self.cabecalho[C_ENCERRADO] = 1
+        self._soltar_mapeamento()
+        self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+# =============================================================================
+# CONSUMIDOR
+# =============================================================================
+
+class ConsumidorBarramento(_Segmento):
+    """
+    Leitor independente: tem seu próprio cursor e sua vaga no cabeçalho
+    (onde publica cursor, perdidos e batida para o `status`).
+    """
+
+    def __init__(self, nome=NOME_PADRAO, desde_inicio=False):
+        self.nome = nome
+        self._mapear(_anexar(nome))
+        if self.cabecalho[C_MAGIC] != MAGIC or self.cabecalho[C_VERSAO] != VERSAO:
+            self._soltar_mapeamento()
+            raise RuntimeError(f"Barramento '{nome}' incompatível ou ainda não iniciado")
+        escritos = self.escritos
+        self.cursor = max(0, escritos - self.capacidade) if desde_inicio else escritos
+        self.perdidos = 0
+        self.vaga = self._ocupar_vaga()
+
+    def _ocupar_vaga(self):
+        agora = time.time_ns()
+        vagas = self.vagas()
+        for i in range(MAX_CONSUMIDORES):
+            if vagas[i, V_PID] == 0 or agora - vagas[i, V_BATIDA] > TIMEOUT_BATIDA_S * 1e9:
+                vagas[i] = (os.getpid(), self.cursor, 0, agora)
+                return i
+        return None  # sem vaga: funciona, só não aparece no status
+
+    def _atualizar_vaga(self):
+        if self.vaga is not None:
+            vaga = self.vagas()[self.vaga]
+            vaga[V_CURSOR] = self.cursor
+            vaga[V_PERDIDOS] = self.perdidos
+            vaga[V_BATIDA] = time.time_ns()
+
+    @property
+    def atraso(self):
+        """Quadros publicados que este consumidor ainda não leu."""
+        return self.escritos - self.cursor
+
+    def ler(self, maximo=None):
+        """
+        Retorna (seqs, timestamps_ns, quadros) com tudo o que chegou depois
+        do cursor (até `maximo`). Quadros sobrescritos antes da leitura são
+        pulados e somados a `perdidos`.
+        """
+        escritos = self.escritos
+        self._pular_sobrescritos(escritos)
+        n = escritos - self.cursor
+        if maximo is not None:
+            n = min(n, maximo)
+
+        bloco = np.empty((n, COLUNAS_REGISTRO), dtype=np.int64)
+        inicio = self.cursor % self.capacidade
+        primeira = min(n, self.capacidade - inicio)
+        bloco[:primeira] = self.registros[inicio:inicio + primeira]
+        bloco[primeira:] = self.registros[:n - primeira]
+
+        # O publicador pode ter dado a volta durante a cópia: só vale o
+        # registro cujo seq continua o esperado depois de copiado
+        esperado = np.arange(self.cursor, self.cursor + n, dtype=np.int64)
+        valido = np.concatenate((self.registros[inicio:inicio + primeira, 0],
+                                 self.registros[:n - primeira, 0])) == esperado
+        valido &= bloco[:, 0] == esperado
+        if not valido.all():
+            self.perdidos += int(n - np.count_nonzero(valido))
+            bloco = bloco[valido]
+        self.cursor += n
+        self._atualizar_vaga()
+
+        quadros = np.empty(len(bloco), dtype=DTYPE_QUADRO)
+        matriz(quadros).view(np.int64)[:] = bloco[:, 2:]
+        return bloco[:, 0].copy(), bloco[:, 1].copy(), quadros
+
+    def _pular_sobrescritos(self, escritos):
+        mais_antigo = escritos - self.capacidade
+        if self.cursor < mais_antigo:
+            self.perdidos += mais_antigo - self.cursor
+            self.cursor = mais_antigo
+
+    def aguardar(self, timeout):
+        """Espera até haver quadros novos; False se deu timeout."""
+        limite = time.monotonic() + timeout
+        while self.escritos <= self.cursor:
+            if time.monotonic() >= limite:
+                self._atualizar_vaga()
+                return False
+            time.sleep(INTERVALO_ESPERA)
+        return True
+
+    def fechar(self):
+        if self.shm is None:
+            return
+        if self.vaga is not None:
+            self.vagas()[self.vaga] = 0
+        self._soltar_mapeamento()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+
+
+def status(nome=NOME_PADRAO):
+    """Estado do barramento e atraso de cada consumidor."""
+    seg = _Segmento()
+    seg._mapear(_anexar(nome))
+    try:
+        escritos = seg.escritos
+        agora = time.time_ns()
+        consumidores = []
+        for pid, cursor, perdidos, batida in seg.vagas():
+            if pid and agora - batida <= TIMEOUT_BATIDA_S * 1e9:
+                consumidores.append({'pid': int(pid), 'cursor': int(cursor),
+                                     'atraso': escritos - int(cursor),
+                                     'perdidos': int(perdidos)})
+        return {
+            'nome': nome,
+            'capacidade': seg.capacidade,
+            'escritos': escritos,
+            'publicador_pid': int(seg.cabecalho[C_PID]),
+            'publicador_vivo': bool(seg.publicador_vivo()),
+            'consumidores': consumidores,
+        }
+    finally:
+        seg._soltar_mapeamento()
+
+# =============================================================================
+# ADAPTADOR COM INTERFACE DE PORTA SERIAL
+# =============================================================================
+
+def eh_porta_barramento(porta):
+    return porta == PREFIXO_PORTA or porta.startswith(PREFIXO_PORTA + ':')
+
+
+class PortaBarramento:
+    """
+    Consumidor com a interface de porta usada pelo coletor, pelo dashboard
+    e pelo classificador (in_waiting, close). No lugar de read() há
+    ler_quadros(): os quadros saem do buffer como o publicador os gravou,
+    sem codificar para bytes e decodificar de novo, então o Index do
+    firmware (usado pelo relogio.py para detectar reinícios do Pico) e os
+    horários de chegada no publicador chegam intactos ao consumidor.
+    """
+
+    protocolo = PROTOCOLO_QUADROS
+
+    def __init__(self, porta=PREFIXO_PORTA, timeout=1.0):
+        nome = porta.split(':', 1)[1] if ':' in porta else NOME_PADRAO
+        self.port = porta
+        self.timeout = timeout
+        self.consumidor = ConsumidorBarramento(nome)
+        self.is_open = True
+
+    @property
+    def in_waiting(self):
+        """Backlog no buffer compartilhado, em bytes de quadro."""
+        return self.consumidor.atraso * DTYPE_QUADRO.itemsize
+
+    @property
+    def perdidos(self):
+        return self.consumidor.perdidos
+
+    def ler_quadros(self, maximo=None):
+        """
+        (timestamps_ns, quadros) publicados desde a última leitura (até
+        `maximo`); arrays vazios se nada chegar dentro do timeout.
+        """
+        if not self.consumidor.aguardar(self.timeout or 0):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=DTYPE_QUADRO)
+        _, timestamps, quadros = self.consumidor.ler(maximo)
+        return timestamps, quadros
+
+    def close(self):
+        if self.is_open:
+            self.consumidor.fechar()
+            self.is_open = False
+
+
+def abrir_porta(porta, baud_rate, timeout):
+    """
+    serial.Serial para portas reais, PortaBarramento para 'barramento[:nome]'
+    e PortaReplay (replay.py) para 'replay:<arquivo>[?opções]'.
+    """
+    if eh_porta_barramento(porta):
+        return PortaBarramento(porta, timeout=timeout)
+    from replay import PortaReplay, eh_porta_replay
+    if eh_porta_replay(porta):
+        return PortaReplay(porta, timeout=timeout)
+    import serial
+    return serial.Serial(porta, baud_rate, timeout=timeout)
+
+
+def protocolo_da_porta(porta, protocolo):
+    """Protocolo que chega pela porta: fixo no barramento e no replay."""
+    if eh_porta_barramento(porta):
+        return PROTOCOLO_QUADROS
+    from replay import eh_porta_replay, opcoes_porta_replay
+    if eh_porta_replay(porta):
+        return opcoes_porta_replay(porta)[1]['protocolo']
+    return protocolo
+
+# =============================================================================
+# FONTES: SERIAL E REPLAY
+# =============================================================================
+
+def ler_porta(ser, parser):
+    """
+    Próximo lote (timestamps_ns, quadros) de uma porta aberta com
+    abrir_porta(): direto do barramento (parser QuadrosProntos) ou
+    ser.read() + parser. Arrays vazios quando nada chegou.
+    """
+    if isinstance(parser, QuadrosProntos):
+        bloco = ser.ler_quadros()
+        parser.perdidos = ser.perdidos
+        return parser.processar([bloco])
+    dados = ser.read(ser.in_waiting or 1)
+    if not dados:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=DTYPE_QUADRO)
+    return parser.processar([(agora_ns(), dados)])
+
+
+def publicar_serial(publicador, ser, protocolo=PROTOCOLO_TEXTO, duracao=None):
+    """Lê a porta e publica até Ctrl+C, erro ou `duracao` segundos."""
+    parser = criar_parser(protocolo)
+    inicio = time.monotonic()
+    while duracao is None or time.monotonic() - inicio < duracao:
+        dados = ser.read(ser.in_waiting or 1)
+        if not dados:
+            publicador.bater()
+            continue
+        timestamps, quadros = parser.processar([(agora_ns(), dados)])
+        publicador.publicar(timestamps, quadros)
+    return parser
+
+
+def carregar_quadros_arquivo(caminho, tempos=False):
+    """
+    Lê um .bme ou CSV (firmware ou coletor) como array DTYPE_QUADRO.
+    Com tempos=True devolve (quadros, timestamps_ns); timestamps_ns é None
+    quando o arquivo não tem coluna de tempo (CSV do firmware).
+    """
+    if caminho.endswith(EXTENSOES_REGISTROS):
+        registros, _ = carregar_registros(caminho)
+        quadros = np.zeros(len(registros), dtype=DTYPE_QUADRO)
+        quadros['indice'] = np.arange(len(registros))
+        for campo in ['temp', 'umid'] + CANAIS_GAS:
+            quadros[campo] = registros[campo]
+        if tempos:
+            return quadros, np.array(registros['timestamp_ns'], dtype=np.int64)
+        return quadros
+
+    linhas, textos, exatos = [], [], []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            try:
+                linhas.append((float(row.get('Index') or i),
+                               float(row.get('Temp') or row['temp']),
+                               float(row.get('Umid') or row['umid']),
+                               *(float(row[g]) for g in CANAIS_GAS)))
+            except (KeyError, TypeError, ValueError):
+                continue
+            textos.append(row.get('timestamp'))
+            exatos.append(row.get('timestamp_ns') or None)
+    quadros = np.array(linhas, dtype=DTYPE_QUADRO)
+    if not tempos:
+        return quadros
+    if exatos and None not in exatos:
+        return quadros, np.array(exatos).astype(np.int64)
+    if not textos or None in textos:
+        return quadros, None
+    import pandas as pd
+    return quadros, local_para_ns(pd.Series(textos))
+
+
+def publicar_replay(publicador, quadros, taxa, repetir=False, duracao=None):
+    """
+    Publica quadros gravados a `taxa` quadros/s (0 = o mais rápido possível),
+    com timestamps do momento da publicação.
+    """
+    inicio = time.monotonic()
+    enviados = 0
+    total = len(quadros)
+    while repetir or enviados < total:
+        agora = time.monotonic()
+        if duracao is not None and agora - inicio >= duracao:
+            break
+        devido = int((agora - inicio) * taxa) if taxa > 0 else enviados + 1024
+        if not repetir:
+            devido = min(devido, total)
+        if devido > enviados:
+            posicoes = np.arange(enviados, devido) % total
+            publicador.publicar(np.full(len(posicoes), agora_ns(), dtype=np.int64),
+                                quadros[posicoes])
+            enviados = devido
+        else:
+            publicador.bater()
+            time.sleep(min(1.0 / taxa, 0.05))
+    return enviados
+
+# =============================================================================
+# PONTO DE ENTRADA
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Barramento de dados BME688 em memória compartilhada')
+    parser.add_argument('--nome', default=NOME_PADRAO)
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_pub = sub.add_parser('publicar', help='lê uma porta serial e publica')
+    p_pub.add_argument('--porta', required=True)
+    p_pub.add_argument('--protocolo', choices=[PROTOCOLO_TEXTO, PROTOCOLO_BINARIO],
+                       default=PROTOCOLO_TEXTO)
+    p_pub.add_argument('--capacidade', type=int, default=CAPACIDADE_PADRAO)
+
+    p_rep = sub.add_parser('replay', help='publica um arquivo gravado (testes)')
+    p_rep.add_argument('--arquivo', required=True)
+    p_rep.add_argument('--taxa', type=float, default=1.0, help='quadros/s (0 = sem limite)')
+    p_rep.add_argument('--repetir', action='store_true')
+    p_rep.add_argument('--duracao', type=float, default=None)
+    p_rep.add_argument('--capacidade', type=int, default=CAPACIDADE_PADRAO)
+
+    sub.add_parser('status', help='mostra escritos e atraso dos consumidores')
+    args = parser.parse_args()
+
+    if args.comando == 'status':
+        try:
+            est = status(args.nome)
+        except FileNotFoundError:
+            print(f"❌ Barramento '{args.nome}' não existe")
+            sys.exit(1)
+        vivo = "ativo" if est['publicador_vivo'] else "parado"
+        print(f"🚌 {est['nome']}: {est['escritos']} quadros publicados | "
+              f"capacidade {est['capacidade']} | publicador {est['publicador_pid']} ({vivo})")
+        for c in est['consumidores']:
+            print(f"   pid {c['pid']}: atraso {c['atraso']} quadros | perdidos {c['perdidos']}")
+        return
+
+    try:
+        publicador = PublicadorBarramento(args.nome, args.capacidade)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    with publicador:
+        print(f"🚌 Barramento '{args.nome}' no ar (Ctrl+C = parar)")
+        try:
+            if args.comando == 'publicar':
+                import serial
+                with serial.Serial(args.porta, 115200, timeout=0.5) as ser:
+                    publicar_serial(publicador, ser, args.protocolo)
+            else:
+                quadros = carregar_quadros_arquivo(args.arquivo)
+                if len(quadros) == 0:
+                    print(f"❌ Nenhuma leitura válida em {args.arquivo}")
+                    return
+                publicar_replay(publicador, quadros, args.taxa, args.repetir, args.duracao)
+        except KeyboardInterrupt:
+            pass
+        print(f"✅ {publicador.publicados} quadros publicados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+CATÁLOGO DE SESSÕES BME688
+=============================================================================
+Índice lateral (.catalogo.json) mantido em cada diretório de dados:
+- Por arquivo: tamanho, mtime, total de leituras e lista de sessões
+- Por sessão: classe, amostra, offset em bytes da primeira linha,
+  leituras, intervalo de tempo (epoch ns) e min/max de cada canal de gás
+
+O coletor registra cada sessão ao terminar (custo O(1)); listar e retomar
+um diretório custa O(arquivos). Um arquivo só é relido por inteiro quando
+o catálogo não existe ou o tamanho/mtime não bate (ex: edição manual).
+
+Uso direto (reconstruir o catálogo de um diretório):
+   python catalogo.py [diretorio]
+=============================================================================
+"""
+
+import csv
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from armazenamento import (
+    CANAIS_GAS, DTYPE_REGISTRO, EXTENSOES_DADOS, EXTENSOES_REGISTROS,
+    FORMATO_TIMESTAMP, ResumoSessao, carregar_registros, inicio_registros
+)
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+NOME_CATALOGO = '.catalogo.json'
+VERSAO_CATALOGO = 1
+
+# =============================================================================
+# INDEXAÇÃO DOS ARQUIVOS
+# =============================================================================
+
+def _texto_para_ns(texto):
+    try:
+        return int(datetime.strptime(texto, FORMATO_TIMESTAMP).timestamp() * 1e9)
+    except ValueError:
+        return None
+
+
+def _horario(partes, idx_ts, idx_ns):
+    """timestamp_ns quando a coluna existe e está preenchida, senão o texto."""
+    if idx_ns is not None and idx_ns < len(partes) and partes[idx_ns]:
+        try:
+            return int(partes[idx_ns])
+        except ValueError:
+            pass
+    return _texto_para_ns(partes[idx_ts]) if idx_ts is not None else None
+
+
+def indexar_csv(caminho):
+    """Lê um CSV inteiro e devolve a lista de sessões (dicts)."""
+    sessoes = []
+    with open(caminho, 'rb') as f:
+        cabecalho = f.readline()
+        offset = len(cabecalho)
+        colunas = next(csv.reader([cabecalho.decode('utf-8')]), [])
+        try:
+            idx_gases = [colunas.index(g) for g in CANAIS_GAS]
+        except ValueError:
+            return sessoes
+        idx_meta = [colunas.index(c) if c in colunas else None
+                    for c in ('sessao_id', 'amostra_id', 'classe', 'sensor_id')]
+        idx_ts = colunas.index('timestamp') if 'timestamp' in colunas else None
+        idx_ns = colunas.index('timestamp_ns') if 'timestamp_ns' in colunas else None
+
+        # Sessões na ordem em que aparecem; linhas de sensores diferentes
+        # podem estar intercaladas no mesmo arquivo
+        resumos = {}
+        ultimos_ts = {}
+        for linha in f:
+            inicio = offset
+            offset += len(linha)
+            partes = next(csv.reader([linha.decode('utf-8', errors='replace')]), [])
+            if len(partes) < len(colunas) - 1:
+                continue
+            try:
+                gases = [float(partes[i]) for i in idx_gases]
+            except (ValueError, IndexError):
+                continue  # linha inválida ou cabeçalho repetido
+
+            chave = tuple(partes[i] if i is not None else '' for i in idx_meta)
+            resumo = resumos.get(chave)
+            if resumo is None:
+                resumo = resumos[chave] = ResumoSessao(*chave[:3], offset=inicio,
+                                                       sensor_id=chave[3])
+                resumo.ts_inicio = _horario(partes, idx_ts, idx_ns)
+
+            # Só o primeiro e o último timestamp da sessão são convertidos
+            resumo.adicionar(None, gases)
+            ultimos_ts[chave] = partes
+
+        for chave, resumo in resumos.items():
+            if chave in ultimos_ts:
+                resumo.ts_fim = _horario(ultimos_ts[chave], idx_ts, idx_ns)
+            sessoes.append(resumo.para_dict())
+    return sessoes
+
+
+def indexar_binario(caminho):
+    """Indexa um .bme (ou .bmz) com operações vetorizadas sobre os registros."""
+    registros, dicionario = carregar_registros(caminho)
+    if len(registros) == 0:
+        return []
+
+    # Agrupa por código de sessão (ordenação estável mantém a ordem no arquivo)
+    codigos = np.asarray(registros['sessao'])
+    ordem = np.argsort(codigos, kind='stable')
+    _, inicios, contagens = np.unique(codigos[ordem], return_index=True,
+                                      return_counts=True)
+    gases = np.column_stack([registros[g] for g in CANAIS_GAS])[ordem]
+    minimos = np.minimum.reduceat(gases, inicios, axis=0)
+    maximos = np.maximum.reduceat(gases, inicios, axis=0)
+    ts = np.asarray(registros['timestamp_ns'])[ordem]
+
+    inicio = inicio_registros(dicionario)
+    sessoes = []
+    for k, (ini, n) in enumerate(zip(inicios, contagens)):
+        primeira = int(ordem[ini])
+        meta = dicionario['sessoes'][codigos[primeira]]
+        sessoes.append({
+            'sessao_id': meta['sessao_id'],
+            'amostra_id': meta['amostra_id'],
+            'classe': meta['classe'],
+            'sensor_id': meta.get('sensor_id', ''),
+            'offset': inicio + primeira * DTYPE_REGISTRO.itemsize,
+            'leituras': int(n),
+            'ts_inicio_ns': int(ts[ini]),
+            'ts_fim_ns': int(ts[ini + n - 1]),
+            'min': [int(v) for v in minimos[k]],
+            'max': [int(v) for v in maximos[k]],
+        })
+    sessoes.sort(key=lambda s: s['offset'])
+    return sessoes
+
+
+def indexar_arquivo(caminho):
+    """Monta a entrada do catálogo lendo o arquivo bruto."""
+    st = os.stat(caminho)
+    if caminho.endswith(EXTENSOES_REGISTROS):
+        sessoes = indexar_binario(caminho)
+    else:
+        sessoes = indexar_csv(caminho)
+    return {
+        'tamanho': st.st_size,
+        'mtime_ns': st.st_mtime_ns,
+        'leituras': sum(s['leituras'] for s in sessoes),
+        'sessoes': sessoes,
+    }
+
+# =============================================================================
+# CATÁLOGO
+# =============================================================================
+
+class Catalogo:
+    """Catálogo de sessões de um diretório de dados."""
+
+    def __init__(self, diretorio):
+        self.diretorio = diretorio
+        self.caminho = os.path.join(diretorio, NOME_CATALOGO)
+        self.arquivos = self._carregar()
+        self.alterado = False
+
+    def _carregar(self):
+        try:
+            with open(self.caminho, 'r', encoding='utf-8') as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if dados.get('versao') != VERSAO_CATALOGO or dados.get('canais') != CANAIS_GAS:
+            return {}
+        return dados.get('arquivos', {})
+
+    def salvar(self):
+        """Grava o catálogo se houve mudança (escrita atômica)."""
+        if not self.alterado:
+            return
+        temporario = self.caminho + '.tmp'
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump({
+                'versao': VERSAO_CATALOGO,
+                'canais': CANAIS_GAS,
+                'arquivos': self.arquivos,
+            }, f, ensure_ascii=False)
+        os.replace(temporario, self.caminho)
+        self.alterado = False
+
+    def entrada(self, nome):
+        """Entrada atualizada de um arquivo, reindexando se estiver velha."""
+        caminho = os.path.join(self.diretorio, nome)
+        st = os.stat(caminho)
+        atual = self.arquivos.get(nome)
+        if (atual is not None and atual['tamanho'] == st.st_size and
+                atual['mtime_ns'] == st.st_mtime_ns):
+            return atual
+        atual = indexar_arquivo(caminho)
+        self.arquivos[nome] = atual
+        self.alterado = True
+        return atual
+
+    def listar(self):
+        """Lista (nome, entrada) dos arquivos de dados do diretório."""
+        nomes = [f for f in os.listdir(self.diretorio) if f.endswith(EXTENSOES_DADOS)]
+        for antigo in set(self.arquivos) - set(nomes):
+            del self.arquivos[antigo]
+            self.alterado = True
+        itens = [(nome, self.entrada(nome)) for nome in nomes]
+        self.salvar()
+        return itens
+
+    def registrar_sessoes(self, nome, resumos):
+        """
+        Acrescenta as sessões recém-gravadas (ResumoSessao) à entrada do arquivo.
+
+        Se o arquivo mudou por fora desde o início das sessões (tamanho no
+        catálogo diferente do menor offset), reindexa o arquivo.
+        """
+        caminho = os.path.join(self.diretorio, nome)
+        st = os.stat(caminho)
+        atual = self.arquivos.get(nome)
+        resumos = [r for r in resumos if r.leituras]
+        inicio = min((r.offset for r in resumos), default=st.st_size)
+        if atual is None or atual['tamanho'] != inicio:
+            self.arquivos[nome] = indexar_arquivo(caminho)
+        else:
+            for resumo in sorted(resumos, key=lambda r: r.offset):
+                atual['sessoes'].append(resumo.para_dict())
+                atual['leituras'] += resumo.leituras
+            atual['tamanho'] = st.st_size
+            atual['mtime_ns'] = st.st_mtime_ns
+        self.alterado = True
+        self.salvar()
+
+    def reconstruir(self):
+        """Descarta o catálogo e reindexa todos os arquivos."""
+        self.arquivos = {}
+        self.alterado = True
+        return self.listar()
+
+
+def metadados_sessao(entrada):
+    """Retorna (classe, amostra_id) da primeira sessão da entrada, ou None."""
+    if not entrada['sessoes']:
+        return None
+    primeira = entrada['sessoes'][0]
+    return (primeira['classe'] or 'desconhecida',
+            primeira['amostra_id'] or 'desconhecido')
+
+
+if __name__ == "__main__":
+    diretorio = sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.path.abspath(__file__))
+    for nome, entrada in Catalogo(diretorio).reconstruir():
+        print(f"  📄 {nome}: {entrada['leituras']} leituras, "
+              f"{len(entrada['sessoes'])} sessão(ões)")
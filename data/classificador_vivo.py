@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+CLASSIFICADOR AO VIVO (PC) COM SUAVIZAÇÃO E HISTERESE
+=============================================================================
+Roda o modelo treinado sobre os quadros à medida que chegam (porta serial,
+barramento ou arquivo gravado) e entrega uma classe estável:
+
+1. Cada lote de quadros vira ratios G/G100 e passa pelo espelho do C
+   exportado (inferencia.py, a partir do artefato modelo_<m>.modelo.npz):
+   a classe "bruta" de cada leitura é a que o Pico daria.
+2. Suavização das classes brutas, por classe:
+      janela  fração dos votos nas últimas N leituras válidas
+      ema     média exponencial dos votos (alfa por leitura)
+3. Histerese: a classe estável só troca quando outra classe passa a dela
+   por MARGEM_HISTERESE durante CONFIRMACOES leituras seguidas, então
+   leituras isoladas não fazem a classe piscar.
+
+Leituras com G100 <= 0 (classe -1) não votam. A latência de cada leitura
+vai da chegada (timestamp do quadro) até a classe sair; processar() devolve
+um array por lote e estado() o resumo para o dashboard. No replay de
+arquivo (--arquivo) não há chegada: o resultado traz o tempo de modelo por
+leitura; a latência de chegada se mede com --porta replay:<arquivo>.
+
+Uso:
+   python classificador_vivo.py ../IA/modelo_rf.modelo.npz --arquivo planta.csv --classe 0
+   python classificador_vivo.py ../IA/modelo_rf.modelo.npz --porta COM4
+   python classificador_vivo.py ../IA/modelo_svm.modelo.npz --porta barramento
+   python classificador_vivo.py ../IA/modelo_rf.modelo.npz --porta "replay:planta.csv?velocidade=50"
+=============================================================================
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from barramento import abrir_porta, carregar_quadros_arquivo, ler_porta, protocolo_da_porta
+from pipeline import LatenciaEtapa
+from protocolo import PROTOCOLO_BINARIO, PROTOCOLO_TEXTO, criar_parser, matriz
+from relogio import agora_ns
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'IA'))
+from artefato import carregar_artefato  # noqa: E402
+from inferencia import classificar, descrever_artefato  # noqa: E402
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+SUAVIZACAO_JANELA = 'janela'
+SUAVIZACAO_EMA = 'ema'
+
+# Leituras válidas consideradas no voto em janela
+JANELA_VOTOS = 15
+
+# Peso da leitura nova na média exponencial
+ALFA_EMA = 0.2
+
+# Vantagem (em fração dos votos) que outra classe precisa ter sobre a
+# classe estável, por CONFIRMACOES leituras seguidas, para trocar
+MARGEM_HISTERESE = 0.2
+CONFIRMACOES = 3
+
+# Quadros por lote no replay de arquivo
+LOTE_REPLAY = 4096
+
+BAUD_RATE = 115200
+TIMEOUT_LEITURA = 0.1
+
+# Classe, classe suavizada e latência de cada leitura processada
+DTYPE_RESULTADO = np.dtype([
+    ('timestamp_ns', '<i8'),
+    ('bruta', '<i2'),
+    ('estavel', '<i2'),
+    ('confianca', '<f4'),
+    ('latencia_ns', '<i8'),
+])
+
+# =============================================================================
+# CLASSIFICADOR
+# =============================================================================
+
+class ClassificadorVivo:
+    """Classe bruta + suavizada + histerese, lote a lote, com estado entre lotes."""
+
+    def __init__(self, descricao, nomes, suavizacao=SUAVIZACAO_JANELA, janela=JANELA_VOTOS,
+                 alfa=ALFA_EMA, margem=MARGEM_HISTERESE, confirmacoes=CONFIRMACOES):
+        if suavizacao not in (SUAVIZACAO_JANELA, SUAVIZACAO_EMA):
+            raise ValueError(f"suavizacao deve ser '{SUAVIZACAO_JANELA}' ou '{SUAVIZACAO_EMA}'")
+        self.descricao = descricao
+        self.nomes = nomes
+        self.n_classes = int(descricao['n_classes'])
+        self.suavizacao = suavizacao
+        self.janela = janela
+        self.alfa = alfa
+        self.margem = margem
+        self.confirmacoes = confirmacoes
+        self.caminho = None
+
+        # Estado entre lotes
+        self._votos_recentes = np.empty(0, dtype=np.int64)  # últimas janela-1 brutas válidas
+        self._media = [0.0] * self.n_classes
+        self.estavel = -1
+        self.confianca = 0.0
+        self._pendente = -1
+        self._seguidas = 0
+
+        # Contadores
+        self.quadros = 0
+        self.invalidos = 0
+        self.trocas = 0
+        self.ultima_bruta = -1
+        self.latencia = {'modelo': LatenciaEtapa(), 'ponta_a_ponta': LatenciaEtapa()}
+
+    def processar(self, timestamps_ns, quadros):
+        """Classifica um lote de quadros (DTYPE_QUADRO); devolve DTYPE_RESULTADO."""
+        n = len(quadros)
+        resultado = np.empty(n, dtype=DTYPE_RESULTADO)
+        if n == 0:
+            return resultado
+        t0 = time.perf_counter_ns()
+
+        brutas = classificar(self.descricao, matriz(quadros)[:, 3:])
+        if self.suavizacao == SUAVIZACAO_JANELA:
+            pontos = self._votos_janela(brutas).tolist()
+        else:
+            pontos = self._votos_ema(brutas)
+        resultado['estavel'], resultado['confianca'] = self._histerese(pontos)
+        resultado['bruta'] = brutas
+        resultado['timestamp_ns'] = timestamps_ns
+
+        fim_ns = agora_ns()
+        resultado['latencia_ns'] = fim_ns - np.asarray(timestamps_ns, dtype=np.int64)
+        self.latencia['modelo'].registrar(time.perf_counter_ns() - t0, n)
+        # Pior caso do lote: da chegada da leitura mais antiga até a classe
+        self.latencia['ponta_a_ponta'].registrar(int(resultado['latencia_ns'].max()), n)
+
+        self.quadros += n
+        self.invalidos += int(np.count_nonzero(brutas < 0))
+        self.ultima_bruta = int(brutas[-1])
+        return resultado
+
+    def _votos_janela(self, brutas):
+        """(n, classes): fração de cada classe nas últimas `janela` leituras válidas."""
+        validas = brutas >= 0
+        historico = np.concatenate((self._votos_recentes, brutas[validas]))
+        antes = len(self._votos_recentes)
+
+        # Soma acumulada dos votos: contagem na janela = acumulado[t] - acumulado[t - janela]
+        acumulado = np.zeros((len(historico) + 1, self.n_classes), dtype=np.int64)
+        acumulado[np.arange(1, len(historico) + 1), historico] = 1
+        np.cumsum(acumulado, axis=0, out=acumulado)
+
+        # Cada leitura vê os votos válidos até ela (inclusive)
+        fim = antes + np.cumsum(validas)
+        inicio = np.maximum(fim - self.janela, 0)
+        contagem = acumulado[fim] - acumulado[inicio]
+        pontos = contagem / np.maximum(fim - inicio, 1)[:, None]
+
+        self._votos_recentes = historico[-(self.janela - 1):] if self.janela > 1 else historico[:0]
+        return pontos
+
+    def _votos_ema(self, brutas):
+        """Lista (n, classes) com a média exponencial dos votos após cada leitura."""
+        media, alfa, resto = self._media, self.alfa, 1.0 - self.alfa
+        pontos = []
+        for classe in brutas.tolist():
+            if classe >= 0:
+                media = [m * resto for m in media]
+                media[classe] += alfa
+            pontos.append(media)
+        self._media = media
+        return pontos
+
+    def _histerese(self, pontos):
+        """Classe estável e a confiança dela (fração dos votos) para cada leitura."""
+        estaveis = np.empty(len(pontos), dtype=np.int16)
+        confiancas = np.empty(len(pontos), dtype=np.float32)
+        estavel, pendente, seguidas = self.estavel, self._pendente, self._seguidas
+        for i, p in enumerate(pontos):
+            candidata = max(range(self.n_classes), key=p.__getitem__)
+            atual = p[estavel] if estavel >= 0 else 0.0
+            if candidata != estavel and p[candidata] - atual >= self.margem:
+                if candidata == pendente:
+                    seguidas += 1
+                else:
+                    pendente, seguidas = candidata, 1
+                if seguidas >= self.confirmacoes:
+                    estavel, pendente, seguidas = candidata, -1, 0
+                    self.trocas += 1
+            else:
+                pendente, seguidas = -1, 0
+            estaveis[i] = estavel
+            confiancas[i] = p[estavel] if estavel >= 0 else 0.0
+        self.estavel, self._pendente, self._seguidas = estavel, pendente, seguidas
+        self.confianca = float(confiancas[-1]) if len(pontos) else self.confianca
+        return estaveis, confiancas
+
+    def nome(self, classe):
+        if classe < 0:
+            return '—'
+        return self.nomes.get(classe, f'Classe {classe}')
+
+    def estado(self):
+        """Resumo para exibir na interface."""
+        return {
+            'classe': self.estavel,
+            'nome': self.nome(self.estavel),
+            'confianca': self.confianca,
+            'bruta': self.ultima_bruta,
+            'nome_bruta': self.nome(self.ultima_bruta),
+            'quadros': self.quadros,
+            'invalidos': self.invalidos,
+            'trocas': self.trocas,
+            'suavizacao': self.suavizacao,
+            'modelo': f"{self.descricao['modelo']} ({self.descricao['formato']})",
+            'latencia': {k: v.como_dict() for k, v in self.latencia.items()},
+        }
+
+
+def carregar_classificador(caminho, arvore_c=None, svm_c=None, **opcoes):
+    """ClassificadorVivo a partir de um artefato modelo_<m>.modelo.npz."""
+    meta, clf, scaler = carregar_artefato(caminho)
+    classificador = ClassificadorVivo(descrever_artefato(meta, clf, scaler, arvore_c, svm_c),
+                                      meta['classes'], **opcoes)
+    classificador.caminho = caminho
+    return classificador
+
+# =============================================================================
+# FONTES: ARQUIVO E PORTA
+# =============================================================================
+
+def classificar_replay(classificador, quadros, lote=LOTE_REPLAY):
+    """
+    Passa um arquivo gravado pelo classificador o mais rápido possível.
+
+    O lote inteiro está disponível de uma vez, então "da chegada até a
+    classe" seria o tempo do lote para todas as leituras: latencia_ns vira
+    o tempo de modelo por leitura (tempo do lote / leituras do lote).
+    """
+    resultados = []
+    for inicio in range(0, len(quadros), lote):
+        bloco = quadros[inicio:inicio + lote]
+        timestamps = np.full(len(bloco), agora_ns(), dtype=np.int64)
+        t0 = time.perf_counter_ns()
+        resultado = classificador.processar(timestamps, bloco)
+        resultado['latencia_ns'] = (time.perf_counter_ns() - t0) // len(bloco)
+        resultados.append(resultado)
+    return np.concatenate(resultados) if resultados else np.empty(0, dtype=DTYPE_RESULTADO)
+
+
+def classificar_porta(classificador, ser, protocolo=PROTOCOLO_TEXTO, duracao=None):
+    """
+    Lê a porta e mostra a classe estável até Ctrl+C, `duracao` segundos ou
+    o fim do arquivo de uma porta de replay.
+    """
+    parser = criar_parser(protocolo)
+    inicio = time.monotonic()
+    ultima_linha = 0.0
+    while duracao is None or time.monotonic() - inicio < duracao:
+        timestamps, quadros = ler_porta(ser, parser)
+        if len(quadros) == 0:
+            # Replay que chegou ao fim (e já foi todo lido) encerra
+            if getattr(ser, 'terminou', False):
+                break
+            continue
+        estavel_antes = classificador.estavel
+        classificador.processar(timestamps, quadros)
+        agora = time.monotonic()
+        if classificador.estavel != estavel_antes or agora - ultima_linha >= 1.0:
+            mostrar_estado(classificador.estado(), fim='\n' if classificador.estavel != estavel_antes else '')
+            ultima_linha = agora
+    mostrar_estado(classificador.estado())
+    return parser
+
+
+def mostrar_estado(est, fim=''):
+    latencia = est['latencia']['ponta_a_ponta']
+    print(f"\r🧠 {est['nome']:<12} {est['confianca']:>5.0%} | bruta {est['nome_bruta']:<12} | "
+          f"{est['quadros']:,} leituras | {est['trocas']} trocas | "
+          f"latência média {latencia['media_ms']:.2f} ms", end=fim, flush=True)
+
+# =============================================================================
+# PONTO DE ENTRADA
+# =============================================================================
+
+def resumir_replay(classificador, resultado, decorrido, classe=None):
+    est = classificador.estado()
+    print(f"\n⚡ {len(resultado):,} leituras em {decorrido:.2f} s "
+          f"({len(resultado) / max(decorrido, 1e-9):,.0f} leituras/s) | "
+          f"{est['trocas']} troca(s) de classe | {est['invalidos']:,} sem G100")
+    for campo, titulo in (('bruta', 'bruta  '), ('estavel', 'estável')):
+        valores, contagem = np.unique(resultado[campo], return_counts=True)
+        partes = ', '.join(f"{classificador.nome(int(c))}: {n:,}" for c, n in zip(valores, contagem))
+        linha = f"   {titulo} {partes}"
+        if classe is not None:
+            linha += f" | acurácia {np.mean(resultado[campo] == classe):.2%}"
+        print(linha)
+    # Tempo de modelo por leitura de cada lote (classificar_replay)
+    modelo_us = resultado['latencia_ns'] / 1e3
+    print(f"   tempo de modelo por leitura (lotes de {LOTE_REPLAY}): média "
+          f"{modelo_us.mean():.2f} µs | pior lote {modelo_us.max():.2f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Classificação ao vivo com suavização')
+    parser.add_argument('modelo', help='Artefato do treinador (modelo_<m>.modelo.npz)')
+    fonte = parser.add_mutually_exclusive_group(required=True)
+    fonte.add_argument('--porta', help="Porta serial, 'barramento[:nome]' ou 'replay:<arquivo>'")
+    fonte.add_argument('--arquivo', help='CSV ou .bme gravado (replay o mais rápido possível)')
+    parser.add_argument('--protocolo', choices=[PROTOCOLO_TEXTO, PROTOCOLO_BINARIO],
+                        default=PROTOCOLO_TEXTO)
+    parser.add_argument('--duracao', type=float, default=None, help='Segundos (porta)')
+    parser.add_argument('--classe', type=int, default=None,
+                        help='Classe verdadeira do arquivo (mostra a acurácia)')
+    parser.add_argument('--suavizacao', choices=[SUAVIZACAO_JANELA, SUAVIZACAO_EMA],
+                        default=SUAVIZACAO_JANELA)
+    parser.add_argument('--janela', type=int, default=JANELA_VOTOS)
+    parser.add_argument('--alfa', type=float, default=ALFA_EMA)
+    parser.add_argument('--margem', type=float, default=MARGEM_HISTERESE)
+    parser.add_argument('--confirmacoes', type=int, default=CONFIRMACOES)
+    parser.add_argument('--arvore-c', choices=['if', 'tabela', 'tabela16'], default=None)
+    parser.add_argument('--svm-c', choices=['float', 'int16', 'int8'], default=None)
+    parser.add_argument('--saida', default=None, help='Salva o resultado por leitura (CSV)')
+    args = parser.parse_args()
+
+    try:
+        classificador = carregar_classificador(
+            args.modelo, args.arvore_c, args.svm_c, suavizacao=args.suavizacao,
+            janela=args.janela, alfa=args.alfa, margem=args.margem,
+            confirmacoes=args.confirmacoes)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ {args.modelo}: {e}")
+        sys.exit(1)
+    print(f"🧠 {classificador.estado()['modelo']} | suavização {args.suavizacao}")
+
+    if args.arquivo:
+        quadros = carregar_quadros_arquivo(args.arquivo)
+        if len(quadros) == 0:
+            print(f"❌ Nenhuma leitura válida em {args.arquivo}")
+            sys.exit(1)
+        inicio = time.perf_counter()
+        resultado = classificar_replay(classificador, quadros)
+        resumir_replay(classificador, resultado, time.perf_counter() - inicio, args.classe)
+        if args.saida:
+            import pandas as pd
+            pd.DataFrame(resultado).to_csv(args.saida, index_label='linha')
+            print(f"💾 Resultado salvo em {args.saida}")
+        return
+
+    protocolo = protocolo_da_porta(args.porta, args.protocolo)
+    try:
+        ser = abrir_porta(args.porta, BAUD_RATE, TIMEOUT_LEITURA)
+    except Exception as e:
+        print(f"❌ Erro ao abrir {args.porta}: {e}")
+        sys.exit(1)
+    print(f"📡 {args.porta} ({protocolo}) | Ctrl+C = parar")
+    try:
+        classificar_porta(classificador, ser, protocolo, args.duracao)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ser.close()
+    print()
+    mostrar_estado(classificador.estado(), fim='\n')
+
+
+if __name__ == "__main__":
+    main()
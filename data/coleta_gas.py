@@ -8,17 +8,31 @@ Funcionalidades:
 - Continuar coleta no mesmo arquivo em sessões diferentes
 - Suporte a múltiplas amostras/espécimes
 - Timestamp e metadados completos
+- Leitura serial em thread dedicada, gravação em lote (pipeline.py)
+- Protocolo serial em texto ou em quadros binários com CRC (protocolo.py)
+- Porta 'barramento' lê de um publicador em memória compartilhada
+  (barramento.py), junto com dashboard e classificador
+- Porta 'replay:<arquivo>[?velocidade=10]' reproduz uma gravação como se
+  fosse o Pico (replay.py), para testar sem hardware
+- Uma linha de status por segundo (não uma por leitura) e métricas da
+  coleta em <arquivo>.metricas.json e, opcionalmente, em
+  http://127.0.0.1:<PORTA_METRICAS>/metrics (metricas.py)
 =============================================================================
 """
 
 import serial
-import csv
 import os
 import sys
 import threading
 import time
 from datetime import datetime
 
+from armazenamento import abrir_armazenamento
+from barramento import abrir_porta
+from catalogo import Catalogo, metadados_sessao
+from metricas import ServidorMetricas, gravar_snapshot
+from pipeline import PipelineColeta
+
 # Tenta importar keyboard para detectar teclas (opcional)
 try:
     import keyboard
@@ -39,14 +53,35 @@ TIMEOUT = 2
 # Diretório base para dados
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-# Cabeçalho do CSV
-CABECALHO = [
-    'timestamp', 'sessao_id', 'amostra_id', 'classe',
-    'temp', 'umid',
-    'G320', 'G295', 'G270', 'G245', 'G220',
-    'G195', 'G170', 'G145', 'G120', 'G100',
-    'notas'
-]
+# Formato dos novos arquivos: '.csv' (texto), '.bme' (binário tipado,
+# ~3x menor e carregado por memory-map no treinador) ou '.bmz' (compactado
+# para arquivo de longo prazo, ~8x menor que o CSV; compactacao.py)
+FORMATO_PADRAO = '.csv'
+
+# Gravação em lote (ver armazenamento.py): linhas por escrita e linhas
+# entre fsync (0 = deixa o sistema operacional decidir)
+LOTE_GRAVACAO = 32
+FSYNC_A_CADA = 256
+
+# Protocolo enviado pelo firmware: 'texto' (linhas CSV) ou 'binario'
+# (quadros com CRC e número de sequência, ver protocolo.py)
+PROTOCOLO_SERIAL = 'texto'
+
+# Blocos brutos da serial que podem esperar na fila do pipeline enquanto
+# o disco ou o terminal estão lentos (ver pipeline.py)
+CAPACIDADE_FILA = 4096
+
+# Status no terminal: uma linha reescrita a cada INTERVALO_STATUS segundos
+# (imprimir cada leitura custa mais que gravá-la)
+INTERVALO_STATUS = 1.0
+
+# Métricas da coleta: snapshot JSON ao lado do arquivo de dados a cada
+# INTERVALO_METRICAS segundos e, com PORTA_METRICAS (ex: 9688), texto do
+# Prometheus em http://127.0.0.1:<porta>/metrics (None = desligado)
+SALVAR_METRICAS = True
+INTERVALO_METRICAS = 5.0
+PORTA_METRICAS = None
+SUFIXO_METRICAS = '.metricas.json'
 
 # =============================================================================
 # CLASSE PRINCIPAL
@@ -58,14 +93,17 @@ class ColetorBME688:
         self.rodando = True
         self.contador = 0
         self.ser = None
+        self.gravados_sessao = 0
+        self.ultima_leitura = None
+        self.inicio_sessao = None
         
     def conectar_serial(self, porta):
         """Conecta à porta serial."""
         try:
-            self.ser = serial.Serial(porta, BAUD_RATE, timeout=TIMEOUT)
+            self.ser = abrir_porta(porta, BAUD_RATE, TIMEOUT)
             print(f"✅ Conectado a {porta}")
             return True
-        except serial.SerialException as e:
+        except (serial.SerialException, FileNotFoundError, RuntimeError, ValueError) as e:
             print(f"❌ Erro ao conectar em {porta}: {e}")
             return False
     
@@ -94,31 +132,32 @@ class ColetorBME688:
         self.rodando = False
         print("\n🛑 Parando coleta...")
     
-    def coletar(self, arquivo_csv, classe, amostra_id, notas=""):
+    def coletar(self, arquivo, classe, amostra_id, notas=""):
         """Loop principal de coleta."""
         
         # Gerar ID de sessão único
         sessao_id = datetime.now().strftime('%Y%m%d_%H%M%S')
         
         # Verificar se arquivo existe
-        arquivo_existe = os.path.exists(arquivo_csv)
-        
-        # Contar linhas existentes para continuar numeração
-        if arquivo_existe:
-            with open(arquivo_csv, 'r') as f:
-                self.contador = sum(1 for _ in f) - 1  # -1 para cabeçalho
-            print(f"📄 Continuando arquivo existente ({self.contador} leituras anteriores)")
+        arquivo_existe = os.path.exists(arquivo)
+        catalogo = Catalogo(os.path.dirname(os.path.abspath(arquivo)))
+        nome = os.path.basename(arquivo)
         
-        # Abrir arquivo para append
-        with open(arquivo_csv, 'a', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
+        # Abrir arquivo para append (backend escolhido pela extensão)
+        armazenamento = abrir_armazenamento(arquivo, lote=LOTE_GRAVACAO,
+                                            fsync_a_cada=FSYNC_A_CADA)
+        with armazenamento:
             
-            # Escrever cabeçalho se arquivo novo
-            if not arquivo_existe:
-                writer.writerow(CABECALHO)
+            # Contar leituras existentes para continuar numeração (via catálogo)
+            armazenamento.descarregar()
+            self.contador = catalogo.entrada(nome)['leituras']
+            if arquivo_existe:
+                print(f"📄 Continuando arquivo existente ({self.contador} leituras anteriores)")
+            
+            armazenamento.iniciar_sessao(sessao_id, amostra_id, classe, notas)
             
             print(f"\n📊 Coletando dados:")
-            print(f"   Arquivo: {arquivo_csv}")
+            print(f"   Arquivo: {arquivo}")
             print(f"   Classe: {classe}")
             print(f"   Amostra: {amostra_id}")
             print(f"   Sessão: {sessao_id}")
@@ -133,70 +172,138 @@ class ColetorBME688:
             
             print("-" * 50)
             
+            pipeline = PipelineColeta(self.ser, armazenamento,
+                                      capacidade=CAPACIDADE_FILA,
+                                      ao_gravar=self._registrar_gravacao,
+                                      protocolo=getattr(self.ser, 'protocolo',
+                                                        PROTOCOLO_SERIAL))
+            arquivo_metricas = arquivo + SUFIXO_METRICAS if SALVAR_METRICAS else None
+            servidor = self._iniciar_servidor_metricas(pipeline, sessao_id)
+            self.gravados_sessao = 0
+            self.ultima_leitura = None
+            self.inicio_sessao = time.monotonic()
+            ultimo_status = ultimo_snapshot = self.inicio_sessao
+            pipeline.iniciar()
+            
             try:
-                while self.rodando:
-                    # Se pausado, aguardar
-                    if self.pausado:
-                        time.sleep(0.1)
-                        continue
-                    
-                    # Ler linha da serial
-                    try:
-                        linha = self.ser.readline().decode('utf-8').strip()
-                    except UnicodeDecodeError:
-                        continue
-                    
-                    if not linha:
-                        continue
-                    
-                    # Parse dos dados
-                    partes = linha.split(',')
-                    if len(partes) < 12:
-                        continue
-                    
-                    # Validar dados numéricos
-                    try:
-                        temp = float(partes[0])
-                        umid = float(partes[1])
-                        gases = [float(partes[i]) for i in range(2, 12)]
-                    except ValueError:
-                        continue
-                    
-                    # Timestamp
-                    ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    
-                    # Montar linha
-                    row = [
-                        ts,
-                        sessao_id,
-                        amostra_id,
-                        classe,
-                        f"{temp:.1f}",
-                        f"{umid:.1f}",
-                        *[f"{g:.0f}" for g in gases],
-                        notas
-                    ]
-                    
-                    # Escrever
-                    writer.writerow(row)
-                    f.flush()
-                    
-                    self.contador += 1
-                    
-                    # Mostrar progresso
-                    print(f"[{self.contador:4d}] {ts} | T={temp:5.1f}°C | "
-                          f"U={umid:4.1f}% | G100={gases[9]:,.0f}")
+                # Leitura, parse e gravação rodam nas threads do pipeline
+                # (um replay que chegou ao fim também encerra a coleta)
+                while self.rodando and pipeline.rodando and not getattr(self.ser, 'terminou', False):
+                    pipeline.pausado = self.pausado
+                    time.sleep(0.1)
+                    agora = time.monotonic()
+                    if agora - ultimo_status >= INTERVALO_STATUS:
+                        self._mostrar_status(pipeline)
+                        ultimo_status = agora
+                    if arquivo_metricas and agora - ultimo_snapshot >= INTERVALO_METRICAS:
+                        gravar_snapshot(arquivo_metricas, self.metricas(pipeline, sessao_id))
+                        ultimo_snapshot = agora
                     
             except KeyboardInterrupt:
                 pass
             
             finally:
+                pipeline.parar()
+                if servidor:
+                    servidor.parar()
                 if KEYBOARD_DISPONIVEL:
                     keyboard.unhook_all()
         
+        self._mostrar_status(pipeline)
+        print()
+        if arquivo_metricas:
+            gravar_snapshot(arquivo_metricas, self.metricas(pipeline, sessao_id))
+        if pipeline.erro:
+            print(f"\n❌ Coleta interrompida por erro: {pipeline.erro}")
+        self._mostrar_estatisticas(pipeline.estatisticas())
+        
+        # Registrar a sessão no catálogo do diretório
+        catalogo.registrar_sessoes(nome, armazenamento.resumos.values())
+        
         print(f"\n✅ Coleta finalizada!")
         print(f"   Total de leituras: {self.contador}")
-        print(f"   Arquivo: {arquivo_csv}")
+        print(f"   Arquivo: {arquivo}")
+        if arquivo_metricas:
+            print(f"   Métricas: {arquivo_metricas}")
+    
+    def _registrar_gravacao(self, timestamps_ns, temps, umids, gases):
+        """Conta o lote gravado (chamado pelo pipeline; sem print por leitura)."""
+        n = len(timestamps_ns)
+        self.contador += n
+        self.gravados_sessao += n
+        self.ultima_leitura = (int(timestamps_ns[-1]), float(temps[-1]), float(umids[-1]),
+                               float(gases[-1][9]))
+    
+    def _mostrar_status(self, pipeline):
+        """Reescreve a linha de status (leituras, taxa, última leitura, backlog)."""
+        est = pipeline.estatisticas()
+        decorrido = max(time.monotonic() - self.inicio_sessao, 1e-9)
+        linha = (f"\r[{self.contador:6d}] {self.gravados_sessao / decorrido:6.2f} leit/s")
+        if self.ultima_leitura:
+            ts_ns, temp, umid, g100 = self.ultima_leitura
+            ts = datetime.fromtimestamp(ts_ns / 1e9).strftime('%H:%M:%S')
+            linha += f" | {ts} T={temp:5.1f}°C U={umid:4.1f}% G100={g100:,.0f}"
+        linha += (f" | rejeitadas {sum(est['rejeitados'].values())}"
+                  f" | fila {est['fila_profundidade']} | serial {est['in_waiting']} B")
+        if self.pausado:
+            linha += " | ⏸️"
+        print(linha, end='  ', flush=True)
+    
+    def metricas(self, pipeline, sessao_id):
+        """Contadores do pipeline + identificação da sessão (snapshot/endpoint)."""
+        decorrido = time.monotonic() - self.inicio_sessao if self.inicio_sessao else 0.0
+        return {
+            'sessao_id': sessao_id,
+            'atualizado_em': datetime.now().isoformat(timespec='seconds'),
+            'duracao_s': decorrido,
+            'leituras_por_s': self.gravados_sessao / decorrido if decorrido else 0.0,
+            'pausado': self.pausado,
+            **pipeline.estatisticas(),
+        }
+    
+    def _iniciar_servidor_metricas(self, pipeline, sessao_id):
+        if PORTA_METRICAS is None:
+            return None
+        try:
+            servidor = ServidorMetricas(PORTA_METRICAS, lambda: self.metricas(pipeline, sessao_id))
+        except OSError as e:
+            print(f"⚠️  Endpoint de métricas indisponível na porta {PORTA_METRICAS}: {e}")
+            return None
+        print(f"📡 Métricas em {servidor.endereco}")
+        return servidor
+    
+    def _mostrar_estatisticas(self, est):
+        """Resumo dos contadores do pipeline ao final da coleta."""
+        rejeitados = sum(est['rejeitados'].values())
+        lat = est['latencia']
+        print(f"\n📈 Pipeline: {est['quadros_lidos']} quadros lidos | "
+              f"{est['gravados']} gravados | {rejeitados} rejeitados "
+              f"{est['rejeitados']}")
+        print(f"   Descartados (fila cheia): {est['quadros_descartados']} quadros, "
+              f"{est['bytes_descartados']} bytes | fila máx: "
+              f"{est['fila_profundidade_max']}/{est['fila_capacidade']}")
+        if 'perdidos_sequencia' in est:
+            print(f"   Protocolo binário: {est['perdidos_sequencia']} quadros perdidos "
+                  f"(sequência) | {est['bytes_corrompidos']} bytes corrompidos | "
+                  f"{est['reinicios']} reinício(s) do Pico")
+        if 'perdidos_barramento' in est:
+            print(f"   Barramento: {est['perdidos_barramento']} quadros perdidos "
+                  f"(sobrescritos antes da leitura)")
+        print(f"   Latência média/máx (ms): parse {lat['parse']['media_ms']:.2f}/"
+              f"{lat['parse']['max_ms']:.2f} | gravação {lat['sink']['media_ms']:.2f}/"
+              f"{lat['sink']['max_ms']:.2f} | ponta a ponta "
+              f"{lat['ponta_a_ponta']['media_ms']:.2f}/{lat['ponta_a_ponta']['max_ms']:.2f}")
+        hist = est['histogramas']
+        print(f"   Intervalo entre quadros p50/p99: {hist['intervalo_quadros_s']['p50']:g}/"
+              f"{hist['intervalo_quadros_s']['p99']:g} s | descarga p99: "
+              f"{hist['descarga_s']['p99'] * 1e3:g} ms | bytes lidos/gravados: "
+              f"{est['bytes_lidos']:,}/{est['bytes_gravados']:,} | serial máx: "
+              f"{est['in_waiting_max']:,} B")
+        relogio = est['relogio']
+        if relogio['taxa_hz']:
+            print(f"   Relógio do sensor: {relogio['taxa_hz']:.4f} Hz | jitter do host "
+                  f"{relogio.get('jitter_ms', 0.0):.2f} ms | {relogio['reancoragens']} "
+                  f"reancoragem(ns) | {relogio['sem_indice']} leituras sem Index")
     
     def fechar(self):
         """Fecha conexão serial."""
@@ -262,7 +369,7 @@ def menu_principal():
                 notas = input("Notas (opcional): ").strip()
                 
                 # Nome do arquivo
-                arquivo_padrao = f"{classe}_{amostra_id}.csv"
+                arquivo_padrao = f"{classe}_{amostra_id}{FORMATO_PADRAO}"
                 arquivo = input(f"Nome do arquivo [{arquivo_padrao}]: ").strip()
                 if not arquivo:
                     arquivo = arquivo_padrao
@@ -285,19 +392,17 @@ def menu_principal():
                 print("\n📂 CONTINUAR COLETA")
                 print("-" * 40)
                 
-                # Listar arquivos CSV
-                arquivos = [f for f in os.listdir(BASE_DIR) if f.endswith('.csv')]
-                if not arquivos:
-                    print("❌ Nenhum arquivo CSV encontrado")
+                # Listar arquivos de dados (contagens vêm do catálogo)
+                catalogo = Catalogo(BASE_DIR)
+                itens = catalogo.listar()
+                if not itens:
+                    print("❌ Nenhum arquivo de dados encontrado")
                     continue
                 
+                arquivos = [arq for arq, _ in itens]
                 print("Arquivos disponíveis:")
-                for i, arq in enumerate(arquivos, 1):
-                    # Contar linhas
-                    path = os.path.join(BASE_DIR, arq)
-                    with open(path, 'r') as f:
-                        linhas = sum(1 for _ in f) - 1
-                    print(f"  {i}. {arq} ({linhas} leituras)")
+                for i, (arq, entrada) in enumerate(itens, 1):
+                    print(f"  {i}. {arq} ({entrada['leituras']} leituras)")
                 
                 escolha = input("\nNúmero do arquivo (ou nome): ").strip()
                 
@@ -314,17 +419,14 @@ def menu_principal():
                     continue
                 
                 # Ler metadados do arquivo existente
-                with open(arquivo_path, 'r') as f:
-                    reader = csv.DictReader(f)
-                    primeira_linha = next(reader, None)
-                    if primeira_linha:
-                        classe = primeira_linha.get('classe', 'desconhecida')
-                        amostra_id = primeira_linha.get('amostra_id', 'desconhecido')
-                        print(f"   Classe: {classe}")
-                        print(f"   Amostra: {amostra_id}")
-                    else:
-                        classe = input("Classe: ").strip()
-                        amostra_id = input("Amostra ID: ").strip()
+                metadados = metadados_sessao(catalogo.entrada(os.path.basename(arquivo_path)))
+                if metadados:
+                    classe, amostra_id = metadados
+                    print(f"   Classe: {classe}")
+                    print(f"   Amostra: {amostra_id}")
+                else:
+                    classe = input("Classe: ").strip()
+                    amostra_id = input("Amostra ID: ").strip()
                 
                 notas = input("Notas para esta sessão (opcional): ").strip()
                 
@@ -337,16 +439,14 @@ def menu_principal():
                 print("\n📂 ARQUIVOS DE DADOS")
                 print("-" * 40)
                 
-                arquivos = [f for f in os.listdir(BASE_DIR) if f.endswith('.csv')]
-                if not arquivos:
-                    print("Nenhum arquivo CSV encontrado")
+                itens = Catalogo(BASE_DIR).listar()
+                if not itens:
+                    print("Nenhum arquivo de dados encontrado")
                 else:
-                    for arq in arquivos:
-                        path = os.path.join(BASE_DIR, arq)
-                        with open(path, 'r') as f:
-                            linhas = sum(1 for _ in f) - 1
-                        size_kb = os.path.getsize(path) / 1024
-                        print(f"  📄 {arq}: {linhas} leituras ({size_kb:.1f} KB)")
+                    for arq, entrada in itens:
+                        size_kb = entrada['tamanho'] / 1024
+                        print(f"  📄 {arq}: {entrada['leituras']} leituras, "
+                              f"{len(entrada['sessoes'])} sessão(ões) ({size_kb:.1f} KB)")
     
     finally:
         coletor.fechar()
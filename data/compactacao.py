@@ -0,0 +1,610 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+ARQUIVO COMPACTADO DE LONGO PRAZO (.bmz)
+=============================================================================
+Formato para guardar meses de gravação: as leituras vão em blocos de
+LINHAS_BLOCO linhas, cada coluna codificada separadamente e comprimida com
+zlib. Um bloco pode ser lido sozinho (acesso aleatório por linha ou
+horário) direto para arrays NumPy.
+
+Codificação das colunas (tudo sem perda):
+   timestamp_ns  delta-de-delta (como o Gorilla): leituras a intervalo fixo
+                 viram quase só zeros
+   sessao        delta (constante dentro do bloco)
+   temp, umid    delta dos bits do float32
+   G320...G100   dicionário: o BME688 só produz alguns milhares de valores
+                 distintos de resistência (ADC de 10 bits x faixa), então
+                 cada canal vira a lista ordenada de valores do bloco +
+                 o código (posição na lista) de cada leitura, em delta.
+                 Resistência que varia devagar = código que anda pouco.
+Todos os deltas passam por zigzag + varint (1 byte até ±63) antes do zlib.
+
+Formato (little-endian):
+   [0:8]   magic b'BME688Z\\x01'
+   depois, registros: tipo (1 byte) + tamanho (uint32) + crc32 + conteúdo
+      'S'  uma sessão nova (JSON: sessao_id, sensor_id, amostra_id, ...)
+      'B'  um bloco: linhas (uint32), ts mín/máx (int64) e, para cada
+           coluna de DTYPE_REGISTRO, tamanho (uint32) + bytes comprimidos
+
+Gravação contínua (coletor): as linhas de um bloco ainda incompleto ficam
+em <arquivo>.diario, registros DTYPE_REGISTRO crus gravados a cada
+descarga (a mesma garantia do .bme contra queda). Com o bloco cheio, ele
+é comprimido no .bmz e o diário volta a zero; fechar() comprime o resto.
+Um registro cortado no fim (queda no meio da escrita) é descartado ao
+reabrir, e as linhas do diário voltam para o próximo bloco.
+
+Uso:
+   python compactacao.py compactar planta.csv [planta.bmz]   (.csv ou .bme)
+   python compactacao.py descompactar planta.bmz [planta.bme]
+   (destino existente: pergunta antes de sobrescrever; --forcar não pergunta)
+   python compactacao.py info planta.bmz
+=============================================================================
+"""
+
+import argparse
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+
+import numpy as np
+
+from armazenamento import (CANAIS_GAS, DTYPE_REGISTRO, EXTENSAO_BINARIO,
+                           EXTENSAO_COMPACTADO, Armazenamento, abrir_armazenamento,
+                           carregar_registros, converter_csv_para_binario)
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+MAGIC_COMPACTADO = b'BME688Z\x01'
+VERSAO_COMPACTADO = 1
+
+# Linhas por bloco: blocos maiores comprimem mais (o dicionário de cada
+# canal é dividido por mais linhas); menores deixam a leitura de um
+# trecho curto mais barata. 16384 leituras = ~4,5 h a 1 Hz
+LINHAS_BLOCO = 16384
+NIVEL_ZLIB = 6
+
+SUFIXO_DIARIO = '.diario'
+
+TIPO_SESSAO = b'S'
+TIPO_BLOCO = b'B'
+REGISTRO = struct.Struct('<cII')          # tipo, tamanho do conteúdo, crc32
+CABECALHO_BLOCO = struct.Struct('<Iqq')   # linhas, ts mínimo, ts máximo
+TAMANHO_COLUNA = struct.Struct('<I')
+
+# Ordem do delta de cada coluna (os canais de gás usam dicionário)
+ORDEM_DELTA = {'timestamp_ns': 2, 'sessao': 1, 'temp': 1, 'umid': 1}
+
+# =============================================================================
+# CODEC: ZIGZAG + VARINT + DELTA
+# =============================================================================
+
+def zigzag(x):
+    """int64 -> uint64 com os pequenos (positivos ou negativos) perto de 0."""
+    x = np.asarray(x, dtype=np.int64)
+    return ((x << 1) ^ (x >> 63)).view(np.uint64)
+
+
+def dezigzag(u):
+    u = np.asarray(u, dtype=np.uint64)
+    return ((u >> np.uint64(1)).view(np.int64)) ^ -((u & np.uint64(1)).view(np.int64))
+
+
+def varint_codificar(u):
+    """uint64 -> bytes, 7 bits por byte (bit 7 = continua), tudo em NumPy."""
+    u = np.asarray(u, dtype=np.uint64)
+    tamanhos = np.ones(len(u), dtype=np.int64)
+    for k in range(1, 10):
+        tamanhos += u >= np.uint64(1 << (7 * k))
+    saida = np.empty(int(tamanhos.sum()), dtype=np.uint8)
+    posicoes = np.cumsum(tamanhos) - tamanhos
+    restante = u.copy()
+    for k in range(int(tamanhos.max(initial=0))):
+        ativos = tamanhos > k
+        byte = (restante[ativos] & np.uint64(0x7F)).astype(np.uint8)
+        byte[tamanhos[ativos] > k + 1] |= 0x80
+        saida[posicoes[ativos] + k] = byte
+        restante[ativos] >>= np.uint64(7)
+    return saida.tobytes()
+
+
+def varint_decodificar(dados, n):
+    """Os `n` primeiros valores de um buffer varint, como uint64."""
+    if n == 0:
+        return np.zeros(0, dtype=np.uint64)
+    b = np.frombuffer(dados, dtype=np.uint8)
+    fins = np.flatnonzero(b < 0x80)[:n]
+    if len(fins) < n:
+        raise ValueError("Bloco compactado truncado (varint)")
+    b = b[:fins[-1] + 1]
+    inicios = np.empty(n, dtype=np.int64)
+    inicios[0] = 0
+    inicios[1:] = fins[:-1] + 1
+    deslocamento = np.arange(len(b)) - np.repeat(inicios, fins - inicios + 1)
+    partes = (b & 0x7F).astype(np.uint64) << (7 * deslocamento).astype(np.uint64)
+    return np.add.reduceat(partes, inicios)
+
+
+def _delta(x, ordem):
+    for _ in range(ordem):
+        x = np.diff(x, prepend=np.int64(0))
+    return x
+
+
+def _integrar(x, ordem):
+    for _ in range(ordem):
+        x = np.cumsum(x, dtype=np.int64)
+    return x
+
+
+def codificar_inteiros(x, ordem=1):
+    """int64 -> zlib(varint(zigzag(delta de ordem `ordem`)))."""
+    return zlib.compress(varint_codificar(zigzag(_delta(np.asarray(x, dtype=np.int64), ordem))),
+                         NIVEL_ZLIB)
+
+
+def decodificar_inteiros(dados, n, ordem=1):
+    return _integrar(dezigzag(varint_decodificar(zlib.decompress(dados), n)), ordem)
+
+
+def codificar_gas(valores):
+    """
+    Um canal de gás: [tamanho do dicionário, deltas do dicionário ordenado,
+    deltas dos códigos], tudo em um varint comprimido.
+    """
+    dicionario, codigos = np.unique(np.asarray(valores, dtype=np.int64), return_inverse=True)
+    inteiros = np.concatenate((
+        [len(dicionario)],
+        zigzag(_delta(dicionario, 1)),
+        zigzag(_delta(codigos.astype(np.int64), 1)),
+    )).astype(np.uint64)
+    return zlib.compress(varint_codificar(inteiros), NIVEL_ZLIB)
+
+
+def decodificar_gas(dados, n):
+    bruto = zlib.decompress(dados)
+    k = int(varint_decodificar(bruto, 1)[0])
+    inteiros = varint_decodificar(bruto, 1 + k + n)
+    dicionario = _integrar(dezigzag(inteiros[1:1 + k]), 1)
+    codigos = _integrar(dezigzag(inteiros[1 + k:]), 1)
+    return dicionario[codigos]
+
+# =============================================================================
+# BLOCOS
+# =============================================================================
+
+def _bits(coluna):
+    """float32 -> int64 com o mesmo padrão de bits (delta sem perda)."""
+    return np.ascontiguousarray(coluna, dtype='<f4').view('<i4').astype(np.int64)
+
+
+def codificar_bloco(registros):
+    """Array DTYPE_REGISTRO -> conteúdo de um registro 'B'."""
+    ts = np.asarray(registros['timestamp_ns'], dtype=np.int64)
+    partes = [CABECALHO_BLOCO.pack(len(registros), int(ts.min()), int(ts.max()))]
+    for nome in DTYPE_REGISTRO.names:
+        if nome in CANAIS_GAS:
+            dados = codificar_gas(registros[nome])
+        elif nome in ('temp', 'umid'):
+            dados = codificar_inteiros(_bits(registros[nome]), ORDEM_DELTA[nome])
+        else:
+            dados = codificar_inteiros(registros[nome], ORDEM_DELTA[nome])
+        partes.append(TAMANHO_COLUNA.pack(len(dados)))
+        partes.append(dados)
+    return b''.join(partes)
+
+
+def decodificar_bloco(conteudo, colunas=None):
+    """
+    Conteúdo de um registro 'B' -> array estruturado só com as `colunas`
+    pedidas (None = todas); as outras nem são descomprimidas.
+    """
+    n, _, _ = CABECALHO_BLOCO.unpack_from(conteudo)
+    nomes = list(DTYPE_REGISTRO.names) if colunas is None else list(colunas)
+    saida = np.empty(n, dtype=[(c, DTYPE_REGISTRO[c]) for c in nomes])
+    pos = CABECALHO_BLOCO.size
+    for nome in DTYPE_REGISTRO.names:
+        (tamanho,) = TAMANHO_COLUNA.unpack_from(conteudo, pos)
+        pos += TAMANHO_COLUNA.size
+        if nome in nomes:
+            dados = conteudo[pos:pos + tamanho]
+            if nome in CANAIS_GAS:
+                saida[nome] = decodificar_gas(dados, n)
+            elif nome in ('temp', 'umid'):
+                bits = decodificar_inteiros(dados, n, ORDEM_DELTA[nome])
+                saida[nome] = bits.astype('<i4').view('<f4')
+            else:
+                saida[nome] = decodificar_inteiros(dados, n, ORDEM_DELTA[nome])
+        pos += tamanho
+    return saida
+
+# =============================================================================
+# ESTRUTURA DO ARQUIVO
+# =============================================================================
+
+def _registro(tipo, conteudo):
+    return REGISTRO.pack(tipo, len(conteudo), zlib.crc32(conteudo)) + conteudo
+
+
+def varrer(caminho):
+    """
+    Percorre os registros sem descomprimir nada. Retorna (sessoes, blocos,
+    fim_valido); blocos = [(offset do conteúdo, tamanho, linhas, ts_min,
+    ts_max)] e fim_valido é onde termina o último registro íntegro.
+    """
+    sessoes, blocos = [], []
+    with open(caminho, 'rb') as f:
+        if f.read(len(MAGIC_COMPACTADO)) != MAGIC_COMPACTADO:
+            raise ValueError(f"Arquivo não é .bmz válido: {caminho}")
+        fim_valido = f.tell()
+        while True:
+            cabecalho = f.read(REGISTRO.size)
+            if len(cabecalho) < REGISTRO.size:
+                break
+            tipo, tamanho, crc = REGISTRO.unpack(cabecalho)
+            offset = f.tell()
+            if tipo == TIPO_BLOCO:
+                # Só o cabeçalho do bloco; o CRC do resto é conferido na leitura
+                inicio = f.read(CABECALHO_BLOCO.size)
+                f.seek(offset + tamanho)
+                if len(inicio) < CABECALHO_BLOCO.size or f.tell() > os.fstat(f.fileno()).st_size:
+                    break
+                blocos.append((offset, tamanho, *CABECALHO_BLOCO.unpack(inicio)))
+            elif tipo == TIPO_SESSAO:
+                conteudo = f.read(tamanho)
+                if len(conteudo) < tamanho or zlib.crc32(conteudo) != crc:
+                    break
+                sessoes.append(json.loads(conteudo.decode('utf-8')))
+            else:
+                break
+            fim_valido = f.tell()
+    return sessoes, blocos, fim_valido
+
+
+def ler_diario(caminho):
+    """Linhas completas do diário de um .bmz (bloco ainda não comprimido)."""
+    diario = caminho + SUFIXO_DIARIO
+    if not os.path.exists(diario):
+        return np.zeros(0, dtype=DTYPE_REGISTRO)
+    with open(diario, 'rb') as f:
+        dados = f.read()
+    n = len(dados) // DTYPE_REGISTRO.itemsize
+    return np.frombuffer(dados[:n * DTYPE_REGISTRO.itemsize], dtype=DTYPE_REGISTRO).copy()
+
+# =============================================================================
+# GRAVAÇÃO
+# =============================================================================
+
+class ArmazenamentoCompactado(Armazenamento):
+    """
+    Grava no formato .bmz. O lote de cada descarga vai para o diário (self.f);
+    a cada `linhas_bloco` linhas acumuladas, um bloco comprimido vai para o .bmz.
+    """
+
+    def __init__(self, caminho, linhas_bloco=LINHAS_BLOCO, **kwargs):
+        super().__init__(caminho, **kwargs)
+        self.linhas_bloco = max(1, linhas_bloco)
+        self.bytes_comprimidos = 0
+        self.blocos = 0
+        self.linhas_blocos = 0
+        diario = caminho + SUFIXO_DIARIO
+
+        if os.path.exists(caminho) and os.path.getsize(caminho) > 0:
+            self.sessoes, blocos, fim_valido = varrer(caminho)
+            self.arquivo = open(caminho, 'r+b')
+            self.arquivo.truncate(fim_valido)  # registro cortado por uma queda
+            self.blocos = len(blocos)
+            self.linhas_blocos = sum(b[2] for b in blocos)
+            recuperadas = ler_diario(caminho)
+        else:
+            self.sessoes = []
+            self.arquivo = open(caminho, 'w+b')
+            self.arquivo.write(MAGIC_COMPACTADO)
+            self._sincronizar(self.arquivo)
+            recuperadas = np.zeros(0, dtype=DTYPE_REGISTRO)  # diário de outro arquivo
+        self.arquivo.seek(0, os.SEEK_END)
+
+        self.acumulado = [recuperadas] if len(recuperadas) else []
+        self.n_acumulado = len(recuperadas)
+        self.f = open(diario, 'w+b')
+        if len(recuperadas):
+            self.f.write(recuperadas.tobytes())
+            self._sincronizar(self.f)
+        self.buffer = np.zeros(self.lote, dtype=DTYPE_REGISTRO)
+        self.sessao = 0
+
+    @staticmethod
+    def _sincronizar(f):
+        f.flush()
+        os.fsync(f.fileno())
+
+    def contar(self):
+        self.descarregar()
+        return self.linhas_blocos + self.n_acumulado
+
+    def _registrar_sessao(self, meta):
+        entrada = dict(meta)
+        if entrada in self.sessoes:
+            self.sessao = self.sessoes.index(entrada)
+            return
+        self.sessoes.append(entrada)
+        self.sessao = len(self.sessoes) - 1
+        conteudo = json.dumps(entrada, ensure_ascii=False).encode('utf-8')
+        self.arquivo.write(_registro(TIPO_SESSAO, conteudo))
+        self._sincronizar(self.arquivo)
+
+    def _adicionar(self, timestamp_ns, temp, umid, gases):
+        reg = self.buffer[self.pendentes]
+        reg['timestamp_ns'] = timestamp_ns
+        reg['sessao'] = self.sessao
+        reg['temp'] = temp
+        reg['umid'] = umid
+        for g, valor in zip(CANAIS_GAS, gases):
+            reg[g] = valor
+
+    def _gravar_lote(self):
+        self._acumular(self.buffer[:self.pendentes].copy())
+
+    def escrever_lote(self, timestamps_ns, temps, umids, gases):
+        self.descarregar()
+        bloco = np.empty(len(timestamps_ns), dtype=DTYPE_REGISTRO)
+        bloco['timestamp_ns'] = timestamps_ns
+        bloco['sessao'] = self.sessao
+        bloco['temp'] = temps
+        bloco['umid'] = umids
+        gases = np.asarray(gases)
+        for i, g in enumerate(CANAIS_GAS):
+            bloco[g] = gases[:, i]
+        self.resumo.adicionar_lote(timestamps_ns, gases)
+        self._acumular(bloco)
+        self._concluir_escrita(len(bloco))
+
+    def _acumular(self, registros):
+        self.f.write(registros.tobytes())
+        self.acumulado.append(registros)
+        self.n_acumulado += len(registros)
+
+    def _concluir_escrita(self, n):
+        super()._concluir_escrita(n)
+        if self.n_acumulado >= self.linhas_bloco:
+            self._comprimir(completos_apenas=True)
+
+    def _comprimir(self, completos_apenas=False):
+        """Passa as linhas acumuladas para blocos do .bmz e esvazia o diário."""
+        if not self.n_acumulado:
+            return
+        registros = np.concatenate(self.acumulado)
+        n_blocos = len(registros) // self.linhas_bloco if completos_apenas else \
+            -(-len(registros) // self.linhas_bloco)
+        inicio = 0
+        for _ in range(n_blocos):
+            fatia = registros[inicio:inicio + self.linhas_bloco]
+            dados = _registro(TIPO_BLOCO, codificar_bloco(fatia))
+            self.arquivo.write(dados)
+            self.bytes_comprimidos += len(dados)
+            self.bytes_gravados += len(dados)
+            self.blocos += 1
+            self.linhas_blocos += len(fatia)
+            inicio += len(fatia)
+        # O bloco precisa estar no disco antes de o diário ser esvaziado
+        self._sincronizar(self.arquivo)
+
+        resto = registros[inicio:]
+        self.acumulado = [resto] if len(resto) else []
+        self.n_acumulado = len(resto)
+        self.f.seek(0)
+        self.f.truncate()
+        if len(resto):
+            self.f.write(resto.tobytes())
+        self._sincronizar(self.f)
+        self._posicao = os.fstat(self.f.fileno()).st_size
+
+    def fechar(self):
+        """Comprime o bloco incompleto, apaga o diário e fecha."""
+        if self.f is None:
+            return
+        self.descarregar()
+        self._comprimir()
+        self.f.close()
+        self.f = None
+        os.remove(self.caminho + SUFIXO_DIARIO)
+        self.arquivo.close()
+
+# =============================================================================
+# LEITURA
+# =============================================================================
+
+class LeitorCompactado:
+    """
+    Acesso aleatório a um .bmz: só os blocos que cobrem o trecho pedido são
+    lidos e descomprimidos, e só as colunas pedidas. Inclui as linhas do
+    diário (arquivo ainda sendo gravado pelo coletor).
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.sessoes, self.blocos, _ = varrer(caminho)
+        self.diario = ler_diario(caminho)
+        linhas = np.array([b[2] for b in self.blocos], dtype=np.int64)
+        self.inicios = np.concatenate(([0], np.cumsum(linhas)))
+
+    def __len__(self):
+        return int(self.inicios[-1]) + len(self.diario)
+
+    def dicionario(self):
+        return {'versao': VERSAO_COMPACTADO, 'colunas': list(DTYPE_REGISTRO.names),
+                'sessoes': self.sessoes}
+
+    def _bloco(self, f, i, colunas):
+        offset, tamanho = self.blocos[i][:2]
+        f.seek(offset - REGISTRO.size)
+        _, _, crc = REGISTRO.unpack(f.read(REGISTRO.size))
+        conteudo = f.read(tamanho)
+        if zlib.crc32(conteudo) != crc:
+            raise ValueError(f"Bloco {i} corrompido (CRC): {self.caminho}")
+        return decodificar_bloco(conteudo, colunas)
+
+    def _diario(self, colunas):
+        if colunas is None:
+            return self.diario
+        return np.array(self.diario[list(colunas)], dtype=[(c, DTYPE_REGISTRO[c]) for c in colunas])
+
+    def ler(self, inicio=0, fim=None, colunas=None):
+        """Linhas [inicio, fim) como array estruturado (colunas=None: todas)."""
+        total = len(self)
+        fim = total if fim is None else min(fim, total)
+        inicio = max(0, min(inicio, fim))
+        n_blocos = len(self.blocos)
+        primeiro = int(np.searchsorted(self.inicios, inicio, side='right')) - 1
+        ultimo = int(np.searchsorted(self.inicios, fim, side='left'))
+        partes = []
+        with open(self.caminho, 'rb') as f:
+            for i in range(max(primeiro, 0), min(ultimo, n_blocos)):
+                bloco = self._bloco(f, i, colunas)
+                base = self.inicios[i]
+                partes.append(bloco[max(inicio - base, 0):fim - base])
+        if fim > self.inicios[-1]:
+            base = self.inicios[-1]
+            partes.append(self._diario(colunas)[max(inicio - base, 0):fim - base])
+        if not partes:
+            return self._diario(colunas)[:0]
+        return np.concatenate(partes)
+
+    def entre(self, ts_inicio, ts_fim, colunas=None):
+        """Leituras com ts_inicio <= timestamp_ns < ts_fim (pula os outros blocos)."""
+        nomes = list(DTYPE_REGISTRO.names) if colunas is None else list(colunas)
+        extra = [] if 'timestamp_ns' in nomes else ['timestamp_ns']
+        partes = []
+        with open(self.caminho, 'rb') as f:
+            for i, (_, _, _, ts_min, ts_max) in enumerate(self.blocos):
+                if ts_max >= ts_inicio and ts_min < ts_fim:
+                    partes.append(self._bloco(f, i, extra + nomes))
+        partes.append(self._diario(extra + nomes))
+        registros = np.concatenate(partes)
+        ts = registros['timestamp_ns']
+        selecionados = registros[(ts >= ts_inicio) & (ts < ts_fim)]
+        return np.array(selecionados[nomes], dtype=[(c, DTYPE_REGISTRO[c]) for c in nomes])
+
+    def iterar(self, linhas=LINHAS_BLOCO, colunas=None):
+        """Gera o arquivo em pedaços de até `linhas` linhas."""
+        for inicio in range(0, len(self), linhas):
+            yield self.ler(inicio, inicio + linhas, colunas)
+
+
+def carregar_compactado(caminho):
+    """(registros, dicionario) de um .bmz, como carregar_binario() de um .bme."""
+    leitor = LeitorCompactado(caminho)
+    return leitor.ler(), leitor.dicionario()
+
+# =============================================================================
+# CONVERSÃO
+# =============================================================================
+
+def converter(origem, destino):
+    """
+    Converte entre .csv, .bme e .bmz (o destino escolhe o formato).
+    Retorna o número de leituras gravadas.
+    """
+    if not origem.endswith((EXTENSAO_BINARIO, EXTENSAO_COMPACTADO)):
+        return converter_csv_para_binario(origem, destino)
+
+    registros, dicionario = carregar_registros(origem)
+    sessoes = dicionario['sessoes'] or [{}]
+    codigos = np.asarray(registros['sessao'])
+    mudou = np.flatnonzero(np.diff(codigos)) + 1
+    inicios = np.concatenate(([0], mudou)).astype(np.int64)
+    fins = np.append(inicios[1:], len(registros))
+
+    with abrir_armazenamento(destino, fsync_a_cada=0) as arm:
+        for ini, fim in zip(inicios, fins):
+            if fim <= ini:
+                continue
+            s = sessoes[codigos[ini]]
+            arm.iniciar_sessao(s.get('sessao_id', ''), s.get('amostra_id', ''),
+                               s.get('classe', ''), s.get('notas', ''),
+                               sensor_id=s.get('sensor_id', ''))
+            fatia = registros[ini:fim]
+            arm.escrever_lote(fatia['timestamp_ns'], fatia['temp'], fatia['umid'],
+                              np.column_stack([fatia[g] for g in CANAIS_GAS]))
+        return arm.contar()
+
+
+def conferir(origem, destino):
+    """True se os dois arquivos têm exatamente as mesmas leituras."""
+    a, _ = carregar_registros(origem)
+    b, _ = carregar_registros(destino)
+    return len(a) == len(b) and all(np.array_equal(a[c], b[c]) for c in DTYPE_REGISTRO.names
+                                    if c != 'sessao')
+
+# =============================================================================
+# PONTO DE ENTRADA
+# =============================================================================
+
+def _tamanho(caminho):
+    return f"{os.path.getsize(caminho) / 1024:,.1f} KB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Arquivo compactado (.bmz) de gravações BME688')
+    sub = parser.add_subparsers(dest='comando', required=True)
+    p_comp = sub.add_parser('compactar', help='.csv/.bme -> .bmz')
+    p_comp.add_argument('origem')
+    p_comp.add_argument('destino', nargs='?')
+    p_desc = sub.add_parser('descompactar', help='.bmz -> .bme (ou .csv)')
+    p_desc.add_argument('origem')
+    p_desc.add_argument('destino', nargs='?')
+    for p in (p_comp, p_desc):
+        p.add_argument('--forcar', action='store_true',
+                       help='sobrescrever o destino sem perguntar')
+    p_info = sub.add_parser('info', help='blocos, sessões e taxa de compressão')
+    p_info.add_argument('arquivo')
+    args = parser.parse_args()
+
+    if args.comando == 'info':
+        leitor = LeitorCompactado(args.arquivo)
+        n = len(leitor)
+        bytes_linha = os.path.getsize(args.arquivo) / max(n, 1)
+        print(f"📦 {args.arquivo}: {n:,} leituras em {len(leitor.blocos)} bloco(s) "
+              f"+ {len(leitor.diario)} no diário | {len(leitor.sessoes)} sessão(ões)")
+        print(f"   {bytes_linha:.1f} bytes/leitura | {DTYPE_REGISTRO.itemsize / bytes_linha:.1f}x "
+              f"menor que o .bme")
+        t0 = time.perf_counter()
+        leitor.ler(colunas=CANAIS_GAS)
+        segundos = time.perf_counter() - t0
+        print(f"   Decodificação dos gases: {n / max(segundos, 1e-9) / 1e6:.2f} M leituras/s")
+        return
+
+    padrao = EXTENSAO_COMPACTADO if args.comando == 'compactar' else EXTENSAO_BINARIO
+    destino = args.destino or os.path.splitext(args.origem)[0] + padrao
+    if os.path.abspath(destino) == os.path.abspath(args.origem):
+        print("❌ Origem e destino são o mesmo arquivo")
+        sys.exit(1)
+    existentes = [c for c in (destino, destino + SUFIXO_DIARIO) if os.path.exists(c)]
+    if existentes and not args.forcar:
+        if not sys.stdin.isatty():
+            print(f"❌ {destino} já existe (use --forcar para sobrescrever)")
+            sys.exit(1)
+        resp = input(f"⚠️  {destino} já existe. Sobrescrever? (s/N): ").strip().lower()
+        if resp != 's':
+            sys.exit(1)
+    for caminho in existentes:
+        os.remove(caminho)
+    n = converter(args.origem, destino)
+    registros = (EXTENSAO_BINARIO, EXTENSAO_COMPACTADO)
+    iguais = not (args.origem.endswith(registros) and destino.endswith(registros)) or \
+        conferir(args.origem, destino)
+    razao = os.path.getsize(args.origem) / max(os.path.getsize(destino), 1)
+    print(f"{'✅' if iguais else '❌'} {n:,} leituras: {args.origem} ({_tamanho(args.origem)}) -> "
+          f"{destino} ({_tamanho(destino)}) | {razao:.1f}x")
+    if not iguais:
+        print("   As leituras não conferem com a origem!")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
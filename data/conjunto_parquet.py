@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+CONJUNTO PARQUET PARTICIONADO (CLASSE / DATA / SENSOR)
+=============================================================================
+Junta os arquivos soltos de data/ em um único conjunto Parquet no layout
+Hive, com um esquema só para os dois formatos de CSV:
+- firmware:  Index,Temp,Umid,G320,...,G100 (sem horário nem classe: a
+             classe vem de --classe ou do nome do arquivo, a data do mtime)
+- coletor:   timestamp[,timestamp_ns],sessao_id,...,classe,temp,umid,...
+- .bme:      registros binários do coletor
+
+   parquet/classe=planta/data=2026-01-28/sensor_id=s1/planta-0.parquet
+
+Cada arquivo é ordenado por horário e gravado com estatísticas min/max
+por grupo de linhas. Ao carregar, o filtro por classe/data/sensor descarta
+diretórios inteiros sem abri-los, e só as colunas pedidas são lidas (ex:
+o treinador não lê temp, umid nem notas).
+
+Requer pyarrow (opcional: pip install pyarrow); o resto do projeto
+funciona sem ele.
+
+Uso:
+   python conjunto_parquet.py exportar planta.csv planta2.csv --classe planta
+   python conjunto_parquet.py exportar teste02.csv bancada.bme --destino parquet
+   python conjunto_parquet.py resumo [--destino parquet]
+=============================================================================
+"""
+
+import argparse
+import functools
+import operator
+import os
+import re
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from armazenamento import (CANAIS_GAS, EXTENSOES_REGISTROS, carregar_registros,
+                           local_para_ns, ns_para_local)
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+    PYARROW_DISPONIVEL = True
+except ImportError:
+    PYARROW_DISPONIVEL = False
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+DIRETORIO_PARQUET = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'parquet')
+
+# Ordem dos diretórios do layout Hive
+PARTICOES = ['classe', 'data', 'sensor_id']
+
+# Valores usados quando o arquivo não informa a partição
+CLASSE_PADRAO = 'desconhecida'
+SENSOR_PADRAO = 'principal'
+
+# Linhas por grupo: as estatísticas min/max são por grupo, então grupos
+# menores deixam o filtro por horário pular mais dados
+LINHAS_GRUPO = 65536
+COMPRESSAO = 'zstd'
+
+COLUNAS_TEXTO = ['origem', 'sessao_id', 'amostra_id', 'notas']
+
+# =============================================================================
+# ESQUEMA
+# =============================================================================
+
+def _exigir_pyarrow():
+    if not PYARROW_DISPONIVEL:
+        raise ImportError("pyarrow não está instalado (necessário para Parquet). "
+                          "Instale com: pip install pyarrow")
+
+
+def esquema(com_particoes=False):
+    """Colunas gravadas nos arquivos (as partições ficam nos diretórios)."""
+    _exigir_pyarrow()
+    campos = ([('timestamp_ns', pa.int64()), ('indice', pa.int64())] +
+              [(c, pa.string()) for c in COLUNAS_TEXTO] +
+              [('temp', pa.float32()), ('umid', pa.float32())] +
+              [(g, pa.uint32()) for g in CANAIS_GAS])
+    if com_particoes:
+        campos += [(p, pa.string()) for p in PARTICOES]
+    return pa.schema(campos)
+
+
+def esquema_particoes():
+    _exigir_pyarrow()
+    return ds.partitioning(pa.schema([(p, pa.string()) for p in PARTICOES]), flavor='hive')
+
+# =============================================================================
+# NORMALIZAÇÃO DOS FORMATOS
+# =============================================================================
+
+def classe_do_nome(caminho):
+    """'planta2.csv' -> 'planta', 'ar_neutro_02.csv' -> 'ar_neutro'."""
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    return re.sub(r'[\d_\-]+$', '', nome) or CLASSE_PADRAO
+
+
+def _texto(df, coluna, padrao=''):
+    if coluna not in df.columns:
+        return pd.Series(padrao, index=df.index, dtype=object)
+    return df[coluna].fillna('').astype(str).replace('', padrao)
+
+
+def _ler_binario(caminho):
+    registros, dicionario = carregar_registros(caminho)
+    sessoes = dicionario['sessoes'] or [{}]
+    codigos = np.asarray(registros['sessao'])
+
+    def coluna_sessao(campo):
+        return np.asarray([s.get(campo, '') for s in sessoes], dtype=object)[codigos]
+
+    return pd.DataFrame({
+        'timestamp_ns': np.asarray(registros['timestamp_ns']),
+        **{c: coluna_sessao(c) for c in ('sessao_id', 'amostra_id', 'classe',
+                                         'sensor_id', 'notas')},
+        'temp': registros['temp'],
+        'umid': registros['umid'],
+        **{g: registros[g] for g in CANAIS_GAS},
+    })
+
+
+def normalizar(caminho, classe=None, sensor_id=None):
+    """
+    DataFrame de um CSV (firmware ou coletor) ou .bme com as colunas do
+    esquema() mais as partições. `classe`/`sensor_id` valem para as
+    linhas que não trazem a própria.
+    """
+    if caminho.endswith(EXTENSOES_REGISTROS):
+        df = _ler_binario(caminho)
+    else:
+        df = pd.read_csv(caminho, dtype={c: str for c in ('sessao_id', 'sensor_id',
+                                                          'amostra_id', 'classe', 'notas')})
+        df = df.rename(columns={'Index': 'indice', 'Temp': 'temp', 'Umid': 'umid'})
+
+    # Linhas com canal de gás vazio ou não numérico (ex: cabeçalho repetido)
+    gases = df[CANAIS_GAS].apply(pd.to_numeric, errors='coerce')
+    validas = gases.notna().all(axis=1).to_numpy()
+    df = df[validas]
+    gases = gases[validas]
+
+    origem = os.path.basename(caminho)
+    saida = pd.DataFrame(index=df.index)
+    saida['timestamp_ns'] = _horarios(df)
+    saida['indice'] = (pd.to_numeric(df['indice'], errors='coerce').astype('Int64')
+                       if 'indice' in df.columns else pd.NA)
+    saida['origem'] = origem
+    saida['sessao_id'] = _texto(df, 'sessao_id', os.path.splitext(origem)[0])
+    saida['amostra_id'] = _texto(df, 'amostra_id')
+    saida['notas'] = _texto(df, 'notas')
+    saida['temp'] = pd.to_numeric(df['temp'], errors='coerce').astype(np.float32)
+    saida['umid'] = pd.to_numeric(df['umid'], errors='coerce').astype(np.float32)
+    for g in CANAIS_GAS:
+        saida[g] = gases[g].to_numpy(dtype=np.uint32)
+
+    saida['classe'] = _texto(df, 'classe', classe or classe_do_nome(caminho))
+    saida['sensor_id'] = _texto(df, 'sensor_id', sensor_id or SENSOR_PADRAO)
+    saida['data'] = _datas(saida['timestamp_ns'], caminho)
+
+    # Em ordem de horário (estável: mantém a ordem do arquivo nos empates
+    # e nas leituras sem horário)
+    if saida['timestamp_ns'].notna().any():
+        saida = saida.sort_values('timestamp_ns', kind='stable', na_position='last')
+    return saida.reset_index(drop=True)
+
+
+def _horarios(df):
+    """timestamp_ns (Int64) com o que o arquivo tiver; nulo no CSV do firmware."""
+    ts = pd.Series(pd.NA, index=df.index, dtype='Int64')
+    if 'timestamp_ns' in df.columns:
+        ts = pd.to_numeric(df['timestamp_ns'], errors='coerce').astype('Int64')
+    if 'timestamp' in df.columns and ts.isna().any():
+        faltando = ts.isna() & df['timestamp'].notna()
+        if faltando.any():
+            ts[faltando] = local_para_ns(df.loc[faltando, 'timestamp'])
+    return ts
+
+
+def _datas(timestamps_ns, caminho):
+    """Data local (AAAA-MM-DD) de cada leitura; a do mtime quando não há horário."""
+    datas = pd.Series(datetime.fromtimestamp(os.path.getmtime(caminho)).strftime('%Y-%m-%d'),
+                      index=timestamps_ns.index, dtype=object)
+    com_horario = timestamps_ns.notna().to_numpy()
+    if com_horario.any():
+        locais = ns_para_local(timestamps_ns[com_horario].to_numpy(dtype=np.int64))
+        datas[com_horario] = locais.strftime('%Y-%m-%d')
+    return datas
+
+# =============================================================================
+# EXPORTAÇÃO
+# =============================================================================
+
+def exportar_arquivo(caminho, destino=DIRETORIO_PARQUET, classe=None, sensor_id=None):
+    """
+    Grava um arquivo no conjunto; retorna o número de leituras. Exportar
+    de novo o mesmo arquivo substitui os Parquet dele (nome = origem).
+    """
+    _exigir_pyarrow()
+    df = normalizar(caminho, classe, sensor_id)
+    if df.empty:
+        return 0
+    tabela = pa.Table.from_pandas(df, schema=esquema(com_particoes=True), preserve_index=False)
+    base = re.sub(r'[^\w\-]', '_', os.path.splitext(os.path.basename(caminho))[0])
+    formato = ds.ParquetFileFormat()
+    ds.write_dataset(
+        tabela, destino, format=formato,
+        partitioning=esquema_particoes(),
+        basename_template=f"{base}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        max_rows_per_group=LINHAS_GRUPO,
+        min_rows_per_group=min(LINHAS_GRUPO, len(tabela)),
+        file_options=formato.make_write_options(compression=COMPRESSAO,
+                                                write_statistics=True),
+    )
+    return len(tabela)
+
+# =============================================================================
+# LEITURA COM FILTROS
+# =============================================================================
+
+def abrir_conjunto(destino=DIRETORIO_PARQUET):
+    _exigir_pyarrow()
+    return ds.dataset(destino, format='parquet', partitioning=esquema_particoes())
+
+
+def filtro(classes=None, inicio=None, fim=None, sensores=None):
+    """
+    Expressão do pyarrow para as partições: classes/sensores são listas,
+    inicio/fim datas 'AAAA-MM-DD' (inclusivas). None quando não há filtro.
+    """
+    _exigir_pyarrow()
+    condicoes = []
+    if classes:
+        condicoes.append(ds.field('classe').isin(list(classes)))
+    if sensores:
+        condicoes.append(ds.field('sensor_id').isin(list(sensores)))
+    if inicio:
+        condicoes.append(ds.field('data') >= str(inicio))
+    if fim:
+        condicoes.append(ds.field('data') <= str(fim))
+    return functools.reduce(operator.and_, condicoes) if condicoes else None
+
+
+def carregar(destino=DIRETORIO_PARQUET, colunas=None, classes=None, inicio=None,
+             fim=None, sensores=None):
+    """
+    DataFrame só com as `colunas` (None = todas) das partições que passam
+    no filtro. Retorna (df, arquivos lidos, arquivos no conjunto).
+    """
+    conjunto = abrir_conjunto(destino)
+    expressao = filtro(classes, inicio, fim, sensores)
+    lidos = len(list(conjunto.get_fragments(filter=expressao)))
+    total = len(conjunto.files)
+    tabela = conjunto.to_table(columns=colunas, filter=expressao)
+    return tabela.to_pandas(), lidos, total
+
+
+def resumo(destino=DIRETORIO_PARQUET):
+    """
+    Leituras e intervalo de horário por partição, só pelos rodapés dos
+    Parquet (estatísticas dos grupos de linhas, sem ler os dados).
+    """
+    conjunto = abrir_conjunto(destino)
+    particoes = {}
+    for fragmento in conjunto.get_fragments():
+        chave = os.path.relpath(os.path.dirname(fragmento.path), destino)
+        item = particoes.setdefault(chave, {'arquivos': 0, 'leituras': 0,
+                                            'ts_inicio_ns': None, 'ts_fim_ns': None})
+        metadados = pq.ParquetFile(fragmento.path).metadata
+        coluna = metadados.schema.names.index('timestamp_ns')
+        item['arquivos'] += 1
+        item['leituras'] += metadados.num_rows
+        for g in range(metadados.num_row_groups):
+            stats = metadados.row_group(g).column(coluna).statistics
+            if stats is None or not stats.has_min_max:
+                continue
+            if item['ts_inicio_ns'] is None or stats.min < item['ts_inicio_ns']:
+                item['ts_inicio_ns'] = stats.min
+            if item['ts_fim_ns'] is None or stats.max > item['ts_fim_ns']:
+                item['ts_fim_ns'] = stats.max
+    return dict(sorted(particoes.items()))
+
+# =============================================================================
+# PONTO DE ENTRADA
+# =============================================================================
+
+def _hora(ts_ns):
+    return datetime.fromtimestamp(ts_ns / 1e9).strftime('%H:%M:%S') if ts_ns is not None else '--'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Conjunto Parquet particionado dos dados BME688')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_exp = sub.add_parser('exportar', help='converte CSV/.bme para o conjunto')
+    p_exp.add_argument('arquivos', nargs='+')
+    p_exp.add_argument('--destino', default=DIRETORIO_PARQUET)
+    p_exp.add_argument('--classe', default=None,
+                       help='classe das linhas sem coluna classe (padrão: nome do arquivo)')
+    p_exp.add_argument('--sensor', default=None,
+                       help=f'sensor_id das linhas sem sensor (padrão: {SENSOR_PADRAO})')
+
+    p_res = sub.add_parser('resumo', help='partições, leituras e horários (só metadados)')
+    p_res.add_argument('--destino', default=DIRETORIO_PARQUET)
+    args = parser.parse_args()
+
+    try:
+        if args.comando == 'exportar':
+            for caminho in args.arquivos:
+                n = exportar_arquivo(caminho, args.destino, args.classe, args.sensor)
+                print(f"✅ {os.path.basename(caminho)}: {n:,} leituras")
+            print(f"📦 Conjunto: {args.destino}")
+        else:
+            for chave, item in resumo(args.destino).items():
+                print(f"  📁 {chave}: {item['leituras']:,} leituras em "
+                      f"{item['arquivos']} arquivo(s) | {_hora(item['ts_inicio_ns'])}"
+                      f" - {_hora(item['ts_fim_ns'])}")
+    except ImportError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
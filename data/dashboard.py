@@ -1,13 +1,72 @@
 import streamlit as st
-import serial
 import pandas as pd
+import os
 import time
 import serial.tools.list_ports
 
+from barramento import PREFIXO_PORTA
+from replay import PREFIXO_REPLAY
+from classificador_vivo import SUAVIZACAO_EMA, SUAVIZACAO_JANELA, carregar_classificador
+from janela import JanelaQuadros
+from protocolo import LAYOUT_SEM_INDICE, PROTOCOLO_BINARIO, PROTOCOLO_TEXTO
+from servico_aquisicao import ServicoAquisicao
+
 # --- CONFIGURAÇÃO ---
 # Se souber a porta fixa, coloque aqui (ex: 'COM4'). Se deixar None, ele tenta achar.
-PORTA_PADRAO = 'COM4' 
-BAUD_RATE = 115200
+PORTA_PADRAO = 'COM4'
+GASES = [f'G{t}' for t in [320,295,270,245,220,195,170,145,120,100]]
+
+# Leituras mantidas na memória (buffer circular de tamanho fixo: a memória
+# não cresce mesmo em sessões de dias)
+JANELA_PONTOS = 10_000
+
+# Máximo de atualizações da tela por segundo, qualquer que seja a taxa do sensor
+REDESENHOS_POR_SEGUNDO = 4
+
+# Artefato do treinador usado na classificação ao vivo (vazio = sem classe)
+MODELO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'IA',
+                             'modelo_rf.modelo.npz')
+
+
+@st.cache_resource
+def obter_servico(porta, protocolo):
+    """
+    Um serviço de aquisição por porta no processo do Streamlit, compartilhado
+    por todos os reruns e abas abertas (a porta só é aberta por ele).
+    """
+    return ServicoAquisicao(porta, protocolo, JANELA_PONTOS)
+
+
+def configurar_classificador(servico, caminho, suavizacao):
+    """Liga/troca o classificador do serviço quando o artefato ou a suavização mudam."""
+    atual = servico.classificador
+    if not caminho:
+        servico.definir_classificador(None)
+        return
+    if atual is not None and atual.caminho == caminho and atual.suavizacao == suavizacao:
+        return
+    try:
+        servico.definir_classificador(carregar_classificador(caminho, suavizacao=suavizacao))
+    except (OSError, ValueError, KeyError) as e:
+        st.sidebar.warning(f"Sem classificação: {e}")
+        servico.definir_classificador(None)
+
+
+def mostrar_classe(painel, classificacao):
+    if not classificacao:
+        return
+    latencia = classificacao['latencia']['ponta_a_ponta']['media_ms']
+    painel.metric("🧠 Classe (estável)", classificacao['nome'],
+                  f"{classificacao['confianca']:.0%} dos votos | leitura atual: "
+                  f"{classificacao['nome_bruta']} | {latencia:.1f} ms",
+                  delta_color="off")
+
+
+def para_dataframe(dados, posicoes, colunas):
+    """Fatia da janela -> DataFrame indexado pela posição da leitura."""
+    nomes = {'Temp': 'temp', 'Umid': 'umid'}
+    return pd.DataFrame({c: dados[nomes.get(c, c)] for c in colunas},
+                        index=pd.Index(posicoes, name='Leitura'))
 
 # Configuração da Página
 st.set_page_config(page_title="BME688 Research Lab", layout="wide")
@@ -15,26 +74,22 @@ st.title("🌱 Monitoramento de Plantas em Tempo Real")
 
 # Sidebar para conexão
 st.sidebar.header("Conexão")
-portas_disponiveis = [p.device for p in serial.tools.list_ports.comports()]
+# 'barramento': lê de um publicador (barramento.py) sem ocupar a porta serial
+# 'replay': reproduz uma gravação (replay.py), sem Pico
+portas_disponiveis = ([p.device for p in serial.tools.list_ports.comports()]
+                      + [PREFIXO_PORTA, f"{PREFIXO_REPLAY}:planta.csv?velocidade=10"])
 porta_selecionada = st.sidebar.selectbox("Selecione a Porta COM", portas_disponiveis, index=0 if portas_disponiveis else None)
+protocolo = st.sidebar.selectbox("Protocolo do firmware", [PROTOCOLO_TEXTO, PROTOCOLO_BINARIO])
 conectar = st.sidebar.button("Iniciar Leitura")
 parar = st.sidebar.button("Parar")
+liberar = st.sidebar.button("Liberar porta", help="Fecha a porta para todas as abas (ex: para usar o coleta_gas.py)")
 
-# Containers para Gráficos
-col1, col2 = st.columns(2)
-with col1:
-    st.subheader("🌡️ Clima (Temp/Umid)")
-    chart_clima = st.line_chart([])
-with col2:
-    st.subheader("💨 Resistência dos Gases (10 Passos)")
-    chart_gas = st.line_chart([])
-
-st.subheader("📋 Dados Recentes")
-tabela_dados = st.empty()
+st.sidebar.header("Classificação")
+caminho_modelo = st.sidebar.text_input("Artefato do modelo (.modelo.npz)",
+                                       MODELO_PADRAO if os.path.exists(MODELO_PADRAO) else "")
+suavizacao = st.sidebar.selectbox("Suavização", [SUAVIZACAO_JANELA, SUAVIZACAO_EMA])
 
-# Estado da Sessão (para manter os dados na memória)
-if 'dados' not in st.session_state:
-    st.session_state.dados = pd.DataFrame(columns=['Index', 'Temp', 'Umid'] + [f'G{t}' for t in [320,295,270,245,220,195,170,145,120,100]])
+# Estado da Sessão: só o que esta aba está vendo; os dados ficam no serviço
 if 'lendo' not in st.session_state:
     st.session_state.lendo = False
 
@@ -44,56 +99,77 @@ if conectar:
 if parar:
     st.session_state.lendo = False
 
-# Loop de Leitura
+if liberar and porta_selecionada:
+    obter_servico(porta_selecionada, protocolo).parar()
+    st.session_state.lendo = False
+
+servico = None
 if st.session_state.lendo and porta_selecionada:
     try:
-        # Abre conexão (se já não estiver aberta na lógica do script)
-        ser = serial.Serial(porta_selecionada, BAUD_RATE, timeout=0.1)
-        st.success(f"Conectado em {porta_selecionada}!")
-        
-        placeholder = st.empty()
-        
-        while st.session_state.lendo:
-            if ser.in_waiting > 0:
-                try:
-                    linha = ser.readline().decode('utf-8', errors='ignore').strip()
-                    if linha and linha[0].isdigit():
-                        partes = linha.split(',')
-                        if len(partes) >= 13:
-                            # Converte para numeros
-                            valores = [float(x) for x in partes]
-                            
-                            # Cria dicionário da nova linha
-                            nova_linha = {
-                                'Index': valores[0],
-                                'Temp': valores[1],
-                                'Umid': valores[2]
-                            }
-                            # Adiciona os 10 gases
-                            temps = [320,295,270,245,220,195,170,145,120,100]
-                            for i, t in enumerate(temps):
-                                nova_linha[f'G{t}'] = valores[3+i]
-                            
-                            # Adiciona ao DataFrame global
-                            st.session_state.dados = pd.concat([st.session_state.dados, pd.DataFrame([nova_linha])], ignore_index=True)
-                            
-                            # Mantém apenas as ultimas 100 leituras para não travar
-                            df_vis = st.session_state.dados.tail(100)
-                            
-                            # Atualiza Gráficos em Tempo Real
-                            chart_clima.line_chart(df_vis[['Temp', 'Umid']])
-                            
-                            # Normaliza os gases para caberem no mesmo gráfico (opcional, mas ajuda)
-                            cols_gas = [c for c in df_vis.columns if 'G' in c]
-                            chart_gas.line_chart(df_vis[cols_gas])
-                            
-                            tabela_dados.dataframe(df_vis.tail(5))
-                            
-                except ValueError:
-                    pass
-            
-            time.sleep(0.05) # Pequena pausa para não explodir a CPU
-            
+        # Só a primeira aba (ou a primeira depois de um erro) abre a porta
+        servico = obter_servico(porta_selecionada, protocolo).iniciar()
+        configurar_classificador(servico, caminho_modelo, suavizacao)
     except Exception as e:
         st.error(f"Erro na conexão: {e}")
-        st.session_state.lendo = False  
\ No newline at end of file
+        st.session_state.lendo = False
+
+painel_classe = st.empty()
+
+# Containers para Gráficos (começam com o que o serviço já tem na janela)
+dados, posicoes = servico.desde(0) if servico else JanelaQuadros(1).desde(0)
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("🌡️ Clima (Temp/Umid)")
+    chart_clima = st.line_chart(para_dataframe(dados, posicoes, ['Temp', 'Umid']))
+with col2:
+    st.subheader("💨 Resistência dos Gases (10 Passos)")
+    chart_gas = st.line_chart(para_dataframe(dados, posicoes, GASES))
+
+st.subheader("📋 Dados Recentes")
+tabela_dados = st.empty()
+status = st.sidebar.empty()
+
+# Loop de Desenho (a leitura da porta acontece na thread do serviço)
+if servico:
+    st.success(f"Conectado em {porta_selecionada}!")
+
+    # Gráficos recebem só as linhas novas (add_rows); quando acumulam
+    # mais que 2x a janela são redesenhados a partir dela, para o
+    # navegador também não crescer sem limite
+    desenhado = servico.total
+    inicio_grafico = int(posicoes[0]) if len(posicoes) else 0
+
+    while st.session_state.lendo and servico.rodando:
+        # Dorme até chegar leitura nova (ou 1 s, para atualizar o status)
+        servico.aguardar(desenhado, timeout=1.0)
+
+        total = servico.total
+        if total > desenhado:
+            if total - inicio_grafico > 2 * JANELA_PONTOS:
+                novos, posicoes = servico.desde(0)
+                chart_clima.line_chart(para_dataframe(novos, posicoes, ['Temp', 'Umid']))
+                chart_gas.line_chart(para_dataframe(novos, posicoes, GASES))
+                inicio_grafico = int(posicoes[0])
+            else:
+                novos, posicoes = servico.desde(desenhado)
+                chart_clima.add_rows(para_dataframe(novos, posicoes, ['Temp', 'Umid']))
+                chart_gas.add_rows(para_dataframe(novos, posicoes, GASES))
+            desenhado = int(posicoes[-1]) + 1
+
+            ultimos, posicoes = servico.desde(desenhado - 5)
+            tabela = para_dataframe(ultimos, posicoes, ['Temp', 'Umid'] + GASES)
+            if servico.estado()['layout'] != LAYOUT_SEM_INDICE:
+                tabela.insert(0, 'Index', ultimos['indice'])
+            tabela_dados.dataframe(tabela)
+
+        estado = servico.estado()
+        mostrar_classe(painel_classe, estado['classificacao'])
+        status.caption(f"📟 {estado['leituras']} leituras | "
+                       f"{sum(estado['rejeitados'].values())} rejeitadas | "
+                       f"{estado['perdidos']} perdidas")
+
+        time.sleep(1.0 / REDESENHOS_POR_SEGUNDO)  # Limita os redesenhos por segundo
+
+    if servico.erro:
+        st.error(f"Erro na conexão: {servico.erro}")
+        st.session_state.lendo = False
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+JANELA CIRCULAR DE LEITURAS (NUMPY)
+=============================================================================
+Guarda as últimas N leituras em um array estruturado de tamanho fixo:
+- adicionar() copia um lote inteiro com no máximo duas fatias (O(lote),
+  sem crescer memória nem reconstruir DataFrames)
+- ultimos(n) devolve as n leituras mais recentes em ordem
+- desde(cursor) devolve só o que chegou depois de um cursor (total de
+  leituras já vistas), para atualizações incrementais de gráficos
+
+A memória usada é capacidade x 112 bytes, não importa por quanto tempo a
+coleta rode (10.000 pontos ~ 1,1 MB).
+=============================================================================
+"""
+
+import numpy as np
+
+from protocolo import DTYPE_QUADRO, matriz
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+CAPACIDADE_JANELA = 10_000
+
+DTYPE_JANELA = np.dtype([('timestamp_ns', '<i8')] + DTYPE_QUADRO.descr)
+
+# =============================================================================
+# JANELA
+# =============================================================================
+
+class JanelaQuadros:
+    """Buffer circular de capacidade fixa para quadros com timestamp."""
+
+    def __init__(self, capacidade=CAPACIDADE_JANELA):
+        self.capacidade = capacidade
+        self.dados = np.zeros(capacidade, dtype=DTYPE_JANELA)
+        # Todos os campos têm 8 bytes: a mesma memória como matriz (n, 14)
+        # permite copiar um lote com uma atribuição por fatia
+        self._linhas = self.dados.view(np.int64).reshape(capacidade, len(DTYPE_JANELA.names))
+        self.total = 0  # leituras já adicionadas desde o início
+
+    def __len__(self):
+        return min(self.total, self.capacidade)
+
+    def adicionar(self, timestamps_ns, quadros):
+        """Acrescenta um lote; as leituras mais antigas são sobrescritas."""
+        n = len(quadros)
+        if n == 0:
+            return
+        # Lote maior que a janela: só as últimas `capacidade` leituras importam
+        pular = max(0, n - self.capacidade)
+        m = n - pular
+        inicio = (self.total + pular) % self.capacidade
+        primeira = min(m, self.capacidade - inicio)
+        valores = matriz(quadros).view(np.int64)
+        for destino, fatia in ((slice(inicio, inicio + primeira), slice(pular, pular + primeira)),
+                               (slice(0, m - primeira), slice(pular + primeira, n))):
+            self._linhas[destino, 0] = timestamps_ns[fatia]
+            self._linhas[destino, 1:] = valores[fatia]
+        self.total += n
+
+    def ultimos(self, n=None):
+        """Cópia das `n` leituras mais recentes (todas, se None), em ordem."""
+        k = len(self) if n is None else min(n, len(self))
+        fim = self.total % self.capacidade
+        inicio = (fim - k) % self.capacidade
+        if k == 0:
+            return self.dados[:0].copy()
+        if inicio < fim:
+            return self.dados[inicio:fim].copy()
+        return np.concatenate((self.dados[inicio:], self.dados[:fim]))
+
+    def desde(self, cursor):
+        """
+        Leituras adicionadas depois de `cursor` (um valor anterior de
+        `total`) e as posições absolutas delas. Se o cursor ficou para trás
+        da janela, devolve só o que ainda está nela.
+        """
+        recentes = self.ultimos(self.total - cursor)
+        posicoes = np.arange(self.total - len(recentes), self.total)
+        return recentes, posicoes
+
+    def limpar(self):
+        self.total = 0
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+MÉTRICAS DA COLETA (HISTOGRAMAS, PROMETHEUS E SNAPSHOT JSON)
+=============================================================================
+Instrumentação barata para o caminho quente do coletor:
+- Histograma: baldes fixos (limites em segundos), observar_lote() em NumPy
+  para registrar um lote inteiro de uma vez
+- texto_prometheus(): converte um dicionário de contadores (ex:
+  PipelineColeta.estatisticas()) no formato texto do Prometheus
+- ServidorMetricas: http://127.0.0.1:<porta>/metrics em uma thread, para
+  acompanhar uma coleta longa (curl, Prometheus, Grafana)
+- gravar_snapshot(): JSON atômico (tmp + replace), lido a qualquer momento
+  sem pegar um arquivo pela metade
+=============================================================================
+"""
+
+import json
+import math
+import os
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+# Intervalo entre quadros (s): o BME688 com perfil de aquecimento completo
+# entrega uma leitura a cada poucos segundos; travamentos passam de 10 s
+LIMITES_INTERVALO_S = (0.001, 0.01, 0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+# Latência de gravação/descarga (s): de flush em cache até fsync em cartão SD
+LIMITES_LATENCIA_S = (1e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+PREFIXO_PROMETHEUS = 'bme688_coleta'
+ENDERECO_METRICAS = '127.0.0.1'
+
+# =============================================================================
+# HISTOGRAMA
+# =============================================================================
+
+class Histograma:
+    """Contagens por balde (valor <= limite), soma e total, como no Prometheus."""
+
+    def __init__(self, limites):
+        self.limites = np.asarray(limites, dtype=np.float64)
+        self._limites = [float(x) for x in limites]  # bisect sem NumPy por valor
+        self.contagens = np.zeros(len(self.limites) + 1, dtype=np.int64)  # último: +Inf
+        self.soma = 0.0
+        self.n = 0
+
+    def observar(self, valor):
+        self.contagens[bisect_left(self._limites, valor)] += 1
+        self.soma += valor
+        self.n += 1
+
+    def observar_lote(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        if len(valores) == 0:
+            return
+        baldes = np.searchsorted(self.limites, valores, side='left')
+        self.contagens += np.bincount(baldes, minlength=len(self.contagens))
+        self.soma += float(valores.sum())
+        self.n += len(valores)
+
+    def percentil(self, p):
+        """Limite superior do balde que contém o percentil `p` (0-100)."""
+        if self.n == 0:
+            return 0.0
+        balde = int(np.searchsorted(np.cumsum(self.contagens), math.ceil(self.n * p / 100)))
+        return float(self.limites[balde]) if balde < len(self.limites) else math.inf
+
+    def como_dict(self):
+        return {
+            'limites': self.limites.tolist(),
+            'contagens': self.contagens.tolist(),
+            'soma': self.soma,
+            'n': self.n,
+            'media': self.soma / self.n if self.n else 0.0,
+            'p50': self.percentil(50),
+            'p99': self.percentil(99),
+        }
+
+# =============================================================================
+# FORMATO PROMETHEUS
+# =============================================================================
+
+def _eh_histograma(valor):
+    return isinstance(valor, dict) and 'limites' in valor and 'contagens' in valor
+
+
+def _numero(valor):
+    if valor is None:
+        return 'NaN'
+    if math.isinf(valor):
+        return '+Inf' if valor > 0 else '-Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(int(valor))
+
+
+def _linhas_histograma(nome, h):
+    linhas = [f"# TYPE {nome} histogram"]
+    acumulado = np.cumsum(h['contagens'])
+    for limite, n in zip(list(h['limites']) + [math.inf], acumulado):
+        linhas.append(f'{nome}_bucket{{le="{_numero(float(limite))}"}} {int(n)}')
+    linhas.append(f"{nome}_sum {_numero(float(h['soma']))}")
+    linhas.append(f"{nome}_count {int(h['n'])}")
+    return linhas
+
+
+def texto_prometheus(dados, prefixo=PREFIXO_PROMETHEUS):
+    """
+    Texto de exposição do Prometheus para um dicionário de métricas.
+    Números viram uma amostra; dicionários de números, uma amostra por
+    chave (rótulo 'chave'); histogramas (como_dict) viram _bucket/_sum/_count.
+    """
+    linhas = []
+
+    def visitar(nome, valor):
+        if _eh_histograma(valor):
+            linhas.extend(_linhas_histograma(nome, valor))
+        elif isinstance(valor, bool):
+            linhas.append(f"{nome} {int(valor)}")
+        elif isinstance(valor, (int, float)):
+            linhas.append(f"{nome} {_numero(valor)}")
+        elif isinstance(valor, dict):
+            if valor and all(isinstance(v, (int, float)) and not isinstance(v, bool)
+                             for v in valor.values()):
+                linhas.extend(f'{nome}{{chave="{k}"}} {_numero(v)}' for k, v in valor.items())
+            else:
+                for k, v in valor.items():
+                    visitar(f"{nome}_{k}", v)
+
+    for chave, valor in dados.items():
+        visitar(f"{prefixo}_{chave}", valor)
+    return "\n".join(linhas) + "\n"
+
+# =============================================================================
+# EXPOSIÇÃO
+# =============================================================================
+
+class ServidorMetricas:
+    """GET /metrics em texto do Prometheus, com o que `fonte()` devolver."""
+
+    def __init__(self, porta, fonte, endereco=ENDERECO_METRICAS):
+        class Tratador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                corpo = texto_prometheus(fonte()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(corpo)))
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def log_message(self, *args):
+                pass  # sem uma linha no terminal a cada consulta
+
+        self.servidor = ThreadingHTTPServer((endereco, porta), Tratador)
+        self.servidor.daemon_threads = True
+        self.endereco = f"http://{endereco}:{self.servidor.server_address[1]}/metrics"
+        self._thread = threading.Thread(target=self.servidor.serve_forever,
+                                        name='metricas', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        self._thread.join()
+
+
+def gravar_snapshot(caminho, dados):
+    """Grava `dados` em JSON sem deixar um arquivo incompleto no caminho."""
+    temporario = caminho + '.tmp'
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, indent=2, ensure_ascii=False, default=float)
+    os.replace(temporario, caminho)
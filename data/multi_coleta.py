@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+COLETA MULTI-SENSOR BME688 (ASYNCIO)
+=============================================================================
+Lê várias portas seriais (um Pico + BME688 por porta) em um único processo
+e uma única thread:
+- No Linux/macOS cada porta é registrada no loop asyncio com add_reader
+  (epoll/kqueue): nenhuma porta fica em busy-wait, 16+ portas em um núcleo
+- No Windows (sem add_reader para portas COM) cada porta usa uma thread
+  de leitura bloqueante que entrega os bytes ao loop
+- Cada leitura é marcada com o sensor_id da porta e com o horário do
+  relógio daquele sensor (relogio.py: Index + chegada, sem o jitter do host)
+- Saída 'separado': um arquivo por sensor (<saida>_<sensor_id>.csv/.bme/.bmz)
+- Saída 'unico': todos os sensores no mesmo arquivo, coluna sensor_id,
+  com as leituras intercaladas em ordem de horário
+- --protocolo binario: quadros com CRC; o status mostra entre parênteses
+  os quadros perdidos (saltos no número de sequência)
+
+Uso:
+   python multi_coleta.py --porta s1=/dev/ttyACM0 --porta s2=/dev/ttyACM1 \\
+       --classe planta --amostra bancada_01 --saida coleta.bme --modo unico
+
+Sem hardware (Linux), com o simulador de portas:
+   python simulador_pty.py --sensores 16        # imprime as portas criadas
+   python multi_coleta.py --porta s1=/dev/pts/3 ... --duracao 30
+=============================================================================
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import serial
+
+from armazenamento import CABECALHO_SENSOR, abrir_armazenamento
+from catalogo import Catalogo
+from protocolo import PROTOCOLO_BINARIO, PROTOCOLO_TEXTO, criar_parser, matriz
+from relogio import RelogioSensor, agora_ns, mesclar_fluxos
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+BAUD_RATE = 115200
+
+# Intervalo (s) entre gravações em lote e entre linhas de status
+INTERVALO_GRAVACAO = 0.5
+INTERVALO_STATUS = 5.0
+
+# =============================================================================
+# SENSOR
+# =============================================================================
+
+class SensorSerial:
+    """Uma porta serial: bytes recebidos -> leituras pendentes de gravação."""
+
+    def __init__(self, sensor_id, porta, protocolo=PROTOCOLO_TEXTO):
+        self.sensor_id = sensor_id
+        self.porta = porta
+        self.ser = None
+        self.parser = criar_parser(protocolo)
+        self.relogio = RelogioSensor()
+        self.timestamps = []
+        self.quadros = []
+        self.bytes_lidos = 0
+        self.gravados = 0
+        self.erro = None
+
+    def abrir(self, timeout):
+        self.ser = serial.Serial(self.porta, BAUD_RATE, timeout=timeout)
+
+    def receber(self, dados):
+        """Processa bytes recebidos (chamado sempre no thread do loop)."""
+        if not dados:
+            return
+        self.bytes_lidos += len(dados)
+        timestamps, quadros = self.parser.processar([(agora_ns(), dados)])
+        if len(quadros):
+            timestamps = self.relogio.converter(quadros['indice'], timestamps)
+            # O array do parser é reaproveitado: guarda uma cópia
+            self.timestamps.append(timestamps)
+            self.quadros.append(quadros.copy())
+
+    def ler_disponivel(self):
+        """Callback do add_reader: a porta tem bytes prontos."""
+        try:
+            self.receber(self.ser.read(self.ser.in_waiting or 1))
+        except (serial.SerialException, OSError) as e:
+            self.erro = e
+            asyncio.get_running_loop().remove_reader(self.ser.fileno())
+
+    def retirar_pendentes(self):
+        """Remove e retorna as leituras acumuladas desde a última gravação."""
+        if not self.quadros:
+            return None
+        timestamps = np.concatenate(self.timestamps)
+        quadros = np.concatenate(self.quadros)
+        self.timestamps = []
+        self.quadros = []
+        return timestamps, quadros
+
+    def fechar(self):
+        if self.ser and self.ser.is_open:
+            self.ser.close()
+
+# =============================================================================
+# COLETOR
+# =============================================================================
+
+class ColetorMultiSensor:
+    """Aquisição concorrente de N portas em um loop asyncio."""
+
+    def __init__(self, portas, saida, classe, amostra_id, notas="", modo='separado',
+                 protocolo=PROTOCOLO_TEXTO):
+        self.sensores = [SensorSerial(sid, porta, protocolo) for sid, porta in portas.items()]
+        self.saida = saida
+        self.classe = classe
+        self.amostra_id = amostra_id
+        self.notas = notas
+        self.modo = modo
+        self.sessao_id = datetime.now().strftime('%Y%m%d_%H%M%S')
+        self.armazenamentos = {}
+        self.parar_evento = None
+        self._threads = []
+
+    def _abrir_saidas(self):
+        base, ext = os.path.splitext(self.saida)
+        if self.modo == 'unico':
+            arm = abrir_armazenamento(self.saida, **self._opcoes(self.saida))
+            for s in self.sensores:
+                self.armazenamentos[s.sensor_id] = arm
+        else:
+            for s in self.sensores:
+                caminho = f"{base}_{s.sensor_id}{ext}"
+                self.armazenamentos[s.sensor_id] = abrir_armazenamento(
+                    caminho, **self._opcoes(caminho))
+
+        # Garante a entrada no catálogo para o registro incremental no final
+        for arm in set(self.armazenamentos.values()):
+            arm.descarregar()
+            diretorio, nome = os.path.split(os.path.abspath(arm.caminho))
+            catalogo = Catalogo(diretorio)
+            catalogo.entrada(nome)
+            catalogo.salvar()
+
+    @staticmethod
+    def _opcoes(caminho):
+        return {'cabecalho': CABECALHO_SENSOR} if caminho.endswith('.csv') else {}
+
+    def _gravar(self):
+        """Grava em lote o que cada sensor acumulou."""
+        lotes = []
+        for s in self.sensores:
+            pendentes = s.retirar_pendentes()
+            if pendentes is not None:
+                lotes.append((s, *pendentes))
+                s.gravados += len(pendentes[1])
+
+        if self.modo == 'unico' and len(lotes) > 1:
+            self._gravar_intercalado(lotes)
+        else:
+            for s, timestamps, quadros in lotes:
+                self._gravar_trecho(s, timestamps, quadros)
+        for arm in set(self.armazenamentos.values()):
+            arm.descarregar()
+
+    def _gravar_trecho(self, sensor, timestamps, quadros):
+        arm = self.armazenamentos[sensor.sensor_id]
+        arm.iniciar_sessao(self.sessao_id, self.amostra_id, self.classe,
+                           self.notas, sensor_id=sensor.sensor_id)
+        arm.escrever_lote(timestamps, quadros['temp'], quadros['umid'],
+                          matriz(quadros)[:, 3:])
+
+    def _gravar_intercalado(self, lotes):
+        """Arquivo único: leituras de todos os sensores em ordem de horário."""
+        ordem, origem = mesclar_fluxos([timestamps for _, timestamps, _ in lotes])
+        timestamps = np.concatenate([t for _, t, _ in lotes])[ordem]
+        quadros = np.concatenate([q for _, _, q in lotes])[ordem]
+        # Um iniciar_sessao por trecho contínuo do mesmo sensor
+        cortes = np.flatnonzero(np.diff(origem)) + 1
+        inicios = np.concatenate(([0], cortes))
+        fins = np.concatenate((cortes, [len(origem)]))
+        for inicio, fim in zip(inicios, fins):
+            sensor = lotes[origem[inicio]][0]
+            self._gravar_trecho(sensor, timestamps[inicio:fim], quadros[inicio:fim])
+
+    def _ler_em_thread(self, sensor, loop):
+        """Leitura bloqueante (Windows): entrega os bytes ao loop."""
+        while not self.parar_evento.is_set():
+            try:
+                dados = sensor.ser.read(sensor.ser.in_waiting or 1)
+            except (serial.SerialException, OSError) as e:
+                sensor.erro = e
+                return
+            if dados:
+                loop.call_soon_threadsafe(sensor.receber, dados)
+
+    def _mostrar_status(self, inicio):
+        decorrido = time.monotonic() - inicio
+        total = sum(s.gravados for s in self.sensores)
+        partes = [f"{s.sensor_id}={s.gravados}"
+                  + (f"(-{s.parser.perdidos})" if getattr(s.parser, 'perdidos', 0) else "")
+                  + (" ❌" if s.erro else "")
+                  for s in self.sensores]
+        print(f"[{decorrido:7.1f}s] {total} leituras ({total / max(decorrido, 1e-9):.1f}/s) | "
+              + " ".join(partes))
+
+    async def executar(self, duracao=None):
+        """Roda até parar() ser chamado, Ctrl+C ou `duracao` segundos."""
+        loop = asyncio.get_running_loop()
+        self.parar_evento = threading.Event()
+        usa_add_reader = os.name == 'posix'
+
+        inicio = time.monotonic()
+        ultimo_status = inicio
+        try:
+            # Dentro do try: se uma porta falhar ao abrir, as já abertas
+            # (e seus leitores) são fechadas no finally
+            for s in self.sensores:
+                s.abrir(timeout=0 if usa_add_reader else 0.2)
+                if usa_add_reader:
+                    loop.add_reader(s.ser.fileno(), s.ler_disponivel)
+                else:
+                    t = threading.Thread(target=self._ler_em_thread, args=(s, loop),
+                                         name=f'leitor-{s.sensor_id}', daemon=True)
+                    t.start()
+                    self._threads.append(t)
+            self._abrir_saidas()
+
+            while not self.parar_evento.is_set():
+                await asyncio.sleep(INTERVALO_GRAVACAO)
+                self._gravar()
+                agora = time.monotonic()
+                if agora - ultimo_status >= INTERVALO_STATUS:
+                    self._mostrar_status(inicio)
+                    ultimo_status = agora
+                if duracao is not None and agora - inicio >= duracao:
+                    break
+        finally:
+            self.parar_evento.set()
+            for s in self.sensores:
+                if usa_add_reader and s.ser and s.ser.is_open and s.erro is None:
+                    loop.remove_reader(s.ser.fileno())
+            for t in self._threads:
+                t.join()
+            if self.armazenamentos:
+                self._gravar()
+            self._fechar_saidas()
+            for s in self.sensores:
+                s.fechar()
+        self._mostrar_status(inicio)
+
+    def parar(self):
+        if self.parar_evento:
+            self.parar_evento.set()
+
+    def _fechar_saidas(self):
+        for arm in set(self.armazenamentos.values()):
+            arm.fechar()
+            diretorio, nome = os.path.split(os.path.abspath(arm.caminho))
+            Catalogo(diretorio).registrar_sessoes(nome, arm.resumos.values())
+
+# =============================================================================
+# PONTO DE ENTRADA
+# =============================================================================
+
+def interpretar_portas(itens):
+    """Converte ['s1=/dev/ttyACM0', '/dev/ttyACM1'] em {sensor_id: porta}."""
+    portas = {}
+    for i, item in enumerate(itens, 1):
+        if '=' in item:
+            sensor_id, porta = item.split('=', 1)
+        else:
+            sensor_id, porta = f"sensor_{i:02d}", item
+        portas[sensor_id] = porta
+    return portas
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Coleta concorrente de vários BME688')
+    parser.add_argument('--porta', action='append', required=True,
+                        help='sensor_id=porta (repita para cada sensor)')
+    parser.add_argument('--classe', required=True)
+    parser.add_argument('--amostra', default='')
+    parser.add_argument('--notas', default='')
+    parser.add_argument('--saida', required=True,
+                        help='arquivo .csv, .bme ou .bmz (base do nome no modo separado)')
+    parser.add_argument('--modo', choices=['separado', 'unico'], default='separado')
+    parser.add_argument('--protocolo', choices=[PROTOCOLO_TEXTO, PROTOCOLO_BINARIO],
+                        default=PROTOCOLO_TEXTO, help='formato enviado pelo firmware')
+    parser.add_argument('--duracao', type=float, default=None,
+                        help='segundos de coleta (padrão: até Ctrl+C)')
+    args = parser.parse_args()
+
+    portas = interpretar_portas(args.porta)
+    amostra_id = args.amostra or f"{args.classe}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    coletor = ColetorMultiSensor(portas, args.saida, args.classe.lower(), amostra_id,
+                                 args.notas, args.modo, args.protocolo)
+
+    print(f"📟 {len(portas)} sensor(es): " + ", ".join(f"{k}={v}" for k, v in portas.items()))
+    print(f"📊 Sessão {coletor.sessao_id} | saída {args.saida} ({args.modo}) | Ctrl+C = parar")
+    try:
+        asyncio.run(coletor.executar(args.duracao))
+    except KeyboardInterrupt:
+        pass
+    except serial.SerialException as e:
+        print(f"❌ Erro ao abrir porta: {e}")
+        sys.exit(1)
+    print("✅ Coleta finalizada!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+PIPELINE DE AQUISIÇÃO BME688 (PRODUTOR/CONSUMIDOR)
+=============================================================================
+Separa a leitura da porta serial do resto do processamento:
+
+   [thread leitora]  ser.read() -> bytes brutos -> FilaCircular
+                     (barramento: ser.ler_quadros() -> quadros prontos)
+   [thread de processamento]
+        etapa parse: blocos -> quadros (protocolo.py, texto ou binário, em lote)
+        relógio:     chegada no host + Index -> horário do sensor (relogio.py)
+        etapa sink:  leituras -> Armazenamento.escrever_lote()
+
+A thread leitora nunca espera disco nem terminal, então o buffer USB CDC
+do Pico é drenado continuamente. Se a fila encher, o bloco é descartado e
+contado (blocos, bytes e quadros perdidos) em vez de travar a leitura.
+
+Contadores expostos por PipelineColeta.estatisticas():
+- quadros lidos, rejeitados (por motivo), gravados, descartados
+- bytes lidos da serial e gravados no arquivo
+- profundidade atual/máxima da fila e backlog da serial (in_waiting)
+- latência média/máxima por etapa (leitura, parse, sink, ponta a ponta)
+- histogramas (metricas.py) do intervalo entre quadros, da gravação de
+  cada lote e de cada descarga do armazenamento (flush/fsync)
+=============================================================================
+"""
+
+import threading
+import time
+
+import numpy as np
+
+from metricas import LIMITES_INTERVALO_S, LIMITES_LATENCIA_S, Histograma
+from protocolo import (
+    PROTOCOLO_BINARIO, PROTOCOLO_QUADROS, PROTOCOLO_TEXTO, TAMANHO_QUADRO, criar_parser,
+    matriz
+)
+from relogio import RelogioSensor, agora_ns
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+# Blocos brutos que cabem na fila entre a leitura e o processamento
+CAPACIDADE_FILA = 4096
+
+# Máximo de blocos retirados da fila por iteração da etapa de parse
+LOTE_PROCESSAMENTO = 64
+
+# =============================================================================
+# BUFFER CIRCULAR
+# =============================================================================
+
+class FilaCircular:
+    """
+    Buffer circular limitado para um produtor e um consumidor.
+
+    Só o produtor altera `cauda` e só o consumidor altera `cabeca`; o item é
+    escrito antes de a cauda avançar, então não há lock no caminho comum.
+    Quando cheia, colocar() descarta o item e incrementa `descartados`.
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_FILA):
+        self.capacidade = capacidade
+        self.itens = [None] * capacidade
+        self.cabeca = 0
+        self.cauda = 0
+        self.descartados = 0
+        self.profundidade_max = 0
+        self.sinal = threading.Event()
+
+    @property
+    def profundidade(self):
+        return self.cauda - self.cabeca
+
+    def colocar(self, item):
+        """Adiciona um item; retorna False se a fila estiver cheia."""
+        ocupados = self.cauda - self.cabeca
+        if ocupados >= self.capacidade:
+            self.descartados += 1
+            return False
+        self.itens[self.cauda % self.capacidade] = item
+        self.cauda += 1
+        if ocupados + 1 > self.profundidade_max:
+            self.profundidade_max = ocupados + 1
+        self.sinal.set()
+        return True
+
+    def retirar_lote(self, maximo):
+        """Remove até `maximo` itens, na ordem de chegada."""
+        n = min(self.cauda - self.cabeca, maximo)
+        lote = []
+        for i in range(self.cabeca, self.cabeca + n):
+            pos = i % self.capacidade
+            lote.append(self.itens[pos])
+            self.itens[pos] = None
+        self.cabeca += n
+        return lote
+
+    def aguardar(self, timeout):
+        """Bloqueia até haver itens ou o timeout expirar."""
+        self.sinal.clear()
+        if self.profundidade == 0:
+            self.sinal.wait(timeout)
+
+# =============================================================================
+# ESTATÍSTICAS
+# =============================================================================
+
+class LatenciaEtapa:
+    """Acumula tempo gasto por uma etapa do pipeline."""
+
+    def __init__(self):
+        self.chamadas = 0
+        self.itens = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def registrar(self, duracao_ns, itens=1):
+        self.chamadas += 1
+        self.itens += itens
+        self.total_ns += duracao_ns
+        if duracao_ns > self.max_ns:
+            self.max_ns = duracao_ns
+
+    def como_dict(self):
+        media = self.total_ns / self.chamadas if self.chamadas else 0
+        return {
+            'chamadas': self.chamadas,
+            'itens': self.itens,
+            'media_ms': media / 1e6,
+            'max_ms': self.max_ns / 1e6,
+        }
+
+# =============================================================================
+# PIPELINE
+# =============================================================================
+
+class PipelineColeta:
+    """Leitura serial em thread própria, parse e gravação em lote."""
+
+    def __init__(self, ser, armazenamento, capacidade=CAPACIDADE_FILA,
+                 lote=LOTE_PROCESSAMENTO, ao_gravar=None, protocolo=PROTOCOLO_TEXTO):
+        self.ser = ser
+        self.armazenamento = armazenamento
+        self.fila = FilaCircular(capacidade)
+        self.lote = lote
+        self.ao_gravar = ao_gravar
+        self.protocolo = protocolo
+        self.parser = criar_parser(protocolo)
+        self.relogio = RelogioSensor()
+        self.pausado = False
+        self.rodando = False
+        self.erro = None
+
+        self.bytes_lidos = 0
+        self.bytes_descartados = 0
+        self.quadros_descartados = 0
+        self.gravados = 0
+        self.pausados = 0
+        self.latencia = {
+            'leitura': LatenciaEtapa(),
+            'parse': LatenciaEtapa(),
+            'sink': LatenciaEtapa(),
+            'ponta_a_ponta': LatenciaEtapa(),
+        }
+        self.in_waiting = 0
+        self.in_waiting_max = 0
+        self.intervalos = Histograma(LIMITES_INTERVALO_S)
+        self.gravacoes = Histograma(LIMITES_LATENCIA_S)
+        self._ultimo_quadro_ns = None
+        self._threads = []
+
+    def iniciar(self):
+        """Dispara as threads de leitura e processamento."""
+        self.rodando = True
+        self._threads = [
+            threading.Thread(target=self._ler, name='leitor-serial', daemon=True),
+            threading.Thread(target=self._processar, name='processamento', daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def parar(self):
+        """Para a leitura e espera a fila ser drenada e gravada."""
+        self.rodando = False
+        self.fila.sinal.set()
+        for t in self._threads:
+            t.join()
+        try:
+            self.armazenamento.descarregar()
+        except Exception as e:
+            # Mantém o primeiro erro (normalmente a mesma falha de disco)
+            if self.erro is None:
+                self.erro = e
+
+    def _ler(self):
+        """Thread leitora: só move bytes da serial para a fila."""
+        latencia = self.latencia['leitura']
+        while self.rodando:
+            try:
+                pendentes = self.ser.in_waiting
+                if self.protocolo == PROTOCOLO_QUADROS:
+                    # Barramento: quadros já decodificados, com o horário
+                    # de chegada no publicador
+                    item = self.ser.ler_quadros()
+                    self.parser.perdidos = self.ser.perdidos
+                    tamanho = item[1].nbytes
+                else:
+                    dados = self.ser.read(pendentes or 1)
+                    item = (agora_ns(), dados)
+                    tamanho = len(dados)
+            except Exception as e:  # porta desconectada, etc.
+                self.erro = e
+                self.rodando = False
+                break
+            # Backlog no buffer de entrada da serial antes da leitura
+            self.in_waiting = pendentes
+            if pendentes > self.in_waiting_max:
+                self.in_waiting_max = pendentes
+            if not tamanho:
+                continue
+            t0 = time.perf_counter_ns()
+            self.bytes_lidos += tamanho
+            if not self.fila.colocar(item):
+                self.bytes_descartados += tamanho
+                self.quadros_descartados += self._contar_quadros(item)
+            latencia.registrar(time.perf_counter_ns() - t0, tamanho)
+
+    def _contar_quadros(self, item):
+        dados = item[1]
+        if self.protocolo == PROTOCOLO_QUADROS:
+            return len(dados)
+        if self.protocolo == PROTOCOLO_BINARIO:
+            return len(dados) // TAMANHO_QUADRO
+        return dados.count(b'\n')
+
+    def _processar(self):
+        """Thread de processamento: parse e gravação em lote."""
+        while self.rodando or self.fila.profundidade:
+            blocos = self.fila.retirar_lote(self.lote)
+            if not blocos:
+                self.fila.aguardar(0.1)
+                continue
+            try:
+                self._processar_lote(blocos)
+            except Exception as e:  # disco cheio, erro de E/S, etc.
+                # Para a coleta inteira: sem gravação, o leitor só encheria
+                # a fila e descartaria tudo com o status parecendo normal
+                self.erro = e
+                self.rodando = False
+                self.fila.sinal.set()
+                break
+
+    def _processar_lote(self, blocos):
+        t0 = time.perf_counter_ns()
+        timestamps, quadros = self.parser.processar(blocos)
+        t1 = time.perf_counter_ns()
+        self.latencia['parse'].registrar(t1 - t0, len(blocos))
+        if len(quadros) == 0:
+            return
+        timestamps = self.relogio.converter(quadros['indice'], timestamps)
+        self._observar_intervalos(timestamps)
+        if self.pausado:
+            self.pausados += len(quadros)
+            return
+
+        # Vistas do buffer do parser: consumidas antes do próximo lote
+        temps, umids, gases = quadros['temp'], quadros['umid'], matriz(quadros)[:, 3:]
+        self.armazenamento.escrever_lote(timestamps, temps, umids, gases)
+        t2 = time.perf_counter_ns()
+        self.latencia['sink'].registrar(t2 - t1, len(quadros))
+        self.gravacoes.observar((t2 - t1) / 1e9)
+        # Pior caso do lote: da chegada da leitura mais antiga até o disco
+        self.latencia['ponta_a_ponta'].registrar(agora_ns() - int(timestamps[0]),
+                                                 len(quadros))
+        self.gravados += len(quadros)
+
+        if self.ao_gravar:
+            self.ao_gravar(timestamps, temps, umids, gases)
+
+    def _observar_intervalos(self, timestamps):
+        """Intervalo de chegada (s) de cada quadro desde o anterior."""
+        anterior = self._ultimo_quadro_ns
+        self._ultimo_quadro_ns = int(timestamps[-1])
+        if anterior is None:
+            intervalos = np.diff(timestamps)
+        else:
+            intervalos = np.diff(timestamps, prepend=anterior)
+        self.intervalos.observar_lote(intervalos / 1e9)
+
+    def estatisticas(self):
+        """Snapshot dos contadores do pipeline."""
+        est = {
+            'bytes_lidos': self.bytes_lidos,
+            'bytes_gravados': self.armazenamento.bytes_gravados,
+            'quadros_lidos': self.parser.quadros,
+            'rejeitados': dict(self.parser.rejeitados),
+            'gravados': self.gravados,
+            'pausados': self.pausados,
+            'blocos_descartados': self.fila.descartados,
+            'bytes_descartados': self.bytes_descartados,
+            'quadros_descartados': self.quadros_descartados,
+            'fila_profundidade': self.fila.profundidade,
+            'fila_profundidade_max': self.fila.profundidade_max,
+            'fila_capacidade': self.fila.capacidade,
+            'in_waiting': self.in_waiting,
+            'in_waiting_max': self.in_waiting_max,
+            'latencia': {k: v.como_dict() for k, v in self.latencia.items()},
+            'relogio': self.relogio.estado(),
+            'histogramas': {
+                'intervalo_quadros_s': self.intervalos.como_dict(),
+                'gravacao_lote_s': self.gravacoes.como_dict(),
+                'descarga_s': self.armazenamento.descargas.como_dict(),
+            },
+        }
+        if self.protocolo == PROTOCOLO_BINARIO:
+            # Só o protocolo binário tem número de sequência
+            est['perdidos_sequencia'] = self.parser.perdidos
+            est['reinicios'] = self.parser.reinicios
+            est['bytes_corrompidos'] = self.parser.bytes_descartados
+        elif self.protocolo == PROTOCOLO_QUADROS:
+            # Sobrescritos no barramento antes de este consumidor ler
+            est['perdidos_barramento'] = self.parser.perdidos
+        return est
@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+PROTOCOLO SERIAL BME688 - PARSER EM LOTE
+=============================================================================
+Parser único usado pelo coletor, pelo multi-sensor e pelo dashboard.
+
+Protocolo 'texto': o firmware envia linhas CSV em um de dois layouts:
+- com índice:  Index,Temp,Umid,G320,...,G100   (13 campos)
+- sem índice:  Temp,Umid,G320,...,G100         (12 campos)
+
+O layout é detectado uma vez por fluxo: pela linha de cabeçalho
+(ex: "Index,Temp,Umid,G320...") se ela aparecer, senão pelo número de
+campos da primeira linha numérica. Depois disso as linhas são convertidas
+em lote: as linhas válidas de um bloco são unidas e interpretadas por uma
+única chamada a np.fromstring, e o resultado vai para um array estruturado
+pré-alocado (reaproveitado entre chamadas). Só quando o lote tem alguma
+linha inválida é que as linhas são interpretadas uma a uma para achar e
+contar as rejeitadas.
+
+Protocolo 'binario' (opcional): quadros de 50 bytes com sincronismo,
+número de sequência, valores inteiros e CRC16 (~2x menos bytes que o
+texto, sem conversão de float no host). DecodificadorBinario se
+ressincroniza depois de bytes corrompidos e conta os quadros perdidos
+pelos saltos de sequência. codificar_quadros() gera o mesmo formato
+(simulador_pty.py --binario).
+
+Protocolo 'quadros': a fonte já entrega quadros decodificados (o
+barramento.py, com o Index do firmware e o horário de chegada no
+publicador); QuadrosProntos só junta os lotes, sem parse.
+=============================================================================
+"""
+
+from collections import deque
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+CANAIS_GAS = ['G320', 'G295', 'G270', 'G245', 'G220',
+              'G195', 'G170', 'G145', 'G120', 'G100']
+
+# Colunas de cada quadro; 'indice' é NaN quando o firmware não envia índice
+COLUNAS_QUADRO = ['indice', 'temp', 'umid'] + CANAIS_GAS
+DTYPE_QUADRO = np.dtype([(c, '<f8') for c in COLUNAS_QUADRO])
+
+LAYOUT_COM_INDICE = 'com_indice'
+LAYOUT_SEM_INDICE = 'sem_indice'
+CAMPOS_LAYOUT = {LAYOUT_COM_INDICE: 13, LAYOUT_SEM_INDICE: 12}
+
+# Quadros que cabem no buffer pré-alocado (cresce se um lote for maior)
+CAPACIDADE_INICIAL = 1024
+
+PROTOCOLO_TEXTO = 'texto'
+PROTOCOLO_BINARIO = 'binario'
+PROTOCOLO_QUADROS = 'quadros'   # barramento: quadros prontos, sem bytes
+
+# Quadro binário (little-endian, 50 bytes, sem preenchimento):
+#   sync A5 5A | seq u16 | temp i16 (0,01 °C) | umid u16 (0,01 %)
+#   | 10 x u32 resistências (Ω) | CRC-16/CCITT-FALSE dos bytes seq..gases
+SYNC_BYTES = b'\xA5\x5A'
+SYNC_BINARIO = 0x5AA5
+DTYPE_QUADRO_BINARIO = np.dtype(
+    [('sync', '<u2'), ('seq', '<u2'), ('temp', '<i2'), ('umid', '<u2')] +
+    [(g, '<u4') for g in CANAIS_GAS] + [('crc', '<u2')])
+TAMANHO_QUADRO = DTYPE_QUADRO_BINARIO.itemsize
+INICIO_CRC = 2
+FIM_CRC = TAMANHO_QUADRO - 2
+POLINOMIO_CRC16 = 0x1021
+
+# Salto de sequência maior que isso (módulo 2^16) = Pico reiniciou
+MAX_SALTO_SEQUENCIA = 0x8000
+
+# Lacunas (seq_antes, seq_depois, perdidos) guardadas para diagnóstico
+MAX_LACUNAS = 100
+
+# =============================================================================
+# DETECÇÃO DO LAYOUT
+# =============================================================================
+
+def layout_do_cabecalho(linha):
+    """Layout indicado por uma linha de cabeçalho, ou None se não for cabeçalho."""
+    nomes = [p.strip().lower() for p in linha.split(b',')]
+    if b'g320' not in nomes:
+        return None
+    return LAYOUT_COM_INDICE if nomes[0] == b'index' else LAYOUT_SEM_INDICE
+
+
+def layout_dos_campos(n_campos):
+    """Layout de uma linha numérica pelo número de campos (None se ambíguo)."""
+    if n_campos == CAMPOS_LAYOUT[LAYOUT_COM_INDICE]:
+        return LAYOUT_COM_INDICE
+    if n_campos == CAMPOS_LAYOUT[LAYOUT_SEM_INDICE]:
+        return LAYOUT_SEM_INDICE
+    return None
+
+
+def matriz(quadros):
+    """Vista (n, 13) em float64 de um array de quadros, sem cópia."""
+    return quadros.view(np.float64).reshape(len(quadros), len(COLUNAS_QUADRO))
+
+# =============================================================================
+# PARSER
+# =============================================================================
+
+class _BufferQuadros:
+    """Array de saída pré-alocado, reaproveitado entre chamadas."""
+
+    def __init__(self, capacidade):
+        self._alocar(capacidade)
+
+    def _alocar(self, capacidade):
+        # Mesma memória vista como matriz (n, 13) e como array estruturado
+        self._buffer = np.empty((capacidade, len(COLUNAS_QUADRO)), dtype=np.float64)
+        self._quadros = self._buffer.view(DTYPE_QUADRO).reshape(capacidade)
+
+    def _saida(self, n):
+        if n > len(self._buffer):
+            self._alocar(max(n, 2 * len(self._buffer)))
+        return self._quadros[:n]
+
+
+class ParserQuadros(_BufferQuadros):
+    """
+    Converte blocos de bytes da serial em quadros (array DTYPE_QUADRO).
+
+    O array devolvido por processar() é uma vista do buffer interno e só é
+    válido até a próxima chamada; quem precisar guardar os quadros deve
+    copiá-los.
+    """
+
+    def __init__(self, layout=None, capacidade=CAPACIDADE_INICIAL):
+        self.layout = layout
+        self.resto = b''
+        self.quadros = 0
+        self.cabecalhos = 0
+        self.rejeitados = {'curta': 0, 'decodificacao': 0, 'nao_numerica': 0}
+        super().__init__(capacidade)
+
+    def processar(self, blocos):
+        """
+        Recebe [(t_ns, bytes), ...] e retorna (timestamps_ns, quadros).
+        Cada linha recebe o horário do bloco em que terminou.
+        """
+        if len(blocos) == 1:
+            t_ns, dados = blocos[0]
+            linhas = (self.resto + dados).split(b'\n')
+            self.resto = linhas.pop()
+            tempos = np.full(len(linhas), t_ns, dtype=np.int64)
+        else:
+            dados = self.resto + b''.join(d for _, d in blocos)
+            linhas = dados.split(b'\n')
+            self.resto = linhas.pop()
+            tempos = np.repeat(np.array([t for t, _ in blocos], dtype=np.int64),
+                               [d.count(b'\n') for _, d in blocos])
+        return self.processar_linhas(linhas, tempos)
+
+    def processar_linhas(self, linhas, tempos):
+        """Converte linhas completas (bytes, sem '\\n') com seus timestamps."""
+        linhas = [l.strip() for l in linhas]
+        validas = [i for i, l in enumerate(linhas) if l]
+        if not validas:
+            return tempos[:0], self._saida(0)
+        self.quadros += len(validas)
+
+        # Cabeçalho (no início ou repetido após reset do Pico) define o layout
+        if any(not linhas[i][:1].isdigit() and linhas[i][:1] != b'-' for i in validas):
+            validas = self._separar_cabecalhos(linhas, validas)
+        if self.layout is None:
+            validas = self._detectar(linhas, validas)
+            if self.layout is None:
+                return tempos[:0], self._saida(0)
+
+        campos = CAMPOS_LAYOUT[self.layout]
+        virgulas = campos - 1
+        contagens = [linhas[i].count(b',') for i in validas]
+        if any(c != virgulas for c in contagens):
+            curtas = [i for i, c in zip(validas, contagens) if c < virgulas]
+            self.rejeitados['curta'] += len(curtas)
+            # Campos extras no fim são ignorados, como no coletor original
+            for k, c in enumerate(contagens):
+                if c > virgulas:
+                    i = validas[k]
+                    linhas[i] = b','.join(linhas[i].split(b',', campos)[:campos])
+            validas = [i for i, c in zip(validas, contagens) if c >= virgulas]
+            if not validas:
+                return tempos[:0], self._saida(0)
+
+        # Caminho rápido: todo o lote em uma única conversão
+        try:
+            valores = np.fromstring(b','.join([linhas[i] for i in validas]), sep=',')
+            ok = valores.size == len(validas) * campos
+        except ValueError:
+            ok = False
+        if not ok:
+            validas, valores = self._converter_linha_a_linha(linhas, validas, campos)
+
+        n = len(validas)
+        saida = self._saida(n)
+        destino = self._buffer[:n]
+        if self.layout == LAYOUT_COM_INDICE:
+            destino[:] = valores.reshape(n, campos)
+        else:
+            destino[:, 0] = np.nan
+            destino[:, 1:] = valores.reshape(n, campos)
+        if n < len(tempos):
+            tempos = tempos[validas]
+        return tempos, saida
+
+    def _separar_cabecalhos(self, linhas, validas):
+        restantes = []
+        for i in validas:
+            l = linhas[i]
+            if l[:1].isdigit() or l[:1] == b'-':
+                restantes.append(i)
+                continue
+            layout = layout_do_cabecalho(l)
+            if layout is None:
+                restantes.append(i)  # texto solto: será rejeitado adiante
+            else:
+                self.layout = layout
+                self.cabecalhos += 1
+                self.quadros -= 1
+        return restantes
+
+    def _detectar(self, linhas, validas):
+        """Sem cabeçalho: decide pelo número de campos da primeira linha numérica."""
+        for k, i in enumerate(validas):
+            layout = layout_dos_campos(linhas[i].count(b',') + 1)
+            if layout is not None:
+                self.layout = layout
+                return validas[k:]
+            # Linha que não define o layout antes da detecção: descartada
+            self.rejeitados['curta'] += 1
+        return []
+
+    def _converter_linha_a_linha(self, linhas, validas, campos):
+        """Caminho lento: identifica e conta as linhas inválidas do lote."""
+        aceitas = []
+        valores = []
+        for i in validas:
+            try:
+                texto = linhas[i].decode('ascii')
+            except UnicodeDecodeError:
+                self.rejeitados['decodificacao'] += 1
+                continue
+            try:
+                valores.append([float(p) for p in texto.split(',')])
+            except ValueError:
+                self.rejeitados['nao_numerica'] += 1
+                continue
+            aceitas.append(i)
+        return aceitas, np.array(valores, dtype=np.float64).reshape(-1, campos)
+
+# =============================================================================
+# QUADROS BINÁRIOS
+# =============================================================================
+
+def _tabela_crc16():
+    tabela = np.zeros(256, dtype=np.uint16)
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = (((crc << 1) ^ POLINOMIO_CRC16) if crc & 0x8000 else (crc << 1)) & 0xFFFF
+        tabela[i] = crc
+    return tabela
+
+
+TABELA_CRC16 = _tabela_crc16()
+
+
+def crc16_ccitt(dados):
+    """
+    CRC-16/CCITT-FALSE (polinômio 0x1021, inicial 0xFFFF) de cada linha de
+    uma matriz (n, m) de uint8. Vetorizado entre os quadros: m iterações.
+    """
+    crc = np.full(len(dados), 0xFFFF, dtype=np.uint16)
+    for j in range(dados.shape[1]):
+        crc = (crc << np.uint16(8)) ^ TABELA_CRC16[(crc >> np.uint16(8)) ^ dados[:, j]]
+    return crc
+
+
+def codificar_quadros(seqs, temps, umids, gases):
+    """Monta quadros binários (bytes) como o firmware enviaria; gases (n, 10)."""
+    quadros = np.zeros(len(seqs), dtype=DTYPE_QUADRO_BINARIO)
+    quadros['sync'] = SYNC_BINARIO
+    quadros['seq'] = np.asarray(seqs) & 0xFFFF
+    quadros['temp'] = np.round(np.asarray(temps) * 100)
+    quadros['umid'] = np.round(np.asarray(umids) * 100)
+    gases = np.asarray(gases)
+    for i, g in enumerate(CANAIS_GAS):
+        quadros[g] = gases[:, i]
+    brutos = quadros.view(np.uint8).reshape(len(quadros), TAMANHO_QUADRO)
+    quadros['crc'] = crc16_ccitt(brutos[:, INICIO_CRC:FIM_CRC])
+    return quadros.tobytes()
+
+
+class DecodificadorBinario(_BufferQuadros):
+    """
+    Decodificador em fluxo dos quadros binários, com a mesma interface do
+    ParserQuadros (processar() -> (timestamps_ns, quadros)).
+
+    Procura a palavra de sincronismo, confere o CRC de todos os candidatos
+    de uma vez e aceita os quadros válidos que não se sobrepõem. Bytes entre
+    quadros aceitos (ruído, quadro corrompido) são descartados e contados,
+    e a leitura se ressincroniza no próximo quadro válido. Saltos no número
+    de sequência viram quadros perdidos; um salto para trás é tratado como
+    reinício do Pico.
+    """
+
+    def __init__(self, capacidade=CAPACIDADE_INICIAL, max_lacunas=MAX_LACUNAS):
+        self.resto = b''
+        self.quadros = 0
+        self.rejeitados = {'crc': 0}
+        self.bytes_descartados = 0
+        self.perdidos = 0
+        self.reinicios = 0
+        self.lacunas = deque(maxlen=max_lacunas)
+        self._seq_bruto = None   # último número de sequência recebido (16 bits)
+        self._contador = None    # mesmo quadro na contagem contínua
+        super().__init__(capacidade)
+
+    def processar(self, blocos):
+        """
+        Recebe [(t_ns, bytes), ...] e retorna (timestamps_ns, quadros).
+        Cada quadro recebe o horário do bloco em que terminou.
+        """
+        dados = self.resto + b''.join(d for _, d in blocos)
+        fins_blocos = len(self.resto) + np.cumsum([len(d) for _, d in blocos])
+        buf = np.frombuffer(dados, dtype=np.uint8)
+
+        ultimo_inicio = len(buf) - TAMANHO_QUADRO
+        if ultimo_inicio < 0:
+            self.resto = dados
+            return np.empty(0, dtype=np.int64), self._saida(0)
+
+        # Candidatos: posições da palavra de sincronismo com um quadro inteiro
+        candidatos = np.flatnonzero((buf[:ultimo_inicio + 1] == SYNC_BYTES[0]) &
+                                    (buf[1:ultimo_inicio + 2] == SYNC_BYTES[1]))
+        janelas = sliding_window_view(buf, TAMANHO_QUADRO)[candidatos]
+        crc_lido = (janelas[:, FIM_CRC].astype(np.uint16) |
+                    (janelas[:, FIM_CRC + 1].astype(np.uint16) << np.uint16(8)))
+        validos = crc16_ccitt(janelas[:, INICIO_CRC:FIM_CRC]) == crc_lido
+
+        # Aceita quadros válidos sem sobreposição, na ordem do fluxo
+        aceitos = []
+        fim = 0
+        for k in np.flatnonzero(validos):
+            p = candidatos[k]
+            if p >= fim:
+                self.bytes_descartados += int(p - fim)
+                aceitos.append(k)
+                fim = int(p) + TAMANHO_QUADRO
+        # CRC inválido fora dos quadros aceitos: quadro corrompido
+        invalidos = candidatos[~validos]
+        if aceitos and len(invalidos):
+            inicios = candidatos[aceitos]
+            anterior = np.searchsorted(inicios, invalidos, side='right') - 1
+            dentro = (anterior >= 0) & (invalidos < inicios[anterior] + TAMANHO_QUADRO)
+            corrompidos = int(np.count_nonzero(~dentro))
+        else:
+            corrompidos = len(invalidos)
+
+        # O que sobra pode conter o começo de um quadro
+        corte = max(fim, ultimo_inicio + 1)
+        self.bytes_descartados += corte - fim
+        self.resto = dados[corte:]
+
+        n = len(aceitos)
+        self.quadros += n + corrompidos
+        self.rejeitados['crc'] += corrompidos
+        if n == 0:
+            return np.empty(0, dtype=np.int64), self._saida(0)
+        brutos = np.ascontiguousarray(janelas[aceitos]).view(DTYPE_QUADRO_BINARIO).reshape(n)
+
+        saida = self._saida(n)
+        destino = self._buffer[:n]
+        destino[:, 0] = self._desenrolar(brutos['seq'])
+        destino[:, 1] = brutos['temp'] / 100.0
+        destino[:, 2] = brutos['umid'] / 100.0
+        for i, g in enumerate(CANAIS_GAS):
+            destino[:, 3 + i] = brutos[g]
+
+        tempos = np.array([t for t, _ in blocos], dtype=np.int64)
+        timestamps = tempos[np.searchsorted(fins_blocos, candidatos[aceitos] + TAMANHO_QUADRO)]
+        return timestamps, saida
+
+    def _desenrolar(self, seqs):
+        """Sequência de 16 bits -> contador contínuo; registra lacunas."""
+        seqs = seqs.astype(np.int64)
+        if self._seq_bruto is None:
+            self._seq_bruto = (seqs[0] - 1) & 0xFFFF
+            self._contador = seqs[0] - 1
+        anterior = self._seq_bruto
+        passos = np.diff(seqs, prepend=anterior) & 0xFFFF
+        reinicios = passos > MAX_SALTO_SEQUENCIA
+        if reinicios.any():
+            self.reinicios += int(np.count_nonzero(reinicios))
+            passos[reinicios] = 1
+        saltos = np.flatnonzero(passos > 1)
+        for i in saltos:
+            self.lacunas.append((int(seqs[i - 1] if i else anterior),
+                                 int(seqs[i]), int(passos[i] - 1)))
+        self.perdidos += int((passos[saltos] - 1).sum())
+        continuos = self._contador + np.cumsum(passos)
+        self._seq_bruto = int(seqs[-1])
+        self._contador = int(continuos[-1])
+        return continuos
+
+
+class QuadrosProntos:
+    """
+    'Parser' de fontes que já entregam quadros (PortaBarramento.ler_quadros):
+    os blocos são (timestamps_ns, quadros) e processar() só os junta.
+    `perdidos` é atualizado por quem lê a fonte (quadros sobrescritos no
+    barramento antes da leitura).
+    """
+
+    layout = None
+
+    def __init__(self):
+        self.quadros = 0
+        self.rejeitados = {}
+        self.perdidos = 0
+        self.reinicios = 0
+        self.bytes_descartados = 0
+
+    def processar(self, blocos):
+        if len(blocos) == 1:
+            timestamps, quadros = blocos[0]
+        else:
+            timestamps = np.concatenate([b[0] for b in blocos])
+            quadros = np.concatenate([b[1] for b in blocos])
+        self.quadros += len(quadros)
+        return timestamps, quadros
+
+
+def criar_parser(protocolo=PROTOCOLO_TEXTO):
+    """Parser para o protocolo da porta: 'texto' (CSV), 'binario' ou 'quadros'."""
+    if protocolo == PROTOCOLO_BINARIO:
+        return DecodificadorBinario()
+    if protocolo == PROTOCOLO_TEXTO:
+        return ParserQuadros()
+    if protocolo == PROTOCOLO_QUADROS:
+        return QuadrosProntos()
+    raise ValueError(f"Protocolo desconhecido: {protocolo}")
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+RELÓGIO DAS LEITURAS (HOST MONOTÔNICO + RELÓGIO DO SENSOR)
+=============================================================================
+O CSV guardava só 'AAAA-MM-DD HH:MM:SS': várias leituras no mesmo segundo
+ficam com o mesmo horário e não dá para medir taxa nem alinhar sensores.
+Aqui os tempos são sempre int64 em ns desde a época (UTC):
+
+- agora_ns(): horário de chegada no host, do time.monotonic_ns() ancorado
+  uma única vez no relógio de parede. Não volta para trás nem salta quando
+  o NTP/usuário acerta a hora no meio da coleta.
+- RelogioSensor: converte o Index do firmware (ou a sequência do protocolo
+  binário) em horário. Ajusta horário = origem + período x Index nas
+  últimas JANELA_RELOGIO leituras: o período acompanha a deriva do cristal
+  do Pico em relação ao PC e a origem é a envoltória inferior dos tempos de
+  chegada (atraso de USB/SO só soma), então o jitter do host some. Índice
+  voltando (Pico reiniciou) ou uma leitura muito atrasada (travamento)
+  reancoram o ajuste.
+- taxa_amostragem(), detectar_travamentos() e mesclar_fluxos() (k sensores
+  já ordenados intercalados por horário em uma passada) para análise.
+
+Uso direto (taxa real e travamentos de cada sessão/sensor dos arquivos):
+   python relogio.py planta.csv coleta_s1.bme coleta_s2.bme
+=============================================================================
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+# Leituras recentes usadas no ajuste Index -> horário do sensor
+JANELA_RELOGIO = 512
+
+# Mínimo de leituras (e de Index distintos) antes de confiar no período
+MINIMO_AJUSTE = 8
+
+# Leitura chegando mais atrasada que isso em relação ao ajuste (ou que
+# FATOR_REANCORAGEM períodos) = o sensor travou ou o Pico reiniciou
+TOLERANCIA_REANCORAGEM_S = 2.0
+FATOR_REANCORAGEM = 10
+
+# Intervalo maior que FATOR_TRAVAMENTO x o intervalo mediano = travamento
+FATOR_TRAVAMENTO = 3.0
+
+# =============================================================================
+# RELÓGIO DO HOST
+# =============================================================================
+
+class RelogioHost:
+    """Época (ns) derivada do relógio monotônico: só anda para frente."""
+
+    def __init__(self):
+        self.epoca_ns = time.time_ns()
+        self.monotonico_ns = time.monotonic_ns()
+
+    def agora_ns(self):
+        return self.epoca_ns + (time.monotonic_ns() - self.monotonico_ns)
+
+
+RELOGIO_HOST = RelogioHost()
+agora_ns = RELOGIO_HOST.agora_ns
+
+# =============================================================================
+# RELÓGIO DO SENSOR
+# =============================================================================
+
+class RelogioSensor:
+    """Index do firmware + chegada no host -> horário do sensor (int64 ns)."""
+
+    def __init__(self, janela=JANELA_RELOGIO, periodo_nominal_s=None):
+        self.janela = janela
+        self.periodo_nominal_s = periodo_nominal_s
+        self.reancoragens = 0
+        self.sem_indice = 0
+        self.convertidos = 0
+        self._ultimo_ns = None
+        self._reancorar()
+
+    def _reancorar(self):
+        self._ref_indice = None
+        self._ref_ns = 0
+        self._x = np.empty(0)
+        self._y = np.empty(0)
+        self._periodo = None   # ns por Index
+        self._origem = 0.0     # ns, relativo a _ref_ns
+        self._ultimo_indice = None
+
+    def converter(self, indices, recebidos_ns):
+        """Horário do sensor de cada leitura (int64 ns, não decrescente)."""
+        recebidos_ns = np.asarray(recebidos_ns, dtype=np.int64)
+        if len(recebidos_ns) == 0:
+            return recebidos_ns.copy()
+        indices = np.asarray(indices, dtype=np.float64)
+        if np.isnan(indices).any():
+            # Firmware sem Index: fica o horário de chegada
+            self.sem_indice += len(indices)
+            return self._monotonico(recebidos_ns.copy())
+
+        # Index que não avança = Pico reiniciou: cada trecho tem seu ajuste
+        anteriores = np.concatenate(([self._ultimo_indice if self._ultimo_indice is not None
+                                      else -np.inf], indices[:-1]))
+        cortes = np.flatnonzero(indices <= anteriores).tolist()
+        saida = np.empty(len(indices), dtype=np.int64)
+        limites = sorted({0, *cortes, len(indices)})
+        for ini, fim in zip(limites[:-1], limites[1:]):
+            if ini in cortes:
+                self.reancoragens += 1
+                self._reancorar()
+            saida[ini:fim] = self._ajustar(indices[ini:fim], recebidos_ns[ini:fim])
+        self._ultimo_indice = float(indices[-1])
+        self.convertidos += len(indices)
+        return self._monotonico(saida)
+
+    def _ajustar(self, indices, recebidos_ns):
+        if self._ref_indice is None:
+            self._ref_indice = float(indices[0])
+            self._ref_ns = int(recebidos_ns[0])
+        x = indices - self._ref_indice
+        y = (recebidos_ns - self._ref_ns).astype(np.float64)
+
+        # Leitura muito atrasada em relação ao ajuste: o sensor parou e
+        # voltou; dali em diante vale um novo ajuste
+        if self._periodo is not None:
+            atraso = y - (self._origem + self._periodo * x)
+            limite = max(TOLERANCIA_REANCORAGEM_S * 1e9, FATOR_REANCORAGEM * self._periodo)
+            atrasadas = np.flatnonzero(atraso > limite)
+            if len(atrasadas):
+                k = int(atrasadas[0])
+                antes = self._ajustar(indices[:k], recebidos_ns[:k]) if k else recebidos_ns[:0]
+                self.reancoragens += 1
+                self._reancorar()
+                return np.concatenate((antes, self._ajustar(indices[k:], recebidos_ns[k:])))
+
+        self._x = np.concatenate((self._x, x))[-self.janela:]
+        self._y = np.concatenate((self._y, y))[-self.janela:]
+        dx = self._x - self._x.mean()
+        variancia = float(dx @ dx)
+        if len(self._x) >= MINIMO_AJUSTE and variancia > 0:
+            periodo = float(dx @ (self._y - self._y.mean())) / variancia
+            if periodo > 0:
+                self._periodo = periodo
+                # Envoltória inferior: o atraso de chegada nunca é negativo
+                self._origem = float((self._y - periodo * self._x).min())
+        if self._periodo is None:
+            return recebidos_ns.copy()
+        return self._ref_ns + np.round(self._origem + self._periodo * x).astype(np.int64)
+
+    def _monotonico(self, ts):
+        """Corrige para não voltar no tempo quando o ajuste se move."""
+        if self._ultimo_ns is not None:
+            ts[0] = max(ts[0], self._ultimo_ns)
+        np.maximum.accumulate(ts, out=ts)
+        self._ultimo_ns = int(ts[-1])
+        return ts
+
+    def estado(self):
+        """Período/taxa estimados, atraso do host acima da envoltória e contadores."""
+        est = {
+            'periodo_s': self._periodo / 1e9 if self._periodo else None,
+            'taxa_hz': 1e9 / self._periodo if self._periodo else None,
+            'pontos': len(self._x),
+            'convertidos': self.convertidos,
+            'reancoragens': self.reancoragens,
+            'sem_indice': self.sem_indice,
+        }
+        # Chamado de outra thread: x e y podem estar no meio de uma troca
+        x, y = self._x, self._y
+        n = min(len(x), len(y))
+        if self._periodo and n:
+            atraso = y[-n:] - (self._origem + self._periodo * x[-n:])
+            est['atraso_medio_ms'] = float(atraso.mean()) / 1e6
+            est['jitter_ms'] = float(atraso.std()) / 1e6
+            if self.periodo_nominal_s:
+                est['deriva_ppm'] = (self._periodo / 1e9 / self.periodo_nominal_s - 1) * 1e6
+        return est
+
+# =============================================================================
+# ANÁLISE
+# =============================================================================
+
+def taxa_amostragem(timestamps_ns):
+    """Taxa real (Hz) de uma sequência de horários em ns."""
+    ts = np.asarray(timestamps_ns, dtype=np.int64)
+    if len(ts) < 2:
+        return {'leituras': len(ts), 'duracao_s': 0.0, 'taxa_hz': None,
+                'intervalo_mediano_s': None}
+    intervalos = np.diff(ts)
+    duracao = (ts[-1] - ts[0]) / 1e9
+    return {
+        'leituras': len(ts),
+        'duracao_s': float(duracao),
+        'taxa_hz': float((len(ts) - 1) / duracao) if duracao > 0 else None,
+        'intervalo_mediano_s': float(np.median(intervalos)) / 1e9,
+    }
+
+
+def detectar_travamentos(timestamps_ns, fator=FATOR_TRAVAMENTO, minimo_s=0.0):
+    """
+    Intervalos maiores que `fator` x o mediano (e que `minimo_s`):
+    lista de (posição da leitura antes da pausa, início ns, duração s).
+    """
+    ts = np.asarray(timestamps_ns, dtype=np.int64)
+    if len(ts) < 3:
+        return []
+    intervalos = np.diff(ts)
+    limite = max(fator * float(np.median(intervalos)), minimo_s * 1e9)
+    if limite <= 0:
+        return []
+    posicoes = np.flatnonzero(intervalos > limite)
+    return [(int(i), int(ts[i]), float(intervalos[i]) / 1e9) for i in posicoes]
+
+
+def mesclar_fluxos(timestamps):
+    """
+    Intercala k sequências já ordenadas por horário.
+
+    Retorna (ordem, origem): `ordem` indexa a concatenação das sequências e
+    `origem` diz de qual sequência veio cada leitura. O sort estável do
+    NumPy (timsort) encontra as k sequências ordenadas e só as intercala:
+    uma passada para k fixo, sem o custo de ordenar do zero.
+    """
+    tamanhos = [len(t) for t in timestamps]
+    if not tamanhos:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    todos = np.concatenate([np.asarray(t, dtype=np.int64) for t in timestamps])
+    ordem = np.argsort(todos, kind='stable')
+    origem = np.repeat(np.arange(len(tamanhos)), tamanhos)[ordem]
+    return ordem, origem
+
+# =============================================================================
+# LEITURA DOS ARQUIVOS
+# =============================================================================
+
+def carregar_tempos(caminho):
+    """
+    (timestamps_ns, chaves) de um CSV ou .bme; chaves identifica
+    sessão/sensor de cada leitura. CSVs antigos (só 'timestamp' em
+    segundos) são convertidos, com a resolução que tiverem.
+    """
+    import pandas as pd
+    from armazenamento import EXTENSOES_REGISTROS, carregar_registros, local_para_ns
+
+    if caminho.endswith(EXTENSOES_REGISTROS):
+        registros, dicionario = carregar_registros(caminho)
+        sessoes = dicionario['sessoes'] or [{}]
+        nomes = np.asarray([f"{s.get('sessao_id', '')}/{s.get('sensor_id', '')}".rstrip('/')
+                            for s in sessoes])
+        return np.asarray(registros['timestamp_ns']), nomes[np.asarray(registros['sessao'])]
+
+    colunas = pd.read_csv(caminho, nrows=0).columns
+    usar = [c for c in ('timestamp', 'timestamp_ns', 'sessao_id', 'sensor_id') if c in colunas]
+    df = pd.read_csv(caminho, usecols=usar, dtype={c: str for c in ('sessao_id', 'sensor_id')})
+    if 'timestamp_ns' in df.columns and df['timestamp_ns'].notna().all():
+        ts = df['timestamp_ns'].to_numpy(dtype=np.int64)
+    elif 'timestamp' in df.columns:
+        ts = local_para_ns(df['timestamp'])
+    else:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=str)
+    chaves = df.get('sessao_id', pd.Series('', index=df.index)).fillna('')
+    if 'sensor_id' in df.columns:
+        chaves = chaves + '/' + df['sensor_id'].fillna('')
+    return ts, chaves.str.rstrip('/').to_numpy(dtype=str)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Taxa real e travamentos das gravações')
+    parser.add_argument('arquivos', nargs='+')
+    parser.add_argument('--fator', type=float, default=FATOR_TRAVAMENTO,
+                        help='intervalo > fator x mediano = travamento')
+    args = parser.parse_args()
+
+    fluxos = []
+    for caminho in args.arquivos:
+        if not os.path.exists(caminho):
+            print(f"❌ Arquivo não encontrado: {caminho}")
+            sys.exit(1)
+        ts, chaves = carregar_tempos(caminho)
+        print(f"\n📄 {caminho}: {len(ts):,} leituras")
+        for chave in dict.fromkeys(chaves):
+            trecho = ts[chaves == chave]
+            taxa = taxa_amostragem(trecho)
+            repetidos = int(np.count_nonzero(np.diff(trecho) == 0))
+            texto_taxa = f"{taxa['taxa_hz']:.3f} Hz" if taxa['taxa_hz'] else "?"
+            print(f"   {chave or '(sem sessão)'}: {taxa['leituras']:,} leituras em "
+                  f"{taxa['duracao_s']:.0f} s | {texto_taxa} | "
+                  f"{repetidos:,} horários repetidos")
+            for pos, inicio, duracao in detectar_travamentos(trecho, args.fator)[:10]:
+                print(f"      ⏸️  leitura {pos}: pausa de {duracao:.1f} s")
+            fluxos.append(np.sort(trecho))
+
+    if len(fluxos) > 1:
+        t0 = time.perf_counter()
+        ordem, _ = mesclar_fluxos(fluxos)
+        print(f"\n🔀 {len(fluxos)} fluxos mesclados por horário: {len(ordem):,} leituras "
+              f"em {(time.perf_counter() - t0) * 1e3:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+REPLAY DE GRAVAÇÕES COMO PORTA SERIAL (SEM PICO)
+=============================================================================
+PortaReplay tem a interface de serial.Serial usada pelo coletor, pelo
+dashboard e pelo classificador ao vivo (read, readline, in_waiting,
+is_open, close) e entrega as leituras de um CSV/.bme gravado como o
+firmware entregaria: linhas "Index,Temp,Umid,G320...G100" ou quadros
+binários com CRC (protocolo.py). Roda em qualquer sistema, sem pty.
+
+Velocidade:
+   1      tempo real: intervalos da coluna de tempo do arquivo (pausas
+          longas limitadas a MAX_INTERVALO_S); sem coluna de tempo (CSV do
+          firmware), uma leitura a cada PERIODO_PADRAO_S
+   N      N vezes mais rápido que o tempo real
+   0/max  o mais rápido possível (limitado só pelo buffer de entrada)
+
+Falhas injetadas (opcionais, reprodutíveis com `semente`):
+   ruido      desvio relativo gaussiano em temp, umid e resistências
+   corrupcao  fração das leituras com um byte trocado (linha inválida ou
+              CRC errado)
+   perda      fração das leituras que somem (o índice/seq continua
+              correndo, como no Pico com o buffer cheio)
+
+Se o consumidor não ler e o buffer de entrada encher, as leituras novas
+são descartadas e contadas (transbordadas), como na USB do Pico.
+
+Em qualquer lugar que aceite uma porta (coleta_gas.py, dashboard,
+classificador_vivo.py):
+   replay:planta.csv
+   replay:planta.csv?velocidade=10&ruido=0.01&corrupcao=0.001
+   replay:planta.bme?velocidade=max&protocolo=binario&repetir=1
+
+Uso direto (lê o replay com o parser e mostra a vazão):
+   python replay.py planta.csv --velocidade max --protocolo binario --corrupcao 0.01
+=============================================================================
+"""
+
+import argparse
+import os
+import sys
+import time
+from urllib.parse import parse_qsl
+
+import numpy as np
+
+from barramento import carregar_quadros_arquivo
+from protocolo import (
+    PROTOCOLO_BINARIO, PROTOCOLO_TEXTO, TAMANHO_QUADRO, codificar_quadros,
+    criar_parser, matriz
+)
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+PREFIXO_REPLAY = 'replay'
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Intervalo entre leituras quando o arquivo não tem coluna de tempo
+# (gravações do coletor mostram ~5 s entre leituras do firmware)
+PERIODO_PADRAO_S = 5.0
+
+# Pausas maiores que isso no arquivo (ex: entre sessões) viram esse valor
+MAX_INTERVALO_S = 60.0
+
+# O CSV do coletor grava o tempo em segundos inteiros: leituras do mesmo
+# segundo são espalhadas dentro dele
+RESOLUCAO_CSV_S = 1.0
+
+# Buffer de entrada da "porta": acima disso as leituras novas são descartadas
+BUFFER_ENTRADA = 1 << 20
+
+# Leituras geradas de uma vez no modo mais rápido possível
+LOTE_REPLAY = 1024
+
+# Espera máxima entre verificações quando read() aguarda a próxima leitura
+INTERVALO_ESPERA = 0.05
+
+OPCOES_PADRAO = {
+    'velocidade': 1.0,
+    'protocolo': PROTOCOLO_TEXTO,
+    'ruido': 0.0,
+    'corrupcao': 0.0,
+    'perda': 0.0,
+    'repetir': False,
+    'semente': None,
+}
+
+# =============================================================================
+# ENDEREÇO DA PORTA
+# =============================================================================
+
+def eh_porta_replay(porta):
+    return porta.startswith(PREFIXO_REPLAY + ':')
+
+
+def ler_velocidade(texto):
+    """'max' ou '0' -> 0 (sem limite); '10' ou '10x' -> 10.0."""
+    texto = str(texto).strip().lower()
+    if texto in ('max', ''):
+        return 0.0
+    velocidade = float(texto.removesuffix('x'))
+    if velocidade < 0:
+        raise ValueError("velocidade deve ser >= 0")
+    return velocidade
+
+
+def opcoes_porta_replay(porta):
+    """'replay:arquivo?chave=valor&...' -> (caminho, opções)."""
+    endereco = porta.split(':', 1)[1]
+    caminho, _, consulta = endereco.partition('?')
+    opcoes = dict(OPCOES_PADRAO)
+    for chave, valor in parse_qsl(consulta):
+        if chave not in opcoes:
+            raise ValueError(f"Opção de replay desconhecida: {chave} "
+                             f"(válidas: {', '.join(OPCOES_PADRAO)})")
+        if chave == 'velocidade':
+            opcoes[chave] = ler_velocidade(valor)
+        elif chave == 'protocolo':
+            if valor not in (PROTOCOLO_TEXTO, PROTOCOLO_BINARIO):
+                raise ValueError(f"protocolo deve ser '{PROTOCOLO_TEXTO}' ou '{PROTOCOLO_BINARIO}'")
+            opcoes[chave] = valor
+        elif chave == 'repetir':
+            opcoes[chave] = valor.lower() in ('1', 'sim', 'true')
+        elif chave == 'semente':
+            opcoes[chave] = int(valor)
+        else:
+            opcoes[chave] = float(valor)
+    # Caminho relativo: do diretório atual ou, se não existir, de data/
+    if not os.path.exists(caminho) and os.path.exists(os.path.join(BASE_DIR, caminho)):
+        caminho = os.path.join(BASE_DIR, caminho)
+    return caminho, opcoes
+
+# =============================================================================
+# AGENDA DAS LEITURAS
+# =============================================================================
+
+def agenda_leituras(n, timestamps_ns=None):
+    """Instante (s, em tempo real) de cada leitura desde o início do arquivo."""
+    if timestamps_ns is None or n == 0:
+        return np.arange(n) * PERIODO_PADRAO_S
+    t = (np.asarray(timestamps_ns, dtype=np.int64) - int(timestamps_ns[0])) / 1e9
+    agenda = np.concatenate(([0.0], np.cumsum(np.clip(np.diff(t), 0.0, MAX_INTERVALO_S))))
+    if np.all(np.asarray(timestamps_ns) % 1_000_000_000 == 0):
+        # Várias leituras no mesmo segundo: posições k/m dentro do segundo
+        _, primeira, inverso, contagem = np.unique(agenda, return_index=True,
+                                                   return_inverse=True, return_counts=True)
+        k = np.arange(n) - primeira[inverso]
+        agenda = agenda + k / contagem[inverso] * RESOLUCAO_CSV_S
+    return agenda
+
+# =============================================================================
+# PORTA
+# =============================================================================
+
+class PortaReplay:
+    """Arquivo gravado com a interface de serial.Serial."""
+
+    def __init__(self, porta, timeout=1.0, quadros=None, timestamps_ns=None, **opcoes):
+        if quadros is None:
+            caminho, lidas = opcoes_porta_replay(porta)
+            lidas.update(opcoes)
+            opcoes = lidas
+            if not os.path.exists(caminho):
+                raise FileNotFoundError(f"Arquivo de replay não encontrado: {caminho}")
+            quadros, timestamps_ns = carregar_quadros_arquivo(caminho, tempos=True)
+            if len(quadros) == 0:
+                raise ValueError(f"Nenhuma leitura válida em {caminho}")
+        else:
+            opcoes = dict(OPCOES_PADRAO, **opcoes)
+
+        self.port = porta
+        self.timeout = timeout
+        self.quadros = quadros
+        self.agenda = agenda_leituras(len(quadros), timestamps_ns)
+        # Duração de uma volta do arquivo (com --repetir a próxima volta
+        # começa um intervalo médio depois da última leitura)
+        passo = self.agenda[-1] / (len(quadros) - 1) if len(quadros) > 1 else PERIODO_PADRAO_S
+        self.duracao_volta = self.agenda[-1] + (passo or PERIODO_PADRAO_S)
+
+        self.velocidade = ler_velocidade(opcoes['velocidade'])
+        self.protocolo = opcoes['protocolo']
+        self.ruido = opcoes['ruido']
+        self.corrupcao = opcoes['corrupcao']
+        self.perda = opcoes['perda']
+        self.repetir = opcoes['repetir']
+        self.rng = np.random.default_rng(opcoes['semente'])
+
+        # Sem ruído, o texto de cada linha (menos o Index) é formatado uma vez
+        self._sufixos = None if self.ruido else self._formatar_sufixos(quadros)
+
+        self._buffer = bytearray()
+        self._posicao = 0
+        self.geradas = 0       # leituras que já "aconteceram" (inclui perdidas)
+        self.enviadas = 0
+        self.perdidas = 0
+        self.corrompidas = 0
+        self.transbordadas = 0
+        self.bytes_enviados = 0
+        self.inicio = time.monotonic()
+        self.is_open = True
+
+    # --- geração -----------------------------------------------------------
+
+    @staticmethod
+    def _formatar_sufixos(quadros):
+        valores = matriz(quadros)
+        return [(f",{t:.2f},{u:.2f}," + ",".join(str(int(g)) for g in gases) + "\r\n").encode('ascii')
+                for t, u, gases in zip(valores[:, 1], valores[:, 2], valores[:, 3:])]
+
+    def _devidas(self):
+        """Total de leituras que já deveriam ter saído da porta agora."""
+        n = len(self.quadros)
+        if self.velocidade <= 0:
+            # Mais rápido possível: mais um lote sempre que o buffer esvazia
+            devidas = self.geradas + (LOTE_REPLAY if self.pendentes < BUFFER_ENTRADA // 2 else 0)
+        else:
+            decorrido = (time.monotonic() - self.inicio) * self.velocidade
+            volta = int(decorrido // self.duracao_volta)
+            dentro = decorrido - volta * self.duracao_volta
+            devidas = volta * n + int(np.searchsorted(self.agenda, dentro, side='right'))
+        return devidas if self.repetir else min(devidas, n)
+
+    def _abastecer(self):
+        devidas = self._devidas()
+        if devidas > self.geradas:
+            self._gerar(self.geradas, devidas)
+            self.geradas = devidas
+
+    def _gerar(self, inicio, fim):
+        """Codifica as leituras [inicio, fim) e coloca no buffer de entrada."""
+        seqs = np.arange(inicio, fim)
+        if self.perda:
+            manter = self.rng.random(len(seqs)) >= self.perda
+            self.perdidas += int(len(seqs) - np.count_nonzero(manter))
+            seqs = seqs[manter]
+        if len(seqs) == 0:
+            return
+        linhas = seqs % len(self.quadros)
+
+        if self.protocolo == PROTOCOLO_BINARIO or self.ruido:
+            valores = matriz(self.quadros)[linhas, 1:]
+            if self.ruido:
+                valores = valores * (1.0 + self.ruido * self.rng.standard_normal(valores.shape))
+                valores[:, 2:] = np.maximum(valores[:, 2:], 0)
+        if self.protocolo == PROTOCOLO_BINARIO:
+            dados = bytearray(codificar_quadros(seqs, valores[:, 0], valores[:, 1], valores[:, 2:]))
+            tamanhos = np.full(len(seqs), TAMANHO_QUADRO)
+        else:
+            if self.ruido:
+                partes = [(f"{s},{t:.2f},{u:.2f}," + ",".join(str(int(g)) for g in gases)
+                           + "\r\n").encode('ascii')
+                          for s, t, u, gases in zip(seqs.tolist(), valores[:, 0], valores[:, 1],
+                                                    valores[:, 2:])]
+            else:
+                sufixos = self._sufixos
+                partes = [b'%d' % s + sufixos[i] for s, i in zip(seqs.tolist(), linhas.tolist())]
+            tamanhos = np.fromiter(map(len, partes), dtype=np.int64, count=len(partes))
+            dados = bytearray(b''.join(partes))
+
+        if self.corrupcao:
+            self._corromper(dados, tamanhos)
+
+        # Buffer cheio: o que não couber é perdido (leituras inteiras)
+        livre = BUFFER_ENTRADA - self.pendentes
+        if len(dados) > livre:
+            cabem = int(np.searchsorted(np.cumsum(tamanhos), livre, side='right'))
+            self.transbordadas += len(tamanhos) - cabem
+            dados = dados[:int(tamanhos[:cabem].sum())]
+            tamanhos = tamanhos[:cabem]
+        self._buffer += dados
+        self.enviadas += len(tamanhos)
+        self.bytes_enviados += len(dados)
+
+    def _corromper(self, dados, tamanhos):
+        """Troca um byte de uma fração `corrupcao` das leituras."""
+        escolhidas = np.flatnonzero(self.rng.random(len(tamanhos)) < self.corrupcao)
+        if len(escolhidas) == 0:
+            return
+        inicios = np.concatenate(([0], np.cumsum(tamanhos)[:-1]))
+        # Sem tocar no '\r\n' final das linhas de texto (a linha continua uma só)
+        util = tamanhos - (2 if self.protocolo == PROTOCOLO_TEXTO else 0)
+        posicoes = inicios[escolhidas] + (self.rng.random(len(escolhidas)) * util[escolhidas]).astype(np.int64)
+        for p, x in zip(posicoes.tolist(), self.rng.integers(1, 256, len(escolhidas)).tolist()):
+            dados[p] ^= x
+            if self.protocolo == PROTOCOLO_TEXTO and dados[p] in (0x0A, 0x0D):
+                dados[p] = ord('#')
+        self.corrompidas += len(escolhidas)
+
+    # --- interface de serial.Serial ----------------------------------------
+
+    @property
+    def pendentes(self):
+        return len(self._buffer) - self._posicao
+
+    @property
+    def terminou(self):
+        """Arquivo inteiro já entregue e lido (nunca com repetir)."""
+        return (not self.repetir and self.geradas >= len(self.quadros)
+                and self.pendentes == 0)
+
+    @property
+    def in_waiting(self):
+        self._abastecer()
+        return self.pendentes
+
+    def _retirar(self, tamanho):
+        fim = self._posicao + tamanho
+        dados = bytes(self._buffer[self._posicao:fim])
+        self._posicao = min(fim, len(self._buffer))
+        if self._posicao > len(self._buffer) // 2:
+            del self._buffer[:self._posicao]
+            self._posicao = 0
+        return dados
+
+    def _aguardar(self, limite):
+        """Espera chegar algo no buffer; False se deu timeout ou o arquivo acabou."""
+        while True:
+            self._abastecer()
+            if self.pendentes:
+                return True
+            if self.terminou or not self.is_open:
+                return False
+            espera = self._ate_proxima()
+            if limite is not None:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    return False
+                espera = min(espera, restante)
+            time.sleep(espera)
+
+    def _ate_proxima(self):
+        if self.velocidade <= 0:
+            return 0.0
+        n = len(self.quadros)
+        volta, i = divmod(self.geradas, n)
+        devido = (volta * self.duracao_volta + self.agenda[i]) / self.velocidade
+        return min(max(devido - (time.monotonic() - self.inicio), 0.0), INTERVALO_ESPERA)
+
+    def _limite(self):
+        return None if self.timeout is None else time.monotonic() + self.timeout
+
+    def read(self, size=1):
+        if not self._aguardar(self._limite()):
+            return b''
+        return self._retirar(size)
+
+    def readline(self, size=-1):
+        limite = self._limite()
+        linha = b''
+        while size < 0 or len(linha) < size:
+            if not self._aguardar(limite):
+                break
+            fim = self._buffer.find(b'\n', self._posicao)
+            falta = size - len(linha) if size >= 0 else None
+            if fim >= 0:
+                tamanho = fim + 1 - self._posicao
+                linha += self._retirar(tamanho if falta is None else min(tamanho, falta))
+                break
+            linha += self._retirar(self.pendentes if falta is None else min(self.pendentes, falta))
+        return linha
+
+    def reset_input_buffer(self):
+        self._abastecer()
+        self._buffer.clear()
+        self._posicao = 0
+
+    def close(self):
+        self.is_open = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def estatisticas(self):
+        decorrido = time.monotonic() - self.inicio
+        return {
+            'geradas': self.geradas,
+            'enviadas': self.enviadas,
+            'perdidas': self.perdidas,
+            'corrompidas': self.corrompidas,
+            'transbordadas': self.transbordadas,
+            'bytes_enviados': self.bytes_enviados,
+            'pendentes': self.pendentes,
+            'leituras_por_s': self.geradas / decorrido if decorrido > 0 else 0.0,
+        }
+
+# =============================================================================
+# PONTO DE ENTRADA
+# =============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay de gravação como porta serial')
+    parser.add_argument('arquivo', help='CSV ou .bme gravado')
+    parser.add_argument('--velocidade', default='max', help="1 = tempo real, 10 = 10x, max")
+    parser.add_argument('--protocolo', choices=[PROTOCOLO_TEXTO, PROTOCOLO_BINARIO],
+                        default=PROTOCOLO_TEXTO)
+    parser.add_argument('--ruido', type=float, default=0.0)
+    parser.add_argument('--corrupcao', type=float, default=0.0)
+    parser.add_argument('--perda', type=float, default=0.0)
+    parser.add_argument('--repetir', action='store_true')
+    parser.add_argument('--semente', type=int, default=None)
+    parser.add_argument('--duracao', type=float, default=None, help='Segundos (padrão: até o fim)')
+    args = parser.parse_args()
+
+    try:
+        porta = PortaReplay(f"{PREFIXO_REPLAY}:{args.arquivo}", timeout=0.1,
+                            velocidade=args.velocidade, protocolo=args.protocolo,
+                            ruido=args.ruido, corrupcao=args.corrupcao, perda=args.perda,
+                            repetir=args.repetir, semente=args.semente)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"▶️  {args.arquivo}: {len(porta.quadros):,} leituras | velocidade "
+          f"{'máxima' if porta.velocidade <= 0 else f'{porta.velocidade:g}x'} | {porta.protocolo}")
+
+    parser_quadros = criar_parser(porta.protocolo)
+    lidos = 0
+    inicio = time.monotonic()
+    try:
+        with porta:
+            while not porta.terminou:
+                if args.duracao is not None and time.monotonic() - inicio >= args.duracao:
+                    break
+                dados = porta.read(porta.in_waiting or 1)
+                if dados:
+                    lidos += len(parser_quadros.processar([(time.time_ns(), dados)])[1])
+    except KeyboardInterrupt:
+        pass
+
+    decorrido = time.monotonic() - inicio
+    est = porta.estatisticas()
+    print(f"✅ {lidos:,} leituras interpretadas em {decorrido:.2f} s "
+          f"({lidos / max(decorrido, 1e-9):,.0f} leituras/s, "
+          f"{est['bytes_enviados'] / max(decorrido, 1e-9) / 1e6:.1f} MB/s)")
+    print(f"   enviadas {est['enviadas']:,} | perdidas {est['perdidas']:,} | "
+          f"corrompidas {est['corrompidas']:,} | transbordadas {est['transbordadas']:,}")
+    rejeitados = dict(parser_quadros.rejeitados)
+    if sum(rejeitados.values()) or getattr(parser_quadros, 'perdidos', 0):
+        print(f"   parser: rejeitados {rejeitados} | "
+              f"perdidos pela sequência {getattr(parser_quadros, 'perdidos', 0):,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+SERVIÇO DE AQUISIÇÃO DE LONGA DURAÇÃO (PARA O DASHBOARD)
+=============================================================================
+Uma thread por porta serial, criada uma única vez por processo do
+Streamlit (st.cache_resource no dashboard):
+- É a única dona da porta: reruns do script e várias abas do navegador
+  não reabrem nem disputam a COM
+- Lê, interpreta (protocolo.py) e publica os quadros em uma JanelaQuadros
+  protegida por lock
+- Quem desenha só tira instantâneos: desde(cursor) devolve o que chegou
+  depois do último desenho daquela sessão, e aguardar() bloqueia até
+  chegar algo novo (sem laço de polling na interface)
+- A porta 'barramento[:nome]' lê de um publicador em memória compartilhada
+  (barramento.py) em vez de abrir a serial; 'replay:<arquivo>' lê uma
+  gravação (replay.py)
+- Com um ClassificadorVivo definido (classificador_vivo.py), cada lote
+  também é classificado na thread de leitura; estado() traz a classe
+=============================================================================
+"""
+
+import threading
+import time
+
+from barramento import abrir_porta, ler_porta, protocolo_da_porta
+from janela import CAPACIDADE_JANELA, JanelaQuadros
+from protocolo import PROTOCOLO_TEXTO, criar_parser
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+BAUD_RATE = 115200
+
+# Timeout de leitura: limita quanto a thread demora para perceber parar()
+TIMEOUT_LEITURA = 0.1
+
+# =============================================================================
+# SERVIÇO
+# =============================================================================
+
+class ServicoAquisicao:
+    """Dono de uma porta serial; publica quadros em uma janela compartilhada."""
+
+    def __init__(self, porta, protocolo=PROTOCOLO_TEXTO, capacidade=CAPACIDADE_JANELA,
+                 baud_rate=BAUD_RATE):
+        self.porta = porta
+        # Pelo barramento os quadros chegam sempre no protocolo binário; no
+        # replay, no protocolo escolhido no endereço
+        self.protocolo = protocolo_da_porta(porta, protocolo)
+        self.baud_rate = baud_rate
+        self.parser = criar_parser(self.protocolo)
+        self.janela = JanelaQuadros(capacidade)
+        self.condicao = threading.Condition()
+        self.rodando = False
+        self.erro = None
+        self.iniciado_em = None
+        self.ser = None
+        self.classificador = None
+        self._thread = None
+        self._trava = threading.Lock()  # várias sessões podem pedir início/parada
+
+    def iniciar(self, ser=None):
+        """
+        Abre a porta (ou usa `ser` já aberto) e dispara a thread de leitura.
+        Não faz nada se já estiver rodando; depois de parar() ou de um erro,
+        reabre a porta e continua na mesma janela.
+        """
+        with self._trava:
+            if self.rodando:
+                return self
+            self._fechar_porta()
+            self.ser = ser or abrir_porta(self.porta, self.baud_rate, TIMEOUT_LEITURA)
+            self.rodando = True
+            self.erro = None
+            self.iniciado_em = time.time()
+            self._thread = threading.Thread(target=self._ler, name=f'aquisicao-{self.porta}',
+                                            daemon=True)
+            self._thread.start()
+        return self
+
+    def definir_classificador(self, classificador):
+        """Classifica os próximos lotes com `classificador` (None = desliga)."""
+        with self.condicao:
+            self.classificador = classificador
+
+    def parar(self):
+        """Para a thread e libera a porta."""
+        with self._trava:
+            self.rodando = False
+            if self._thread:
+                self._thread.join()
+                self._thread = None
+            self._fechar_porta()
+        with self.condicao:
+            self.condicao.notify_all()
+
+    def _fechar_porta(self):
+        if self.ser is not None and self.ser.is_open:
+            self.ser.close()
+        self.ser = None
+
+    def _ler(self):
+        while self.rodando:
+            try:
+                timestamps, quadros = ler_porta(self.ser, self.parser)
+            except Exception as e:  # porta desconectada, etc.
+                self.erro = e
+                self.rodando = False
+                break
+            if len(quadros):
+                with self.condicao:
+                    self.janela.adicionar(timestamps, quadros)
+                    if self.classificador is not None:
+                        self.classificador.processar(timestamps, quadros)
+                    self.condicao.notify_all()
+        with self.condicao:
+            self.condicao.notify_all()
+
+    @property
+    def total(self):
+        return self.janela.total
+
+    def aguardar(self, cursor, timeout):
+        """Bloqueia até haver leituras depois de `cursor`, parada ou timeout."""
+        with self.condicao:
+            return self.condicao.wait_for(
+                lambda: self.janela.total > cursor or not self.rodando, timeout)
+
+    def desde(self, cursor):
+        """Instantâneo (cópia) do que chegou depois de `cursor` e as posições."""
+        with self.condicao:
+            return self.janela.desde(cursor)
+
+    def estado(self):
+        """Resumo para exibir na interface."""
+        return {
+            'porta': self.porta,
+            'protocolo': self.protocolo,
+            'rodando': self.rodando,
+            'erro': str(self.erro) if self.erro else None,
+            'leituras': self.janela.total,
+            'rejeitados': dict(self.parser.rejeitados),
+            'perdidos': getattr(self.parser, 'perdidos', 0),
+            'layout': getattr(self.parser, 'layout', None),
+            'iniciado_em': self.iniciado_em,
+            'classificacao': self.classificador.estado() if self.classificador else None,
+        }
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+=============================================================================
+SIMULADOR DE SENSORES BME688 EM PSEUDO-TERMINAIS (LINUX/MACOS)
+=============================================================================
+Cria N pseudo-terminais (pty) que se comportam como Picos ligados na USB,
+enviando linhas no formato do firmware (Index,Temp,Umid,G320...G100)
+tiradas de um CSV gravado. Permite testar coleta_gas.py, multi_coleta.py e
+o dashboard sem hardware.
+
+Uso:
+   python simulador_pty.py --sensores 16 --taxa 5 --arquivo planta.csv
+
+O simulador imprime o caminho de cada porta (ex: /dev/pts/7). Como em um
+Pico real, se ninguém estiver lendo a porta e o buffer encher, as linhas
+excedentes são descartadas (e contadas). Uma linha que coube só em parte
+termina de ser escrita antes da próxima: o coletor nunca recebe linha
+cortada.
+
+Com --binario as portas enviam quadros binários (protocolo.py) em vez de
+texto; o número de sequência continua correndo nos quadros descartados,
+então o coletor enxerga a perda como lacuna de sequência.
+=============================================================================
+"""
+
+import argparse
+import asyncio
+import csv
+import os
+import time
+import tty
+
+import numpy as np
+
+from protocolo import codificar_quadros
+
+# =============================================================================
+# CONFIGURAÇÃO
+# =============================================================================
+
+ARQUIVO_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'planta.csv')
+CANAIS_GAS = ['G320', 'G295', 'G270', 'G245', 'G220',
+              'G195', 'G170', 'G145', 'G120', 'G100']
+
+# =============================================================================
+# SIMULAÇÃO
+# =============================================================================
+
+def carregar_linhas(caminho):
+    """Lê um CSV (firmware ou coletor) e gera linhas no formato do firmware."""
+    linhas = []
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for i, row in enumerate(csv.DictReader(f)):
+            try:
+                temp = float(row.get('Temp') or row['temp'])
+                umid = float(row.get('Umid') or row['umid'])
+                gases = [int(float(row[g])) for g in CANAIS_GAS]
+            except (KeyError, TypeError, ValueError):
+                continue
+            linhas.append((temp, umid, gases))
+    return linhas
+
+
+class PortaSimulada:
+    """Um pty cujo lado escravo é aberto pelo coletor como porta serial."""
+
+    def __init__(self, linhas, deslocamento=0, binario=False):
+        self.mestre, self.escravo = os.openpty()
+        tty.setraw(self.escravo)
+        os.set_blocking(self.mestre, False)
+        self.nome = os.ttyname(self.escravo)
+        self.linhas = linhas
+        self.indice = deslocamento
+        self.binario = binario
+        self.enviadas = 0
+        self.descartadas = 0
+        self.pendente = b''  # resto de uma linha escrita em parte
+
+    def _escrever_pendente(self):
+        """Escreve o que der do resto pendente; True se ele acabou."""
+        try:
+            escritos = os.write(self.mestre, self.pendente)
+        except BlockingIOError:
+            return False
+        self.pendente = self.pendente[escritos:]
+        if self.pendente:
+            return False
+        self.enviadas += 1
+        return True
+
+    def enviar(self, quantidade=1):
+        """
+        Escreve as próximas linhas; descarta se o buffer do pty estiver
+        cheio. Linha escrita em parte só conta como enviada quando o resto
+        sai (nas chamadas seguintes, antes de qualquer linha nova).
+        """
+        if self.pendente:
+            self._escrever_pendente()
+        for _ in range(quantidade):
+            temp, umid, gases = self.linhas[self.indice % len(self.linhas)]
+            if self.binario:
+                dados = codificar_quadros([self.indice], [temp], [umid], np.array([gases]))
+            else:
+                linha = f"{self.indice},{temp:.2f},{umid:.2f}," + ",".join(map(str, gases)) + "\r\n"
+                dados = linha.encode('ascii')
+            self.indice += 1
+            if self.pendente:
+                self.descartadas += 1
+                continue
+            self.pendente = dados
+            if not self._escrever_pendente() and len(self.pendente) == len(dados):
+                # Nada coube: a linha inteira é descartada
+                self.pendente = b''
+                self.descartadas += 1
+
+    def fechar(self):
+        os.close(self.mestre)
+        os.close(self.escravo)
+
+
+async def simular(portas, taxa, duracao=None):
+    """Envia `taxa` linhas/s por porta até Ctrl+C ou `duracao` segundos."""
+    inicio = time.monotonic()
+    enviados = 0
+    while duracao is None or time.monotonic() - inicio < duracao:
+        # Quantas linhas cada porta já deveria ter enviado até agora
+        devido = int((time.monotonic() - inicio) * taxa)
+        for p in portas:
+            p.enviar(devido - enviados)
+        enviados = devido
+        await asyncio.sleep(min(1.0 / taxa, 0.05))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulador de BME688 em pseudo-terminais')
+    parser.add_argument('--sensores', type=int, default=1)
+    parser.add_argument('--taxa', type=float, default=1.0, help='linhas por segundo por sensor')
+    parser.add_argument('--arquivo', default=ARQUIVO_PADRAO, help='CSV de origem')
+    parser.add_argument('--duracao', type=float, default=None)
+    parser.add_argument('--binario', action='store_true',
+                        help='envia quadros binários com CRC em vez de texto')
+    args = parser.parse_args()
+
+    linhas = carregar_linhas(args.arquivo)
+    if not linhas:
+        print(f"❌ Nenhuma linha válida em {args.arquivo}")
+        return
+    portas = [PortaSimulada(linhas, deslocamento=i * 97, binario=args.binario)
+              for i in range(args.sensores)]
+
+    print(f"🧪 {len(portas)} sensor(es) simulado(s) a {args.taxa:g} linhas/s (Ctrl+C = parar):")
+    for i, p in enumerate(portas, 1):
+        print(f"   sensor_{i:02d}={p.nome}")
+
+    try:
+        asyncio.run(simular(portas, args.taxa, args.duracao))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in portas:
+            print(f"   {p.nome}: {p.enviadas} enviadas, {p.descartadas} descartadas")
+            p.fechar()
+
+
+if __name__ == "__main__":
+    main()